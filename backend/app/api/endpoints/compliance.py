@@ -1,19 +1,23 @@
-from app.db.database import engine
 from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import List, Optional, Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Optional, Dict, Any
+import asyncio
 import copy
 import logging
 import uuid
 import datetime
 import os
 import json
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
+from app.core.config import settings
 # Import database modules
-from app.db.database import get_db
+from app.db.database import get_async_db, get_db
 from app.db.models.models import Base, Review, ComplianceIssue as DbComplianceIssue, Decision
 from app.db.repositories.compliance_repository import ComplianceRepository
+from app.db.repositories.async_compliance_repository import AsyncComplianceRepository
 
 from app.models.compliance import (
     ComplianceReviewInput,
@@ -22,7 +26,9 @@ from app.models.compliance import (
     DocumentOwnerNotification,
     ComplianceReview,
     ApplySuggestionRequest,
-    ApplySuggestionResponse
+    ApplySuggestionResponse,
+    BatchReviewJob,
+    BatchReviewRequest
 )
 # Import both implementations (original and enhanced)
 from app.services.compliance_service import compliance_service as enhanced_compliance_service
@@ -30,25 +36,111 @@ from app.services.compliance_service import compliance_service as enhanced_compl
 # from app.services.compliance_service import compliance_service as original_compliance_service
 from app.services.document_service import document_service
 from app.services.email_service import EmailService
+from app.services.cache_service import get_analysis_result_cache
+from app.services.batch_review_service import get_batch_review_service
+from app.services.compliance_service.llm_cache import get_llm_cache
+from app.services.compliance_service.tracing import ReviewTrace
 # Import the document matcher service for automatic compliance doc selection
 from app.services.document_matcher_service import get_matching_compliance_document
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Initialize the database on startup - this creates tables based on our models
-Base.metadata.create_all(bind=engine)
-
 # Document content storage is a core part of the design
 # The Review model includes clinical_doc_content and compliance_doc_content fields
 
-# For caching analysis results and document content temporarily to avoid duplicate API calls
-analysis_results_cache: Dict[str, Any] = {}
-document_content_cache: Dict[str, str] = {}
+# Analysis results wait here until the review that stores them is created; the backend
+# (in-process LRU or Redis) is chosen with CACHE_BACKEND
+analysis_results_cache = get_analysis_result_cache()
 
 router = APIRouter()
 
 
+async def _document_content_or_empty(document_id: str, doc_type: str) -> str:
+    """Load a document's content, logging failures and returning an empty string instead."""
+    try:
+        logger.info(
+            f"Fetching {doc_type} document content for {document_id}")
+        return await document_service.aget_document_content(document_id)
+    except Exception as e:
+        logger.error(
+            f"Error fetching {doc_type} document content: {str(e)}")
+        return ""
+
+
+async def _resolve_compliance_doc_id(clinical_doc_id: str, compliance_doc_id: Optional[str]) -> str:
+    """
+    Return the given compliance document ID, or auto-select the best match for the clinical document.
+
+    Raises:
+        HTTPException: 404 if no suitable compliance document exists
+    """
+    if compliance_doc_id:
+        return compliance_doc_id
+
+    logger.info(
+        f"No compliance document specified. Auto-selecting best match for clinical document {clinical_doc_id}")
+    compliance_doc_id = await get_matching_compliance_document(clinical_doc_id)
+
+    if not compliance_doc_id:
+        logger.error(
+            "Failed to auto-select a compliance document. No suitable document found.")
+        raise HTTPException(
+            status_code=404,
+            detail="No suitable compliance document found. Please upload compliance documents first."
+        )
+
+    logger.info(
+        f"Auto-selected compliance document: {compliance_doc_id}")
+    return compliance_doc_id
+
+
+async def _review_input_for_ids(clinical_doc_id: str, compliance_doc_id: str,
+                                force_refresh: bool = False) -> ComplianceReviewInput:
+    """Build a review input with both documents' content loaded from the document service."""
+    clinical_doc_content, compliance_doc_content = await asyncio.gather(
+        document_service.aget_document_content(clinical_doc_id),
+        document_service.aget_document_content(compliance_doc_id))
+
+    return ComplianceReviewInput(
+        clinical_doc_id=clinical_doc_id,
+        compliance_doc_id=compliance_doc_id,
+        clinical_doc_content=clinical_doc_content,
+        compliance_doc_content=compliance_doc_content,
+        force_refresh=force_refresh
+    )
+
+
+def _streaming_analysis_response(review_input: ComplianceReviewInput, stream_format: str) -> StreamingResponse:
+    """
+    Stream the events of a compliance analysis as NDJSON (one JSON object per line)
+    or as Server-Sent Events.
+
+    The final issues are cached like those of the non-streaming endpoints, so a
+    review created after the "complete" event stores them.
+    """
+    async def body() -> AsyncIterator[str]:
+        async for event in enhanced_compliance_service.stream_compliance(review_input):
+            if event["event"] == "complete":
+                # Cached before the client sees the event, so it can create the review right away
+                await asyncio.to_thread(
+                    analysis_results_cache.put, event["clinical_doc_id"], event["compliance_doc_id"],
+                    [ComplianceIssue(**issue) for issue in event["issues"]], profile=event["profile"])
+            data = json.dumps(event)
+            if stream_format == "sse":
+                yield f"event: {event['event']}\ndata: {data}\n\n"
+            else:
+                yield f"{data}\n"
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        # Ask proxies not to buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/analyze-compliance/", response_model=ComplianceReviewResponse)
 async def analyze_compliance(review_input: ComplianceReviewInput):
     """
@@ -61,7 +153,8 @@ async def analyze_compliance(review_input: ComplianceReviewInput):
             f"Analyzing compliance for docs: {review_input.clinical_doc_id}:{review_input.compliance_doc_id}")
 
         # Use the enhanced compliance service to perform the analysis
-        issues = await enhanced_compliance_service.analyze_compliance(review_input)
+        trace = ReviewTrace()
+        issues = await enhanced_compliance_service.analyze_compliance(review_input, trace=trace)
 
         logger.info(f"Analysis complete: Found {len(issues)} issues")
 
@@ -71,10 +164,11 @@ async def analyze_compliance(review_input: ComplianceReviewInput):
             "issues": issues
         }
 
-        # Store result in our temporary cache with a unique timestamp key
-        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        cache_key = f"{review_input.clinical_doc_id}:{review_input.compliance_doc_id}:{timestamp}"
-        analysis_results_cache[cache_key] = result
+        # Keep the latest result of this document pair for the review that stores it
+        # (off the event loop: with CACHE_BACKEND=redis this is a network round-trip)
+        await asyncio.to_thread(
+            analysis_results_cache.put, review_input.clinical_doc_id, review_input.compliance_doc_id,
+            issues, profile=trace.to_dict())
 
         return result
     except Exception as e:
@@ -86,64 +180,35 @@ async def analyze_compliance(review_input: ComplianceReviewInput):
 async def analyze_compliance_by_ids(
     clinical_doc_id: str,
     compliance_doc_id: Optional[str] = None,
-    force_refresh: bool = True,
-    db: Session = Depends(get_db)
+    force_refresh: bool = False
 ):
     """
     Analyze clinical trial documents for compliance issues using document IDs.
     Loads document content from the document service and performs compliance analysis.
     If compliance_doc_id is not provided, automatically selects the most relevant one.
-    Always creates a new analysis rather than reusing previous ones.
+    Always creates a new analysis rather than reusing previous ones; LLM responses
+    to unchanged prompts are reused unless force_refresh is set.
 
     Args:
         clinical_doc_id: ID of the clinical trial document
         compliance_doc_id: Optional ID of the compliance document (auto-selected if not provided)
-        force_refresh: If true, forces a new analysis even if cached results exist
+        force_refresh: If true, sends every prompt to the LLM instead of reusing cached responses
 
     Returns:
         ComplianceReviewResponse with identified compliance issues
     """
     try:
         # If compliance_doc_id is not provided, use document matcher to automatically select it
-        if not compliance_doc_id:
-            logger.info(
-                f"No compliance document specified. Auto-selecting best match for clinical document {clinical_doc_id}")
-            compliance_doc_id = await get_matching_compliance_document(clinical_doc_id)
-
-            if not compliance_doc_id:
-                logger.error(
-                    "Failed to auto-select a compliance document. No suitable document found.")
-                raise HTTPException(
-                    status_code=404,
-                    detail="No suitable compliance document found. Please upload compliance documents first."
-                )
-
-            logger.info(
-                f"Auto-selected compliance document: {compliance_doc_id}")
-
-        # Generate a unique cache key that includes a timestamp to prevent reuse
-        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        cache_key = f"{clinical_doc_id}:{compliance_doc_id}:{timestamp}"
+        compliance_doc_id = await _resolve_compliance_doc_id(clinical_doc_id, compliance_doc_id)
 
         logger.info(
             f"Creating new analysis for documents {clinical_doc_id} and {compliance_doc_id}")
 
-        # Get document content from document service
-        clinical_doc_content = document_service.get_document_content(
-            clinical_doc_id)
-        compliance_doc_content = document_service.get_document_content(
-            compliance_doc_id)
-
-        # Create a review input with the document content
-        review_input = ComplianceReviewInput(
-            clinical_doc_id=clinical_doc_id,
-            compliance_doc_id=compliance_doc_id,
-            clinical_doc_content=clinical_doc_content,
-            compliance_doc_content=compliance_doc_content
-        )
+        review_input = await _review_input_for_ids(clinical_doc_id, compliance_doc_id, force_refresh)
 
         # Use the enhanced compliance service to perform the analysis
-        issues = await enhanced_compliance_service.analyze_compliance(review_input)
+        trace = ReviewTrace()
+        issues = await enhanced_compliance_service.analyze_compliance(review_input, trace=trace)
 
         # Store the results in our cache
         result = {
@@ -160,7 +225,8 @@ async def analyze_compliance_by_ids(
             else:
                 logger.info(
                     f"Caching analysis with 0 issues (compliant document)")
-            analysis_results_cache[cache_key] = result
+            await asyncio.to_thread(
+                analysis_results_cache.put, clinical_doc_id, compliance_doc_id, issues, profile=trace.to_dict())
         else:
             logger.warning(
                 f"Warning: Analysis completed but issues is not a list")
@@ -171,6 +237,117 @@ async def analyze_compliance_by_ids(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/analyze-compliance/stream")
+async def analyze_compliance_stream(
+    review_input: ComplianceReviewInput,
+    stream_format: str = Query("ndjson", alias="format", pattern="^(ndjson|sse)$")
+):
+    """
+    Analyze documents provided directly and stream the results.
+
+    Each verified issue is sent as soon as its chunk pair finishes, interleaved with
+    phase and progress events; the stream ends with a "complete" event holding the
+    final deduplicated issues (or an "error" event).
+
+    Args:
+        review_input: Input containing clinical and compliance document content
+        stream_format: "ndjson" (default) or "sse"
+
+    Returns:
+        StreamingResponse of analysis events
+    """
+    logger.info(
+        f"Streaming compliance analysis for docs: {review_input.clinical_doc_id}:{review_input.compliance_doc_id}")
+    return _streaming_analysis_response(review_input, stream_format)
+
+
+@router.post("/analyze-by-ids/stream")
+async def analyze_compliance_by_ids_stream(
+    clinical_doc_id: str,
+    compliance_doc_id: Optional[str] = None,
+    force_refresh: bool = False,
+    stream_format: str = Query("ndjson", alias="format", pattern="^(ndjson|sse)$")
+):
+    """
+    Streaming version of /analyze-by-ids/.
+
+    Args:
+        clinical_doc_id: ID of the clinical trial document
+        compliance_doc_id: Optional ID of the compliance document (auto-selected if not provided)
+        force_refresh: If true, sends every prompt to the LLM instead of reusing cached responses
+        stream_format: "ndjson" (default) or "sse"
+
+    Returns:
+        StreamingResponse of analysis events
+    """
+    compliance_doc_id = await _resolve_compliance_doc_id(clinical_doc_id, compliance_doc_id)
+    try:
+        review_input = await _review_input_for_ids(clinical_doc_id, compliance_doc_id, force_refresh)
+    except Exception as e:
+        logger.error(f"Error loading documents for streamed analysis: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    logger.info(
+        f"Streaming compliance analysis for documents {clinical_doc_id} and {compliance_doc_id}")
+    return _streaming_analysis_response(review_input, stream_format)
+
+
+@router.post("/batch-reviews/", response_model=BatchReviewJob, status_code=202)
+async def start_batch_review(request: BatchReviewRequest):
+    """
+    Review many clinical documents in one background job.
+
+    Every document is matched to its compliance document (unless compliance_doc_id
+    is given), each compliance document is prepared once for all documents matched
+    to it, and all LLM calls of the job share one concurrency and token budget.
+    Each document is stored as a completed review as soon as it finishes.
+
+    Args:
+        request: Clinical document IDs (or all_clinical) and the job's LLM budget
+
+    Returns:
+        The new job; poll /batch-reviews/{job_id} for its progress
+    """
+    try:
+        return get_batch_review_service().start_job(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/batch-reviews/{job_id}", response_model=BatchReviewJob)
+async def get_batch_review(job_id: str):
+    """
+    Get the plan and progress of a batch review job.
+
+    Args:
+        job_id: ID returned when the job was started
+
+    Returns:
+        The job with the status and review ID of every document
+    """
+    job = get_batch_review_service().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Batch review job {job_id} not found")
+    return job
+
+
+@router.get("/cache-stats/")
+async def get_cache_stats():
+    """
+    Get hit/miss/eviction statistics and size limits of the result, document and LLM response caches.
+
+    Returns:
+        Statistics per cache
+    """
+    stats = {
+        "analysis_results": await asyncio.to_thread(analysis_results_cache.stats),
+        "document_text": document_service.text_store.stats()
+    }
+    if settings.LLM_CACHE_ENABLED:
+        stats["llm_responses"] = await asyncio.to_thread(get_llm_cache().stats)
+    return stats
+
+
 @router.post("/notify-document-owner/", status_code=202)
 async def notify_document_owner(notification: DocumentOwnerNotification):
     """
@@ -192,28 +369,48 @@ async def notify_document_owner(notification: DocumentOwnerNotification):
 
 
 @router.get("/reviews/", response_model=dict)
-async def get_compliance_reviews(db: Session = Depends(get_db)):
+async def get_compliance_reviews(
+    status: Optional[str] = None,
+    clinical_doc_id: Optional[str] = None,
+    compliance_doc_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Get a list of all compliance reviews from the database.
+    Get a list of compliance reviews from the database, newest first.
+
+    Document content is not included; use /reviews/{review_id} for a complete review.
+
+    Args:
+        status: Optional review status filter
+        clinical_doc_id: Optional clinical document ID filter
+        compliance_doc_id: Optional compliance document ID filter
+        limit: Page size (defaults to settings.REVIEWS_PAGE_SIZE)
+        cursor: next_cursor of the previous page
 
     Returns:
-        List of compliance review records
+        List of compliance review summaries and the cursor of the next page (or None)
     """
     try:
-        # Get all reviews from the database
-        db_reviews = ComplianceRepository.get_all_reviews(db)
+        rows, next_cursor = await AsyncComplianceRepository.get_review_summaries(
+            db, status=status, clinical_doc_id=clinical_doc_id,
+            compliance_doc_id=compliance_doc_id, limit=limit or settings.REVIEWS_PAGE_SIZE, cursor=cursor)
 
         # Convert to dictionary format for API response
-        reviews = [review.to_dict() for review in db_reviews]
+        reviews = [Review.summary_dict(row) for row in rows]
 
-        return {"reviews": reviews}
+        return {"reviews": reviews, "next_cursor": next_cursor}
+    except ValueError as e:
+        # Malformed pagination cursor
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting reviews: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/reviews/{review_id}", response_model=dict)
-async def get_review_by_id(review_id: str, db: Session = Depends(get_db)):
+async def get_review_by_id(review_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Get a review by ID, including its document content.
     This helps avoiding repeated API calls for document content.
@@ -225,56 +422,25 @@ async def get_review_by_id(review_id: str, db: Session = Depends(get_db)):
         The review with document content
     """
     try:
-        # Get the review from the database
-        review = ComplianceRepository.get_review_by_id(db, review_id)
+        # Get the review from the database, with its issues
+        review = await AsyncComplianceRepository.get_review_by_id(db, review_id)
 
         if not review:
             raise HTTPException(
                 status_code=404, detail=f"Review {review_id} not found")
 
-        # Get the issues for this review
-        issues = ComplianceRepository.get_issues_for_review(db, review_id)
-
         # Create the complete review response with issues
         review_dict = review.to_dict()
-        review_dict["issues"] = [issue.to_dict() for issue in issues]
+        review_dict["issues"] = [issue.to_dict() for issue in review.issues]
 
-        # Add document content from cache or fetch it
-        clinical_doc_id = review.clinical_doc_id
-        compliance_doc_id = review.compliance_doc_id
-
-        # Check if we need to fetch and cache document content
-        if clinical_doc_id not in document_content_cache:
-            try:
-                logger.info(
-                    f"Fetching clinical document content for {clinical_doc_id}")
-                content = document_service.get_document_content(
-                    clinical_doc_id)
-                document_content_cache[clinical_doc_id] = content
-            except Exception as e:
-                logger.error(
-                    f"Error fetching clinical document content: {str(e)}")
-                # Cache empty string to prevent repeated failures
-                document_content_cache[clinical_doc_id] = ""
-
-        if compliance_doc_id not in document_content_cache:
-            try:
-                logger.info(
-                    f"Fetching compliance document content for {compliance_doc_id}")
-                content = document_service.get_document_content(
-                    compliance_doc_id)
-                document_content_cache[compliance_doc_id] = content
-            except Exception as e:
-                logger.error(
-                    f"Error fetching compliance document content: {str(e)}")
-                # Cache empty string to prevent repeated failures
-                document_content_cache[compliance_doc_id] = ""
-
-        # Add content to the response
-        review_dict["clinical_doc_content"] = document_content_cache.get(
-            clinical_doc_id, "")
-        review_dict["compliance_doc_content"] = document_content_cache.get(
-            compliance_doc_id, "")
+        # The stored content includes applied edits; reviews saved without content
+        # fall back to the source documents (served from the extracted-text store)
+        if not review.clinical_doc_content or not review.compliance_doc_content:
+            clinical_content, compliance_content = await asyncio.gather(
+                _document_content_or_empty(review.clinical_doc_id, "clinical"),
+                _document_content_or_empty(review.compliance_doc_id, "compliance"))
+            review_dict["clinical_doc_content"] = review.clinical_doc_content or clinical_content
+            review_dict["compliance_doc_content"] = review.compliance_doc_content or compliance_content
 
         logger.info(f"Returning review {review_id} with document content")
         return review_dict
@@ -285,8 +451,38 @@ async def get_review_by_id(review_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/reviews/{review_id}/profile", response_model=dict)
+async def get_review_profile(review_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get the profile of the analysis behind a review: phase durations, LLM calls and
+    token usage per phase, and the hit rates of the chunk, embedding and LLM caches.
+
+    Args:
+        review_id: The ID of the review
+
+    Returns:
+        The profile stored with the review
+    """
+    try:
+        found, profile = await AsyncComplianceRepository.get_review_profile(db, review_id)
+
+        if not found:
+            raise HTTPException(
+                status_code=404, detail=f"Review {review_id} not found")
+        if profile is None:
+            raise HTTPException(
+                status_code=404, detail=f"Review {review_id} has no analysis profile")
+
+        return {"review_id": review_id, "profile": profile}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting profile of review {review_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/reviews/{review_id}/issues", response_model=dict)
-async def get_review_issues(review_id: str, db: Session = Depends(get_db)):
+async def get_review_issues(review_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Get all issues for a specific review ID.
 
@@ -298,7 +494,7 @@ async def get_review_issues(review_id: str, db: Session = Depends(get_db)):
     """
     try:
         # Get the issues for this review from the database
-        issues = ComplianceRepository.get_issues_for_review(db, review_id)
+        issues = await AsyncComplianceRepository.get_issues_for_review(db, review_id)
 
         # Convert to dictionary format for API response
         issues_dict = [issue.to_dict() for issue in issues]
@@ -311,7 +507,7 @@ async def get_review_issues(review_id: str, db: Session = Depends(get_db)):
 
 
 @router.post("/reviews/", response_model=ComplianceReview)
-async def create_compliance_review(review: ComplianceReview, db: Session = Depends(get_db)):
+async def create_compliance_review(review: ComplianceReview, db: AsyncSession = Depends(get_async_db)):
     """
     Create a compliance review record in the database.
     Always creates a new review, even if one exists for the same documents.
@@ -332,83 +528,38 @@ async def create_compliance_review(review: ComplianceReview, db: Session = Depen
         clinical_doc_id = review_dict['clinical_doc_id']
         compliance_doc_id = review_dict['compliance_doc_id']
 
-        # Determine if we need to fetch content
-        should_fetch_clinical = clinical_doc_id not in document_content_cache
-        should_fetch_compliance = compliance_doc_id not in document_content_cache
-
-        # Fetch clinical document content if needed
-        if should_fetch_clinical:
-            try:
-                logger.info(
-                    f"Fetching clinical document content for {clinical_doc_id}")
-                clinical_content = document_service.get_document_content(
-                    clinical_doc_id)
-                document_content_cache[clinical_doc_id] = clinical_content
-            except Exception as e:
-                logger.error(
-                    f"Error fetching clinical document content: {str(e)}")
-                # Cache empty string to prevent repeated failures
-                document_content_cache[clinical_doc_id] = ""
-
-        # Fetch compliance document content if needed
-        if should_fetch_compliance:
-            try:
-                logger.info(
-                    f"Fetching compliance document content for {compliance_doc_id}")
-                compliance_content = document_service.get_document_content(
-                    compliance_doc_id)
-                document_content_cache[compliance_doc_id] = compliance_content
-            except Exception as e:
-                logger.error(
-                    f"Error fetching compliance document content: {str(e)}")
-                # Cache empty string to prevent repeated failures
-                document_content_cache[compliance_doc_id] = ""
-
         # Set the document content in the review data for database storage
-        review_dict['clinical_doc_content'] = document_content_cache.get(
-            clinical_doc_id, "")
-        review_dict['compliance_doc_content'] = document_content_cache.get(
-            compliance_doc_id, "")
+        review_dict['clinical_doc_content'], review_dict['compliance_doc_content'] = await asyncio.gather(
+            _document_content_or_empty(clinical_doc_id, "clinical"),
+            _document_content_or_empty(compliance_doc_id, "compliance"))
 
         logger.info(f"Successfully prepared document content for review")
 
+        # Store the latest cached analysis result of this document pair, if any,
+        # with the profile of the analysis
+        issues_data = None
+        if review_dict.get('status') == 'completed':
+            issues_data, review_dict['profile'] = await asyncio.to_thread(
+                analysis_results_cache.pop_with_profile,
+                review_dict['clinical_doc_id'], review_dict['compliance_doc_id'])
+
         # Always create a new review
-        new_review = ComplianceRepository.create_review(db, review_dict)
+        new_review = await AsyncComplianceRepository.create_review(db, review_dict)
         logger.info(f"Creating new review {new_review.id}")
 
-        # Check for cached analysis results for this document pair with any timestamp
-        # Look for any cache key that matches the document pair pattern
-        document_pair_prefix = f"{review_dict['clinical_doc_id']}:{review_dict['compliance_doc_id']}"
-        matching_cache_keys = [key for key in analysis_results_cache.keys()
-                               if key.startswith(document_pair_prefix)]
-
-        # Use the most recent cached result if available
-        if matching_cache_keys and review_dict.get('status') == 'completed':
-            # Sort by timestamp (newest first) if timestamps are included
-            matching_cache_keys.sort(reverse=True)
-            latest_cache_key = matching_cache_keys[0]
-
-            if 'issues' in analysis_results_cache[latest_cache_key]:
-                # Get the issues from the cache
-                issues_data = analysis_results_cache[latest_cache_key]['issues']
-
-                # Always store issues in the database, even if the list is empty
-                if isinstance(issues_data, list):
-                    if len(issues_data) > 0:
-                        logger.info(
-                            f"Adding {len(issues_data)} issues to review {new_review.id}")
-                    else:
-                        logger.info(
-                            f"Storing review {new_review.id} with 0 issues (compliant document)")
-
-                    # Add the issues to the review in the database
-                    ComplianceRepository.add_issues_to_review(
-                        db, new_review.id, issues_data)
-
-                    # Clear from cache once stored in the database
-                    for key in matching_cache_keys:
-                        if key in analysis_results_cache:
-                            del analysis_results_cache[key]
+        if review_dict.get('status') == 'completed':
+            # Always store issues in the database, even if the list is empty
+            if issues_data is not None:
+                if len(issues_data) > 0:
+                    logger.info(
+                        f"Adding {len(issues_data)} issues to review {new_review.id}")
+                else:
+                    logger.info(
+                        f"Storing review {new_review.id} with 0 issues (compliant document)")
+
+                # Add the issues to the review in the database
+                new_review = await AsyncComplianceRepository.add_issues_to_review(
+                    db, new_review.id, issues_data)
 
         # Return the review as a dictionary
         return new_review.to_dict()
@@ -497,44 +648,88 @@ def update_issue_statuses(issue_statuses: List[Dict[str, Any]], db: Session = De
 
 
 @router.post("/update-review-content/{review_id}")
-def update_review_content(review_id: str, content_data: Dict[str, str], db: Session = Depends(get_db)):
+async def update_review_content(review_id: str, content_data: Dict[str, str], reanalyze: bool = False,
+                                db: AsyncSession = Depends(get_async_db)):
     """
     Update the document content of a review to save applied changes.
     This ensures that when the document is reopened, the applied changes are still visible.
 
+    With reanalyze=true, only the edited parts of the clinical document are analyzed
+    again: stored issues in unchanged text keep their status with remapped offsets,
+    undecided issues whose text was edited are replaced by the issues found in the
+    edited regions. Issues with a decision are always kept.
+
     Args:
         review_id: ID of the review to update
         content_data: Dictionary containing the updated clinical_doc_content
+        reanalyze: Whether to incrementally re-analyze the edited regions
         db: Database session dependency
 
     Returns:
-        Updated review object
+        Updated review object (with an "incremental" summary when re-analyzed)
     """
     try:
         logger.info(f"Updating document content for review {review_id}")
 
-        # Get the review
-        review = ComplianceRepository.get_review_by_id(db, review_id)
+        # Get the review (with decisions, which keep issues from being replaced)
+        review = await AsyncComplianceRepository.get_review_by_id(
+            db, review_id, with_decisions=reanalyze)
 
         if not review:
             raise HTTPException(
                 status_code=404, detail=f"Review {review_id} not found")
 
-        # Update the clinical_doc_content field
-        if "clinical_doc_content" in content_data:
-            update_data = {
-                "clinical_doc_content": content_data["clinical_doc_content"]
-            }
+        if "clinical_doc_content" not in content_data:
+            raise HTTPException(
+                status_code=400, detail="Missing clinical_doc_content field")
 
-            updated_review = ComplianceRepository.update_review(
-                db, review_id, update_data)
+        new_content = content_data["clinical_doc_content"]
+        previous_content = review.clinical_doc_content
+
+        if not reanalyze or not previous_content:
+            if reanalyze:
+                logger.warning(
+                    f"Review {review_id} has no stored clinical content to diff against, skipping re-analysis")
+
+            # Update the clinical_doc_content field
+            updated_review = await AsyncComplianceRepository.update_review(
+                db, review_id, {"clinical_doc_content": new_content})
 
             logger.info(
                 f"Successfully updated document content for review {review_id}")
             return updated_review.to_dict()
-        else:
-            raise HTTPException(
-                status_code=400, detail="Missing clinical_doc_content field")
+
+        # Incremental re-analysis of the edited regions only
+        compliance_content = review.compliance_doc_content or await document_service.aget_document_content(
+            review.compliance_doc_id)
+        review_input = ComplianceReviewInput(
+            clinical_doc_id=review.clinical_doc_id,
+            compliance_doc_id=review.compliance_doc_id,
+            clinical_doc_content=new_content,
+            compliance_doc_content=compliance_content
+        )
+        existing_issues = [{**issue.to_dict(), "decided": bool(issue.decisions)} for issue in review.issues]
+
+        result = await enhanced_compliance_service.analyze_incremental(
+            review_input, previous_content, existing_issues)
+
+        updated_review = await AsyncComplianceRepository.apply_incremental_analysis(
+            db, review_id, new_content, result)
+
+        logger.info(
+            f"Updated review {review_id}: {len(result.remapped_issues)} issues kept, "
+            f"{len(result.removed_issue_ids)} removed, {len(result.new_issues)} added")
+
+        response = updated_review.to_dict()
+        response["incremental"] = {
+            "changed_regions": result.changed_regions,
+            "reanalyzed_chunks": result.reanalyzed_chunks,
+            "analyzed_pairs": result.analyzed_pairs,
+            "kept_issues": len(result.remapped_issues),
+            "removed_issue_ids": result.removed_issue_ids,
+            "new_issues": len(result.new_issues)
+        }
+        return response
     except HTTPException:
         raise
     except Exception as e:
@@ -559,7 +754,7 @@ def save_decisions(review_id: str, decisions: List[Dict[str, Any]], db: Session
         logger.info(
             f"Saving {len(decisions)} decisions for review {review_id}")
 
-        saved_count = 0
+        normalized_decisions = []
         for decision_data in decisions:
             # Support both camelCase (issueId) and snake_case (issue_id) for flexibility
             issue_id = decision_data.get(
@@ -569,15 +764,6 @@ def save_decisions(review_id: str, decisions: List[Dict[str, Any]], db: Session
                     f"Missing issue_id in decision data: {decision_data}")
                 continue
 
-            # Make sure the issue belongs to the specified review
-            issue = db.query(DbComplianceIssue).filter(
-                DbComplianceIssue.id == issue_id).first()
-
-            if not issue or issue.review_id != review_id:
-                logger.warning(
-                    f"Issue {issue_id} does not exist or does not belong to review {review_id}")
-                continue
-
             # Support both camelCase and snake_case for action field
             action = decision_data.get("action") or decision_data.get("status")
             if not action:
@@ -590,33 +776,27 @@ def save_decisions(review_id: str, decisions: List[Dict[str, Any]], db: Session
             applied_change = decision_data.get(
                 "applied_change") or decision_data.get("appliedChange")
 
-            ComplianceRepository.add_decision(db, {
+            normalized_decisions.append({
                 "issue_id": issue_id,
                 "action": action,
                 "applied_change": applied_change,
                 "comments": decision_data.get("comments")
             })
-            saved_count += 1
-
-        # Update review status if all decisions have been made
-        review = ComplianceRepository.get_review_by_id(db, review_id)
-        if review and len(review.issues) > 0:
-            # Get all issues for this review
-            issues = ComplianceRepository.get_issues_for_review(db, review_id)
-
-            # Count how many issues have decisions
-            issues_with_decisions = 0
-            for issue in issues:
-                if issue.decisions and len(issue.decisions) > 0:
-                    issues_with_decisions += 1
-
-            # If all issues have decisions, mark the review as completed
-            if issues_with_decisions == len(issues):
-                ComplianceRepository.update_review(
-                    db, review_id, {"status": "completed"})
-                logger.info(f"Updated review {review_id} status to completed")
-
-        return {"message": f"Successfully saved {saved_count} decisions", "saved_count": saved_count}
+
+        # Decisions on issues of other reviews are skipped; the review is marked
+        # completed once every issue has a decision
+        result = ComplianceRepository.save_decisions(
+            db, review_id, normalized_decisions)
+        saved_count = result["saved_count"]
+
+        if result["skipped_count"]:
+            logger.warning(
+                f"Skipped {result['skipped_count']} decisions on issues that do not exist or do not belong to review {review_id}")
+        if result["review_completed"]:
+            logger.info(f"Updated review {review_id} status to completed")
+
+        return {"message": f"Successfully saved {saved_count} decisions", "saved_count": saved_count,
+                "skipped_count": result["skipped_count"] + len(decisions) - len(normalized_decisions)}
     except Exception as e:
         logger.error(f"Error saving decisions: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -718,7 +898,7 @@ def get_issue_decisions(issue_id: str, db: Session = Depends(get_db)):
 
 
 @router.delete("/review/{review_id}/")
-def delete_review(review_id: str, db: Session = Depends(get_db)):
+async def delete_review(review_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Hard delete a review and all associated data (issues, decisions).
     This permanently removes the record from the database.
@@ -733,30 +913,18 @@ def delete_review(review_id: str, db: Session = Depends(get_db)):
     try:
         logger.info(f"Deleting review {review_id}")
 
-        # Get the review
-        review = ComplianceRepository.get_review_by_id(db, review_id)
+        # Delete decisions, issues and the review with one statement each
+        deleted = await AsyncComplianceRepository.delete_review(db, review_id)
 
-        if not review:
+        if deleted is None:
             raise HTTPException(
                 status_code=404, detail=f"Review {review_id} not found")
 
-        # First, get all issues for this review and delete their decisions
-        issues = ComplianceRepository.get_issues_for_review(db, review_id)
-        for issue in issues:
-            # Delete decisions for this issue
-            db.query(Decision).filter(Decision.issue_id == issue.id).delete()
-
-        # Delete all issues for this review
-        db.query(DbComplianceIssue).filter(
-            DbComplianceIssue.review_id == review_id).delete()
-
-        # Delete the review itself
-        db.delete(review)
-
-        # Commit changes
-        db.commit()
+        logger.info(
+            f"Deleted review {review_id} with {deleted['issues']} issues and {deleted['decisions']} decisions")
 
-        return {"success": True, "message": f"Review {review_id} successfully deleted", "review_id": review_id}
+        return {"success": True, "message": f"Review {review_id} successfully deleted", "review_id": review_id,
+                "deleted": deleted}
     except HTTPException:
         # Re-raise HTTP exceptions (like 404) directly
         raise
@@ -764,7 +932,7 @@ def delete_review(review_id: str, db: Session = Depends(get_db)):
         # Log and handle other exceptions
         logger.error(
             f"Error deleting review {review_id}: {str(e)}", exc_info=True)
-        db.rollback()  # Roll back any uncommitted changes
+        await db.rollback()  # Roll back any uncommitted changes
         raise HTTPException(
             status_code=500, detail=f"Failed to delete review: {str(e)}")
 
@@ -33,11 +33,12 @@ async def get_document_content(document_id: str):
         document_id: Document identifier
     
     Returns:
-        Document text content
+        Document text content and the character offset at which each page starts
     """
     try:
-        content = document_service.get_document_content(document_id)
-        return {"document_id": document_id, "content": content}
+        extracted = await document_service.aget_document_text(document_id)
+        return {"document_id": document_id, "content": extracted.text,
+                "page_offsets": extracted.page_offsets}
     except HTTPException as e:
         # Re-raise HTTP exceptions
         raise
@@ -39,6 +39,106 @@ class Settings(BaseSettings):
     CHUNKING_STRATEGY: str = Field(default=os.getenv("CHUNKING_STRATEGY", "agentic"))
     # Optional custom parameters for specific chunkers
     CHUNKING_PARAMS: dict = Field(default={})
+    # Agentic chunking rewrites paragraph batches with the LLM; when off it splits recursively
+    AGENTIC_CHUNKING_LLM_ENABLED: bool = Field(default=os.getenv("AGENTIC_CHUNKING_LLM_ENABLED", "False").lower() == "true")
+    # Maximum number of concurrent LLM calls while agentic chunking a document
+    CHUNKING_MAX_CONCURRENCY: int = Field(default=int(os.getenv("CHUNKING_MAX_CONCURRENCY", "4")))
+    # Maximum number of chunk pairs analyzed per review, most similar first (0 = unlimited)
+    MAX_CHUNK_PAIRS_PER_REVIEW: int = Field(default=int(os.getenv("MAX_CHUNK_PAIRS_PER_REVIEW", "150")))
+
+    # LLM Concurrency Settings
+    # Maximum number of concurrent LLM calls per compliance review (1 = sequential)
+    LLM_MAX_CONCURRENCY: int = Field(default=int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
+    # Prompt token budget per minute for a single review (0 = unlimited)
+    LLM_TOKENS_PER_MINUTE: int = Field(default=int(os.getenv("LLM_TOKENS_PER_MINUTE", "0")))
+
+    # Batch Review Settings
+    # LLM calls in flight across all documents of a batch review job
+    BATCH_LLM_MAX_CONCURRENCY: int = Field(default=int(os.getenv("BATCH_LLM_MAX_CONCURRENCY", "16")))
+    # Prompt token budget per minute for a whole batch job (0 = unlimited)
+    BATCH_LLM_TOKENS_PER_MINUTE: int = Field(default=int(os.getenv("BATCH_LLM_TOKENS_PER_MINUTE", "0")))
+    # Clinical documents analyzed at once within a batch job
+    BATCH_MAX_CONCURRENT_DOCUMENTS: int = Field(default=int(os.getenv("BATCH_MAX_CONCURRENT_DOCUMENTS", "4")))
+    # Finished batch jobs kept in memory for progress queries
+    BATCH_JOB_HISTORY: int = Field(default=int(os.getenv("BATCH_JOB_HISTORY", "50")))
+
+    # Confidence Scoring Settings
+    # Options: "pair" (one batched call per chunk pair), "review" (batched calls over the whole review)
+    CONFIDENCE_SCORING_SCOPE: str = Field(default=os.getenv("CONFIDENCE_SCORING_SCOPE", "review"))
+    # Maximum number of issues scored in a single LLM call
+    CONFIDENCE_BATCH_SIZE: int = Field(default=int(os.getenv("CONFIDENCE_BATCH_SIZE", "20")))
+
+    # Whole-Document Analysis Settings
+    # Options: "auto" (direct if the prompt fits FULL_DOCUMENT_MAX_PROMPT_TOKENS), "direct", "map_reduce"
+    FULL_DOCUMENT_MODE: str = Field(default=os.getenv("FULL_DOCUMENT_MODE", "auto"))
+    # Estimated prompt tokens of the direct whole-document prompt, and of the holistic prompt over digests
+    FULL_DOCUMENT_MAX_PROMPT_TOKENS: int = Field(default=int(os.getenv("FULL_DOCUMENT_MAX_PROMPT_TOKENS", "12000")))
+    # Size (estimated tokens) of the document sections condensed into one digest each
+    DIGEST_SECTION_TOKENS: int = Field(default=int(os.getenv("DIGEST_SECTION_TOKENS", "3000")))
+    # Maximum number of verbatim statements in the digest of a section
+    DIGEST_MAX_STATEMENTS: int = Field(default=int(os.getenv("DIGEST_MAX_STATEMENTS", "15")))
+    # Section digests are cached per document and reused until the document changes
+    DIGEST_CACHE_ENABLED: bool = Field(default=os.getenv("DIGEST_CACHE_ENABLED", "True").lower() == "true")
+
+    # Cache Settings
+    # Directory for persistent caches (embeddings, chunking results, ...)
+    CACHE_DIR: str = Field(default=os.getenv("CACHE_DIR", os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".cache")))
+    EMBEDDING_CACHE_ENABLED: bool = Field(default=os.getenv("EMBEDDING_CACHE_ENABLED", "True").lower() == "true")
+    # Number of embedding vectors kept in the in-memory LRU tier
+    EMBEDDING_CACHE_MEMORY_ITEMS: int = Field(default=int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "10000")))
+    # Size of the embedding vector files before the store is compacted to recently used vectors (0 = unbounded)
+    EMBEDDING_CACHE_MAX_BYTES: int = Field(default=int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(512 * 1024 * 1024))))
+    # Responses to repeated temperature-0 prompts are served from a SQLite cache
+    LLM_CACHE_ENABLED: bool = Field(default=os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true")
+    # Seconds a cached LLM response stays valid (0 = no expiry)
+    LLM_CACHE_TTL_SECONDS: int = Field(default=int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600))))
+    # Total size of the cached LLM responses before the least recently used are evicted (0 = unbounded)
+    LLM_CACHE_MAX_BYTES: int = Field(default=int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024))))
+    CHUNK_CACHE_ENABLED: bool = Field(default=os.getenv("CHUNK_CACHE_ENABLED", "True").lower() == "true")
+    # Cached chunking results (and section digests) kept on disk before the least recently used are removed (0 = unbounded)
+    CHUNK_CACHE_MAX_ENTRIES: int = Field(default=int(os.getenv("CHUNK_CACHE_MAX_ENTRIES", "10000")))
+    # Extracted document text is persisted on disk and reused until the file changes
+    DOCUMENT_TEXT_CACHE_ENABLED: bool = Field(default=os.getenv("DOCUMENT_TEXT_CACHE_ENABLED", "True").lower() == "true")
+    # Number of extracted documents kept in memory
+    DOCUMENT_TEXT_CACHE_MEMORY_ITEMS: int = Field(default=int(os.getenv("DOCUMENT_TEXT_CACHE_MEMORY_ITEMS", "64")))
+    # Size of the extracted text kept on disk before the least recently used documents are removed (0 = unbounded)
+    DOCUMENT_TEXT_CACHE_MAX_BYTES: int = Field(default=int(os.getenv("DOCUMENT_TEXT_CACHE_MAX_BYTES", str(512 * 1024 * 1024))))
+
+    # Review Tracing Settings
+    # Spans kept individually in a review profile; further spans only count towards the phase totals
+    REVIEW_TRACE_MAX_SPANS: int = Field(default=int(os.getenv("REVIEW_TRACE_MAX_SPANS", "500")))
+
+    # Review Listing Settings
+    # Reviews returned per page by GET /reviews/ when no limit is given (max 1000)
+    REVIEWS_PAGE_SIZE: int = Field(default=int(os.getenv("REVIEWS_PAGE_SIZE", "100")))
+
+    # Shared Result Cache Settings
+    # Options: "memory" (per process), "redis" (shared by all workers)
+    CACHE_BACKEND: str = Field(default=os.getenv("CACHE_BACKEND", "memory"))
+    REDIS_URL: str = Field(default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    # Seconds an analysis result is kept for the review that stores it (0 = no expiry)
+    RESULT_CACHE_TTL_SECONDS: int = Field(default=int(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600")))
+    # Limits of the in-memory backend (0 = unbounded)
+    RESULT_CACHE_MAX_ITEMS: int = Field(default=int(os.getenv("RESULT_CACHE_MAX_ITEMS", "256")))
+    RESULT_CACHE_MAX_BYTES: int = Field(default=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+
+    # PDF Extraction Settings
+    # Worker processes used to extract large PDFs (0 = one per CPU, 1 = no process pool)
+    PDF_EXTRACTION_WORKERS: int = Field(default=int(os.getenv("PDF_EXTRACTION_WORKERS", "0")))
+    # Consecutive pages extracted by one worker task
+    PDF_EXTRACTION_PAGES_PER_TASK: int = Field(default=int(os.getenv("PDF_EXTRACTION_PAGES_PER_TASK", "8")))
+    # PDFs with fewer pages are extracted without the process pool
+    PDF_PARALLEL_MIN_PAGES: int = Field(default=int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16")))
+
+    # Document Matching Settings
+    # Options: "mean" (mean-pooled document embeddings), "max_sim" (chunk-level max-similarity)
+    MATCHING_MODE: str = Field(default=os.getenv("MATCHING_MODE", "mean"))
+    # Size and overlap (characters) of the deterministic chunks embedded for matching
+    MATCHING_CHUNK_SIZE: int = Field(default=int(os.getenv("MATCHING_CHUNK_SIZE", "2000")))
+    MATCHING_CHUNK_OVERLAP: int = Field(default=int(os.getenv("MATCHING_CHUNK_OVERLAP", "200")))
+    # Number of ranked compliance documents logged for every match
+    MATCHING_TOP_K: int = Field(default=int(os.getenv("MATCHING_TOP_K", "3")))
 
     # Email Settings
     SMTP_SERVER: str = Field(default=os.getenv("SMTP_SERVER", "smtp.gmail.com"))
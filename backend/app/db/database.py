@@ -1,8 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, select, text, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 import os
 import logging
+import re
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -14,20 +17,92 @@ DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
 DB_NAME = os.getenv("DB_NAME", "auditcopilot")
 
-# Log database connection (without password)
-logger.info(f"Connecting to PostgreSQL database at {DB_HOST}:{DB_PORT}/{DB_NAME}")
+# Connection pool parameters (PostgreSQL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() in ("true", "1", "t", "yes")
+# Server-side limit of a single statement in milliseconds (0 = no limit)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+# PostgreSQL database URL; DATABASE_URL overrides it (e.g. sqlite:///./reviews.db for local runs)
+SQLALCHEMY_DATABASE_URL = os.getenv(
+    "DATABASE_URL", f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
+
+# Drivers used by the async engine for each database
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    """
+    Derive the async driver URL of a database URL.
+
+    Args:
+        url: Synchronous SQLAlchemy URL (postgresql://... or sqlite:///...)
+
+    Returns:
+        The same URL using asyncpg or aiosqlite
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """
+    Build the create_engine/create_async_engine keyword arguments of a database URL.
+
+    PostgreSQL connections get a bounded pool with pre-ping and recycling, and
+    a statement_timeout set when the connection is opened. SQLite only needs
+    to allow its connections to move between threads.
+
+    Args:
+        url: Database URL
+        is_async: Whether the options are for the async engine
+
+    Returns:
+        Dictionary of engine options
+    """
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}
 
-# PostgreSQL database URL
-SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING
+    }
+    if backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS > 0:
+        if is_async:
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+# Log database connection (without password)
+logger.info(f"Connecting to database at {make_url(SQLALCHEMY_DATABASE_URL).render_as_string(hide_password=True)}")
 
 # Create SQLAlchemy engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Counter for generating sequential review IDs
-review_counter = 0
+# Async engine on the same database, used by the async endpoints so that queries
+# don't block the event loop
+ASYNC_DATABASE_URL = async_database_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+
+# Objects stay readable after commit; attributes are never lazy-loaded under asyncio
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False,
+                                       expire_on_commit=False)
 
 def get_db():
     """
@@ -40,64 +115,163 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    """
+    Dependency for getting an async database session.
+    Used by async endpoints instead of get_db.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # No schema checking function - we're implementing this from scratch
 # Document content storage is a core part of the design, not an add-on
 
 
-def generate_review_id():
+REVIEW_ID_PATTERN = re.compile(r'^R-0*([0-9]+)$')
+REVIEW_ID_COUNTER_NAME = "reviews"
+
+
+def format_review_id(number: int) -> str:
+    """Format a review number as a review ID (R-00001)."""
+    return f"R-{number:05d}"
+
+
+def _uses_sequence(bind) -> bool:
+    """Whether review numbers come from review_id_seq (PostgreSQL) or the counter table."""
+    return bind.dialect.name == "postgresql"
+
+
+def _max_review_number(db: Session) -> int:
+    """Highest number among existing R-xxxxx review IDs (0 if there are none)."""
+    from app.db.models.models import Review
+
+    numbers = [int(match.group(1))
+               for (review_id,) in db.query(Review.id).filter(Review.id.like("R-%"))
+               for match in [REVIEW_ID_PATTERN.match(review_id)] if match]
+    return max(numbers, default=0)
+
+
+def _add_missing_columns(bind) -> None:
     """
-    Generate a sequential review ID in the format R-00001
-    Uses a database-stored counter to maintain sequence
+    Add nullable columns of the models that are missing from existing tables.
+
+    create_all only creates missing tables; columns added to a model later (such as
+    reviews.profile) are added here, so databases created by older versions keep working.
     """
-    from app.db.models.models import Base, Review
-    import re
-    
-    # Initialize database tables if they don't exist
-    Base.metadata.create_all(bind=engine)
-    
-    # Get a session
-    db = SessionLocal()
-    
+    from app.db.models.models import Base
+
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                connection.execute(text(
+                    f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+                logger.info(f"Added column {table.name}.{column.name}")
+
+
+def _add_missing_indexes(bind) -> None:
+    """
+    Create indexes of the models that are missing from existing tables.
+
+    create_all skips tables that already exist, so indexes added to a model later
+    (such as ix_reviews_created_at_id) would otherwise never reach older databases.
+    """
+    from app.db.models.models import Base
+
+    existing_tables = set(inspect(bind).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index["name"] for index in inspect(bind).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            index.create(bind, checkfirst=True)
+            logger.info(f"Created index {index.name} on {table.name}")
+
+
+def init_db(bind=None):
+    """
+    Create missing tables, columns and indexes and make sure the review ID allocator starts
+    after the highest existing review ID.
+
+    Runs once at application startup; the existing IDs are only scanned here,
+    never when a review is created.
+
+    Args:
+        bind: Engine to initialize (defaults to the application engine)
+    """
+    from app.db.models.models import Base, ReviewIdCounter, review_id_seq
+
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    _add_missing_columns(bind)
+    _add_missing_indexes(bind)
+
+    db = Session(bind=bind)
     try:
-        # Get all reviews and sort them by ID to find the highest numberic value
-        all_reviews = db.query(Review).all()
-        
-        if all_reviews:
-            # Extract numeric parts from all review IDs
-            numeric_values = []
-            pattern = r'R-0*([1-9][0-9]*)'
-            
-            for review in all_reviews:
-                if review.id and review.id.startswith('R-'):
-                    match = re.match(pattern, review.id)
-                    if match:
-                        try:
-                            numeric_values.append(int(match.group(1)))
-                        except (ValueError, IndexError):
-                            pass
-            
-            # Find the highest numeric value if any valid IDs exist
-            if numeric_values:
-                next_num = max(numeric_values) + 1
-            else:
-                next_num = 1
+        max_number = _max_review_number(db)
+
+        if _uses_sequence(bind):
+            if max_number:
+                # Never move the sequence backwards; other workers may already be using it
+                db.execute(
+                    text(f"SELECT setval('{review_id_seq.name}', GREATEST(:max_number, "
+                         f"(SELECT last_value FROM {review_id_seq.name})))"),
+                    {"max_number": max_number})
         else:
-            # Start from 1 if no reviews exist
-            next_num = 1
-            
-        # Format with leading zeros (5 digits)
-        new_id = f"R-{next_num:05d}"
-        
-        # Double-check the ID doesn't already exist
-        existing = db.query(Review).filter(Review.id == new_id).first()
-        if existing:
-            # If somehow this ID exists, increment until we find an unused one
-            while existing:
-                next_num += 1
-                new_id = f"R-{next_num:05d}"
-                existing = db.query(Review).filter(Review.id == new_id).first()
-        
-        return new_id
-    
+            counter = db.get(ReviewIdCounter, REVIEW_ID_COUNTER_NAME)
+            if counter is None:
+                db.add(ReviewIdCounter(name=REVIEW_ID_COUNTER_NAME, value=max_number))
+            elif counter.value < max_number:
+                counter.value = max_number
+
+        db.commit()
+        logger.info(f"Database initialized; review IDs continue after {format_review_id(max_number)}")
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
+
+
+def generate_review_id(db: Session) -> str:
+    """
+    Allocate the next sequential review ID in the format R-00001
+
+    On PostgreSQL the number comes from review_id_seq (nextval is atomic and never
+    hands out the same value twice, even across workers). Other databases increment
+    the row of review_id_counter, which holds a row lock until the caller's
+    transaction ends.
+
+    Args:
+        db: Database session of the transaction creating the review
+
+    Returns:
+        The new review ID
+    """
+    from app.db.models.models import ReviewIdCounter, review_id_seq
+
+    if _uses_sequence(db.get_bind()):
+        number = db.execute(review_id_seq.next_value()).scalar()
+    else:
+        updated = db.execute(
+            update(ReviewIdCounter)
+            .where(ReviewIdCounter.name == REVIEW_ID_COUNTER_NAME)
+            .values(value=ReviewIdCounter.value + 1)
+        ).rowcount
+        if not updated:
+            raise RuntimeError("Review ID counter is missing; init_db() must run at startup")
+        number = db.execute(
+            select(ReviewIdCounter.value).where(ReviewIdCounter.name == REVIEW_ID_COUNTER_NAME)
+        ).scalar()
+
+    return format_review_id(number)
@@ -1,11 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Sequence, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 import datetime
 import uuid
 
 Base = declarative_base()
 
+# Allocates the numeric part of review IDs on PostgreSQL (created by create_all)
+review_id_seq = Sequence("review_id_seq", metadata=Base.metadata)
+
 
 class Review(Base):
     """
@@ -13,6 +16,8 @@ class Review(Base):
     Stores the main review information and links to the documents being compared
     """
     __tablename__ = "reviews"
+    # Matches the newest-first ORDER BY of the review listing and its keyset cursor
+    __table_args__ = (Index("ix_reviews_created_at_id", "created_at", "id"),)
 
     id = Column(String, primary_key=True)  # R-00001 format
     clinical_doc_id = Column(String, nullable=False)
@@ -22,8 +27,11 @@ class Review(Base):
     complianceDoc = Column(String, nullable=False)
     clinical_doc_content = Column(Text)  # Store actual document content
     compliance_doc_content = Column(Text)  # Store actual document content
-    status = Column(String, nullable=False)
+    status = Column(String, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.datetime.now)
+    # Trace of the analysis (phase durations, token usage, cache hit rates);
+    # only loaded when requested
+    profile = deferred(Column(JSON, nullable=True))
 
     # Relationships
     issues = relationship(
@@ -46,6 +54,27 @@ class Review(Base):
             "lowConfidenceIssues": sum(1 for issue in self.issues if issue.confidence == "low")
         }
 
+    @staticmethod
+    def summary_dict(row) -> dict:
+        """
+        Convert a row of ComplianceRepository.get_review_summaries to the listing format.
+
+        Same fields as to_dict, minus the document bodies; the issue counts come
+        from the row instead of loading the issues.
+        """
+        return {
+            "id": row.id,
+            "clinical_doc_id": row.clinical_doc_id,
+            "compliance_doc_id": row.compliance_doc_id,
+            "clinicalDoc": row.clinicalDoc,
+            "complianceDoc": row.complianceDoc,
+            "status": row.status,
+            "created": row.created_at.strftime("%b %d, %Y, %I:%M %p"),
+            "issues": row.issue_count or 0,
+            "highConfidenceIssues": row.high_confidence_count or 0,
+            "lowConfidenceIssues": row.low_confidence_count or 0
+        }
+
 
 class ComplianceIssue(Base):
     """
@@ -55,7 +84,7 @@ class ComplianceIssue(Base):
     __tablename__ = "compliance_issues"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    review_id = Column(String, ForeignKey("reviews.id"), nullable=False)
+    review_id = Column(String, ForeignKey("reviews.id"), nullable=False, index=True)
 
     # Issue content
     clinical_text = Column(Text, nullable=False)
@@ -111,7 +140,7 @@ class Decision(Base):
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     issue_id = Column(String, ForeignKey(
-        "compliance_issues.id"), nullable=False)
+        "compliance_issues.id"), nullable=False, index=True)
     action = Column(String, nullable=False)  # "accepted" or "rejected"
     # Stores the text that was applied when accepted
     applied_change = Column(Text)
@@ -131,3 +160,14 @@ class Decision(Base):
             "comments": self.comments,
             "timestamp": self.timestamp.strftime("%b %d, %Y, %I:%M %p")
         }
+
+
+class ReviewIdCounter(Base):
+    """
+    Review ID counter for databases without sequences
+    Holds the last allocated review number in a single row
+    """
+    __tablename__ = "review_id_counter"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False)
@@ -0,0 +1,192 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.db.models.models import Review, ComplianceIssue
+from app.db.repositories.compliance_repository import ComplianceRepository
+from app.models.compliance import ComplianceIssue as ComplianceIssueModel, IncrementalAnalysisResult
+
+
+class AsyncComplianceRepository:
+    """
+    Async counterpart of ComplianceRepository for the async API endpoints
+
+    Reads are issued directly on the AsyncSession. Writes run the synchronous
+    repository methods through AsyncSession.run_sync, which drives the same code
+    on the async driver, so both repositories share one implementation of the
+    write logic. Relationships used by Review.to_dict are loaded eagerly because
+    lazy loading is not possible under asyncio.
+    """
+
+    @staticmethod
+    async def create_review(db: AsyncSession, review_data: Dict[str, Any]) -> Review:
+        """
+        Create a new review record in the database
+
+        Args:
+            db: Async database session
+            review_data: Review data dictionary
+
+        Returns:
+            The created review object
+        """
+        review = await db.run_sync(ComplianceRepository.create_review, review_data)
+        await db.refresh(review, ["issues"])
+        return review
+
+    @staticmethod
+    async def get_review_summaries(db: AsyncSession, status: Optional[str] = None,
+                                   clinical_doc_id: Optional[str] = None,
+                                   compliance_doc_id: Optional[str] = None,
+                                   limit: Optional[int] = None,
+                                   cursor: Optional[str] = None) -> Tuple[List[Any], Optional[str]]:
+        """
+        Get review rows for the listing, newest first, without document content
+
+        Args:
+            db: Async database session
+            status: Optional review status filter
+            clinical_doc_id: Optional clinical document ID filter
+            compliance_doc_id: Optional compliance document ID filter
+            limit: Maximum number of rows to return (None returns all)
+            cursor: Cursor returned with the previous page
+
+        Returns:
+            Tuple of (summary rows, cursor of the next page or None), as
+            ComplianceRepository.get_review_summaries
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        statement = ComplianceRepository.review_summaries_statement(
+            status, clinical_doc_id, compliance_doc_id, limit, cursor)
+        rows = (await db.execute(statement)).all()
+        return ComplianceRepository.review_summaries_page(rows, limit)
+
+    @staticmethod
+    async def get_review_by_id(db: AsyncSession, review_id: str,
+                               with_decisions: bool = False) -> Optional[Review]:
+        """
+        Get a review by its ID, with its issues loaded
+
+        Args:
+            db: Async database session
+            review_id: ID of the review to get
+            with_decisions: Also load the decisions of every issue
+
+        Returns:
+            Review object if found, None otherwise
+        """
+        issues = selectinload(Review.issues)
+        if with_decisions:
+            issues = issues.selectinload(ComplianceIssue.decisions)
+        result = await db.execute(select(Review).options(issues).where(Review.id == review_id))
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def get_review_profile(db: AsyncSession, review_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Get the analysis profile stored with a review, without loading the review
+
+        Args:
+            db: Async database session
+            review_id: ID of the review
+
+        Returns:
+            Tuple of (whether the review exists, its profile or None if it has none)
+        """
+        row = (await db.execute(
+            select(Review.id, Review.profile).where(Review.id == review_id))).first()
+        if row is None:
+            return False, None
+        return True, row.profile
+
+    @staticmethod
+    async def get_issues_for_review(db: AsyncSession, review_id: str) -> List[ComplianceIssue]:
+        """
+        Get all issues for a specific review
+
+        Args:
+            db: Async database session
+            review_id: ID of the review to get issues for
+
+        Returns:
+            List of compliance issue objects
+        """
+        result = await db.execute(
+            select(ComplianceIssue).where(ComplianceIssue.review_id == review_id))
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def update_review(db: AsyncSession, review_id: str, review_data: Dict[str, Any]) -> Optional[Review]:
+        """
+        Update an existing review in the database
+
+        Args:
+            db: Async database session
+            review_id: ID of the review to update
+            review_data: Updated review data dictionary
+
+        Returns:
+            The updated review object, or None if the review doesn't exist
+        """
+        review = await db.run_sync(ComplianceRepository.update_review, review_id, review_data)
+        if review is not None:
+            await db.refresh(review, ["issues"])
+        return review
+
+    @staticmethod
+    async def add_issues_to_review(db: AsyncSession, review_id: str,
+                                   issues: List[ComplianceIssueModel]) -> Optional[Review]:
+        """
+        Add compliance issues to a review
+
+        Args:
+            db: Async database session
+            review_id: ID of the review to add issues to
+            issues: List of compliance issues
+
+        Returns:
+            Updated review object, or None if the review doesn't exist
+        """
+        review = await db.run_sync(ComplianceRepository.add_issues_to_review, review_id, issues)
+        if review is not None:
+            await db.refresh(review, ["issues"])
+        return review
+
+    @staticmethod
+    async def apply_incremental_analysis(db: AsyncSession, review_id: str, clinical_doc_content: str,
+                                         result: IncrementalAnalysisResult) -> Optional[Review]:
+        """
+        Store an edited clinical document together with the outcome of its incremental analysis.
+
+        Args:
+            db: Async database session
+            review_id: ID of the review to update
+            clinical_doc_content: Edited clinical document content
+            result: Result of ComplianceService.analyze_incremental
+
+        Returns:
+            The updated review object, or None if the review doesn't exist
+        """
+        review = await db.run_sync(
+            ComplianceRepository.apply_incremental_analysis, review_id, clinical_doc_content, result)
+        if review is not None:
+            await db.refresh(review, ["issues"])
+        return review
+
+    @staticmethod
+    async def delete_review(db: AsyncSession, review_id: str) -> Optional[Dict[str, int]]:
+        """
+        Delete a review with its issues and decisions in one transaction
+
+        Args:
+            db: Async database session
+            review_id: ID of the review to delete
+
+        Returns:
+            Dictionary with the number of deleted reviews, issues and decisions,
+            or None if the review doesn't exist
+        """
+        return await db.run_sync(ComplianceRepository.delete_review, review_id)
@@ -1,12 +1,36 @@
+from sqlalchemy import String, and_, case, column, delete, exists, func, insert, or_, select, update, values
 from sqlalchemy.orm import Session
+import base64
+import datetime
 import json
-from typing import List, Dict, Any, Optional
+import uuid
+from typing import List, Dict, Any, Optional, Tuple
 
 from app.db.models.models import Review, ComplianceIssue, Decision
-from app.models.compliance import ComplianceIssue as ComplianceIssueModel
+from app.models.compliance import ComplianceIssue as ComplianceIssueModel, IncrementalAnalysisResult
 from app.db.database import generate_review_id
 
 
+def encode_review_cursor(created_at: datetime.datetime, review_id: str) -> str:
+    """Encode the sort key of the last listed review as an opaque pagination cursor."""
+    raw = json.dumps([created_at.isoformat(), review_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_review_cursor(cursor: str) -> Tuple[datetime.datetime, str]:
+    """
+    Decode a cursor produced by encode_review_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        created_at, review_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.datetime.fromisoformat(created_at), str(review_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
 class ComplianceRepository:
     """
     Repository for handling database operations related to compliance reviews
@@ -26,7 +50,7 @@ class ComplianceRepository:
         """
         # Always generate a sequential review ID in R-00001 format
         # This overrides any ID that might have been provided (e.g., from frontend)
-        review_data['id'] = generate_review_id()
+        review_data['id'] = generate_review_id(db)
 
         # Create the review object
         review = Review(
@@ -43,6 +67,9 @@ class ComplianceRepository:
             review.clinical_doc_content = review_data['clinical_doc_content']
         if 'compliance_doc_content' in review_data:
             review.compliance_doc_content = review_data['compliance_doc_content']
+        # Trace of the analysis that produced the review, if any
+        if review_data.get('profile') is not None:
+            review.profile = review_data['profile']
 
         db.add(review)
         db.commit()
@@ -63,6 +90,99 @@ class ComplianceRepository:
         """
         return db.query(Review).order_by(Review.created_at.desc()).all()
 
+    @staticmethod
+    def get_review_summaries(db: Session, status: Optional[str] = None,
+                             clinical_doc_id: Optional[str] = None,
+                             compliance_doc_id: Optional[str] = None,
+                             limit: Optional[int] = None,
+                             cursor: Optional[str] = None) -> Tuple[List[Any], Optional[str]]:
+        """
+        Get review rows for the listing, newest first, without document content
+
+        Issue counts are computed with a single GROUP BY over compliance_issues
+        instead of loading every review's issues. Pages are selected with a keyset
+        on (created_at, id), so deep pages cost the same as the first one.
+
+        Args:
+            db: Database session
+            status: Optional review status filter
+            clinical_doc_id: Optional clinical document ID filter
+            compliance_doc_id: Optional compliance document ID filter
+            limit: Maximum number of rows to return (None returns all)
+            cursor: Cursor returned with the previous page
+
+        Returns:
+            Tuple of (rows with review columns and issue_count, high_confidence_count,
+            low_confidence_count attributes, cursor of the next page or None)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        statement = ComplianceRepository.review_summaries_statement(
+            status, clinical_doc_id, compliance_doc_id, limit, cursor)
+        return ComplianceRepository.review_summaries_page(db.execute(statement).all(), limit)
+
+    @staticmethod
+    def review_summaries_statement(status: Optional[str] = None,
+                                   clinical_doc_id: Optional[str] = None,
+                                   compliance_doc_id: Optional[str] = None,
+                                   limit: Optional[int] = None,
+                                   cursor: Optional[str] = None):
+        """
+        Build the SELECT of get_review_summaries (shared with the async repository)
+
+        Selects one row more than limit so the caller knows whether another page exists.
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        issue_counts = (
+            select(
+                ComplianceIssue.review_id.label("review_id"),
+                func.count(ComplianceIssue.id).label("issue_count"),
+                func.sum(case((ComplianceIssue.confidence == "high", 1), else_=0)).label(
+                    "high_confidence_count"),
+                func.sum(case((ComplianceIssue.confidence == "low", 1), else_=0)).label(
+                    "low_confidence_count"))
+            .group_by(ComplianceIssue.review_id)
+            .subquery()
+        )
+
+        statement = (
+            select(
+                Review.id, Review.clinical_doc_id, Review.compliance_doc_id,
+                Review.clinicalDoc, Review.complianceDoc, Review.status, Review.created_at,
+                issue_counts.c.issue_count, issue_counts.c.high_confidence_count,
+                issue_counts.c.low_confidence_count)
+            .outerjoin(issue_counts, issue_counts.c.review_id == Review.id)
+        )
+
+        if status:
+            statement = statement.where(Review.status == status)
+        if clinical_doc_id:
+            statement = statement.where(Review.clinical_doc_id == clinical_doc_id)
+        if compliance_doc_id:
+            statement = statement.where(Review.compliance_doc_id == compliance_doc_id)
+        if cursor:
+            cursor_created_at, cursor_id = decode_review_cursor(cursor)
+            statement = statement.where(or_(
+                Review.created_at < cursor_created_at,
+                and_(Review.created_at == cursor_created_at, Review.id < cursor_id)))
+
+        statement = statement.order_by(Review.created_at.desc(), Review.id.desc())
+
+        if limit is not None:
+            statement = statement.limit(limit + 1)
+        return statement
+
+    @staticmethod
+    def review_summaries_page(rows: List[Any], limit: Optional[int]) -> Tuple[List[Any], Optional[str]]:
+        """Trim the extra row selected by review_summaries_statement and build the next cursor."""
+        if limit is None or len(rows) <= limit:
+            return list(rows), None
+        rows = rows[:limit]
+        return rows, encode_review_cursor(rows[-1].created_at, rows[-1].id)
+
     @staticmethod
     def get_review_by_id(db: Session, review_id: str) -> Optional[Review]:
         """
@@ -106,12 +226,64 @@ class ComplianceRepository:
         if 'complianceDoc' in review_data:
             review.complianceDoc = review_data['complianceDoc']
 
+        if 'clinical_doc_content' in review_data:
+            review.clinical_doc_content = review_data['clinical_doc_content']
+
+        if 'compliance_doc_content' in review_data:
+            review.compliance_doc_content = review_data['compliance_doc_content']
+
         # Update the review
         db.commit()
         db.refresh(review)
 
         return review
 
+    @staticmethod
+    def _issue_row(review_id: str, issue: ComplianceIssueModel) -> Dict[str, Any]:
+        """Build the compliance_issues row of an analysis issue."""
+        # Handle metadata if it exists in the model
+        metadata_json = None
+        if hasattr(issue, 'metadata') and issue.metadata:
+            metadata_json = json.dumps(issue.metadata)
+
+        row = {
+            "id": str(uuid.uuid4()),
+            "review_id": review_id,
+            "clinical_text": issue.clinical_text,
+            "compliance_text": issue.compliance_text,
+            "explanation": issue.explanation,
+            "suggested_edit": issue.suggested_edit,
+            "confidence": issue.confidence,
+            "regulation": issue.regulation,
+            "metadata_json": metadata_json,
+            "status": "pending"
+        }
+
+        # Default to None for missing positions
+        for attr in ["clinical_text_start_char", "clinical_text_end_char",
+                     "compliance_text_start_char", "compliance_text_end_char"]:
+            row[attr] = getattr(issue, attr, None)
+
+        return row
+
+    @staticmethod
+    def insert_issues(db: Session, review_id: str, issues: List[ComplianceIssueModel]) -> int:
+        """
+        Insert compliance issues with a single multi-row INSERT (no commit)
+
+        Args:
+            db: Database session
+            review_id: ID of the review the issues belong to
+            issues: List of compliance issues
+
+        Returns:
+            Number of inserted issues
+        """
+        rows = [ComplianceRepository._issue_row(review_id, issue) for issue in issues]
+        if rows:
+            db.execute(insert(ComplianceIssue), rows)
+        return len(rows)
+
     @staticmethod
     def add_issues_to_review(db: Session, review_id: str, issues: List[ComplianceIssueModel]) -> Review:
         """
@@ -130,52 +302,58 @@ class ComplianceRepository:
         if not review:
             return None
 
-        # When we have an empty list of issues, we won't create any marker records
-        # The empty list in the database will indicate that the document is compliant
-        # We'll handle this at the API layer by checking if the issues list is empty
-        if len(issues) == 0:
-            # Just log that the document is compliant - no need to create a marker record
-            # The empty issues list is enough to indicate compliance
-            pass
-        else:
-            # Add each issue to the review
-            for issue in issues:
-                # Handle metadata if it exists in the model
-                metadata_json = None
-                if hasattr(issue, 'metadata') and issue.metadata:
-                    metadata_json = json.dumps(issue.metadata)
-
-                # Create the issue object with required fields
-                issue_data = {
-                    "review_id": review_id,
-                    "clinical_text": issue.clinical_text,
-                    "compliance_text": issue.compliance_text,
-                    "explanation": issue.explanation,
-                    "suggested_edit": issue.suggested_edit,
-                    "confidence": issue.confidence,
-                    "regulation": issue.regulation,
-                    "metadata_json": metadata_json
-                }
-
-                # Add optional position fields if they exist in the model
-                for attr in ["clinical_text_start_char", "clinical_text_end_char",
-                             "compliance_text_start_char", "compliance_text_end_char"]:
-                    if hasattr(issue, attr) and getattr(issue, attr) is not None:
-                        issue_data[attr] = getattr(issue, attr)
-                    else:
-                        # Default to None for missing positions
-                        issue_data[attr] = None
-
-                # Create the database issue object
-                db_issue = ComplianceIssue(**issue_data)
-
-                db.add(db_issue)
+        # An empty list of issues creates no records; it indicates that the document is compliant
+        ComplianceRepository.insert_issues(db, review_id, issues)
 
         db.commit()
         db.refresh(review)
 
         return review
 
+    @staticmethod
+    def apply_incremental_analysis(db: Session, review_id: str, clinical_doc_content: str,
+                                   result: IncrementalAnalysisResult) -> Optional[Review]:
+        """
+        Store an edited clinical document together with the outcome of its incremental analysis.
+
+        Updates the content, remaps the offsets of surviving issues, deletes issues whose
+        text was edited away and adds the new issues, all in one transaction. Issues
+        with a decision are never deleted.
+
+        Args:
+            db: Database session
+            review_id: ID of the review to update
+            clinical_doc_content: Edited clinical document content
+            result: Result of ComplianceService.analyze_incremental
+
+        Returns:
+            The updated review object, or None if the review doesn't exist
+        """
+        review = ComplianceRepository.get_review_by_id(db, review_id)
+
+        if not review:
+            return None
+
+        review.clinical_doc_content = clinical_doc_content
+
+        issues_by_id = {issue.id: issue for issue in review.issues}
+
+        # Shift surviving issues to their position in the edited text
+        for remap in result.remapped_issues:
+            issue = issues_by_id.get(remap.issue_id)
+            if issue:
+                issue.clinical_text_start_char = remap.clinical_text_start_char
+                issue.clinical_text_end_char = remap.clinical_text_end_char
+
+        # Remove undecided issues whose clinical text no longer exists
+        removed_ids = [issue_id for issue_id in result.removed_issue_ids if issue_id in issues_by_id]
+        db.flush()
+        ComplianceRepository.delete_issues(db, removed_ids, keep_decided=True)
+        db.expire(review, ["issues"])
+
+        # add_issues_to_review commits the whole transaction
+        return ComplianceRepository.add_issues_to_review(db, review_id, result.new_issues)
+
     @staticmethod
     def get_issues_for_review(db: Session, review_id: str) -> List[ComplianceIssue]:
         """
@@ -215,6 +393,66 @@ class ComplianceRepository:
 
         return decision
 
+    @staticmethod
+    def save_decisions(db: Session, review_id: str, decisions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Save decisions on the issues of a review in one transaction
+
+        Decisions on issues that don't belong to the review are skipped. All valid
+        decisions are inserted with a single multi-row INSERT, and the review is marked
+        completed once every issue has at least one decision.
+
+        Args:
+            db: Database session
+            review_id: ID of the review the decisions belong to
+            decisions: Decision dictionaries with issue_id, action, applied_change and comments
+
+        Returns:
+            Dictionary with saved_count, skipped_count and review_completed
+        """
+        issue_ids = {decision['issue_id'] for decision in decisions}
+        valid_ids = set(db.execute(
+            select(ComplianceIssue.id).where(
+                ComplianceIssue.review_id == review_id,
+                ComplianceIssue.id.in_(issue_ids))
+        ).scalars()) if issue_ids else set()
+
+        now = datetime.datetime.now()
+        rows = [{
+            "id": str(uuid.uuid4()),
+            "issue_id": decision['issue_id'],
+            "action": decision['action'],
+            "applied_change": decision.get('applied_change'),
+            "comments": decision.get('comments'),
+            "timestamp": now
+        } for decision in decisions if decision['issue_id'] in valid_ids]
+
+        if rows:
+            db.execute(insert(Decision), rows)
+
+        # Mark the review completed when no issue is left without a decision
+        review_completed = False
+        has_issues = db.execute(
+            select(exists().where(ComplianceIssue.review_id == review_id))).scalar()
+        if has_issues:
+            undecided = db.execute(
+                select(func.count(ComplianceIssue.id)).where(
+                    ComplianceIssue.review_id == review_id,
+                    ~exists().where(Decision.issue_id == ComplianceIssue.id))
+            ).scalar()
+            if undecided == 0:
+                review_completed = db.execute(
+                    update(Review).where(Review.id == review_id).values(status="completed")
+                ).rowcount > 0
+
+        db.commit()
+
+        return {
+            "saved_count": len(rows),
+            "skipped_count": len(decisions) - len(rows),
+            "review_completed": review_completed
+        }
+
     @staticmethod
     def get_decisions_for_issue(db: Session, issue_id: str) -> List[Decision]:
         """
@@ -254,6 +492,47 @@ class ComplianceRepository:
 
         return issue
 
+    @staticmethod
+    def bulk_update_issue_statuses(db: Session, statuses: Dict[str, str]) -> int:
+        """
+        Set the status of many issues with a single UPDATE (no commit)
+
+        PostgreSQL joins against a VALUES list (UPDATE ... FROM (VALUES ...)); other
+        databases use an equivalent CASE expression.
+
+        Args:
+            db: Database session
+            statuses: Mapping of issue ID to new status
+
+        Returns:
+            Number of updated rows
+        """
+        if not statuses:
+            return 0
+
+        statement = ComplianceRepository._issue_status_update(
+            db.get_bind().dialect.name, statuses)
+        return db.execute(statement.execution_options(synchronize_session=False)).rowcount
+
+    @staticmethod
+    def _issue_status_update(dialect_name: str, statuses: Dict[str, str]):
+        """Build the single UPDATE statement of bulk_update_issue_statuses for a database dialect."""
+        if dialect_name == "postgresql":
+            new_statuses = values(
+                column("issue_id", String), column("status", String), name="new_statuses"
+            ).data(list(statuses.items()))
+            return (
+                update(ComplianceIssue)
+                .where(ComplianceIssue.id == new_statuses.c.issue_id)
+                .values(status=new_statuses.c.status)
+            )
+
+        return (
+            update(ComplianceIssue)
+            .where(ComplianceIssue.id.in_(list(statuses)))
+            .values(status=case(statuses, value=ComplianceIssue.id))
+        )
+
     @staticmethod
     def update_issues_status(db: Session, issue_statuses: List[Dict[str, Any]]) -> List[ComplianceIssue]:
         """
@@ -266,8 +545,8 @@ class ComplianceRepository:
         Returns:
             List of updated issue objects
         """
-        updated_issues = []
-
+        # Later updates of the same issue win
+        statuses = {}
         for status_update in issue_statuses:
             issue_id = status_update.get('issue_id')
             status = status_update.get('status')
@@ -275,9 +554,83 @@ class ComplianceRepository:
             if not issue_id or not status:
                 continue
 
-            issue = ComplianceRepository.update_issue_status(
-                db, issue_id, status)
-            if issue:
-                updated_issues.append(issue)
+            statuses[issue_id] = status
+
+        if not statuses:
+            return []
+
+        ComplianceRepository.bulk_update_issue_statuses(db, statuses)
+        db.commit()
+
+        return db.query(ComplianceIssue).filter(ComplianceIssue.id.in_(list(statuses))).all()
+
+    @staticmethod
+    def delete_issues(db: Session, issue_ids: List[str], keep_decided: bool = False) -> Dict[str, int]:
+        """
+        Delete issues and their decisions with set-based DELETEs (no commit)
+
+        Args:
+            db: Database session
+            issue_ids: IDs of the issues to delete
+            keep_decided: Skip issues that have a decision instead of deleting it with them
 
-        return updated_issues
+        Returns:
+            Dictionary with the number of deleted issues and decisions
+        """
+        if not issue_ids:
+            return {"issues": 0, "decisions": 0}
+
+        if keep_decided:
+            issues_deleted = db.execute(
+                delete(ComplianceIssue).where(
+                    ComplianceIssue.id.in_(issue_ids),
+                    ~exists().where(Decision.issue_id == ComplianceIssue.id))
+                .execution_options(synchronize_session=False)).rowcount
+            return {"issues": issues_deleted, "decisions": 0}
+
+        decisions_deleted = db.execute(
+            delete(Decision).where(Decision.issue_id.in_(issue_ids))
+            .execution_options(synchronize_session=False)).rowcount
+        issues_deleted = db.execute(
+            delete(ComplianceIssue).where(ComplianceIssue.id.in_(issue_ids))
+            .execution_options(synchronize_session=False)).rowcount
+
+        return {"issues": issues_deleted, "decisions": decisions_deleted}
+
+    @staticmethod
+    def delete_review(db: Session, review_id: str) -> Optional[Dict[str, int]]:
+        """
+        Delete a review with its issues and decisions in one transaction
+
+        Args:
+            db: Database session
+            review_id: ID of the review to delete
+
+        Returns:
+            Dictionary with the number of deleted reviews, issues and decisions,
+            or None if the review doesn't exist
+        """
+        review_issue_ids = select(ComplianceIssue.id).where(
+            ComplianceIssue.review_id == review_id).scalar_subquery()
+
+        try:
+            decisions_deleted = db.execute(
+                delete(Decision).where(Decision.issue_id.in_(review_issue_ids))
+                .execution_options(synchronize_session=False)).rowcount
+            issues_deleted = db.execute(
+                delete(ComplianceIssue).where(ComplianceIssue.review_id == review_id)
+                .execution_options(synchronize_session=False)).rowcount
+            reviews_deleted = db.execute(
+                delete(Review).where(Review.id == review_id)
+                .execution_options(synchronize_session=False)).rowcount
+
+            if not reviews_deleted:
+                db.rollback()
+                return None
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        return {"reviews": reviews_deleted, "issues": issues_deleted, "decisions": decisions_deleted}
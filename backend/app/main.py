@@ -1,10 +1,14 @@
 import logging
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.api import api_router
 from app.core.config import settings
+from app.db.database import async_engine, init_db
+from app.services.compliance_service.tracing import review_metrics
+from app.services.document_service import document_service
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -29,6 +33,31 @@ app.add_middleware(
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
+@app.on_event("startup")
+def initialize_database():
+    """
+    Create missing tables and prepare the review ID allocator.
+    """
+    init_db()
+
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    """
+    Stop the PDF extraction worker processes.
+    """
+    document_service.pdf_extractor.shutdown()
+
+
+@app.on_event("shutdown")
+async def close_database_connections():
+    """
+    Close the pooled async database connections (aiosqlite runs each one in a
+    non-daemon thread that would otherwise keep the process alive).
+    """
+    await async_engine.dispose()
+
+
 @app.get("/")
 async def root():
     """
@@ -47,3 +76,12 @@ async def health_check():
     Health check endpoint for monitoring.
     """
     return {"status": "healthy"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Review counters (phase durations, LLM calls and tokens, cache hits) in the
+    Prometheus text format.
+    """
+    return PlainTextResponse(review_metrics.render(), media_type="text/plain; version=0.0.4")
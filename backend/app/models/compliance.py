@@ -1,6 +1,7 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
+import json
 
 
 class ComplianceReviewInput(BaseModel):
@@ -15,6 +16,14 @@ class ComplianceReviewInput(BaseModel):
                                       description="Content of the clinical trial document")
     compliance_doc_content: str = Field(...,
                                         description="Content of the compliance document")
+    max_concurrency: Optional[int] = Field(
+        None, ge=1, description="Maximum concurrent LLM calls for this review (defaults to LLM_MAX_CONCURRENCY)")
+    tokens_per_minute: Optional[int] = Field(
+        None, ge=0, description="Prompt token budget per minute for this review (defaults to LLM_TOKENS_PER_MINUTE, 0 = unlimited)")
+    max_chunk_pairs: Optional[int] = Field(
+        None, ge=0, description="Maximum chunk pairs sent to the LLM for this review (defaults to MAX_CHUNK_PAIRS_PER_REVIEW, 0 = unlimited)")
+    force_refresh: bool = Field(
+        False, description="Send every prompt to the LLM instead of reusing cached responses")
 
 
 class ComplianceIssue(BaseModel):
@@ -35,6 +44,27 @@ class ComplianceIssue(BaseModel):
                             description="Specific regulation being violated")
     edit_type: str = Field(
         "modification", description="Type of edit required: 'modification' (change existing text) or 'insertion' (add new content)")
+    clinical_text_start_char: Optional[int] = Field(
+        None, description="Start offset of clinical_text in the clinical document")
+    clinical_text_end_char: Optional[int] = Field(
+        None, description="End offset of clinical_text in the clinical document")
+    compliance_text_start_char: Optional[int] = Field(
+        None, description="Start offset of compliance_text in the compliance document")
+    compliance_text_end_char: Optional[int] = Field(
+        None, description="End offset of compliance_text in the compliance document")
+    metadata: Optional[Dict[str, Any]] = Field(
+        None, description="Analysis details, e.g. the chunk pair the issue was found in")
+
+    @validator('metadata', pre=True)
+    def metadata_from_json(cls, v):
+        """Accept metadata as stored in the database (a JSON string)."""
+        if isinstance(v, str):
+            try:
+                parsed = json.loads(v)
+            except ValueError:
+                return None
+            return parsed if isinstance(parsed, dict) else None
+        return v
 
 
 class ComplianceReviewResponse(BaseModel):
@@ -99,3 +129,84 @@ class ApplySuggestionResponse(BaseModel):
                                description="The original non-compliant text")
     revised_text: str = Field(...,
                               description="The revised text after applying the suggestion")
+
+
+class IssueRemap(BaseModel):
+    """
+    New clinical document position of an issue that survived an edit.
+    """
+    issue_id: str = Field(..., description="ID of the stored issue")
+    clinical_text_start_char: Optional[int] = Field(
+        None, description="Start offset in the edited clinical document")
+    clinical_text_end_char: Optional[int] = Field(
+        None, description="End offset in the edited clinical document")
+
+
+class IncrementalAnalysisResult(BaseModel):
+    """
+    Outcome of re-analyzing only the edited parts of a clinical document.
+    """
+    remapped_issues: List[IssueRemap] = Field(
+        default_factory=list, description="Stored issues that carry over, with their new offsets")
+    removed_issue_ids: List[str] = Field(
+        default_factory=list, description="Stored issues whose text was edited away")
+    new_issues: List[ComplianceIssue] = Field(
+        default_factory=list, description="Issues found in the edited regions")
+    changed_regions: int = Field(
+        0, description="Number of edited regions that were re-analyzed")
+    reanalyzed_chunks: int = Field(
+        0, description="Number of clinical chunks that were re-analyzed")
+    analyzed_pairs: int = Field(
+        0, description="Number of chunk pairs sent to the LLM")
+
+
+class BatchReviewRequest(BaseModel):
+    """
+    Request to review many clinical documents against their matched compliance documents.
+    """
+    clinical_doc_ids: List[str] = Field(
+        default_factory=list, description="IDs of the clinical documents to review")
+    all_clinical: bool = Field(
+        False, description="Review every clinical document instead of clinical_doc_ids")
+    compliance_doc_id: Optional[str] = Field(
+        None, description="Review every document against this compliance document instead of the matched one")
+    max_concurrency: Optional[int] = Field(
+        None, ge=1, description="LLM calls in flight across the whole job (defaults to BATCH_LLM_MAX_CONCURRENCY)")
+    tokens_per_minute: Optional[int] = Field(
+        None, ge=0, description="Prompt token budget per minute for the whole job (defaults to BATCH_LLM_TOKENS_PER_MINUTE, 0 = unlimited)")
+    force_refresh: bool = Field(
+        False, description="Send every prompt to the LLM instead of reusing cached responses")
+
+
+class BatchReviewItem(BaseModel):
+    """
+    Progress of one clinical document within a batch review job.
+    """
+    clinical_doc_id: str = Field(..., description="ID of the clinical document")
+    compliance_doc_id: Optional[str] = Field(
+        None, description="ID of the matched compliance document")
+    status: str = Field(
+        "pending", description="pending, matching, analyzing, completed or failed")
+    review_id: Optional[str] = Field(
+        None, description="ID of the stored review once the document is finished")
+    issues: int = Field(0, description="Number of issues found")
+    error: Optional[str] = Field(None, description="Why the document failed")
+
+
+class BatchReviewJob(BaseModel):
+    """
+    State and progress of a batch review job.
+    """
+    job_id: str = Field(..., description="Unique identifier for the job")
+    status: str = Field(
+        "planning", description="planning, running, completed or failed")
+    created: str = Field(..., description="Creation timestamp")
+    finished: Optional[str] = Field(None, description="Completion timestamp")
+    total: int = Field(0, description="Number of clinical documents in the job")
+    completed: int = Field(0, description="Documents stored as reviews")
+    failed: int = Field(0, description="Documents that could not be reviewed")
+    groups: Dict[str, List[str]] = Field(
+        default_factory=dict, description="Clinical document IDs by matched compliance document")
+    items: List[BatchReviewItem] = Field(
+        default_factory=list, description="Progress of every clinical document")
+    error: Optional[str] = Field(None, description="Why the job failed")
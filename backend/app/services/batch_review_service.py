@@ -0,0 +1,280 @@
+"""
+Batch review jobs: many clinical documents reviewed in one background job.
+
+A job is planned before any analysis starts: every clinical document is matched
+to its compliance document and the documents are grouped by that guideline.
+Each guideline is then loaded, chunked and embedded once for its whole group,
+and all documents of the job share a single LLM rate limiter, so the job's load
+on the LLM is bounded no matter how many documents it covers. Every document
+is stored as a Review as soon as its analysis finishes, so a job that is
+interrupted keeps the reviews it already completed.
+
+Jobs live in memory; their progress is read with get_job.
+"""
+
+import asyncio
+import datetime
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.db.repositories.async_compliance_repository import AsyncComplianceRepository
+from app.models.compliance import BatchReviewItem, BatchReviewJob, BatchReviewRequest, ComplianceReviewInput
+from app.services.compliance_service.concurrency import LLMRateLimiter
+from app.services.compliance_service.tracing import ReviewTrace
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Job states after which a job is never updated again
+FINISHED_STATES = ("completed", "failed")
+
+
+class BatchReviewService:
+    """
+    Plans and runs batch review jobs and keeps their progress.
+    """
+
+    def __init__(self, analyzer, matcher, documents, session_factory):
+        """
+        Initialize the service.
+
+        Args:
+            analyzer: Compliance service (prepare_compliance_document, analyze_compliance)
+            matcher: Document matcher (find_matching_compliance_document)
+            documents: Document service (list_documents, aget_document_content)
+            session_factory: Factory of AsyncSessions the reviews are stored with
+        """
+        self.analyzer = analyzer
+        self.matcher = matcher
+        self.documents = documents
+        self.session_factory = session_factory
+
+        self.jobs: "OrderedDict[str, BatchReviewJob]" = OrderedDict()
+        # Strong references to the running jobs, the event loop only keeps weak ones
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def start_job(self, request: BatchReviewRequest) -> BatchReviewJob:
+        """
+        Create a job and start it in the background of the running event loop.
+
+        Args:
+            request: Documents to review and the job's LLM budget
+
+        Returns:
+            The new job, in the planning state
+
+        Raises:
+            ValueError: If the request names no clinical documents
+        """
+        if not request.all_clinical and not request.clinical_doc_ids:
+            raise ValueError("Provide clinical_doc_ids or set all_clinical")
+
+        job = BatchReviewJob(job_id=f"B-{uuid.uuid4().hex[:8]}",
+                             created=datetime.datetime.now().isoformat())
+        self.jobs[job.job_id] = job
+        self._evict_finished_jobs()
+
+        task = asyncio.create_task(self.run_job(job, request))
+        self._tasks[job.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.job_id, None))
+        logger.info(f"Started batch review job {job.job_id}")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[BatchReviewJob]:
+        """
+        Return a job by ID, or None if it is unknown (or was evicted).
+        """
+        return self.jobs.get(job_id)
+
+    def _evict_finished_jobs(self) -> None:
+        """Forget the oldest finished jobs beyond BATCH_JOB_HISTORY."""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - settings.BATCH_JOB_HISTORY)]:
+            del self.jobs[job_id]
+
+    async def run_job(self, job: BatchReviewJob, request: BatchReviewRequest) -> BatchReviewJob:
+        """
+        Plan and run a job to completion, updating its progress in place.
+
+        Args:
+            job: Job to run
+            request: Documents to review and the job's LLM budget
+
+        Returns:
+            The finished job
+        """
+        try:
+            # Listing stats every document file, so it runs off the event loop
+            documents = await asyncio.to_thread(self.documents.list_documents)
+            titles = {str(doc["id"]): doc["title"] for doc in documents}
+            await self._plan(job, request)
+
+            max_concurrency = request.max_concurrency or settings.BATCH_LLM_MAX_CONCURRENCY
+            tokens_per_minute = request.tokens_per_minute
+            if tokens_per_minute is None:
+                tokens_per_minute = settings.BATCH_LLM_TOKENS_PER_MINUTE
+            # One budget for every LLM call of the job, whichever document makes it
+            limiter = LLMRateLimiter(max_concurrency=max_concurrency,
+                                     tokens_per_minute=tokens_per_minute)
+            document_slots = asyncio.Semaphore(max(1, settings.BATCH_MAX_CONCURRENT_DOCUMENTS))
+
+            job.status = "running"
+            logger.info(
+                f"Batch review job {job.job_id}: {job.total} documents in {len(job.groups)} groups, "
+                f"concurrency={limiter.max_concurrency}, tokens_per_minute={limiter.tokens_per_minute or 'unlimited'}")
+
+            items = {item.clinical_doc_id: item for item in job.items}
+            await asyncio.gather(*(
+                self._run_group(job, compliance_doc_id, [items[doc_id] for doc_id in clinical_doc_ids],
+                                titles, limiter, document_slots, request.force_refresh)
+                for compliance_doc_id, clinical_doc_ids in job.groups.items()))
+            job.status = "completed"
+        except Exception as e:
+            logger.error(f"Batch review job {job.job_id} failed: {e}", exc_info=True)
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished = datetime.datetime.now().isoformat()
+            logger.info(
+                f"Batch review job {job.job_id} {job.status}: {job.completed} completed, {job.failed} failed")
+        return job
+
+    async def _plan(self, job: BatchReviewJob, request: BatchReviewRequest) -> None:
+        """
+        Resolve the job's clinical documents and group them by compliance document.
+        """
+        if request.all_clinical:
+            documents = await asyncio.to_thread(self.documents.list_documents, doc_type="clinical")
+            clinical_doc_ids = [str(doc["id"]) for doc in documents]
+        else:
+            # Keep the caller's order, without repeats
+            clinical_doc_ids = list(dict.fromkeys(request.clinical_doc_ids))
+
+        job.items = [BatchReviewItem(clinical_doc_id=doc_id) for doc_id in clinical_doc_ids]
+        job.total = len(job.items)
+
+        # Matching only embeds the clinical document, bound it like the analyses
+        match_slots = asyncio.Semaphore(max(1, settings.BATCH_MAX_CONCURRENT_DOCUMENTS))
+
+        async def match(item: BatchReviewItem) -> None:
+            if request.compliance_doc_id:
+                item.compliance_doc_id = request.compliance_doc_id
+                return
+            async with match_slots:
+                item.status = "matching"
+                item.compliance_doc_id = await self.matcher.find_matching_compliance_document(
+                    item.clinical_doc_id)
+            item.status = "pending"
+            if not item.compliance_doc_id:
+                self._fail_item(job, item, "No suitable compliance document found")
+
+        await asyncio.gather(*(match(item) for item in job.items))
+
+        groups: Dict[str, List[str]] = {}
+        for item in job.items:
+            if item.status != "failed":
+                groups.setdefault(item.compliance_doc_id, []).append(item.clinical_doc_id)
+        job.groups = groups
+
+    async def _run_group(self, job: BatchReviewJob, compliance_doc_id: str, items: List[BatchReviewItem],
+                         titles: Dict[str, str], limiter: LLMRateLimiter,
+                         document_slots: asyncio.Semaphore, force_refresh: bool) -> None:
+        """
+        Prepare a compliance document once, then review every clinical document matched to it.
+        """
+        try:
+            compliance_doc_content = await self.documents.aget_document_content(compliance_doc_id)
+            chunk_count = await self.analyzer.prepare_compliance_document(compliance_doc_content)
+            logger.info(
+                f"Batch review job {job.job_id}: prepared {compliance_doc_id} ({chunk_count} chunks) "
+                f"for {len(items)} documents")
+        except Exception as e:
+            logger.error(f"Could not prepare compliance document {compliance_doc_id}: {e}")
+            for item in items:
+                self._fail_item(job, item, f"Compliance document {compliance_doc_id} unavailable: {e}")
+            return
+
+        async def review(item: BatchReviewItem) -> None:
+            async with document_slots:
+                try:
+                    item.status = "analyzing"
+                    await self._review_document(item, compliance_doc_content, titles, limiter, force_refresh)
+                    item.status = "completed"
+                    job.completed += 1
+                except Exception as e:
+                    logger.error(f"Batch review of {item.clinical_doc_id} failed: {e}", exc_info=True)
+                    self._fail_item(job, item, str(e))
+
+        await asyncio.gather(*(review(item) for item in items))
+
+    async def _review_document(self, item: BatchReviewItem, compliance_doc_content: str,
+                               titles: Dict[str, str], limiter: LLMRateLimiter,
+                               force_refresh: bool) -> None:
+        """Analyze one clinical document and store the result as a completed review."""
+        clinical_doc_content = await self.documents.aget_document_content(item.clinical_doc_id)
+        review_input = ComplianceReviewInput(
+            clinical_doc_id=item.clinical_doc_id,
+            compliance_doc_id=item.compliance_doc_id,
+            clinical_doc_content=clinical_doc_content,
+            compliance_doc_content=compliance_doc_content,
+            force_refresh=force_refresh
+        )
+        trace = ReviewTrace()
+        issues = await self.analyzer.analyze_compliance(review_input, limiter=limiter, trace=trace)
+
+        async with self.session_factory() as db:
+            review = await AsyncComplianceRepository.create_review(db, {
+                "clinical_doc_id": item.clinical_doc_id,
+                "compliance_doc_id": item.compliance_doc_id,
+                "clinicalDoc": titles.get(item.clinical_doc_id, item.clinical_doc_id),
+                "complianceDoc": titles.get(item.compliance_doc_id, item.compliance_doc_id),
+                "status": "completed",
+                "clinical_doc_content": clinical_doc_content,
+                "compliance_doc_content": compliance_doc_content,
+                "profile": trace.to_dict()
+            })
+            await AsyncComplianceRepository.add_issues_to_review(db, review.id, issues)
+
+        item.review_id = review.id
+        item.issues = len(issues)
+        logger.info(f"Stored review {review.id} for {item.clinical_doc_id} with {len(issues)} issues")
+
+    @staticmethod
+    def _fail_item(job: BatchReviewJob, item: BatchReviewItem, error: str) -> None:
+        """Mark a document of the job as failed."""
+        item.status = "failed"
+        item.error = error
+        job.failed += 1
+
+
+# Created on first use so importing this module does not create the LLM clients
+_batch_review_service: Optional[BatchReviewService] = None
+_batch_review_service_lock = threading.Lock()
+
+
+def get_batch_review_service() -> BatchReviewService:
+    """
+    Return the process-wide batch review service.
+
+    Returns:
+        The shared BatchReviewService instance
+    """
+    global _batch_review_service
+    with _batch_review_service_lock:
+        if _batch_review_service is None:
+            from app.db.database import AsyncSessionLocal
+            from app.services.compliance_service import compliance_service
+            from app.services.document_matcher_service import document_matcher
+            from app.services.document_service import document_service
+
+            _batch_review_service = BatchReviewService(
+                analyzer=compliance_service,
+                matcher=document_matcher,
+                documents=document_service,
+                session_factory=AsyncSessionLocal
+            )
+        return _batch_review_service
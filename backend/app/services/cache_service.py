@@ -0,0 +1,392 @@
+"""
+Shared cache layer for API-level state.
+
+Analysis results are held between /analyze-* and the creation of the review
+that stores them. With several uvicorn workers the two requests may hit
+different processes, so the cache is pluggable:
+
+- MemoryCache: in-process LRU with per-entry TTL and item/byte caps
+- RedisCache: Redis (or any Redis-compatible server) shared by all workers
+
+Values must be JSON-serializable; both backends store them as JSON so they
+behave the same way.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.compliance import ComplianceIssue
+
+# Redis is only needed when CACHE_BACKEND=redis
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """
+    Interface of the cache backends.
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+            ttl: Time to live in seconds (None uses the backend default, 0 never expires)
+        """
+        raise NotImplementedError
+
+    def pop(self, key: str) -> Optional[Any]:
+        """
+        Atomically look up and remove a value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        """
+        Remove a value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Whether the key existed
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss/eviction counters and sizes.
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process LRU cache with TTL expiry, bounded by item count and total size.
+    """
+
+    def __init__(self, max_items: int = 256, max_bytes: int = 64 * 1024 * 1024,
+                 default_ttl: int = 3600):
+        """
+        Initialize the cache.
+
+        Args:
+            max_items: Maximum number of entries (0 = unbounded)
+            max_bytes: Maximum total size of the JSON-encoded values (0 = unbounded)
+            default_ttl: Default time to live in seconds (0 = entries never expire)
+        """
+        self.max_items = max(0, max_items)
+        self.max_bytes = max(0, max_bytes)
+        self.default_ttl = max(0, default_ttl)
+
+        self._lock = threading.Lock()
+        # key -> (expiry timestamp or None, JSON-encoded value)
+        self._entries: "OrderedDict[str, Tuple[Optional[float], str]]" = OrderedDict()
+        self._bytes = 0
+
+        # Hit/miss/eviction counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove(self, key: str) -> None:
+        _, encoded = self._entries.pop(key)
+        self._bytes -= len(encoded)
+
+    def _lookup(self, key: str, remove: bool) -> Optional[str]:
+        """Return the encoded value of a live entry, dropping it if expired or if remove is set."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            if remove:
+                self._remove(key)
+            else:
+                self._entries.move_to_end(key)
+            return entry[1]
+
+    def get(self, key: str) -> Optional[Any]:
+        encoded = self._lookup(key, remove=False)
+        return json.loads(encoded) if encoded is not None else None
+
+    def pop(self, key: str) -> Optional[Any]:
+        encoded = self._lookup(key, remove=True)
+        return json.loads(encoded) if encoded is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        encoded = json.dumps(value)
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes and len(encoded) > self.max_bytes:
+                logger.warning(f"Not caching {key}: {len(encoded)} bytes exceeds the cache size limit")
+                self.evictions += 1
+                return
+
+            self._entries[key] = (expires_at, encoded)
+            self._bytes += len(encoded)
+
+            # Evict least recently used entries until both limits hold
+            while ((self.max_items and len(self._entries) > self.max_items) or
+                   (self.max_bytes and self._bytes > self.max_bytes)):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_items": self.max_items,
+                "max_bytes": self.max_bytes
+            }
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache stored in Redis and shared by every worker; Redis enforces the TTLs, and
+    its maxmemory policy bounds the total size.
+    """
+
+    def __init__(self, url: str, prefix: str = "compliance:", default_ttl: int = 3600, client=None):
+        """
+        Connect to Redis.
+
+        Args:
+            url: Redis URL (e.g. redis://localhost:6379/0)
+            prefix: Prefix of every key written by this cache
+            default_ttl: Default time to live in seconds (0 = entries never expire)
+            client: Optional pre-built Redis-compatible client (used instead of url)
+        """
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("CACHE_BACKEND=redis requires the redis package")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = max(0, default_ttl)
+
+        self._lock = threading.Lock()
+        # Counters of this process; server-wide evictions come from INFO
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, encoded) -> Optional[Any]:
+        with self._lock:
+            if encoded is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(encoded)
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._count(self.client.get(self.prefix + key))
+
+    def pop(self, key: str) -> Optional[Any]:
+        # GET and DEL in one MULTI/EXEC so two workers never both receive the value
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.get(self.prefix + key)
+        pipeline.delete(self.prefix + key)
+        encoded, _ = pipeline.execute()
+        return self._count(encoded)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl or None)
+
+    def delete(self, key: str) -> bool:
+        return bool(self.client.delete(self.prefix + key))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "backend": "redis",
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+        try:
+            info = self.client.info()
+            stats.update({
+                "evictions": info.get("evicted_keys"),
+                "expirations": info.get("expired_keys"),
+                "bytes": info.get("used_memory"),
+                "max_bytes": info.get("maxmemory")
+            })
+        except Exception as e:
+            logger.warning(f"Could not read Redis statistics: {e}")
+        return stats
+
+
+class AnalysisResultCache:
+    """
+    Latest analysis result per (clinical_doc_id, compliance_doc_id) pair, kept until
+    the review that stores it is created.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        """
+        Args:
+            backend: Cache backend holding the results
+        """
+        self.backend = backend
+
+    @staticmethod
+    def _key(clinical_doc_id: str, compliance_doc_id: str) -> str:
+        return f"analysis:{json.dumps([clinical_doc_id, compliance_doc_id])}"
+
+    def put(self, clinical_doc_id: str, compliance_doc_id: str, issues: List[ComplianceIssue],
+            profile: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Store the issues of an analysis, replacing any earlier result for the pair.
+
+        Args:
+            clinical_doc_id: ID of the clinical document
+            compliance_doc_id: ID of the compliance document
+            issues: Issues found by the analysis
+            profile: Optional trace of the analysis (ReviewTrace.to_dict) to store with the review
+        """
+        self.backend.set(self._key(clinical_doc_id, compliance_doc_id), {
+            "clinical_doc_id": clinical_doc_id,
+            "compliance_doc_id": compliance_doc_id,
+            "issues": [issue.model_dump(mode="json") for issue in issues],
+            "profile": profile
+        })
+
+    def pop(self, clinical_doc_id: str, compliance_doc_id: str) -> Optional[List[ComplianceIssue]]:
+        """
+        Take the latest analysis result of a document pair out of the cache.
+
+        Args:
+            clinical_doc_id: ID of the clinical document
+            compliance_doc_id: ID of the compliance document
+
+        Returns:
+            The cached issues, or None if the pair has no cached result
+        """
+        return self.pop_with_profile(clinical_doc_id, compliance_doc_id)[0]
+
+    def pop_with_profile(self, clinical_doc_id: str, compliance_doc_id: str
+                         ) -> Tuple[Optional[List[ComplianceIssue]], Optional[Dict[str, Any]]]:
+        """
+        Take the latest analysis result of a document pair out of the cache, with its profile.
+
+        Args:
+            clinical_doc_id: ID of the clinical document
+            compliance_doc_id: ID of the compliance document
+
+        Returns:
+            Tuple of (cached issues or None if the pair has no cached result, profile or None)
+        """
+        result = self.backend.pop(self._key(clinical_doc_id, compliance_doc_id))
+        if result is None:
+            return None, None
+        return [ComplianceIssue(**issue) for issue in result.get("issues", [])], result.get("profile")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the statistics of the underlying backend.
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        return self.backend.stats()
+
+
+def create_cache_backend() -> CacheBackend:
+    """
+    Build the cache backend selected by CACHE_BACKEND.
+
+    Returns:
+        A MemoryCache or RedisCache instance
+    """
+    if settings.CACHE_BACKEND == "redis":
+        logger.info("Using Redis for the shared result cache")
+        return RedisCache(settings.REDIS_URL, default_ttl=settings.RESULT_CACHE_TTL_SECONDS)
+
+    return MemoryCache(
+        max_items=settings.RESULT_CACHE_MAX_ITEMS,
+        max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+        default_ttl=settings.RESULT_CACHE_TTL_SECONDS
+    )
+
+
+_analysis_result_cache: Optional[AnalysisResultCache] = None
+_analysis_result_cache_lock = threading.Lock()
+
+
+def get_analysis_result_cache() -> AnalysisResultCache:
+    """
+    Return the process-wide analysis result cache.
+
+    Returns:
+        The shared AnalysisResultCache instance
+    """
+    global _analysis_result_cache
+    with _analysis_result_cache_lock:
+        if _analysis_result_cache is None:
+            _analysis_result_cache = AnalysisResultCache(create_cache_backend())
+        return _analysis_result_cache
@@ -0,0 +1,315 @@
+"""
+Persistent cache of chunking results.
+
+Chunking a document (especially with the AgenticChunker, which rewrites every
+paragraph batch with an LLM) is repeated on every analysis of the same file.
+This cache stores the chunk texts and offsets keyed by
+(document SHA-256, strategy, chunk_size, chunk_overlap, model), so edits to a
+document automatically produce a new key and stale entries are never served.
+Each result is one JSON file; once the directory holds more than a maximum
+number of entries, the least recently used files (by modification time, which
+is refreshed on every disk hit) are removed.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.services.compliance_service.models.pydantic_models import TextWithOffset
+from app.services.compliance_service.tracing import record_cache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Share of the entry limit kept after an eviction, so that evictions are not run on every write
+EVICTION_TARGET = 0.9
+
+
+class ChunkCache:
+    """
+    Two-tier (memory LRU + JSON files on disk) cache of chunking results.
+    """
+
+    def __init__(self, cache_dir: str, memory_items: int = 128, max_entries: int = 0):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding one JSON file per cached chunking result
+            memory_items: Maximum number of documents kept in the in-memory LRU tier
+            max_entries: Maximum number of files on disk before the least recently used are removed (0 = unbounded)
+        """
+        self.cache_dir = cache_dir
+        self.memory_items = max(0, memory_items)
+        self.max_entries = max(0, max_entries)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, List[TextWithOffset]]" = OrderedDict()
+        # Other workers write to the same directory, so this is recounted before evicting
+        self._disk_entries = len(self._entry_paths())
+
+        # Hit/miss counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(text: str, strategy: str, chunk_size: Optional[int],
+                 chunk_overlap: Optional[int], model: Optional[str]) -> str:
+        """
+        Build the cache key of a chunking result.
+
+        Args:
+            text: Full document text
+            strategy: Chunking strategy name
+            chunk_size: Chunk size used by the chunker
+            chunk_overlap: Chunk overlap used by the chunker
+            model: LLM used for chunking, if any
+
+        Returns:
+            Hex digest identifying the chunking result
+        """
+        document_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        key_material = json.dumps(
+            [document_hash, strategy, chunk_size, chunk_overlap, model])
+        return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _entry_paths(self) -> List[str]:
+        return [entry.path for entry in os.scandir(self.cache_dir)
+                if entry.is_file() and entry.name.endswith(".json")]
+
+    def _evict(self) -> None:
+        """Remove the least recently used files beyond the entry limit. Called with the lock held."""
+        entries = []
+        for path in self._entry_paths():
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                # Removed by another worker
+                continue
+        self._disk_entries = len(entries)
+
+        excess = len(entries) - int(self.max_entries * EVICTION_TARGET)
+        if excess <= 0:
+            return
+        # Entries in the memory tier were used by this process without touching their files
+        recent = {self._path(key) for key in self._memory}
+        candidates = sorted(entries, key=lambda entry: (entry[1] in recent, entry[0]))
+        for _, path in candidates[:excess]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        evicted = min(excess, len(candidates))
+        self._disk_entries -= evicted
+        self.evictions += evicted
+        logger.info(f"Evicted {evicted} chunk cache entries from {self.cache_dir}")
+
+    def _remember(self, key: str, chunks: List[TextWithOffset]) -> None:
+        """Insert a result into the LRU tier, evicting the least recently used entries."""
+        if not self.memory_items:
+            return
+        self._memory[key] = chunks
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[List[TextWithOffset]]:
+        """
+        Look up a chunking result.
+
+        Args:
+            key: Cache key built with make_key
+
+        Returns:
+            The cached chunks with offsets, or None on a miss
+        """
+        with self._lock:
+            chunks = self._memory.get(key)
+            if chunks is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return list(chunks)
+
+            path = self._path(key)
+            if os.path.exists(path):
+                try:
+                    with open(path, "r", encoding="utf-8") as cache_file:
+                        data = json.load(cache_file)
+                    chunks = [TextWithOffset(**chunk) for chunk in data["chunks"]]
+                    # The modification time orders entries for eviction
+                    os.utime(path)
+                    self._remember(key, chunks)
+                    self.hits += 1
+                    return list(chunks)
+                except FileNotFoundError:
+                    # Evicted by another worker in the meantime
+                    pass
+                except Exception as e:
+                    logger.warning(f"Removing unreadable chunk cache entry {path}: {e}")
+                    try:
+                        os.remove(path)
+                        self._disk_entries = max(0, self._disk_entries - 1)
+                    except OSError:
+                        pass
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, chunks: List[TextWithOffset], metadata: Optional[Dict] = None) -> None:
+        """
+        Store a chunking result.
+
+        Args:
+            key: Cache key built with make_key
+            chunks: Chunks with offsets to store
+            metadata: Optional descriptive fields stored alongside the chunks
+        """
+        data = dict(metadata or {})
+        data["chunks"] = [chunk.model_dump() for chunk in chunks]
+
+        with self._lock:
+            # Write atomically so concurrent readers never see a partial file
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                existed = os.path.exists(path)
+                with open(tmp_path, "w", encoding="utf-8") as cache_file:
+                    json.dump(data, cache_file)
+                os.replace(tmp_path, path)
+                if not existed:
+                    self._disk_entries += 1
+            except Exception as e:
+                logger.warning(f"Failed to persist chunk cache entry {path}: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self._remember(key, list(chunks))
+
+            if self.max_entries and self._disk_entries > self.max_entries:
+                self._evict()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return hit/miss counters and sizes.
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_entries,
+                "max_entries": self.max_entries
+            }
+
+
+_chunk_cache: Optional[ChunkCache] = None
+_chunk_cache_lock = threading.Lock()
+
+
+def get_chunk_cache() -> ChunkCache:
+    """
+    Return the process-wide chunk cache shared by all services.
+
+    Returns:
+        The shared ChunkCache instance
+    """
+    global _chunk_cache
+    with _chunk_cache_lock:
+        if _chunk_cache is None:
+            _chunk_cache = ChunkCache(
+                cache_dir=os.path.join(settings.CACHE_DIR, "chunks"),
+                max_entries=settings.CHUNK_CACHE_MAX_ENTRIES)
+        return _chunk_cache
+
+
+def _cache_lookup(chunker, text: str):
+    """Return (params, cache, key, cached chunks or None) for a chunking request."""
+    params = chunker.cache_params()
+    cache = get_chunk_cache()
+    key = cache.make_key(text, **params)
+    return params, cache, key, cache.get(key)
+
+
+def _cache_store(params: Dict, cache: ChunkCache, key: str,
+                 chunks: List[TextWithOffset], complete: bool) -> None:
+    """Store a freshly computed chunking result if it is complete."""
+    if complete:
+        cache.put(key, chunks, metadata=params)
+    else:
+        logger.warning(
+            f"Not caching incomplete {params['strategy']} chunking result")
+
+
+def split_with_offsets_cached(chunker, text: str) -> List[TextWithOffset]:
+    """
+    Split text with the given chunker, reusing a cached result for identical input.
+
+    Results the chunker reports as incomplete (e.g. agentic chunking that fell back
+    to recursive splitting because the LLM failed) are returned but not cached.
+
+    Args:
+        chunker: A BaseChunker instance
+        text: Text to split
+
+    Returns:
+        List of TextWithOffset objects
+    """
+    if not text:
+        return []
+    if not settings.CHUNK_CACHE_ENABLED:
+        return chunker.split_with_offsets(text)
+
+    params, cache, key, chunks = _cache_lookup(chunker, text)
+    if chunks is not None:
+        logger.info(
+            f"Using cached {params['strategy']} chunking result ({len(chunks)} chunks)")
+        return chunks
+
+    chunks, complete = chunker.split_with_offsets_and_status(text)
+    _cache_store(params, cache, key, chunks, complete)
+    return chunks
+
+
+async def asplit_with_offsets_cached(chunker, text: str) -> List[TextWithOffset]:
+    """
+    Awaitable version of split_with_offsets_cached.
+
+    Args:
+        chunker: A BaseChunker instance
+        text: Text to split
+
+    Returns:
+        List of TextWithOffset objects
+    """
+    if not text:
+        return []
+    if not settings.CHUNK_CACHE_ENABLED:
+        return await chunker.asplit_with_offsets(text)
+
+    params, cache, key, chunks = await asyncio.to_thread(_cache_lookup, chunker, text)
+    if chunks is not None:
+        record_cache("chunks", hits=1)
+        logger.info(
+            f"Using cached {params['strategy']} chunking result ({len(chunks)} chunks)")
+        return chunks
+
+    record_cache("chunks", misses=1)
+    chunks, complete = await chunker.asplit_with_offsets_and_status(text)
+    await asyncio.to_thread(_cache_store, params, cache, key, chunks, complete)
+    return chunks
@@ -7,9 +7,11 @@ Each chunker implements a common interface, making it easy to switch between str
 
 # Standard library imports
 import re
+import asyncio
+import json
 import logging
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 
 # Third-party imports
 from pydantic import BaseModel, Field
@@ -33,6 +35,7 @@ except ImportError:
 # Local application imports
 from app.core.config import settings
 from app.services.compliance_service.models.pydantic_models import TextWithOffset
+from app.services.compliance_service.utils import NormalizedText, fuzzy_locate, normalize_whitespace
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -54,6 +57,9 @@ class BaseChunker(ABC):
     Defines the common interface that all chunkers must implement.
     """
 
+    # Strategy name used by ChunkerFactory and in chunk cache keys
+    strategy = "base"
+
     @abstractmethod
     def split_text(self, text: str) -> List[str]:
         """
@@ -80,19 +86,80 @@ class BaseChunker(ABC):
         """
         pass
 
+    def split_with_offsets_and_status(self, text: str) -> Tuple[List[TextWithOffset], bool]:
+        """
+        Split text with offsets and report whether the result is complete.
+
+        A result is incomplete when the chunker had to degrade because of a transient
+        failure (e.g. an LLM error). Incomplete results should not be cached.
+
+        Args:
+            text: The text to be split
+
+        Returns:
+            Tuple of (chunks with offsets, whether the result is complete)
+        """
+        return self.split_with_offsets(text), True
+
+    async def asplit_with_offsets_and_status(self, text: str) -> Tuple[List[TextWithOffset], bool]:
+        """
+        Awaitable version of split_with_offsets_and_status.
+
+        The default implementation runs the synchronous splitter in a worker thread
+        so that chunking never blocks the event loop.
+
+        Args:
+            text: Text to split
+
+        Returns:
+            Tuple of (chunks with positions, whether the result is complete)
+        """
+        return await asyncio.to_thread(self.split_with_offsets_and_status, text)
+
+    async def asplit_with_offsets(self, text: str) -> List[TextWithOffset]:
+        """
+        Awaitable version of split_with_offsets.
+
+        Args:
+            text: Text to split
+
+        Returns:
+            List of TextWithOffset objects with text and position
+        """
+        chunks, _ = await self.asplit_with_offsets_and_status(text)
+        return chunks
+
+    def cache_params(self) -> Dict[str, Optional[object]]:
+        """
+        Parameters that, together with the document hash, identify a chunking result.
+
+        Returns:
+            Dictionary with strategy, chunk_size, chunk_overlap and model
+        """
+        return {
+            "strategy": self.strategy,
+            "chunk_size": getattr(self, "chunk_size", None),
+            "chunk_overlap": getattr(self, "chunk_overlap", None),
+            "model": None
+        }
+
     @staticmethod
-    def fuzzy_find_position(chunk_text: str, source_text: str, start_pos: int = 0) -> int:
+    def fuzzy_find_position(chunk_text: str, source_text: Union[str, NormalizedText], start_pos: int = 0) -> int:
         """
         Find the position of chunk_text in source_text using multiple strategies.
 
         Args:
             chunk_text: The text chunk to locate
-            source_text: The source text to search in
+            source_text: The source text to search in, or its NormalizedText index
+                (pass the index when locating many chunks in the same document)
             start_pos: Starting position for the search
 
         Returns:
             Position (character index) where the chunk was found
         """
+        index = NormalizedText.of(source_text)
+        source_text = index.original
+
         # Try several approaches, from most to least accurate
 
         # 1. Direct match (most accurate)
@@ -101,26 +168,9 @@ class BaseChunker(ABC):
             return pos
 
         # 2. Try with just basic whitespace normalization
-        chunk_norm = re.sub(r'\s+', ' ', chunk_text).strip()
-        source_norm = re.sub(
-            r'\s+', ' ', source_text[start_pos:start_pos + min(20000, len(source_text) - start_pos)])
-        pos = source_norm.find(chunk_norm)
-        if pos >= 0:
-            # Adjust position based on original text
-            # Find the real character position in the original text
-            real_pos = start_pos
-            norm_pos = 0
-
-            for i in range(start_pos, len(source_text)):
-                if norm_pos >= pos:
-                    real_pos = i
-                    break
-
-                # Count normalized positions
-                if not source_text[i].isspace() or (source_text[i].isspace() and (i == 0 or not source_text[i-1].isspace())):
-                    norm_pos += 1
-
-            return real_pos
+        span = index.find(chunk_text, start_pos)
+        if span is not None:
+            return span[0]
 
         # 3. Try with first N chars (for cases where end is different)
         if len(chunk_text) > 30:
@@ -130,26 +180,12 @@ class BaseChunker(ABC):
                 return pos
 
             # Also try with normalized whitespace
-            first_part_norm = re.sub(r'\s+', ' ', first_part).strip()
-            pos = source_norm.find(first_part_norm)
-            if pos >= 0:
-                # Find real position as above
-                real_pos = start_pos
-                norm_pos = 0
-
-                for i in range(start_pos, len(source_text)):
-                    if norm_pos >= pos:
-                        real_pos = i
-                        break
-
-                    # Count normalized positions
-                    if not source_text[i].isspace() or (source_text[i].isspace() and (i == 0 or not source_text[i-1].isspace())):
-                        norm_pos += 1
-
-                return real_pos
+            span = index.find(first_part, start_pos)
+            if span is not None:
+                return span[0]
 
         # 4. Try with word boundary matching (split into words and find sequences)
-        words = re.sub(r'\s+', ' ', chunk_text).strip().split()
+        words = normalize_whitespace(chunk_text).strip().split()
         if len(words) >= 3:
             # Create a pattern to find at least the first few words with flexible spacing
             first_words = words[:min(5, len(words))]
@@ -166,20 +202,16 @@ class BaseChunker(ABC):
         # 5. If available, try rapidfuzz for approximate matching
         if RAPIDFUZZ_AVAILABLE and len(chunk_text) > 5:
             try:
-                # Use extract to find best match in a substring of source text
-                # This helps with performance by limiting the search space
-                search_window = source_text[start_pos:start_pos +
-                                            min(10000, len(source_text) - start_pos)]
-                match = rapidfuzz_fuzz.partial_ratio_alignment(
-                    chunk_text, search_window)
+                # Only the regions proposed by the anchor index are scored,
+                # which keeps the search cheap on long documents.
+                # For longer texts, lower the threshold slightly
+                threshold = 75 if len(chunk_text) > 100 else 85
+                match = fuzzy_locate(chunk_text, index, min_score=threshold,
+                                     search_start_offset=start_pos)
 
                 # Only use results with high enough confidence
-                if match.score > 85:
-                    return start_pos + match.dest_start
-
-                # For longer texts, lower the threshold slightly
-                if len(chunk_text) > 100 and match.score > 75:
-                    return start_pos + match.dest_start
+                if match is not None and match[2] > threshold:
+                    return match[0]
             except Exception as e:
                 logger.debug(f"Fuzzy matching error: {e}")
 
@@ -197,6 +229,8 @@ class RecursiveChunker(BaseChunker):
     It recursively splits by different separators, attempting to preserve semantic structure.
     """
 
+    strategy = "recursive"
+
     def __init__(self, chunk_size: int = None, chunk_overlap: int = None):
         """
         Initialize the RecursiveChunker.
@@ -245,6 +279,9 @@ class RecursiveChunker(BaseChunker):
         chunks = self.split_text(text)
         result = []
 
+        # Index the document once for all whitespace-normalized lookups
+        index = NormalizedText(text)
+
         # Start tracking positions
         current_pos = 0
         for chunk in chunks:
@@ -252,7 +289,7 @@ class RecursiveChunker(BaseChunker):
                 continue
 
             # Use the advanced matching function
-            found_pos = self.fuzzy_find_position(chunk, text, current_pos)
+            found_pos = self.fuzzy_find_position(chunk, index, current_pos)
 
             # If we didn't find a good match, log a warning but continue
             if found_pos == current_pos and text.find(chunk, current_pos) == -1:
@@ -277,6 +314,8 @@ class TokenChunker(BaseChunker):
     which can be useful for working within token limitations of language models.
     """
 
+    strategy = "token"
+
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 100):
         """
         Initialize the TokenChunker.
@@ -326,12 +365,13 @@ class TokenChunker(BaseChunker):
         result = []
 
         # Track positions using the same algorithm as RecursiveChunker
+        index = NormalizedText(text)
         current_pos = 0
         for chunk in chunks:
             if not chunk.strip():
                 continue
 
-            found_pos = self.fuzzy_find_position(chunk, text, current_pos)
+            found_pos = self.fuzzy_find_position(chunk, index, current_pos)
 
             if found_pos == current_pos and text.find(chunk, current_pos) == -1:
                 logger.warning(
@@ -351,6 +391,8 @@ class SentenceChunker(BaseChunker):
     more meaning in each chunk compared to character-based approaches.
     """
 
+    strategy = "sentence"
+
     def __init__(self, chunk_size: int = 3500, chunk_overlap: int = 250):
         """
         Initialize the SentenceChunker.
@@ -407,12 +449,13 @@ class SentenceChunker(BaseChunker):
             chunks = self.split_text(text)
             result = []
 
+            index = NormalizedText(text)
             current_pos = 0
             for chunk in chunks:
                 if not chunk.strip():
                     continue
 
-                found_pos = self.fuzzy_find_position(chunk, text, current_pos)
+                found_pos = self.fuzzy_find_position(chunk, index, current_pos)
 
                 if found_pos == current_pos and text.find(chunk, current_pos) == -1:
                     logger.warning(
@@ -438,6 +481,9 @@ class ChunkerFactory:
     This provides a simple way to get the appropriate chunker based on configuration.
     """
 
+    # Strategies create_chunker accepts
+    STRATEGIES = ("recursive", "token", "sentence")
+
     @staticmethod
     def create_chunker(strategy: str = "recursive", **kwargs) -> BaseChunker:
         """
@@ -485,8 +531,14 @@ class AgenticChunker(BaseChunker):
 
     This chunker is specifically designed for compliance review, focusing on preserving regulatory
     context and identifying sections that might contain compliance issues.
+
+    The LLM rewrite costs one call per paragraph batch of every uncached document and
+    only runs when settings.AGENTIC_CHUNKING_LLM_ENABLED is set; otherwise the text is
+    split with the recursive fallback chunker.
     """
 
+    strategy = "agentic"
+
     def __init__(self, chunk_size: int = 3500, chunk_overlap: int = 250, batch_size: int = 10):
         """
         Initialize the AgenticChunker.
@@ -543,6 +595,8 @@ class AgenticChunker(BaseChunker):
         if current_chunk:
             prelim_chunks.append(current_chunk)
 
+        return prelim_chunks
+
     def split_into_sentences(self, text: str) -> List[str]:
         """
         Split the input text into semantic chunks directly using paragraph breaks.
@@ -578,15 +632,15 @@ class AgenticChunker(BaseChunker):
         self.sentences = chunks
         return chunks
 
-    def _process_batch(self, paragraphs: List[str]) -> Optional[ChunkGroupsDirect]:
+    def _build_batch_messages(self, paragraphs: List[str]) -> List[Dict[str, str]]:
         """
-        Process a batch of text paragraphs using the LLM to create semantic chunks optimized for compliance analysis.
+        Build the chat messages asking the LLM to chunk a batch of paragraphs.
 
         Args:
             paragraphs: List of text paragraphs to process
 
         Returns:
-            Parsed response from the LLM with rewritten chunks
+            List of chat messages for the OpenAI API
         """
         # Join paragraphs with clear separators for the LLM to understand structure
         combined_text = "\n\n".join(paragraphs)
@@ -621,6 +675,37 @@ class AgenticChunker(BaseChunker):
             "}\n"
         )
 
+        return [
+            {"role": "system", "content": "You are an expert compliance document analyst specializing in clinical trial regulatory document analysis."},
+            {"role": "user", "content": prompt},
+        ]
+
+    @staticmethod
+    def _parse_batch_response(response_text: str) -> ChunkGroupsDirect:
+        """
+        Parse a JSON-mode completion into rewritten chunks.
+
+        Args:
+            response_text: Raw JSON returned by the LLM
+
+        Returns:
+            Parsed response with rewritten chunks
+        """
+        response_json = json.loads(response_text)
+        return ChunkGroupsDirect(chunks=[ChunkContent(rewritten=c["rewritten"]) for c in response_json["chunks"]])
+
+    def _process_batch(self, paragraphs: List[str]) -> Optional[ChunkGroupsDirect]:
+        """
+        Process a batch of text paragraphs using the LLM to create semantic chunks optimized for compliance analysis.
+
+        Args:
+            paragraphs: List of text paragraphs to process
+
+        Returns:
+            Parsed response from the LLM with rewritten chunks
+        """
+        messages = self._build_batch_messages(paragraphs)
+
         try:
             if not OPENAI_AVAILABLE:
                 logging.warning("OpenAI not available, skipping LLM chunking")
@@ -634,10 +719,7 @@ class AgenticChunker(BaseChunker):
                 # Try with newer structured parse method first
                 completion = client.beta.chat.completions.parse(
                     model=model,
-                    messages=[
-                        {"role": "system", "content": "You are an expert compliance document analyst specializing in clinical trial regulatory document analysis."},
-                        {"role": "user", "content": prompt},
-                    ],
+                    messages=messages,
                     response_format=ChunkGroupsDirect,
                 )
                 return completion.choices[0].message.parsed
@@ -645,57 +727,161 @@ class AgenticChunker(BaseChunker):
                 # Fall back to regular completion and manual parsing for older SDK versions
                 completion = client.chat.completions.create(
                     model=model,
-                    messages=[
-                        {"role": "system", "content": "You are an expert compliance document analyst specializing in clinical trial regulatory document analysis."},
-                        {"role": "user", "content": prompt},
-                    ],
+                    messages=messages,
                     response_format={"type": "json_object"}
                 )
-                response_text = completion.choices[0].message.content
                 # Parse the JSON response manually
-                response_json = json.loads(response_text)
-                return ChunkGroupsDirect(chunks=[ChunkContent(rewritten=c["rewritten"]) for c in response_json["chunks"]])
+                return self._parse_batch_response(completion.choices[0].message.content)
         except Exception as e:
             logging.error(f"An error occurred while calling the LLM: {e}")
             return None
 
-    def process_with_llm(self, text: str) -> List[str]:
+    async def _aprocess_batch(self, paragraphs: List[str], client,
+                              semaphore: asyncio.Semaphore) -> Optional[ChunkGroupsDirect]:
         """
-        Process the entire text with the LLM to create compliance-optimized chunks.
+        Async version of _process_batch using a shared openai.AsyncOpenAI client.
 
         Args:
-            text: The text to process
+            paragraphs: List of text paragraphs to process
+            client: openai.AsyncOpenAI client
+            semaphore: Semaphore bounding the number of batches in flight
 
         Returns:
-            List of rewritten text chunks
+            Parsed response from the LLM with rewritten chunks
         """
-        # First do initial paragraph-based splitting to handle large documents
-        chunks = self.split_text_with_llm(text)
-        if not chunks:
-            return self.fallback_chunker.split_text(text)
+        messages = self._build_batch_messages(paragraphs)
+        model = settings.OPENAI_MODEL_NAME
 
-        # Process these initial chunks with the LLM
-        all_results = []
+        async with semaphore:
+            try:
+                try:
+                    # Try with newer structured parse method first
+                    completion = await client.beta.chat.completions.parse(
+                        model=model,
+                        messages=messages,
+                        response_format=ChunkGroupsDirect,
+                    )
+                    return completion.choices[0].message.parsed
+                except AttributeError:
+                    # Fall back to regular completion and manual parsing for older SDK versions
+                    completion = await client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        response_format={"type": "json_object"}
+                    )
+                    return self._parse_batch_response(completion.choices[0].message.content)
+            except Exception as e:
+                logging.error(f"An error occurred while calling the LLM: {e}")
+                return None
+
+    def _merge_batch_results(self, batches: List[List[str]],
+                             results: List[Optional[ChunkGroupsDirect]],
+                             text: str) -> Tuple[List[str], bool]:
+        """
+        Combine per-batch LLM results in batch order.
 
-        # Process in batches based on batch_size
-        for start in range(0, len(chunks), self.batch_size):
-            end = start + self.batch_size
-            batch_chunks = chunks[start:end]
-            result = self._process_batch(batch_chunks)
+        Args:
+            batches: Paragraph batches sent to the LLM
+            results: LLM result for each batch (None where the call failed)
+            text: The full text, used for the fallback chunker
 
+        Returns:
+            Tuple of (rewritten text chunks, whether all LLM batches succeeded)
+        """
+        all_results = []
+        complete = True
+
+        for batch_chunks, result in zip(batches, results):
             if result and result.chunks:
                 all_results.extend(
                     [chunk.rewritten for chunk in result.chunks])
             else:
                 # If LLM processing fails, include the original text
                 all_results.extend(batch_chunks)
+                complete = False
 
         if not all_results:
             logging.warning(
                 "No chunks produced by LLM, falling back to basic chunking")
-            return self.fallback_chunker.split_text(text)
+            return self.fallback_chunker.split_text(text), False
 
-        return all_results
+        return all_results, complete
+
+    def _make_batches(self, chunks: List[str]) -> List[List[str]]:
+        """Group preliminary chunks into batches of batch_size."""
+        return [chunks[start:start + self.batch_size]
+                for start in range(0, len(chunks), self.batch_size)]
+
+    def _process_with_llm(self, text: str) -> Tuple[List[str], bool]:
+        """
+        Process the entire text with the LLM and report whether every batch succeeded.
+
+        Args:
+            text: The text to process
+
+        Returns:
+            Tuple of (rewritten text chunks, whether all LLM batches succeeded)
+        """
+        if not settings.AGENTIC_CHUNKING_LLM_ENABLED:
+            return self.fallback_chunker.split_text(text), True
+
+        # First do initial paragraph-based splitting to handle large documents
+        chunks = self.split_text_with_llm(text)
+        if not chunks:
+            return self.fallback_chunker.split_text(text), True
+
+        # Process these initial chunks with the LLM, one batch after another
+        batches = self._make_batches(chunks)
+        results = [self._process_batch(batch) for batch in batches]
+        return self._merge_batch_results(batches, results, text)
+
+    async def _aprocess_with_llm(self, text: str) -> Tuple[List[str], bool]:
+        """
+        Async version of _process_with_llm that sends batches to the LLM concurrently.
+
+        At most settings.CHUNKING_MAX_CONCURRENCY batches are in flight at once and
+        results are merged in the original batch order.
+
+        Args:
+            text: The text to process
+
+        Returns:
+            Tuple of (rewritten text chunks, whether all LLM batches succeeded)
+        """
+        if not settings.AGENTIC_CHUNKING_LLM_ENABLED:
+            return self.fallback_chunker.split_text(text), True
+
+        chunks = self.split_text_with_llm(text)
+        if not chunks:
+            return self.fallback_chunker.split_text(text), True
+
+        batches = self._make_batches(chunks)
+        if not OPENAI_AVAILABLE:
+            logging.warning("OpenAI not available, skipping LLM chunking")
+            return self._merge_batch_results(batches, [None] * len(batches), text)
+
+        semaphore = asyncio.Semaphore(max(1, settings.CHUNKING_MAX_CONCURRENCY))
+        logging.info(
+            f"Chunking {len(batches)} batches with up to {settings.CHUNKING_MAX_CONCURRENCY} concurrent LLM calls")
+
+        async with openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY) as client:
+            # gather preserves the order of the batches
+            results = await asyncio.gather(
+                *[self._aprocess_batch(batch, client, semaphore) for batch in batches])
+
+        return self._merge_batch_results(batches, list(results), text)
+
+    def process_with_llm(self, text: str) -> List[str]:
+        """
+        Process the entire text with the LLM to create compliance-optimized chunks.
+
+        Args:
+            text: The text to process
+
+        Returns:
+            List of rewritten text chunks
+        """
+        return self._process_with_llm(text)[0]
 
     def split_text(self, text: str) -> List[str]:
         """
@@ -719,59 +905,142 @@ class AgenticChunker(BaseChunker):
             # Fallback to traditional chunking if LLM approach fails
             return self.fallback_chunker.split_text(text)
 
-    def split_with_offsets(self, text: str) -> List[TextWithOffset]:
+    def _locate_chunks(self, chunks: List[str], text: str) -> List[TextWithOffset]:
         """
-        Split text with LLM and track character offsets for UI highlighting of compliance issues.
+        Find the character offset of each (possibly rewritten) chunk in the original text.
 
         Args:
-            text: Text to split
+            chunks: Chunks produced by the LLM
+            text: Original text
 
         Returns:
             List of TextWithOffset objects with text chunks and their positions
         """
+        result = []
+
+        # Index the document once for all whitespace-normalized lookups
+        index = NormalizedText(text)
+
+        # Start tracking positions
+        current_pos = 0
+        for chunk in chunks:
+            if not chunk.strip():
+                continue
+
+            # Try exact match first (fastest approach)
+            exact_pos = text.find(chunk, current_pos)
+            if exact_pos >= 0:
+                # Found an exact match
+                found_pos = exact_pos
+            else:
+                # Use fuzzy matching for LLM-rewritten chunks
+                found_pos = self.fuzzy_find_position(
+                    chunk, index, current_pos)
+
+            # Log a warning if position tracking is uncertain
+            if found_pos == current_pos and text.find(chunk, current_pos) == -1:
+                logging.warning(
+                    f"Using approximate position for LLM-generated chunk: '{chunk[:30]}...'")
+
+            # Add to results
+            result.append(TextWithOffset(text=chunk, offset=found_pos))
+
+            # Advance position for next search
+            current_pos = found_pos + max(len(chunk.strip()), 1)
+
+        return result
+
+    def split_with_offsets_and_status(self, text: str) -> Tuple[List[TextWithOffset], bool]:
+        """
+        Split text with LLM, track character offsets and report whether every LLM batch succeeded.
+
+        Args:
+            text: Text to split
+
+        Returns:
+            Tuple of (chunks with positions, whether the result is complete)
+        """
         if not text:
-            return []
+            return [], True
+        if not settings.AGENTIC_CHUNKING_LLM_ENABLED:
+            return self.fallback_chunker.split_with_offsets(text), True
 
         try:
             # Get LLM-optimized chunks
-            chunks = self.split_text(text)
-            result = []
+            chunks, complete = self._process_with_llm(text)
+        except Exception as e:
+            logging.error(
+                f"Error in agentic chunking: {e}, falling back to recursive chunking")
+            return self.fallback_chunker.split_with_offsets(text), False
 
-            # Start tracking positions
-            current_pos = 0
-            for chunk in chunks:
-                if not chunk.strip():
-                    continue
+        try:
+            return self._locate_chunks(chunks, text), complete
+        except Exception as e:
+            logging.error(
+                f"Error in agentic chunking with offsets: {e}, falling back to recursive chunking")
+            return self.fallback_chunker.split_with_offsets(text), False
 
-                # Try exact match first (fastest approach)
-                exact_pos = text.find(chunk, current_pos)
-                if exact_pos >= 0:
-                    # Found an exact match
-                    found_pos = exact_pos
-                else:
-                    # Use fuzzy matching for LLM-rewritten chunks
-                    found_pos = self.fuzzy_find_position(
-                        chunk, text, current_pos)
+    async def asplit_with_offsets_and_status(self, text: str) -> Tuple[List[TextWithOffset], bool]:
+        """
+        Awaitable version of split_with_offsets_and_status.
 
-                # Log a warning if position tracking is uncertain
-                if found_pos == current_pos and text.find(chunk, current_pos) == -1:
-                    logging.warning(
-                        f"Using approximate position for LLM-generated chunk: '{chunk[:30]}...'")
+        LLM batches run concurrently on the event loop and the CPU-bound offset
+        search runs in a worker thread, so other requests stay responsive while a
+        large document is being chunked.
 
-                # Add to results
-                result.append(TextWithOffset(text=chunk, offset=found_pos))
+        Args:
+            text: Text to split
 
-                # Advance position for next search
-                current_pos = found_pos + max(len(chunk.strip()), 1)
+        Returns:
+            Tuple of (chunks with positions, whether the result is complete)
+        """
+        if not text:
+            return [], True
+        if not settings.AGENTIC_CHUNKING_LLM_ENABLED:
+            return await self.fallback_chunker.asplit_with_offsets(text), True
 
-            return result
+        try:
+            chunks, complete = await self._aprocess_with_llm(text)
+        except Exception as e:
+            logging.error(
+                f"Error in agentic chunking: {e}, falling back to recursive chunking")
+            return await self.fallback_chunker.asplit_with_offsets(text), False
+
+        try:
+            located = await asyncio.to_thread(self._locate_chunks, chunks, text)
+            return located, complete
         except Exception as e:
             logging.error(
                 f"Error in agentic chunking with offsets: {e}, falling back to recursive chunking")
-            return self.fallback_chunker.split_with_offsets(text)
+            return await self.fallback_chunker.asplit_with_offsets(text), False
+
+    def split_with_offsets(self, text: str) -> List[TextWithOffset]:
+        """
+        Split text with LLM and track character offsets for UI highlighting of compliance issues.
+
+        Args:
+            text: Text to split
+
+        Returns:
+            List of TextWithOffset objects with text chunks and their positions
+        """
+        return self.split_with_offsets_and_status(text)[0]
+
+    def cache_params(self) -> Dict[str, Optional[object]]:
+        """
+        Parameters that, together with the document hash, identify a chunking result.
+
+        Returns:
+            Dictionary with strategy, chunk_size, chunk_overlap and the chunking model
+        """
+        params = super().cache_params()
+        # Without the LLM rewrite the result does not depend on a model
+        params["model"] = settings.OPENAI_MODEL_NAME if settings.AGENTIC_CHUNKING_LLM_ENABLED else None
+        return params
 
 
 # Update the factory to support the agentic chunker
+ChunkerFactory.STRATEGIES += ("agentic",)
 ChunkerFactory.create_chunker = lambda strategy="agentic", **kwargs: {
     "recursive": lambda: RecursiveChunker(**kwargs),
     "token": lambda: TokenChunker(**kwargs),
@@ -0,0 +1,102 @@
+"""
+Concurrency controls for the compliance service.
+
+A single review fans out many independent LLM calls (one per chunk pair plus the
+whole-document pass). The LLMRateLimiter bounds how many of those calls are in
+flight at once and, optionally, how many prompt tokens are sent per minute.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English prose
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate used for rate limiting.
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Approximate number of tokens in the text
+    """
+    if not text:
+        return 0
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class LLMRateLimiter:
+    """
+    Per-review limiter for LLM calls.
+
+    Combines a semaphore (maximum concurrent calls) with a token bucket
+    (maximum prompt tokens per minute). A tokens_per_minute of 0 disables
+    the token limit.
+    """
+
+    def __init__(self, max_concurrency: int = 8, tokens_per_minute: int = 0):
+        """
+        Initialize the limiter.
+
+        Args:
+            max_concurrency: Maximum number of LLM calls in flight at once
+            tokens_per_minute: Prompt token budget per minute (0 = unlimited)
+        """
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.tokens_per_minute = max(0, int(tokens_per_minute or 0))
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._token_lock = asyncio.Lock()
+        self._available_tokens = float(self.tokens_per_minute)
+        self._last_refill = time.monotonic()
+
+    async def _acquire_tokens(self, tokens: int) -> None:
+        """Wait until the token bucket can cover the requested prompt tokens."""
+        if not self.tokens_per_minute or tokens <= 0:
+            return
+
+        # A single prompt larger than the whole budget may still run once the bucket is full
+        tokens = min(tokens, self.tokens_per_minute)
+        refill_rate = self.tokens_per_minute / 60.0
+
+        # Waiters are served in arrival order while holding the lock
+        async with self._token_lock:
+            while True:
+                now = time.monotonic()
+                self._available_tokens = min(
+                    float(self.tokens_per_minute),
+                    self._available_tokens + (now - self._last_refill) * refill_rate)
+                self._last_refill = now
+
+                if self._available_tokens >= tokens:
+                    self._available_tokens -= tokens
+                    return
+
+                wait_seconds = (tokens - self._available_tokens) / refill_rate
+                logger.debug(
+                    f"Token budget exhausted, waiting {wait_seconds:.2f}s for {tokens} tokens")
+                await asyncio.sleep(wait_seconds)
+
+    @asynccontextmanager
+    async def limit(self, estimated_tokens: int = 0) -> AsyncIterator[None]:
+        """
+        Context manager wrapping a single LLM call.
+
+        Token budget is reserved before taking a concurrency slot so that calls
+        waiting on the token bucket don't hold a slot.
+
+        Args:
+            estimated_tokens: Estimated prompt tokens for the call
+        """
+        await self._acquire_tokens(estimated_tokens)
+        async with self._semaphore:
+            yield
@@ -0,0 +1,302 @@
+"""
+Issue deduplication for the compliance service.
+
+Two issues are duplicates when their clinical texts are identical after
+stripping, or when the word sets of their clinical texts overlap strongly
+(Jaccard similarity) and either the compliance texts, the suggested edits or
+the cited regulation sections agree as well. Every rule requires a clinical
+overlap above TEXT_SIMILARITY_THRESHOLD, so only issues whose clinical texts
+are similar need to be compared at all.
+
+Each issue is tokenized once (IssueFeatures). IssueIndex finds the candidates
+of an issue through its exact clinical text and MinHash/LSH buckets of the
+clinical word set, and verifies only those candidates with the exact rules.
+With BANDS bands of ROWS_PER_BAND rows, a pair whose clinical Jaccard
+similarity is just above 0.8 shares no bucket with probability
+(1 - 0.8^5)^32 = 3e-6 (less for more similar pairs), while a pair at 0.3
+becomes a candidate with probability 0.075, so the index finds the same
+duplicates as comparing every pair without the quadratic number of
+comparisons. The index is used where issues are checked against a set of
+known issues: the whole-document merge and the incremental check against
+stored issues.
+
+deduplicate_issues, the final pass of an analysis, only groups issues whose
+clinical texts are identical after stripping, in a single dictionary pass.
+"""
+
+import logging
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from app.models.compliance import ComplianceIssue
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Word-set overlap above which two texts count as similar
+TEXT_SIMILARITY_THRESHOLD = 0.8
+# Clinical overlap above which two issues are duplicates regardless of the other fields
+EXACT_CLINICAL_OVERLAP = 0.95
+
+# MinHash/LSH layout: NUM_PERM = BANDS * ROWS_PER_BAND hash functions
+BANDS = 32
+ROWS_PER_BAND = 5
+NUM_PERM = BANDS * ROWS_PER_BAND
+
+# Multiply-add-shift hashing of 32-bit token hashes: the high 32 bits of a * h + b in
+# wrapping 64-bit arithmetic, with a random odd a and random b per hash function
+_generator = np.random.default_rng(20240601)
+_PERM_A = _generator.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _generator.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2)
+_SHIFT = np.uint64(32)
+# Combines the rows of a band into a single bucket key (wrapping arithmetic is intended)
+_BAND_MULTIPLIERS = _generator.integers(1, 1 << 63, size=ROWS_PER_BAND, dtype=np.uint64)
+
+# Maximum number of token hashes expanded at once while computing signatures
+SIGNATURE_BLOCK_TOKENS = 8192
+
+
+def word_set(text: Optional[str]) -> Set[str]:
+    """
+    Lowercased whitespace-separated words of a text.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        Set of the text's words (empty for empty text)
+    """
+    if not text:
+        return set()
+    return set(text.lower().split())
+
+
+def text_overlap(words1: Set[str], words2: Set[str]) -> float:
+    """
+    Jaccard similarity of two word sets.
+
+    Args:
+        words1: Words of the first text
+        words2: Words of the second text
+
+    Returns:
+        Similarity score between 0.0 and 1.0 (0.0 if either set is empty)
+    """
+    if not words1 or not words2:
+        return 0.0
+    intersection = len(words1 & words2)
+    return intersection / (len(words1) + len(words2) - intersection)
+
+
+class IssueFeatures:
+    """
+    Everything the duplicate rules read from an issue, computed once.
+    """
+
+    __slots__ = ("clinical_key", "clinical_words", "compliance_words",
+                 "suggestion_words", "regulation_section")
+
+    def __init__(self, issue: ComplianceIssue):
+        self.clinical_key = issue.clinical_text.strip()
+        self.clinical_words = word_set(issue.clinical_text)
+        self.compliance_words = word_set(issue.compliance_text)
+        self.suggestion_words = word_set(issue.suggested_edit)
+        # Section numbers, e.g. '4.1.2' from 'ICH GCP Section 4.1.2'
+        self.regulation_section = re.sub(r'[^0-9.]', '', issue.regulation) if issue.regulation else None
+
+
+def is_similar(features1: IssueFeatures, features2: IssueFeatures) -> bool:
+    """
+    Decide whether two issues are duplicates.
+
+    Args:
+        features1: Features of the first issue
+        features2: Features of the second issue
+
+    Returns:
+        True if the issues are similar (likely duplicates)
+    """
+    # Exact clinical text match is the strongest indicator of a duplicate
+    if features1.clinical_key == features2.clinical_key:
+        return True
+
+    clinical_overlap = text_overlap(features1.clinical_words, features2.clinical_words)
+    if clinical_overlap > EXACT_CLINICAL_OVERLAP:
+        return True
+    if clinical_overlap <= TEXT_SIMILARITY_THRESHOLD:
+        return False
+
+    # Significant clinical overlap also needs agreement on the regulation, the
+    # violated compliance text or the suggested fix
+    regulation_match = (features1.regulation_section is not None
+                        and features2.regulation_section is not None
+                        and features1.regulation_section == features2.regulation_section)
+    return (regulation_match
+            or text_overlap(features1.compliance_words, features2.compliance_words) > TEXT_SIMILARITY_THRESHOLD
+            or text_overlap(features1.suggestion_words, features2.suggestion_words) > TEXT_SIMILARITY_THRESHOLD)
+
+
+def minhash_signatures(word_sets: List[Set[str]]) -> np.ndarray:
+    """
+    MinHash signatures of non-empty word sets.
+
+    Token hashes of many sets are expanded together, in blocks of about
+    SIGNATURE_BLOCK_TOKENS tokens, and reduced per set with np.minimum.reduceat.
+
+    Args:
+        word_sets: Non-empty word sets
+
+    Returns:
+        uint64 matrix with one NUM_PERM signature per set
+    """
+    signatures = np.empty((len(word_sets), NUM_PERM), dtype=np.uint64)
+    start = 0
+    while start < len(word_sets):
+        # Whole sets per block, at least one
+        end, tokens = start, 0
+        while end < len(word_sets) and (end == start or tokens + len(word_sets[end]) <= SIGNATURE_BLOCK_TOKENS):
+            tokens += len(word_sets[end])
+            end += 1
+
+        hashes = np.fromiter((zlib.crc32(word.encode()) for words in word_sets[start:end] for word in words),
+                             dtype=np.uint64, count=tokens)
+        permuted = (hashes[:, None] * _PERM_A + _PERM_B) >> _SHIFT
+        offsets = np.cumsum([0] + [len(words) for words in word_sets[start:end - 1]])
+        signatures[start:end] = np.minimum.reduceat(permuted, offsets, axis=0)
+        start = end
+    return signatures
+
+
+def band_keys(signatures: np.ndarray) -> np.ndarray:
+    """
+    LSH bucket key of every band of every signature.
+
+    Args:
+        signatures: Matrix of MinHash signatures
+
+    Returns:
+        uint64 matrix with one key per (signature, band)
+    """
+    bands = signatures.reshape(len(signatures), BANDS, ROWS_PER_BAND)
+    return (bands * _BAND_MULTIPLIERS).sum(axis=2, dtype=np.uint64)
+
+
+class IssueIndex:
+    """
+    Indexed issues that can be searched for duplicates of another issue.
+    """
+
+    def __init__(self, issues: Iterable[ComplianceIssue] = ()):
+        """
+        Initialize the index.
+
+        Args:
+            issues: Issues to index right away (signatures are computed in one pass)
+        """
+        self.features: List[IssueFeatures] = []
+        self._by_clinical_text: Dict[str, List[int]] = {}
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(BANDS)]
+        self.add_many(issues)
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def add(self, issue: ComplianceIssue) -> int:
+        """
+        Index an issue.
+
+        Args:
+            issue: Issue to index
+
+        Returns:
+            Position of the issue in the index
+        """
+        return self.add_many([issue])[0]
+
+    def add_many(self, issues: Iterable[ComplianceIssue]) -> List[int]:
+        """
+        Index several issues.
+
+        Args:
+            issues: Issues to index
+
+        Returns:
+            Positions of the issues in the index
+        """
+        features = [IssueFeatures(issue) for issue in issues]
+        positions = list(range(len(self.features), len(self.features) + len(features)))
+        keys = self._band_keys(features)
+        self.features.extend(features)
+        for position, feature, row in zip(positions, features, keys):
+            self._by_clinical_text.setdefault(feature.clinical_key, []).append(position)
+            if row is not None:
+                for buckets, key in zip(self._buckets, row):
+                    buckets.setdefault(key, []).append(position)
+        return positions
+
+    @staticmethod
+    def _band_keys(features: List[IssueFeatures]) -> List[Optional[List[int]]]:
+        """Bucket keys of every issue, with the signatures computed in one pass."""
+        hashed = [feature.clinical_words for feature in features if feature.clinical_words]
+        rows = iter(band_keys(minhash_signatures(hashed)).tolist() if hashed else ())
+        return [next(rows) if feature.clinical_words else None for feature in features]
+
+    def _candidates(self, features: IssueFeatures, row: Optional[List[int]]) -> Set[int]:
+        """Positions sharing the exact clinical text or an LSH bucket with an issue."""
+        found = set(self._by_clinical_text.get(features.clinical_key, ()))
+        if row is not None:
+            for buckets, key in zip(self._buckets, row):
+                found.update(buckets.get(key, ()))
+        return found
+
+    def find_similar(self, issue: ComplianceIssue) -> Optional[int]:
+        """
+        Find the first indexed issue that is a duplicate of an issue.
+
+        Args:
+            issue: Issue to look up
+
+        Returns:
+            Lowest position of a similar indexed issue, or None
+        """
+        features = IssueFeatures(issue)
+        return self._first_similar(features, self._candidates(features, self._band_keys([features])[0]))
+
+    def _first_similar(self, features: IssueFeatures, candidates: Iterable[int]) -> Optional[int]:
+        """Lowest candidate position whose issue is similar to the features."""
+        for position in sorted(candidates):
+            if is_similar(features, self.features[position]):
+                return position
+        return None
+
+
+def deduplicate_issues(issues: List[ComplianceIssue]) -> List[ComplianceIssue]:
+    """
+    Keep one issue per clinical text (after stripping whitespace).
+
+    From every group of issues with the same clinical text the first
+    high-confidence issue is kept, or the first issue if none has high
+    confidence; groups keep the order of their first issue.
+
+    Args:
+        issues: Issues to deduplicate
+
+    Returns:
+        Deduplicated issues
+    """
+    if not issues or len(issues) <= 1:
+        return issues
+
+    text_groups: Dict[str, List[ComplianceIssue]] = {}
+    for issue in issues:
+        text_groups.setdefault(issue.clinical_text.strip(), []).append(issue)
+
+    deduplicated = []
+    for group in text_groups.values():
+        if len(group) > 1:
+            logger.debug(f"Found {len(group)} issues for the same clinical text: '{group[0].clinical_text[:30]}...'")
+        deduplicated.append(next((issue for issue in group if issue.confidence == 'high'), group[0]))
+    return deduplicated
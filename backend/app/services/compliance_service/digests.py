@@ -0,0 +1,175 @@
+"""
+Section digests for the map-reduce whole-document analysis.
+
+Documents too large for a single whole-document prompt are split into sections
+on paragraph boundaries. Each section is condensed by the LLM into a digest: the
+statements relevant to compliance, quoted verbatim, so that issues found in the
+digests can be mapped back to exact spans of the original document. Digests only
+depend on the document text, so they are cached per document hash (in a
+ChunkCache, one entry per document holding the digest of every section).
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import List, Optional
+
+from app.core.config import settings
+from app.services.compliance_service.chunk_cache import ChunkCache
+from app.services.compliance_service.models.pydantic_models import TextWithOffset
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bump when the digest prompt changes, so digests of the old prompt are not reused
+DIGEST_PROMPT_VERSION = "digest-v1"
+
+PARAGRAPH_BREAK_PATTERN = re.compile(r"\n\s*\n")
+SENTENCE_END_PATTERN = re.compile(r"[.!?]\s")
+# Bullets, numbering and quotes around the statements of a digest reply
+STATEMENT_PREFIX_PATTERN = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+def split_sections(text: str, max_chars: int) -> List[TextWithOffset]:
+    """
+    Split a document into sections of at most max_chars characters.
+
+    Consecutive paragraphs are grouped into a section; a paragraph longer than a
+    section is cut after the last sentence end that fits. Sections cover the
+    whole text, so their offsets are exact.
+
+    Args:
+        text: Document text
+        max_chars: Maximum section length in characters
+
+    Returns:
+        Sections with their offsets in the document
+    """
+    if not text:
+        return []
+    max_chars = max(1, max_chars)
+
+    # Paragraphs keep their trailing separator so sections tile the text
+    paragraph_ends = [match.end() for match in PARAGRAPH_BREAK_PATTERN.finditer(text)] + [len(text)]
+    sections = []
+    start = 0
+    section_end = 0
+    for paragraph_end in paragraph_ends:
+        if paragraph_end - start <= max_chars:
+            section_end = paragraph_end
+            continue
+        if section_end > start:
+            sections.append(TextWithOffset(text=text[start:section_end], offset=start))
+            start = section_end
+        # Cut paragraphs longer than a section at sentence ends
+        while paragraph_end - start > max_chars:
+            window = text[start:start + max_chars]
+            sentence_ends = [match.end() for match in SENTENCE_END_PATTERN.finditer(window)]
+            cut = start + (sentence_ends[-1] if sentence_ends else max_chars)
+            sections.append(TextWithOffset(text=text[start:cut], offset=start))
+            start = cut
+        section_end = paragraph_end
+    if section_end > start:
+        sections.append(TextWithOffset(text=text[start:section_end], offset=start))
+
+    return [section for section in sections if section.text.strip()]
+
+
+def parse_digest(response_content: str, max_statements: int) -> str:
+    """
+    Extract the statements of a digest reply, one per line.
+
+    Args:
+        response_content: LLM reply to the digest prompt
+        max_statements: Maximum number of statements kept
+
+    Returns:
+        The digest text (empty if the section has no relevant statements)
+    """
+    statements = []
+    for line in response_content.splitlines():
+        statement = STATEMENT_PREFIX_PATTERN.sub("", line).strip().strip('"“”').strip()
+        if not statement or statement.upper() == "NONE" or statement.startswith("```"):
+            continue
+        statements.append(statement)
+    return "\n".join(f"- {statement}" for statement in statements[:max(1, max_statements)])
+
+
+def fit_digests(digests: List[TextWithOffset], max_chars: int) -> List[TextWithOffset]:
+    """
+    Trim section digests so that together they fit into max_chars.
+
+    Every section gets an equal share; shares left unused by short digests go to
+    the longer ones. Digests are trimmed at statement (line) boundaries.
+
+    Args:
+        digests: Digests with the offsets of their sections
+        max_chars: Character budget of all digests together
+
+    Returns:
+        The digests, trimmed where necessary
+    """
+    if sum(len(digest.text) for digest in digests) <= max_chars:
+        return list(digests)
+
+    shares = {}
+    remaining = max_chars
+    pending = sorted(range(len(digests)), key=lambda index: len(digests[index].text))
+    while pending:
+        share = remaining // len(pending)
+        index = pending.pop(0)
+        shares[index] = min(len(digests[index].text), share)
+        remaining -= shares[index]
+
+    fitted = []
+    for index, digest in enumerate(digests):
+        kept, used = [], 0
+        for line in digest.text.splitlines():
+            # Lines after the first are preceded by a newline
+            length = len(line) + (1 if kept else 0)
+            if used + length > shares[index]:
+                break
+            kept.append(line)
+            used += length
+        fitted.append(TextWithOffset(text="\n".join(kept), offset=digest.offset))
+    return fitted
+
+
+def format_digest(digests: List[TextWithOffset], document_length: int) -> str:
+    """
+    Render the section digests of a document for the holistic prompt.
+
+    Args:
+        digests: Digests with the offsets of their sections
+        document_length: Length of the document, to label the last section
+
+    Returns:
+        Digest text with a heading per section
+    """
+    blocks = []
+    for number, digest in enumerate(digests, start=1):
+        end = digests[number].offset if number < len(digests) else document_length
+        blocks.append(f"[Section {number}, characters {digest.offset}-{end}]\n"
+                      f"{digest.text or '- (no compliance-relevant statements)'}")
+    return "\n\n".join(blocks)
+
+
+_digest_cache: Optional[ChunkCache] = None
+_digest_cache_lock = threading.Lock()
+
+
+def get_digest_cache() -> ChunkCache:
+    """
+    Return the process-wide cache of section digests.
+
+    Returns:
+        The shared ChunkCache instance holding digests
+    """
+    global _digest_cache
+    with _digest_cache_lock:
+        if _digest_cache is None:
+            _digest_cache = ChunkCache(
+                cache_dir=os.path.join(settings.CACHE_DIR, "digests"),
+                max_entries=settings.CHUNK_CACHE_MAX_ENTRIES)
+        return _digest_cache
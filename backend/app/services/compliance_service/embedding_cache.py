@@ -0,0 +1,472 @@
+"""
+Persistent, content-addressed embedding cache.
+
+Embeddings are keyed by hash(model name, chunk text) and stored on disk as raw
+float32 rows (one file per embedding dimension) that are read back through a
+NumPy memory map. A small LRU tier keeps recently used vectors in memory.
+
+Vectors are only ever appended. Once the vector files exceed a size limit the
+store is compacted: the vectors most recently used by this process and the most
+recently written ones are copied into a new generation of files, and the old
+generation is removed. Other processes notice the new index file and reload.
+
+The cache is shared by the ComplianceService and the DocumentMatcher, so a
+compliance guideline chunk is embedded once no matter how many clinical
+documents it is paired with.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.compliance_service.tracing import record_cache
+
+# File locking keeps appends consistent when several workers share the cache directory
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "index.jsonl"
+# Share of the size limit kept after a compaction, so that compactions are not run on every write
+EVICTION_TARGET = 0.9
+
+
+class EmbeddingCache:
+    """
+    Two-tier (memory LRU + memory-mapped disk store) cache of embedding vectors.
+    """
+
+    def __init__(self, cache_dir: str, memory_items: int = 10000, max_bytes: int = 0):
+        """
+        Initialize the cache and load the on-disk index.
+
+        Args:
+            cache_dir: Directory holding the vector files and index
+            memory_items: Maximum number of vectors kept in the in-memory LRU tier
+            max_bytes: Total size of the vector files before the store is compacted (0 = unbounded)
+        """
+        self.cache_dir = cache_dir
+        self.memory_items = max(0, memory_items)
+        self.max_bytes = max(0, max_bytes)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # key -> (dimension, row)
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._index_read_offset = 0
+        # Inode of the index file read so far; a compaction replaces the file
+        self._index_inode: Optional[int] = None
+        # Compactions write their vector files under a new generation number
+        self._generation = 0
+        # dimension -> read-only memory map of the vector file
+        self._stores: Dict[int, np.memmap] = {}
+
+        # Hit/miss counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._refresh_index()
+        logger.info(
+            f"Embedding cache at {self.cache_dir} loaded with {len(self._index)} vectors")
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """
+        Build the content address of an embedding.
+
+        Args:
+            model_name: Name of the embedding model
+            text: Embedded text
+
+        Returns:
+            Hex digest identifying the (model, text) pair
+        """
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, INDEX_FILENAME)
+
+    def _vectors_path(self, dimension: int, generation: Optional[int] = None) -> str:
+        generation = self._generation if generation is None else generation
+        suffix = f".g{generation}" if generation else ""
+        return os.path.join(self.cache_dir, f"vectors_{dimension}{suffix}.f32")
+
+    def _refresh_index(self) -> None:
+        """Read index entries appended since the last refresh (possibly by other processes)."""
+        index_path = self._index_path()
+        if not os.path.exists(index_path):
+            return
+
+        with open(index_path, "r", encoding="utf-8") as index_file:
+            inode = os.fstat(index_file.fileno()).st_ino
+            if inode != self._index_inode:
+                # The store was compacted (or is read for the first time): reload from the start
+                self._index = {}
+                self._index_read_offset = 0
+                self._generation = 0
+                self._stores = {}
+                self._index_inode = inode
+            index_file.seek(self._index_read_offset)
+            while True:
+                line = index_file.readline()
+                # Stop at a partially written trailing line
+                if not line or not line.endswith("\n"):
+                    break
+                self._index_read_offset = index_file.tell()
+                try:
+                    entry = json.loads(line)
+                    if "generation" in entry:
+                        self._generation = int(entry["generation"])
+                        continue
+                    self._index[entry["k"]] = (int(entry["d"]), int(entry["r"]))
+                except (ValueError, KeyError) as e:
+                    logger.warning(f"Skipping corrupt embedding cache index entry: {e}")
+
+    def _read_row(self, dimension: int, row: int) -> Optional[np.ndarray]:
+        """Read one vector from the memory-mapped store, remapping if the file grew."""
+        store = self._stores.get(dimension)
+        if store is None or row >= store.shape[0]:
+            vectors_path = self._vectors_path(dimension)
+            if not os.path.exists(vectors_path):
+                return None
+            rows = os.path.getsize(vectors_path) // (dimension * 4)
+            if row >= rows:
+                return None
+            store = np.memmap(vectors_path, dtype=np.float32,
+                              mode="r", shape=(rows, dimension))
+            self._stores[dimension] = store
+        return np.array(store[row])
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """Insert a vector into the LRU tier, evicting the least recently used entries."""
+        if not self.memory_items:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up several embeddings.
+
+        Args:
+            keys: Cache keys built with make_key
+
+        Returns:
+            One float32 vector per key, or None where the key is not cached
+        """
+        results: List[Optional[np.ndarray]] = []
+        with self._lock:
+            refreshed = False
+            if self.max_bytes:
+                # Pick up a compaction by another process before reading rows
+                self._refresh_index()
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    results.append(vector)
+                    continue
+
+                location = self._index.get(key)
+                if location is None and not refreshed:
+                    # Another worker may have added it since we last looked
+                    self._refresh_index()
+                    refreshed = True
+                    location = self._index.get(key)
+
+                if location is not None:
+                    vector = self._read_row(*location)
+                    if vector is not None:
+                        self.disk_hits += 1
+                        self._remember(key, vector)
+                        results.append(vector)
+                        continue
+
+                self.misses += 1
+                results.append(None)
+        return results
+
+    def put_many(self, keys: List[str], vectors: List[np.ndarray]) -> None:
+        """
+        Store several embeddings on disk and in the memory tier.
+
+        Args:
+            keys: Cache keys built with make_key
+            vectors: Embedding vectors, one per key
+        """
+        if not keys:
+            return
+
+        with self._lock:
+            with self._locked_index() as index_file:
+                for key, vector in zip(keys, vectors):
+                    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+                    if key in self._index:
+                        self._remember(key, vector)
+                        continue
+
+                    dimension = vector.shape[0]
+                    row_bytes = dimension * 4
+                    vectors_path = self._vectors_path(dimension)
+                    mode = "r+b" if os.path.exists(vectors_path) else "w+b"
+                    with open(vectors_path, mode) as vectors_file:
+                        # Overwrite any partially written row left by an interrupted write
+                        vectors_file.seek(0, os.SEEK_END)
+                        row = vectors_file.tell() // row_bytes
+                        vectors_file.seek(row * row_bytes)
+                        vectors_file.write(vector.tobytes())
+
+                    index_file.write(json.dumps(
+                        {"k": key, "d": dimension, "r": row}) + "\n")
+                    self._index[key] = (dimension, row)
+                    self._remember(key, vector)
+                index_file.flush()
+
+                if self.max_bytes and self._disk_bytes() > self.max_bytes:
+                    self._compact()
+
+    @contextmanager
+    def _locked_index(self) -> Iterator[TextIO]:
+        """
+        Open the index for appending under an exclusive file lock.
+
+        The index read so far is brought up to date first, so rows are appended
+        to the vector files of the current generation.
+        """
+        while True:
+            index_file = open(self._index_path(), "a", encoding="utf-8")
+            if FCNTL_AVAILABLE:
+                fcntl.flock(index_file, fcntl.LOCK_EX)
+            # Another process may have replaced the index while we waited for the lock
+            try:
+                replaced = os.stat(self._index_path()).st_ino != os.fstat(index_file.fileno()).st_ino
+            except FileNotFoundError:
+                replaced = True
+            if not replaced:
+                break
+            index_file.close()
+
+        try:
+            self._refresh_index()
+            yield index_file
+        finally:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(index_file, fcntl.LOCK_UN)
+            index_file.close()
+
+    def _disk_bytes(self) -> int:
+        """Total size of the vector files of the current generation."""
+        dimensions = {dimension for dimension, _ in self._index.values()}
+        return sum(os.path.getsize(self._vectors_path(dimension)) for dimension in dimensions
+                   if os.path.exists(self._vectors_path(dimension)))
+
+    def _compact(self) -> None:
+        """
+        Rewrite the store keeping recently used vectors within the size limit.
+
+        Called with the lock and the index file lock held. Vectors in this
+        process's memory tier are kept first (most recently used first), then the
+        most recently written rows.
+        """
+        keys = list(reversed(self._memory))
+        recent = set(keys)
+        keys.extend(key for key in reversed(self._index) if key not in recent)
+
+        budget = int(self.max_bytes * EVICTION_TARGET)
+        kept: Dict[int, List[Tuple[str, np.ndarray]]] = {}
+        for key in keys:
+            location = self._index.get(key)
+            vector = self._read_row(*location) if location else None
+            if vector is None:
+                continue
+            if vector.nbytes > budget:
+                break
+            budget -= vector.nbytes
+            kept.setdefault(location[0], []).append((key, vector))
+
+        old_paths = {self._vectors_path(dimension) for dimension, _ in self._index.values()}
+        generation = self._generation + 1
+        index_entries = [json.dumps({"generation": generation})]
+        kept_keys = 0
+        for dimension, rows in kept.items():
+            vectors_path = self._vectors_path(dimension, generation)
+            np.stack([vector for _, vector in rows]).astype(np.float32).tofile(vectors_path)
+            index_entries.extend(json.dumps({"k": key, "d": dimension, "r": row})
+                                 for row, (key, _) in enumerate(rows))
+            kept_keys += len(rows)
+
+        # Readers switch to the new generation when they see the new index file
+        temporary_index_path = self._index_path() + ".tmp"
+        with open(temporary_index_path, "w", encoding="utf-8") as index_file:
+            index_file.write("\n".join(index_entries) + "\n")
+        os.replace(temporary_index_path, self._index_path())
+
+        evicted = len(self._index) - kept_keys
+        self._stores = {}
+        self._index_inode = None
+        self._refresh_index()
+        for path in old_paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.evictions += evicted
+        logger.info(f"Compacted embedding cache: kept {kept_keys} vectors, evicted {evicted}")
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return hit/miss counters and sizes.
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._index),
+                "disk_bytes": self._disk_bytes(),
+                "max_bytes": self.max_bytes
+            }
+
+
+class CachedEmbeddings:
+    """
+    Drop-in replacement for a LangChain embeddings client that serves
+    embed_documents/embed_query from an EmbeddingCache and only sends
+    uncached texts to the underlying client.
+    """
+
+    def __init__(self, embeddings, cache: EmbeddingCache, model_name: Optional[str] = None):
+        """
+        Wrap an embeddings client.
+
+        Args:
+            embeddings: LangChain embeddings client (e.g. OpenAIEmbeddings)
+            cache: Shared embedding cache
+            model_name: Model name used in cache keys (defaults to the client's model)
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name or getattr(
+            embeddings, "model", None) or type(embeddings).__name__
+
+    def embed_documents(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Embed texts, calling the underlying client only for cache misses.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One float32 embedding vector per text
+        """
+        if not texts:
+            return []
+
+        keys = [self.cache.make_key(self.model_name, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+
+        # Embed each distinct uncached text once
+        missing: Dict[str, List[int]] = {}
+        for position, (key, vector) in enumerate(zip(keys, vectors)):
+            if vector is None:
+                missing.setdefault(key, []).append(position)
+
+        uncached = sum(len(positions) for positions in missing.values())
+        record_cache("embeddings", hits=len(texts) - uncached, misses=uncached)
+        if missing:
+            missing_keys = list(missing.keys())
+            missing_texts = [texts[missing[key][0]] for key in missing_keys]
+            logger.info(
+                f"Embedding {len(missing_texts)} uncached texts ({len(texts) - uncached} of {len(texts)} served from cache)")
+
+            new_vectors = [np.asarray(vector, dtype=np.float32)
+                           for vector in self.embeddings.embed_documents(missing_texts)]
+            self.cache.put_many(missing_keys, new_vectors)
+
+            for key, vector in zip(missing_keys, new_vectors):
+                for position in missing[key]:
+                    vectors[position] = vector
+        else:
+            logger.info(f"All {len(texts)} embeddings served from cache")
+
+        return vectors
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """
+        Embed a single text through the cache.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Embedding vector
+        """
+        return self.embed_documents([text])[0]
+
+    def __getattr__(self, name):
+        # Expose the wrapped client's attributes (model, deployment, ...)
+        return getattr(self.embeddings, name)
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Return the process-wide embedding cache shared by all services.
+
+    Returns:
+        The shared EmbeddingCache instance
+    """
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(
+                cache_dir=os.path.join(settings.CACHE_DIR, "embeddings"),
+                memory_items=settings.EMBEDDING_CACHE_MEMORY_ITEMS,
+                max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES
+            )
+        return _embedding_cache
+
+
+def with_embedding_cache(embeddings, model_name: Optional[str] = None):
+    """
+    Wrap an embeddings client with the shared cache when caching is enabled.
+
+    Args:
+        embeddings: LangChain embeddings client
+        model_name: Model name used in cache keys
+
+    Returns:
+        A CachedEmbeddings wrapper, or the client itself if caching is disabled
+    """
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return embeddings
+    return CachedEmbeddings(embeddings, get_embedding_cache(), model_name=model_name)
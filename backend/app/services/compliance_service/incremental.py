@@ -0,0 +1,165 @@
+"""
+Diffing support for incremental re-analysis of an edited clinical document.
+
+ContentDiff compares the previous and the edited clinical text. It maps
+character offsets of unchanged text from the old document to the new one and
+reports the edited regions of the new document, so that only those regions
+need to be chunked and sent to the LLM again.
+"""
+
+import bisect
+import difflib
+import logging
+from typing import List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Replaced line blocks up to this size are refined with a character-level diff
+CHAR_DIFF_MAX_CHARS = 2000
+
+
+def _line_starts(lines: List[str]) -> List[int]:
+    """Character offset of the start of every line, plus the total length."""
+    starts = [0]
+    for line in lines:
+        starts.append(starts[-1] + len(line))
+    return starts
+
+
+class ContentDiff:
+    """
+    Offset map between two versions of a document.
+
+    The documents are compared line by line; small replaced blocks are refined
+    character by character so a one-word edit doesn't invalidate a long line.
+    """
+
+    def __init__(self, old_text: str, new_text: str):
+        """
+        Diff two versions of a document.
+
+        Args:
+            old_text: Previous document text
+            new_text: Edited document text
+        """
+        self.old_text = old_text or ""
+        self.new_text = new_text or ""
+
+        # (old_start, old_end, new_start) of every unchanged span, in order
+        self.equal_blocks: List[Tuple[int, int, int]] = []
+        # (new_start, new_end) of every inserted or replaced span of the new text
+        self.changed_spans: List[Tuple[int, int]] = []
+
+        old_lines = self.old_text.splitlines(keepends=True)
+        new_lines = self.new_text.splitlines(keepends=True)
+        old_starts = _line_starts(old_lines)
+        new_starts = _line_starts(new_lines)
+
+        matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            old_start, old_end = old_starts[i1], old_starts[i2]
+            new_start, new_end = new_starts[j1], new_starts[j2]
+
+            if tag == "equal":
+                self._add_equal(old_start, old_end, new_start)
+            elif (tag == "replace" and old_end - old_start <= CHAR_DIFF_MAX_CHARS
+                  and new_end - new_start <= CHAR_DIFF_MAX_CHARS):
+                self._diff_characters(old_start, old_end, new_start, new_end)
+            else:
+                # Inserted, replaced or deleted text; a deletion marks the text around it as edited
+                self._add_changed(new_start, new_end)
+
+        self._old_block_starts = [block[0] for block in self.equal_blocks]
+
+    def _add_equal(self, old_start: int, old_end: int, new_start: int) -> None:
+        """Record an unchanged span, merging it with the previous one when contiguous."""
+        if old_end <= old_start:
+            return
+        if self.equal_blocks:
+            previous_old_start, previous_old_end, previous_new_start = self.equal_blocks[-1]
+            if (previous_old_end == old_start and
+                    previous_new_start + (previous_old_end - previous_old_start) == new_start):
+                self.equal_blocks[-1] = (previous_old_start, old_end, previous_new_start)
+                return
+        self.equal_blocks.append((old_start, old_end, new_start))
+
+    def _add_changed(self, new_start: int, new_end: int) -> None:
+        """Record an edited span of the new text, merging it with the previous one when touching."""
+        if self.changed_spans and self.changed_spans[-1][1] >= new_start:
+            self.changed_spans[-1] = (self.changed_spans[-1][0], max(self.changed_spans[-1][1], new_end))
+        else:
+            self.changed_spans.append((new_start, new_end))
+
+    def _diff_characters(self, old_start: int, old_end: int, new_start: int, new_end: int) -> None:
+        """Refine a replaced block of lines with a character-level diff."""
+        matcher = difflib.SequenceMatcher(
+            None, self.old_text[old_start:old_end], self.new_text[new_start:new_end], autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                self._add_equal(old_start + i1, old_start + i2, new_start + j1)
+            else:
+                self._add_changed(new_start + j1, new_start + j2)
+
+    @property
+    def unchanged(self) -> bool:
+        """Whether the two versions are identical."""
+        return self.old_text == self.new_text
+
+    def map_span(self, start: Optional[int], end: Optional[int]) -> Optional[Tuple[int, int]]:
+        """
+        Map an old [start, end) span to the new document.
+
+        Args:
+            start: Start offset in the old document
+            end: End offset in the old document
+
+        Returns:
+            The (start, end) span in the new document, or None if any part of it was edited
+        """
+        if start is None or end is None or end < start:
+            return None
+
+        position = bisect.bisect_right(self._old_block_starts, start) - 1
+        if position < 0:
+            return None
+
+        old_start, old_end, new_start = self.equal_blocks[position]
+        if end > old_end:
+            return None
+
+        shift = new_start - old_start
+        return start + shift, end + shift
+
+    def changed_regions(self, context_chars: int = 0) -> List[Tuple[int, int]]:
+        """
+        Edited regions of the new document, widened to whole paragraphs.
+
+        Each edited span is extended to the surrounding paragraph breaks (at most
+        context_chars in each direction) so the LLM sees complete statements.
+        Overlapping regions are merged.
+
+        Args:
+            context_chars: Maximum number of characters added on each side
+
+        Returns:
+            Sorted, non-overlapping (start, end) spans of the new document
+        """
+        text = self.new_text
+        regions: List[Tuple[int, int]] = []
+        for start, end in self.changed_spans:
+            lower_bound = max(0, start - context_chars)
+            paragraph_start = text.rfind("\n\n", lower_bound, start)
+            region_start = paragraph_start + 2 if paragraph_start >= 0 else lower_bound
+
+            upper_bound = min(len(text), end + context_chars)
+            paragraph_end = text.find("\n\n", end, upper_bound)
+            region_end = paragraph_end if paragraph_end >= 0 else upper_bound
+
+            if regions and region_start <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], max(regions[-1][1], region_end))
+            else:
+                regions.append((region_start, region_end))
+
+        # Regions that only contain whitespace need no analysis
+        return [(start, end) for start, end in regions if text[start:end].strip()]
@@ -0,0 +1,340 @@
+"""
+Persistent cache of LLM responses.
+
+All compliance prompts are sent at temperature 0, so the same messages to the
+same model and deployment are answered the same way. Responses are keyed by
+hash(model, deployment, messages) and stored in a SQLite database, which
+several workers can share. Entries expire after a TTL and the least recently
+used entries are evicted once the stored responses exceed a size limit.
+
+A review that asks for a fresh analysis (force_refresh) runs inside
+llm_cache_bypass: its calls go to the model and refresh the cached responses.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain.schema import AIMessage
+
+from app.core.config import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Share of the size limit kept after an eviction, so that evictions are not run on every write
+EVICTION_TARGET = 0.9
+
+# Set while the current review must not be served from the cache
+_bypass_llm_cache: ContextVar[bool] = ContextVar("bypass_llm_cache", default=False)
+
+
+@contextmanager
+def llm_cache_bypass(enabled: bool = True) -> Iterator[None]:
+    """
+    Send the LLM calls made inside the block (and in tasks created inside it) to the model.
+
+    Fresh responses still replace the cached ones.
+
+    Args:
+        enabled: Whether to bypass the cache; False leaves the cache in use
+    """
+    token = _bypass_llm_cache.set(enabled or _bypass_llm_cache.get())
+    try:
+        yield
+    finally:
+        _bypass_llm_cache.reset(token)
+
+
+def llm_cache_bypassed() -> bool:
+    """Whether the current review must not reuse cached LLM results."""
+    return _bypass_llm_cache.get()
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed cache of LLM response messages with TTL and size-bounded LRU eviction.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int = 0, max_bytes: int = 0):
+        """
+        Initialize the cache, creating the database if needed.
+
+        Args:
+            path: SQLite database file
+            ttl_seconds: Seconds a response stays valid (0 = no expiry)
+            max_bytes: Maximum total size of the stored responses (0 = unbounded)
+        """
+        self.path = path
+        self.ttl_seconds = max(0, ttl_seconds)
+        self.max_bytes = max(0, max_bytes)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._connection:
+            # WAL lets other workers read while one writes
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, content TEXT NOT NULL, metadata TEXT NOT NULL, "
+                "size INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._total_bytes = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model: str, deployment: Optional[str], messages: List[Any]) -> str:
+        """
+        Build the cache key of a request.
+
+        Args:
+            model: Model name
+            deployment: Deployment name (Azure), if any
+            messages: LangChain messages of the request (system and human prompts)
+
+        Returns:
+            Hex digest identifying the request
+        """
+        payload = json.dumps({
+            "model": model,
+            "deployment": deployment or "",
+            "messages": [[message.type, message.content] for message in messages]
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            Dictionary with the response "content" and "metadata", or None
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT content, metadata, created, size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            content, metadata, created, size = row
+            if self.ttl_seconds and now - created > self.ttl_seconds:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return {"content": content, "metadata": json.loads(metadata)}
+
+    def put(self, key: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Store a response, evicting least recently used responses beyond the size limit.
+
+        Args:
+            key: Cache key from make_key
+            content: Response text
+            metadata: JSON-serializable response metadata (token usage, model, ...)
+        """
+        metadata_json = json.dumps(metadata or {}, default=str)
+        size = len(content.encode("utf-8")) + len(metadata_json)
+        now = time.time()
+        with self._lock, self._connection:
+            previous = self._connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, content, metadata, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (key, content, metadata_json, size, now, now))
+            self._total_bytes += size - (previous[0] if previous else 0)
+
+            if self.max_bytes and self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop expired and then least recently used responses. Called with the lock held."""
+        if self.ttl_seconds:
+            self._connection.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,))
+        # Other workers write to the same database, so recount before evicting
+        self._total_bytes = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        excess = self._total_bytes - int(self.max_bytes * EVICTION_TARGET)
+        if excess <= 0:
+            return
+        evicted_keys = []
+        for key, size in self._connection.execute(
+                "SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            if excess <= 0:
+                break
+            evicted_keys.append((key,))
+            excess -= size
+            self._total_bytes -= size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", evicted_keys)
+        self.evictions += len(evicted_keys)
+        logger.info(f"Evicted {len(evicted_keys)} cached LLM responses")
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return hit/miss counters and sizes.
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+
+class CachedChatModel:
+    """
+    Drop-in replacement for a LangChain chat model's ainvoke that serves
+    repeated requests from an LLMResponseCache.
+    """
+
+    def __init__(self, llm_client, cache: LLMResponseCache, model_name: Optional[str] = None,
+                 deployment: Optional[str] = None):
+        """
+        Wrap a chat model.
+
+        Args:
+            llm_client: LangChain chat model (e.g. ChatOpenAI)
+            cache: Shared LLM response cache
+            model_name: Model name used in cache keys (defaults to the client's model)
+            deployment: Deployment name used in cache keys (defaults to the client's deployment)
+        """
+        self.llm_client = llm_client
+        self.cache = cache
+        self.model_name = model_name or getattr(llm_client, "model_name", None) or type(llm_client).__name__
+        self.deployment = deployment or getattr(llm_client, "deployment_name", None)
+
+    async def alookup(self, messages: List[Any]) -> Optional[AIMessage]:
+        """
+        Return the cached response of the messages without calling the model.
+
+        Args:
+            messages: LangChain messages to send
+
+        Returns:
+            The cached response, or None on a miss or while the cache is bypassed
+        """
+        if _bypass_llm_cache.get():
+            return None
+        # SQLite blocks, so keep it off the event loop
+        cached = await asyncio.to_thread(
+            self.cache.get, self.cache.make_key(self.model_name, self.deployment, messages))
+        if cached is None:
+            return None
+        return AIMessage(content=cached["content"],
+                         response_metadata={**cached["metadata"], "cache_hit": True})
+
+    async def ainvoke_uncached(self, messages: List[Any], *args, **kwargs):
+        """
+        Call the model and cache its response.
+
+        Args:
+            messages: LangChain messages to send
+
+        Returns:
+            The model's response message
+        """
+        response = await self.llm_client.ainvoke(messages, *args, **kwargs)
+        if isinstance(response.content, str):
+            await asyncio.to_thread(
+                self.cache.put, self.cache.make_key(self.model_name, self.deployment, messages),
+                response.content, getattr(response, "response_metadata", None))
+        return response
+
+    async def ainvoke(self, messages: List[Any], *args, **kwargs):
+        """
+        Return the cached response of the messages, or call the model and cache its response.
+
+        Args:
+            messages: LangChain messages to send
+
+        Returns:
+            The response message (an AIMessage when served from the cache)
+        """
+        cached = await self.alookup(messages)
+        if cached is not None:
+            return cached
+        return await self.ainvoke_uncached(messages, *args, **kwargs)
+
+    def __getattr__(self, name):
+        # Expose the wrapped client's attributes (temperature, invoke, ...)
+        return getattr(self.llm_client, name)
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """
+    Return the process-wide LLM response cache.
+
+    Returns:
+        The shared LLMResponseCache instance
+    """
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache(
+                path=os.path.join(settings.CACHE_DIR, "llm", "responses.sqlite3"),
+                ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+                max_bytes=settings.LLM_CACHE_MAX_BYTES
+            )
+        return _llm_cache
+
+
+def with_llm_cache(llm_client, model_name: Optional[str] = None, deployment: Optional[str] = None):
+    """
+    Wrap a chat model with the shared response cache when caching is enabled.
+
+    Only deterministic (temperature 0) clients are cached.
+
+    Args:
+        llm_client: LangChain chat model
+        model_name: Model name used in cache keys
+        deployment: Deployment name used in cache keys
+
+    Returns:
+        A CachedChatModel wrapper, or the client itself if caching does not apply
+    """
+    if not settings.LLM_CACHE_ENABLED:
+        return llm_client
+    if getattr(llm_client, "temperature", 0) not in (0, None):
+        logger.info("Not caching LLM responses of a client with non-zero temperature")
+        return llm_client
+    return CachedChatModel(llm_client, get_llm_cache(), model_name=model_name, deployment=deployment)
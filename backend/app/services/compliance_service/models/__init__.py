@@ -5,7 +5,12 @@ Models package for the compliance service.
 from app.services.compliance_service.models.pydantic_models import (
     LLMComplianceIssue,
     ComplianceIssueList,
+    IssueConfidenceScore,
+    ConfidenceScoreList,
+    ChunkPair,
+    PairPlan,
     TextWithOffset
 )
 
-__all__ = ["LLMComplianceIssue", "ComplianceIssueList", "TextWithOffset"]
+__all__ = ["LLMComplianceIssue", "ComplianceIssueList", "IssueConfidenceScore",
+           "ConfidenceScoreList", "ChunkPair", "PairPlan", "TextWithOffset"]
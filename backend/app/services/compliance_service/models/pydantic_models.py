@@ -39,6 +39,32 @@ class ComplianceIssueList(BaseModel):
     """Pydantic model for the list of issues expected from the LLM."""
     issues: List[LLMComplianceIssue] = Field(description="A list of identified potential compliance issues.")
 
+class IssueConfidenceScore(BaseModel):
+    """Pydantic model for the confidence score of one issue in a batched assessment."""
+    index: int = Field(description="Index of the issue in the batch, as given in the prompt")
+    confidence: float = Field(description="Confidence score between 0.0 and 1.0")
+
+class ConfidenceScoreList(BaseModel):
+    """Pydantic model for the batched confidence assessment expected from the LLM."""
+    scores: List[IssueConfidenceScore] = Field(description="Confidence score for each issue in the batch.")
+
+class ChunkPair(BaseModel):
+    """A (clinical chunk, compliance chunk) pair selected for LLM analysis."""
+    clinical_index: int = Field(description="Index of the clinical chunk")
+    compliance_index: int = Field(description="Index of the compliance chunk")
+    similarity: Optional[float] = Field(default=None, description="Cosine similarity of the chunk embeddings, if embeddings were used")
+
+class PairPlan(BaseModel):
+    """The chunk pairs chosen for one review, serializable so a review can be logged and replayed."""
+    method: str = Field(description="How pairs were selected: 'embedding', 'basic' or 'replay'")
+    clinical_chunk_count: int = Field(description="Number of clinical chunks the plan was built for")
+    compliance_chunk_count: int = Field(description="Number of compliance chunks the plan was built for")
+    top_n: Optional[int] = Field(default=None, description="Candidates kept per clinical chunk")
+    similarity_threshold: Optional[float] = Field(default=None, description="Minimum similarity of a candidate pair")
+    max_pairs: Optional[int] = Field(default=None, description="Global pair budget applied (None = unlimited)")
+    candidate_count: int = Field(default=0, description="Candidate pairs before the budget was applied")
+    pairs: List[ChunkPair] = Field(default_factory=list, description="Selected pairs in execution order")
+
 class TextWithOffset(BaseModel):
     """Represents a chunk of text with its offset in the original document."""
     text: str
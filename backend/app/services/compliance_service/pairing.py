@@ -0,0 +1,162 @@
+"""
+Chunk pairing planner for the compliance service.
+
+Decides which (clinical chunk, compliance chunk) pairs are sent to the LLM.
+Embeddings are normalized once, the full similarity matrix is a single
+float32 matrix product, and the top candidates per clinical chunk are picked
+with np.argpartition. A global per-review budget keeps only the most similar
+pairs, which bounds LLM spend on very large documents.
+
+The result is a PairPlan that can be logged and passed back to
+ComplianceService.analyze_compliance to replay a review with the same pairs.
+"""
+
+import logging
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.services.compliance_service.models.pydantic_models import ChunkPair, PairPlan
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def normalize_rows(embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+    """
+    Convert embeddings to a float32 matrix with unit-length rows.
+
+    Args:
+        embeddings: One embedding vector per chunk
+
+    Returns:
+        float32 matrix whose rows have L2 norm 1 (zero vectors stay zero)
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(embeddings), -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def plan_embedding_pairs(clinical_embeddings: Sequence[Sequence[float]],
+                         compliance_embeddings: Sequence[Sequence[float]],
+                         top_n: int,
+                         similarity_threshold: float,
+                         max_pairs: Optional[int] = None) -> PairPlan:
+    """
+    Select chunk pairs by embedding similarity.
+
+    Each clinical chunk keeps its top_n most similar compliance chunks above
+    similarity_threshold. If more candidates remain than max_pairs, only the
+    max_pairs most similar ones are kept.
+
+    Args:
+        clinical_embeddings: Embeddings of the clinical chunks
+        compliance_embeddings: Embeddings of the compliance chunks
+        top_n: Candidates kept per clinical chunk
+        similarity_threshold: Minimum cosine similarity of a pair
+        max_pairs: Global pair budget (None or 0 = unlimited)
+
+    Returns:
+        PairPlan with pairs ordered by clinical chunk, then by descending similarity
+    """
+    clinical_count = len(clinical_embeddings)
+    compliance_count = len(compliance_embeddings)
+    plan = PairPlan(
+        method="embedding",
+        clinical_chunk_count=clinical_count,
+        compliance_chunk_count=compliance_count,
+        top_n=top_n,
+        similarity_threshold=similarity_threshold,
+        max_pairs=max_pairs or None
+    )
+    if not clinical_count or not compliance_count or top_n <= 0:
+        return plan
+
+    # Cosine similarity of all pairs as one float32 matrix product
+    similarity = normalize_rows(clinical_embeddings) @ normalize_rows(compliance_embeddings).T
+
+    # Top-k compliance chunks per clinical chunk without a full sort
+    k = min(top_n, compliance_count)
+    if k < compliance_count:
+        top_columns = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+    else:
+        top_columns = np.broadcast_to(np.arange(compliance_count), (clinical_count, k))
+    rows = np.repeat(np.arange(clinical_count), k)
+    columns = top_columns.reshape(-1)
+    scores = similarity[rows, columns]
+
+    # Only keep pairs with similarity above threshold
+    keep = scores >= similarity_threshold
+    rows, columns, scores = rows[keep], columns[keep], scores[keep]
+    plan.candidate_count = int(scores.size)
+
+    # Apply the global budget to the most similar candidates
+    if max_pairs and scores.size > max_pairs:
+        best = np.argpartition(-scores, max_pairs - 1)[:max_pairs]
+        rows, columns, scores = rows[best], columns[best], scores[best]
+        logger.info(
+            f"Pair budget kept {max_pairs} of {plan.candidate_count} candidate chunk pairs (min similarity {float(scores.min()):.2f})")
+
+    # Execution order: clinical chunk, then most similar compliance chunk first
+    order = np.lexsort((columns, -scores, rows))
+    plan.pairs = [ChunkPair(clinical_index=int(rows[position]),
+                            compliance_index=int(columns[position]),
+                            similarity=float(scores[position]))
+                  for position in order]
+    return plan
+
+
+def plan_basic_pairs(clinical_chunk_count: int, compliance_chunk_count: int,
+                     max_clinical_chunks: int = 3, max_compliance_chunks: int = 2) -> PairPlan:
+    """
+    Fixed pairing used when embeddings are not available.
+
+    Args:
+        clinical_chunk_count: Number of clinical chunks
+        compliance_chunk_count: Number of compliance chunks
+        max_clinical_chunks: Leading clinical chunks to analyze
+        max_compliance_chunks: Leading compliance chunks paired with each clinical chunk
+
+    Returns:
+        PairPlan of the first clinical chunks against the first compliance chunks
+    """
+    # Process a limited combination to optimize API calls
+    pairs: List[ChunkPair] = [
+        ChunkPair(clinical_index=i, compliance_index=j)
+        for i in range(min(clinical_chunk_count, max_clinical_chunks))
+        for j in range(min(compliance_chunk_count, max_compliance_chunks))
+    ]
+    return PairPlan(
+        method="basic",
+        clinical_chunk_count=clinical_chunk_count,
+        compliance_chunk_count=compliance_chunk_count,
+        candidate_count=len(pairs),
+        pairs=pairs
+    )
+
+
+def validate_replay_plan(plan: PairPlan, clinical_chunk_count: int,
+                         compliance_chunk_count: int) -> bool:
+    """
+    Check that a recorded plan fits the chunks of the current review.
+
+    Args:
+        plan: Previously recorded pair plan
+        clinical_chunk_count: Number of clinical chunks in this review
+        compliance_chunk_count: Number of compliance chunks in this review
+
+    Returns:
+        True if the plan can be replayed against these chunks
+    """
+    if (plan.clinical_chunk_count != clinical_chunk_count or
+            plan.compliance_chunk_count != compliance_chunk_count):
+        logger.warning(
+            f"Pair plan was built for {plan.clinical_chunk_count}x{plan.compliance_chunk_count} chunks, "
+            f"but this review has {clinical_chunk_count}x{compliance_chunk_count}; ignoring it")
+        return False
+    return all(0 <= pair.clinical_index < clinical_chunk_count and
+               0 <= pair.compliance_index < compliance_chunk_count
+               for pair in plan.pairs)
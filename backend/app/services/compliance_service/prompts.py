@@ -271,6 +271,33 @@ Output ONLY a single floating-point number between 0.0 and 1.0 representing your
 """
 
 
+def get_batch_confidence_assessment_prompt(snippet_pairs: list) -> str:
+    """
+    Generate a prompt for assessing confidence in several potential violations at once.
+    Each (clinical snippet, compliance snippet) pair is numbered by its index in the list.
+    """
+    issues_text = "\n\n".join(
+        f"Issue {index}:\nClinical Text Snippet:\n{clinical_text_snippet}\n\nCompliance Requirement Snippet:\n{compliance_text_snippet}"
+        for index, (clinical_text_snippet, compliance_text_snippet) in enumerate(snippet_pairs)
+    )
+
+    return f"""For EACH numbered issue below, assess the confidence level that the 'Clinical Text Snippet' DIRECTLY violates or fails to meet the requirement stated in the 'Compliance Requirement Snippet' of the same issue. Assess every issue independently, basing each assessment *only* on the two snippets of that issue.
+
+{issues_text}
+
+**Assessment Criteria:**
+- **1.0:** Very High Confidence - There is an explicit, unambiguous contradiction found directly comparing these two snippets (e.g., different numbers for the same parameter, directly opposing instructions, a required element is clearly absent vs. present).
+- **0.7 - 0.9:** High Confidence - A direct violation is highly likely based on these snippets, with minimal interpretation needed.
+- **0.4 - 0.6:** Medium Confidence - A potential violation exists within these snippets, but it may require some interpretation, rely on implicit meaning, or involve vagueness vs. specificity.
+- **0.1 - 0.3:** Low Confidence - A violation is possible but uncertain or peripheral based on these snippets; the connection is weak or highly interpretive.
+- **0.0:** No Confidence - There is no discernible violation when comparing only these two specific snippets.
+
+Output ONLY a single JSON object with one score per issue, using the issue numbers shown above as "index":
+{{"scores": [{{"index": 0, "confidence": 0.8}}, {{"index": 1, "confidence": 0.3}}]}}
+Do not include any other text or explanation.
+"""
+
+
 # Whole document compliance analysis prompt
 WHOLE_DOCUMENT_ANALYSIS_PROMPT = """
 You are an expert regulatory compliance analyst specializing in clinical trial documentation. Your task is to conduct a comprehensive analysis of the provided clinical trial document against the compliance requirements.
@@ -293,14 +320,16 @@ def get_whole_document_analysis_prompt(clinical_doc_content: str, compliance_doc
     across the entire document without being restricted to specific sections or issues.
 
     This approach can identify systemic or cross-sectional issues that might be missed in chunk-based analysis.
+    Both documents are included in full; documents too large for one prompt are analyzed
+    through section digests instead (see get_digest_analysis_prompt).
     """
     return f"""Perform a comprehensive compliance analysis of the following clinical trial document against the provided compliance requirements:  
 
 CLINICAL TRIAL DOCUMENT:
-{clinical_doc_content[:10000]}
+{clinical_doc_content}
 
 COMPLIANCE REQUIREMENTS:
-{compliance_doc_content[:10000]}
+{compliance_doc_content}
 
 Analyze the document for ALL potential compliance issues, including but not limited to:
 - Direct contradictions between documents
@@ -336,6 +365,76 @@ If you find no issues, return an empty issues array like this: `{{"issues": []}}
 """
 
 
+# Section digest prompts (map step of the map-reduce whole-document analysis)
+DOCUMENT_DIGEST_SYSTEM_PROMPT = """
+You are an expert regulatory compliance analyst specializing in clinical trial documentation. You condense one section of a long document into a digest that another analyst will use to check compliance without seeing the full document.
+
+**IMPORTANT GUIDELINES:**
+1. Select only statements that matter for compliance: obligations, procedures, timelines, numbers, roles and responsibilities, eligibility, safety reporting, consent and data handling
+2. Copy every selected statement EXACTLY as it appears in the section - do not paraphrase, shorten or correct it
+3. Do not add commentary, headings or explanations
+"""
+
+
+def get_document_digest_prompt(section_content: str, document_type: str, max_statements: int) -> str:
+    """
+    Generate the prompt condensing one section of a document into verbatim statements.
+    """
+    return f"""Condense the following section of a {document_type} into at most {max_statements} compliance-relevant statements.
+
+DOCUMENT SECTION:
+{section_content}
+
+Output one statement per line, each starting with "- " and copied verbatim from the section.
+If the section has no compliance-relevant statements, output only: NONE
+"""
+
+
+def get_digest_analysis_prompt(clinical_digest: str, compliance_digest: str) -> str:
+    """
+    Generate the holistic prompt over the section digests of both documents
+    (reduce step of the map-reduce whole-document analysis).
+    """
+    return f"""Perform a comprehensive compliance analysis of a clinical trial document against the provided compliance requirements. Both documents were too long to include in full; each is given as a digest of verbatim statements, grouped by section in document order.
+
+CLINICAL TRIAL DOCUMENT DIGEST:
+{clinical_digest}
+
+COMPLIANCE REQUIREMENTS DIGEST:
+{compliance_digest}
+
+Analyze the digests for ALL potential compliance issues, including but not limited to:
+- Direct contradictions between documents
+- Missing required elements or procedures
+- Numerical discrepancies (dates, values, measurements)
+- Procedural gaps or timeline misalignments across sections
+
+Focus on concrete, specific issues. For each issue, cite the exact text of one digest statement from each document (without the leading "- "); the statements are verbatim quotes of the documents.
+
+**CRITICAL: YOUR RESPONSE MUST FOLLOW THIS EXACT JSON STRUCTURE WITH AN 'issues' ROOT KEY:**
+
+```json
+{{
+  "issues": [
+    {{
+      "clinical_text": "EXACT statement from the clinical document digest that violates compliance",
+      "compliance_text": "EXACT statement from the compliance requirements digest being violated",
+      "explanation": "Explanation of why this is a violation (50-100 words)",
+      "suggested_edit": "Specific suggestion to fix the compliance issue",
+      "confidence": "high" or "low",
+      "regulation": "Specific regulation being violated (if identifiable)",
+      "edit_type": "modification" or "insertion"
+    }}
+  ]
+}}
+```
+
+If you find no issues, return an empty issues array like this: `{{"issues": []}}`
+
+**YOU MUST USE THE KEY NAME "issues" EXACTLY AS SHOWN ABOVE - DO NOT USE ANY OTHER STRUCTURE**
+"""
+
+
 # Content insertion prompts
 INSERTION_CONTENT_SYSTEM_PROMPT = """
 You are an expert document editor specializing in clinical trial documentation and regulatory compliance language.
@@ -0,0 +1,439 @@
+"""
+Record/replay stand-ins for the compliance service's LLM and embedding clients.
+
+ReplayChatModel and ReplayEmbeddings take the place of ComplianceService.llm_client
+and ComplianceService.embeddings, so that reviews can be run and measured
+without OpenAI/Azure credentials. Responses come from a Cassette recorded
+against the real clients with RecordingChatModel and RecordingEmbeddings.
+Requests that were never recorded are answered synthetically and
+deterministically: analysis prompts get issues quoting sentences of the two
+texts in the prompt, confidence prompts get scores and embeddings are hashed
+term counts. A configurable synthetic latency stands in for the API round trip.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain.schema import AIMessage
+
+from app.services.compliance_service.concurrency import estimate_tokens
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Sections of the prompts the synthetic responder answers (see prompts.py)
+CHUNK_ANALYSIS_PATTERN = re.compile(
+    r"CLINICAL DOCUMENT CONTENT:\n(.*?)\n\nCOMPLIANCE DOCUMENT CONTENT \(Defines the rules for this comparison\):\n"
+    r"(.*?)\n\n\*\*Instructions for Analysis", re.DOTALL)
+WHOLE_DOCUMENT_PATTERN = re.compile(
+    r"CLINICAL TRIAL DOCUMENT:\n(.*?)\n\nCOMPLIANCE REQUIREMENTS:\n(.*?)\n\nAnalyze the document", re.DOTALL)
+DIGEST_ANALYSIS_PATTERN = re.compile(
+    r"CLINICAL TRIAL DOCUMENT DIGEST:\n(.*?)\n\nCOMPLIANCE REQUIREMENTS DIGEST:\n(.*?)\n\nAnalyze the digests", re.DOTALL)
+DOCUMENT_DIGEST_PATTERN = re.compile(
+    r"into at most (\d+) compliance-relevant statements.*?DOCUMENT SECTION:\n(.*?)\n\nOutput one statement per line",
+    re.DOTALL)
+BATCH_CONFIDENCE_PATTERN = re.compile(r"^Issue (\d+):$", re.MULTILINE)
+SINGLE_CONFIDENCE_MARKER = "Output ONLY a single floating-point number"
+
+# Sentences shorter than this are not quoted in synthetic issues
+MIN_QUOTE_CHARS = 40
+
+
+def message_key(messages: List[Any]) -> str:
+    """
+    Identify a request by its messages.
+
+    Args:
+        messages: LangChain messages of the request
+
+    Returns:
+        Hex digest of the message types and contents
+    """
+    payload = json.dumps([[message.type, message.content] for message in messages])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def text_key(text: str) -> str:
+    """
+    Identify an embedded text.
+
+    Args:
+        text: Text sent to the embedding client
+
+    Returns:
+        Hex digest of the text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Recorded LLM responses and embeddings, stored as a JSON file.
+    """
+
+    def __init__(self, responses: Optional[Dict[str, Dict[str, Any]]] = None,
+                 embeddings: Optional[Dict[str, List[float]]] = None):
+        """
+        Initialize the cassette.
+
+        Args:
+            responses: Recorded responses by message_key ({"content": ..., "metadata": ...})
+            embeddings: Recorded embedding vectors by text_key
+        """
+        self.responses = responses or {}
+        self.embeddings = embeddings or {}
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        """
+        Load a cassette saved with save.
+
+        Args:
+            path: JSON file of the cassette
+
+        Returns:
+            The loaded cassette
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(responses=data.get("responses"), embeddings=data.get("embeddings"))
+
+    def save(self, path: str) -> None:
+        """
+        Write the cassette to a JSON file.
+
+        Args:
+            path: JSON file to write
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"responses": self.responses, "embeddings": self.embeddings}, f)
+        logger.info(f"Saved {len(self.responses)} responses and {len(self.embeddings)} embeddings to {path}")
+
+    def record_response(self, messages: List[Any], content: str,
+                        metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Record the response to a request."""
+        self.responses[message_key(messages)] = {
+            "content": content,
+            "metadata": json.loads(json.dumps(metadata or {}, default=str))
+        }
+
+    def response(self, messages: List[Any]) -> Optional[Dict[str, Any]]:
+        """Return the recorded response to a request, or None."""
+        return self.responses.get(message_key(messages))
+
+    def record_embedding(self, text: str, vector) -> None:
+        """Record the embedding of a text."""
+        self.embeddings[text_key(text)] = [float(value) for value in vector]
+
+    def embedding(self, text: str) -> Optional[List[float]]:
+        """Return the recorded embedding of a text, or None."""
+        return self.embeddings.get(text_key(text))
+
+
+def _quotable_sentences(text: str) -> List[str]:
+    """Sentences of a text long enough to be quoted."""
+    sentences = (sentence.strip() for sentence in re.split(r"(?<=[.!?])\s+|\n+", text))
+    return [sentence for sentence in sentences if len(sentence) >= MIN_QUOTE_CHARS]
+
+
+def _add_typo(text: str, generator: random.Random) -> str:
+    """Replace one letter, so the quote has to be verified fuzzily."""
+    positions = [index for index, char in enumerate(text) if char.isalpha()]
+    if not positions:
+        return text
+    position = generator.choice(positions)
+    replacement = "e" if text[position] != "e" else "a"
+    return text[:position] + replacement + text[position + 1:]
+
+
+def _digest_statements(digest: str) -> List[str]:
+    """Statements of a rendered digest ("- " lines) long enough to be quoted."""
+    return [line[2:] for line in digest.splitlines()
+            if line.startswith("- ") and len(line) - 2 >= MIN_QUOTE_CHARS]
+
+
+def synthesize_response(messages: List[Any], issues_per_prompt: int = 2, typo_rate: float = 0.3) -> str:
+    """
+    Answer a compliance prompt deterministically, in the format the service parses.
+
+    Analysis prompts (chunk pair, whole document and digests) get up to
+    issues_per_prompt issues quoting sentences of the clinical and compliance texts
+    of the prompt, some of them with a typo; digest prompts get the first sentences
+    of the section and confidence prompts get scores. The answer only depends on
+    the messages.
+
+    Args:
+        messages: LangChain messages of the request
+        issues_per_prompt: Maximum number of issues per analysis prompt
+        typo_rate: Share of quotes given a one-letter typo
+
+    Returns:
+        Response text
+    """
+    prompt = messages[-1].content if messages else ""
+    generator = random.Random(message_key(messages))
+
+    if SINGLE_CONFIDENCE_MARKER in prompt:
+        return f"{generator.choice([0.3, 0.6, 0.8, 0.9])}"
+
+    issue_numbers = BATCH_CONFIDENCE_PATTERN.findall(prompt)
+    if issue_numbers and '"scores"' in prompt:
+        return json.dumps({"scores": [{"index": int(number), "confidence": generator.choice([0.3, 0.6, 0.8, 0.9])}
+                                      for number in issue_numbers]})
+
+    digest = DOCUMENT_DIGEST_PATTERN.search(prompt)
+    if digest is not None:
+        statements = _quotable_sentences(digest.group(2))[:int(digest.group(1))]
+        return "\n".join(f"- {statement}" for statement in statements) or "NONE"
+
+    match = DIGEST_ANALYSIS_PATTERN.search(prompt)
+    if match is not None:
+        clinical_sentences = _digest_statements(match.group(1))
+        compliance_sentences = _digest_statements(match.group(2))
+    else:
+        match = CHUNK_ANALYSIS_PATTERN.search(prompt) or WHOLE_DOCUMENT_PATTERN.search(prompt)
+        if match is None:
+            return json.dumps({"issues": []})
+        clinical_sentences = _quotable_sentences(match.group(1))
+        compliance_sentences = _quotable_sentences(match.group(2))
+
+    issues = []
+    if clinical_sentences and compliance_sentences:
+        count = generator.randint(0, min(issues_per_prompt, len(clinical_sentences)))
+        for clinical_text in generator.sample(clinical_sentences, count):
+            compliance_text = generator.choice(compliance_sentences)
+            if generator.random() < typo_rate:
+                clinical_text = _add_typo(clinical_text, generator)
+            issues.append({
+                "clinical_text": clinical_text,
+                "compliance_text": compliance_text,
+                "explanation": "The clinical text does not follow the cited requirement.",
+                "suggested_edit": f"Revise to meet: {compliance_text[:80]}",
+                "confidence": generator.choice(["high", "low"]),
+                "regulation": f"Section {generator.randint(1, 8)}.{generator.randint(1, 12)}"
+            })
+    return json.dumps({"issues": issues})
+
+
+class ReplayChatModel:
+    """
+    Chat model stand-in answering from a cassette, or synthetically, after a synthetic latency.
+    """
+
+    temperature = 0.0
+    model_name = "replay"
+
+    def __init__(self, cassette: Optional[Cassette] = None, latency: float = 0.0, jitter: float = 0.0,
+                 issues_per_prompt: int = 2, typo_rate: float = 0.3, seed: int = 0):
+        """
+        Initialize the stand-in.
+
+        Args:
+            cassette: Recorded responses (requests not in it are answered synthetically)
+            latency: Mean seconds every call takes
+            jitter: Relative spread of the latency (0.2 = +/-20%)
+            issues_per_prompt: Maximum number of issues per synthetic analysis response
+            typo_rate: Share of synthetic quotes given a one-letter typo
+            seed: Seed of the latency jitter
+        """
+        self.cassette = cassette or Cassette()
+        self.latency = max(0.0, latency)
+        self.jitter = max(0.0, jitter)
+        self.issues_per_prompt = issues_per_prompt
+        self.typo_rate = typo_rate
+        self._generator = random.Random(seed)
+
+        self.calls = 0
+        self.replayed = 0
+        self.synthesized = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def _delay(self) -> float:
+        """Seconds the next call takes."""
+        if not self.latency:
+            return 0.0
+        return self.latency * (1 + self.jitter * self._generator.uniform(-1, 1))
+
+    def _respond(self, messages: List[Any]) -> AIMessage:
+        """Build the response message of a request and count it."""
+        recorded = self.cassette.response(messages)
+        if recorded is not None:
+            content, metadata = recorded["content"], dict(recorded["metadata"])
+            self.replayed += 1
+        else:
+            content = synthesize_response(messages, self.issues_per_prompt, self.typo_rate)
+            metadata = {}
+            self.synthesized += 1
+
+        self.calls += 1
+        prompt_tokens = estimate_tokens("".join(message.content for message in messages))
+        completion_tokens = estimate_tokens(content)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        metadata.setdefault("token_usage", {"prompt_tokens": prompt_tokens,
+                                            "completion_tokens": completion_tokens,
+                                            "total_tokens": prompt_tokens + completion_tokens})
+        metadata.setdefault("model_name", self.model_name)
+        return AIMessage(content=content, response_metadata=metadata)
+
+    async def ainvoke(self, messages: List[Any], *args, **kwargs) -> AIMessage:
+        """
+        Answer a request after the synthetic latency, without blocking the event loop.
+
+        Args:
+            messages: LangChain messages of the request
+
+        Returns:
+            The recorded or synthetic response
+        """
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._respond(messages)
+
+    def invoke(self, messages: List[Any], *args, **kwargs) -> AIMessage:
+        """Blocking version of ainvoke."""
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        return self._respond(messages)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return call and token counters.
+
+        Returns:
+            Dictionary of counters
+        """
+        return {
+            "calls": self.calls,
+            "replayed": self.replayed,
+            "synthesized": self.synthesized,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens
+        }
+
+
+class ReplayEmbeddings:
+    """
+    Embedding client stand-in returning recorded vectors, or L2-normalized hashed term counts.
+    """
+
+    def __init__(self, cassette: Optional[Cassette] = None, dimensions: int = 256,
+                 latency: float = 0.0):
+        """
+        Initialize the stand-in.
+
+        Args:
+            cassette: Recorded embeddings (texts not in it get hashed term counts)
+            dimensions: Size of the synthetic vectors
+            latency: Seconds every embed_documents call blocks, like the API client does
+        """
+        self.cassette = cassette or Cassette()
+        self.dimensions = dimensions
+        self.latency = max(0.0, latency)
+        self.model = "replay"
+
+        self.calls = 0
+        self.texts = 0
+
+    def _synthetic_vector(self, text: str) -> List[float]:
+        """Hashed term counts of a text."""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[zlib.crc32(word.encode()) % self.dimensions] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One vector per text
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        self.calls += 1
+        self.texts += len(texts)
+        return [self.cassette.embedding(text) or self._synthetic_vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single text."""
+        return self.embed_documents([text])[0]
+
+
+class RecordingChatModel:
+    """
+    Wraps a real chat model and records its responses into a cassette.
+    """
+
+    def __init__(self, llm_client, cassette: Cassette):
+        """
+        Wrap a chat model.
+
+        Args:
+            llm_client: LangChain chat model (e.g. ChatOpenAI)
+            cassette: Cassette receiving the responses
+        """
+        self.llm_client = llm_client
+        self.cassette = cassette
+
+    async def ainvoke(self, messages: List[Any], *args, **kwargs):
+        """Call the model and record its response."""
+        response = await self.llm_client.ainvoke(messages, *args, **kwargs)
+        if isinstance(response.content, str):
+            self.cassette.record_response(messages, response.content,
+                                          getattr(response, "response_metadata", None))
+        return response
+
+    def __getattr__(self, name):
+        # Expose the wrapped client's attributes (temperature, alookup, ...)
+        return getattr(self.llm_client, name)
+
+
+class RecordingEmbeddings:
+    """
+    Wraps a real embedding client and records its vectors into a cassette.
+    """
+
+    def __init__(self, embeddings, cassette: Cassette):
+        """
+        Wrap an embedding client.
+
+        Args:
+            embeddings: Embedding client (embed_documents)
+            cassette: Cassette receiving the vectors
+        """
+        self.embeddings = embeddings
+        self.cassette = cassette
+
+    def embed_documents(self, texts: List[str]):
+        """Embed texts and record their vectors."""
+        vectors = self.embeddings.embed_documents(texts)
+        for text, vector in zip(texts, vectors):
+            self.cassette.record_embedding(text, vector)
+        return vectors
+
+    def embed_query(self, text: str):
+        """Embed a single text and record its vector."""
+        return self.embed_documents([text])[0]
+
+    def __getattr__(self, name):
+        return getattr(self.embeddings, name)
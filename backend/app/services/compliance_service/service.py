@@ -8,14 +8,13 @@ This service analyzes clinical trial documents for compliance issues using:
 4. Verification and confidence scoring
 """
 
+import asyncio
 import json
 import logging
+import time
 import uuid
 import re
-from typing import List, Optional, Tuple
-
-# Math/similarity libraries
-import numpy as np
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 # LangChain components
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -25,17 +24,30 @@ from langchain.output_parsers import PydanticOutputParser
 
 # Local imports
 from app.core.config import settings
-from app.models.compliance import ComplianceIssue, ComplianceReviewInput
-from app.services.compliance_service.models.pydantic_models import LLMComplianceIssue, ComplianceIssueList, TextWithOffset
-from app.services.compliance_service.utils import find_text_offsets, verify_text_in_source
+from app.models.compliance import ComplianceIssue, ComplianceReviewInput, IncrementalAnalysisResult, IssueRemap
+from app.services.compliance_service.models.pydantic_models import LLMComplianceIssue, ComplianceIssueList, ConfidenceScoreList, ChunkPair, PairPlan, TextWithOffset
+from app.services.compliance_service.utils import NormalizedText, find_text_offsets, locate_verified_text
+from app.services.compliance_service.concurrency import CHARS_PER_TOKEN, LLMRateLimiter, estimate_tokens
+from app.services.compliance_service.embedding_cache import with_embedding_cache
+from app.services.compliance_service.llm_cache import CachedChatModel, llm_cache_bypass, llm_cache_bypassed, with_llm_cache
+from app.services.compliance_service.tracing import ReviewTrace, current_trace, record_cache, record_llm_response, record_time, review_trace, span, timed
+from app.services.compliance_service.digests import DIGEST_PROMPT_VERSION, fit_digests, format_digest, get_digest_cache, parse_digest, split_sections
+from app.services.compliance_service.pairing import plan_basic_pairs, plan_embedding_pairs, validate_replay_plan
+from app.services.compliance_service.chunk_cache import asplit_with_offsets_cached
+from app.services.compliance_service.incremental import ContentDiff
+from app.services.compliance_service.dedup import IssueFeatures, IssueIndex, deduplicate_issues, is_similar, text_overlap, word_set
 from app.services.compliance_service.prompts import (
     COMPLIANCE_ANALYSIS_SYSTEM_PROMPT,
     get_compliance_analysis_human_prompt,
     APPLY_SUGGESTION_SYSTEM_PROMPT,
     get_apply_suggestion_human_prompt,
     get_confidence_assessment_prompt,
+    get_batch_confidence_assessment_prompt,
     WHOLE_DOCUMENT_ANALYSIS_PROMPT,
     get_whole_document_analysis_prompt,
+    DOCUMENT_DIGEST_SYSTEM_PROMPT,
+    get_document_digest_prompt,
+    get_digest_analysis_prompt,
     INSERTION_CONTENT_SYSTEM_PROMPT,
     get_insertion_content_human_prompt
 )
@@ -50,16 +62,10 @@ logger = logging.getLogger(__name__)
 SIMILARITY_THRESHOLD = 0.75
 TOP_N_MATCHES = 3  # Number of top matching chunks to analyze
 RAPIDFUZZ_MATCH_THRESHOLD = 85  # Percentage threshold for fuzzy matching
+# Characters reserved per section heading when fitting digests into the holistic prompt
+SECTION_HEADING_CHARS = 48
 
 # Check for optional dependencies
-try:
-    from sklearn.metrics.pairwise import cosine_similarity
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
-    logger.warning(
-        "scikit-learn not installed. Cannot perform embedding-based matching.")
-
 try:
     from rapidfuzz import fuzz as rapidfuzz_fuzz
     RAPIDFUZZ_AVAILABLE = True
@@ -70,6 +76,16 @@ except ImportError:
 
 # No counter file needed for UUID-based IDs
 
+# Receives progress events ({"event": ..., ...} dictionaries) while a review runs
+EventCallback = Callable[[Dict[str, Any]], None]
+
+
+def _is_context_length_error(error: Exception) -> bool:
+    """Whether an LLM error reports a prompt exceeding the model's context window."""
+    message = str(error).lower()
+    return (getattr(error, "code", None) == "context_length_exceeded"
+            or "context_length_exceeded" in message or "maximum context length" in message)
+
 
 class ComplianceService:
     """
@@ -83,24 +99,27 @@ class ComplianceService:
         """Initialize the compliance service."""
         # Initialize the LLM client based on configuration
         if settings.USE_AZURE_OPENAI:
-            self.llm_client = AzureChatOpenAI(
+            # Responses of repeated prompts are served from the shared LLM response cache
+            self.llm_client = with_llm_cache(AzureChatOpenAI(
                 model=settings.AZURE_OPENAI_API_MODEL_NAME,
                 azure_deployment=settings.AZURE_OPENAI_API_DEPLOYMENT_NAME,
                 api_version=settings.AZURE_OPENAI_API_MODEL_VERSION,
                 azure_endpoint=settings.AZURE_OPENAI_API_ENDPOINT,
                 api_key=settings.AZURE_OPENAI_API_KEY,
                 temperature=0.0
-            )
+            ), model_name=settings.AZURE_OPENAI_API_MODEL_NAME,
+                deployment=settings.AZURE_OPENAI_API_DEPLOYMENT_NAME)
 
             # Initialize embeddings client
             try:
-                self.embeddings = AzureOpenAIEmbeddings(
+                # Embeddings are served through the shared on-disk cache
+                self.embeddings = with_embedding_cache(AzureOpenAIEmbeddings(
                     model=settings.AZURE_OPENAI_EMBEDDING_MODEL_NAME,
                     azure_deployment=settings.AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME,
                     api_version=settings.AZURE_OPENAI_API_MODEL_VERSION,
                     azure_endpoint=settings.AZURE_OPENAI_API_ENDPOINT,
                     api_key=settings.AZURE_OPENAI_API_KEY
-                )
+                ))
                 self.embeddings_available = True
                 logger.info("Using Azure OpenAI embeddings")
             except Exception as e:
@@ -109,18 +128,20 @@ class ComplianceService:
 
             logger.info("Using Azure OpenAI client")
         else:
-            self.llm_client = ChatOpenAI(
+            # Responses of repeated prompts are served from the shared LLM response cache
+            self.llm_client = with_llm_cache(ChatOpenAI(
                 model=settings.OPENAI_MODEL_NAME,
                 api_key=settings.OPENAI_API_KEY,
                 temperature=0.0
-            )
+            ), model_name=settings.OPENAI_MODEL_NAME)
 
             # Initialize embeddings client
             try:
-                self.embeddings = OpenAIEmbeddings(
+                # Embeddings are served through the shared on-disk cache
+                self.embeddings = with_embedding_cache(OpenAIEmbeddings(
                     model="text-embedding-3-large",
                     api_key=settings.OPENAI_API_KEY
-                )
+                ))
                 self.embeddings_available = True
                 logger.info("Using standard OpenAI embeddings")
             except Exception as e:
@@ -162,7 +183,7 @@ class ComplianceService:
         # Create a shortened UUID (first 8 chars) with the 'R-' prefix
         return f"R-{uuid.uuid4().hex[:8]}"
 
-    def _split_text_with_offsets(self, text: str) -> List[TextWithOffset]:
+    async def _split_text_with_offsets(self, text: str) -> List[TextWithOffset]:
         """
         Splits text and returns chunks with their start character offsets.
         Uses the configured chunker to perform the splitting and position tracking.
@@ -176,23 +197,147 @@ class ComplianceService:
         if not text:
             return []
 
-        # Use the configured chunker to split the text with offsets
-        return self.chunker.split_with_offsets(text)
+        # Use the configured chunker, reusing cached results for unchanged documents.
+        # Awaited so that chunking never blocks the event loop.
+        return await asplit_with_offsets_cached(self.chunker, text)
+
+    def _create_rate_limiter(self, review_input: ComplianceReviewInput) -> LLMRateLimiter:
+        """
+        Create the LLM rate limiter for a single review.
+
+        Per-request values on the review input override the configured defaults.
+
+        Args:
+            review_input: Input for the review being analyzed
+
+        Returns:
+            Rate limiter shared by every LLM call of the review
+        """
+        max_concurrency = review_input.max_concurrency or settings.LLM_MAX_CONCURRENCY
+        tokens_per_minute = review_input.tokens_per_minute
+        if tokens_per_minute is None:
+            tokens_per_minute = settings.LLM_TOKENS_PER_MINUTE
+
+        return LLMRateLimiter(max_concurrency=max_concurrency,
+                              tokens_per_minute=tokens_per_minute)
 
-    async def analyze_compliance(self, review_input: ComplianceReviewInput) -> List[ComplianceIssue]:
+    async def _invoke_llm(self, messages: list, limiter: Optional[LLMRateLimiter] = None):
+        """
+        Invoke the LLM client, honouring the review's concurrency and token limits.
+
+        Responses served from the LLM response cache bypass the limits. The call's
+        token usage is added to the review's trace.
+
+        Args:
+            messages: LangChain messages to send
+            limiter: Optional rate limiter of the current review
+
+        Returns:
+            The LLM response message
+        """
+        invoke = self.llm_client.ainvoke
+        cached_client = isinstance(self.llm_client, CachedChatModel)
+        # Cached responses don't count against the review's limits
+        if cached_client:
+            cached = await self.llm_client.alookup(messages)
+            if cached is not None:
+                record_llm_response(cached, cached_client=True)
+                return cached
+            invoke = self.llm_client.ainvoke_uncached
+
+        if limiter is None:
+            with timed("llm_call"):
+                response = await invoke(messages)
+        else:
+            prompt_tokens = estimate_tokens(
+                "".join(message.content for message in messages))
+            waiting_since = time.perf_counter()
+            async with limiter.limit(prompt_tokens):
+                record_time("rate_limiter_wait", time.perf_counter() - waiting_since)
+                with timed("llm_call"):
+                    response = await invoke(messages)
+
+        record_llm_response(response, cached_client=cached_client)
+        return response
+
+    @staticmethod
+    async def _traced(name: str, awaitable):
+        """Await a step of the review inside a span of the review's trace."""
+        with span(name):
+            return await awaitable
+
+    async def prepare_compliance_document(self, compliance_doc_content: str) -> int:
+        """
+        Chunk and embed a compliance document ahead of the reviews that use it.
+
+        The chunks and chunk embeddings land in the chunk and embedding caches, so
+        every review against the same guideline reuses them instead of computing
+        them again (concurrent reviews would otherwise all miss the caches at once).
+
+        Args:
+            compliance_doc_content: Content of the compliance document
+
+        Returns:
+            Number of chunks of the compliance document
+        """
+        chunks = await self._split_text_with_offsets(compliance_doc_content)
+        if chunks and self.embeddings_available:
+            try:
+                # The embedding client blocks, so keep it off the event loop
+                await asyncio.to_thread(self.embeddings.embed_documents, [c.text for c in chunks])
+            except Exception as e:
+                logger.warning(f"Could not pre-compute compliance chunk embeddings: {e}")
+        return len(chunks)
+
+    async def analyze_compliance(self, review_input: ComplianceReviewInput,
+                                 pair_plan: Optional[PairPlan] = None,
+                                 event_callback: Optional[EventCallback] = None,
+                                 limiter: Optional[LLMRateLimiter] = None,
+                                 trace: Optional[ReviewTrace] = None) -> List[ComplianceIssue]:
         """
         Analyzes documents using a two-phase approach:
         1. First tries agentic chunking for semantic understanding of document parts
         2. Then attempts whole-document analysis for holistic issues
 
-        This comprehensive approach combines the strengths of both methods.
+        Both phases run concurrently: every selected chunk pair and the whole-document
+        pass are scheduled as tasks bounded by the review's LLM rate limiter. Results
+        are merged in a fixed order (chunk pairs in selection order, then the
+        whole-document issues) so deduplication output stays stable.
 
         Args:
             review_input: Input containing clinical and compliance document content
+            pair_plan: Optional recorded PairPlan to replay instead of selecting pairs
+            event_callback: Optional callback receiving phase, progress and issue events
+                as the review runs (see stream_compliance)
+            limiter: Optional rate limiter shared with other reviews (e.g. a batch job);
+                by default the review gets its own limiter
+            trace: Optional ReviewTrace receiving the review's spans, token usage and
+                cache statistics (to store them with the review); by default the
+                review is traced for the logs and metrics only
 
         Returns:
             List of compliance issues with precise text locations
         """
+        # A fresh analysis is not served from the LLM response cache; the tasks the
+        # review creates inherit the bypass and the trace
+        with llm_cache_bypass(review_input.force_refresh), review_trace(trace) as active_trace:
+            active_trace.attributes.update(clinical_doc_id=review_input.clinical_doc_id,
+                                           compliance_doc_id=review_input.compliance_doc_id)
+            issues = await self._analyze_compliance(review_input, pair_plan, event_callback, limiter)
+            active_trace.attributes["issues"] = len(issues)
+
+        logger.info(f"Review profile: {active_trace.summary()}")
+        return issues
+
+    async def _analyze_compliance(self, review_input: ComplianceReviewInput,
+                                  pair_plan: Optional[PairPlan],
+                                  event_callback: Optional[EventCallback],
+                                  limiter: Optional[LLMRateLimiter]) -> List[ComplianceIssue]:
+        """Run the review of analyze_compliance."""
+        def emit(event: str, **data):
+            if event_callback is not None:
+                event_callback({"event": event, **data})
+
         # Get document content
         clinical_doc_content = review_input.clinical_doc_content
         compliance_doc_content = review_input.compliance_doc_content
@@ -200,146 +345,382 @@ class ComplianceService:
         logger.info(
             f"Starting compliance analysis for documents (ClinicalID: {review_input.clinical_doc_id}, ComplianceID: {review_input.compliance_doc_id})")
 
+        if limiter is None:
+            limiter = self._create_rate_limiter(review_input)
+        logger.info(
+            f"LLM limits for this review: concurrency={limiter.max_concurrency}, tokens_per_minute={limiter.tokens_per_minute or 'unlimited'}")
+
         # Collect all unique compliance issues
         all_issues = []
 
-        # Phase 1: Use agentic chunking first (better for large documents and detailed analysis)
-        chunk_issues = []
-        try:
-            logger.info("Phase 1: Starting agentic chunk-based analysis...")
-
-            # Split documents into chunks with position tracking (uses AgenticChunker by default now)
-            clinical_chunks_with_offsets = self._split_text_with_offsets(
-                clinical_doc_content)
-            compliance_chunks_with_offsets = self._split_text_with_offsets(
-                compliance_doc_content)
-
-            logger.info(
-                f"Split clinical document into {len(clinical_chunks_with_offsets)} chunks and compliance document into {len(compliance_chunks_with_offsets)} chunks")
-
-            # Extract just the chunks for easier handling
-            clinical_chunks = [c.text for c in clinical_chunks_with_offsets]
-            clinical_offsets = [c.offset for c in clinical_chunks_with_offsets]
-            compliance_chunks = [
-                c.text for c in compliance_chunks_with_offsets]
-            compliance_offsets = [
-                c.offset for c in compliance_chunks_with_offsets]
+        # Phase 2 does not depend on chunking, so start the whole-document pass right away
+        logger.info("Phase 2: Starting whole-document analysis...")
+        emit("phase", phase="full_document_started")
+        full_document_task = asyncio.create_task(self._traced(
+            "full_document", self._analyze_full_documents(
+                clinical_doc_content, compliance_doc_content, limiter=limiter)))
 
-            # Collect compliance issues from chunk-based analysis
-            processed_pairs = set()  # Track which pairs have been processed
+        try:
+            # Phase 1: Use agentic chunking first (better for large documents and detailed analysis)
+            chunk_issues = []
+            try:
+                logger.info("Phase 1: Starting agentic chunk-based analysis...")
+                emit("phase", phase="chunking")
 
-            # Check if we can use embeddings for intelligent pairing
-            if self.embeddings_available and SKLEARN_AVAILABLE and len(clinical_chunks) > 0 and len(compliance_chunks) > 0:
-                try:
-                    logger.info("Using embeddings for chunk pairing")
-
-                    # Get embeddings for all chunks
-                    clinical_embeddings = self.embeddings.embed_documents(
-                        clinical_chunks)
-                    compliance_embeddings = self.embeddings.embed_documents(
-                        compliance_chunks)
-
-                    # Convert to numpy arrays for efficient computation
-                    clinical_np = np.array(clinical_embeddings)
-                    compliance_np = np.array(compliance_embeddings)
-
-                    # Calculate cosine similarity between all pairs
-                    similarity_matrix = cosine_similarity(
-                        clinical_np, compliance_np)
-
-                    # Process most similar pairs first
-                    for i in range(len(clinical_chunks)):
-                        # Find top N most similar compliance chunks for this clinical chunk
-                        similarities = similarity_matrix[i]
-                        # Get indices of top N matches
-                        top_indices = similarities.argsort(
-                        )[-TOP_N_MATCHES:][::-1]
-
-                        # Only process pairs with similarity above threshold
-                        for j in top_indices:
-                            similarity = similarities[j]
-                            if similarity < SIMILARITY_THRESHOLD:
-                                continue
-
-                            # Skip if already processed
-                            if (i, j) in processed_pairs:
-                                continue
+                # Split documents into chunks with position tracking (uses AgenticChunker by default now)
+                with span("chunking"):
+                    clinical_chunks_with_offsets, compliance_chunks_with_offsets = await asyncio.gather(
+                        self._split_text_with_offsets(clinical_doc_content),
+                        self._split_text_with_offsets(compliance_doc_content))
 
-                            logger.info(
-                                f"Processing chunk pair with similarity {similarity:.2f}: Clinical chunk {i+1}/{len(clinical_chunks)}, Compliance chunk {j+1}/{len(compliance_chunks)}")
-
-                            # Analyze this pair
-                            issues = await self._analyze_chunk_pair(
-                                clinical_chunks[i],
-                                compliance_chunks[j],
-                                clinical_offsets[i],
-                                compliance_offsets[j]
-                            )
-
-                            chunk_issues.extend(issues)
-                            processed_pairs.add((i, j))
-
-                            # Limit to max 3 compliance chunks per clinical chunk to control API usage
-                            if len([p for p in processed_pairs if p[0] == i]) >= 3:
-                                break
-
-                except Exception as e:
-                    logger.error(
-                        f"Error in embedding-based pairing: {str(e)}", exc_info=True)
-                    # Fall back to basic pairing if embeddings fail
-                    await self._perform_basic_pairing_analysis(
+                logger.info(
+                    f"Split clinical document into {len(clinical_chunks_with_offsets)} chunks and compliance document into {len(compliance_chunks_with_offsets)} chunks")
+
+                # Extract just the chunks for easier handling
+                clinical_chunks = [c.text for c in clinical_chunks_with_offsets]
+                clinical_offsets = [c.offset for c in clinical_chunks_with_offsets]
+                compliance_chunks = [
+                    c.text for c in compliance_chunks_with_offsets]
+                compliance_offsets = [
+                    c.offset for c in compliance_chunks_with_offsets]
+
+                # Decide which (clinical, compliance) chunk pairs to analyze
+                if pair_plan is not None and validate_replay_plan(
+                        pair_plan, len(clinical_chunks), len(compliance_chunks)):
+                    logger.info(
+                        f"Replaying recorded {pair_plan.method} pair plan with {len(pair_plan.pairs)} pairs")
+                    plan = pair_plan
+                else:
+                    max_pairs = review_input.max_chunk_pairs
+                    if max_pairs is None:
+                        max_pairs = settings.MAX_CHUNK_PAIRS_PER_REVIEW
+                    with span("pairing"):
+                        plan = await self._select_chunk_pairs(
+                            clinical_chunks, compliance_chunks, max_pairs=max_pairs)
+                    logger.info(
+                        f"Selected {len(plan.pairs)} chunk pairs ({plan.method}, {plan.candidate_count} candidates, budget {plan.max_pairs or 'unlimited'})")
+                # The full plan can be fed back to analyze_compliance to replay this review
+                logger.debug(f"Pair plan: {plan.model_dump_json()}")
+                pairs = plan.pairs
+
+                # Analyze all selected pairs concurrently; confidence is scored either
+                # per pair or once over the whole review
+                score_per_pair = settings.CONFIDENCE_SCORING_SCOPE != "review"
+                emit("phase", phase="chunk_analysis", method=plan.method,
+                     clinical_chunks=len(clinical_chunks), compliance_chunks=len(compliance_chunks),
+                     pairs_planned=len(pairs))
+
+                pairs_done = 0
+
+                def on_pair_done(pair: ChunkPair, pair_issues: List[ComplianceIssue]) -> None:
+                    nonlocal pairs_done
+                    pairs_done += 1
+                    # Without per-pair scoring the confidence is the analysis prompt's estimate
+                    for issue in pair_issues:
+                        emit("issue", source="chunk_pair", provisional=not score_per_pair,
+                             issue=issue.model_dump(mode="json"))
+                    emit("progress", pairs_done=pairs_done, pairs_planned=len(pairs),
+                         clinical_index=pair.clinical_index, compliance_index=pair.compliance_index,
+                         issues=len(pair_issues))
+
+                with span("chunk_analysis", pairs=len(pairs)):
+                    chunk_issues = await self._analyze_chunk_pairs(
+                        pairs,
                         clinical_chunks, clinical_offsets,
                         compliance_chunks, compliance_offsets,
-                        chunk_issues, processed_pairs
+                        limiter,
+                        score_confidence=score_per_pair,
+                        on_pair_done=on_pair_done if event_callback is not None else None
                     )
-            else:
-                # Fall back to basic pairing if embeddings/sklearn aren't available
-                logger.info(
-                    "Using basic chunk pairing (embeddings not available)")
-                await self._perform_basic_pairing_analysis(
-                    clinical_chunks, clinical_offsets,
-                    compliance_chunks, compliance_offsets,
-                    chunk_issues, processed_pairs
-                )
-
-            # Add all chunk-based issues to our final collection
-            if chunk_issues and len(chunk_issues) > 0:
-                logger.info(
-                    f"Found {len(chunk_issues)} issues using agentic chunk-based analysis")
-                all_issues.extend(chunk_issues)
-            else:
-                logger.info("Chunk-based analysis found no issues")
-        except Exception as e:
-            logger.error(f"Error in chunk-based analysis: {e}")
+                if not score_per_pair:
+                    emit("phase", phase="confidence_scoring", issues=len(chunk_issues))
+                    await self._score_issue_confidence(chunk_issues, limiter)
 
-        # Phase 2: Also try whole-document analysis for holistic issues and patterns
-        try:
-            logger.info("Phase 2: Starting whole-document analysis...")
-            direct_issues = await self._analyze_full_documents(clinical_doc_content, compliance_doc_content)
+                # Add all chunk-based issues to our final collection
+                if chunk_issues and len(chunk_issues) > 0:
+                    logger.info(
+                        f"Found {len(chunk_issues)} issues using agentic chunk-based analysis")
+                    all_issues.extend(chunk_issues)
+                else:
+                    logger.info("Chunk-based analysis found no issues")
+            except Exception as e:
+                logger.error(f"Error in chunk-based analysis: {e}")
+                emit("phase", phase="chunk_analysis_failed", detail=str(e))
 
-            if direct_issues and len(direct_issues) > 0:
-                logger.info(
-                    f"Found {len(direct_issues)} issues using whole-document analysis")
+            # Phase 2: Collect the whole-document analysis for holistic issues and patterns
+            try:
+                emit("phase", phase="full_document")
+                direct_issues = await full_document_task
 
-                # Add whole document analysis issues, avoiding duplicates
-                for issue in direct_issues:
-                    # Add if not a duplicate (checking for similar text and explanation)
-                    if not any(self._is_similar_issue(issue, existing) for existing in all_issues):
-                        all_issues.append(issue)
-            else:
-                logger.info(
-                    "Whole-document analysis found no additional issues")
-        except Exception as e:
-            logger.error(f"Error in whole-document analysis: {e}")
+                if direct_issues and len(direct_issues) > 0:
+                    logger.info(
+                        f"Found {len(direct_issues)} issues using whole-document analysis")
+
+                    # Add whole document analysis issues, avoiding duplicates
+                    with span("deduplication", stage="merge"):
+                        known_issues = IssueIndex(all_issues)
+                        for issue in direct_issues:
+                            # Add if not a duplicate (checking for similar text and explanation)
+                            if known_issues.find_similar(issue) is None:
+                                all_issues.append(issue)
+                                known_issues.add(issue)
+                                emit("issue", source="full_document", provisional=False,
+                                     issue=issue.model_dump(mode="json"))
+                else:
+                    logger.info(
+                        "Whole-document analysis found no additional issues")
+            except Exception as e:
+                # The review continues with the chunk issues, but the lost phase is reported
+                logger.error(f"Error in whole-document analysis: {e}", exc_info=True)
+                emit("phase", phase="full_document_failed", detail=str(e))
+                trace = current_trace()
+                if trace is not None:
+                    trace.attributes["full_document_error"] = str(e)
+        finally:
+            # Don't leave the whole-document call running if chunk analysis was cancelled
+            if not full_document_task.done():
+                full_document_task.cancel()
 
         # Apply enhanced deduplication to reduce multiple issues on the same text
-        deduplicated_issues = self._deduplicate_issues(all_issues)
+        emit("phase", phase="deduplication", issues=len(all_issues))
+        with span("deduplication", stage="final"):
+            deduplicated_issues = self._deduplicate_issues(all_issues)
 
         # Log final issue count
         logger.info(
             f"Found {len(deduplicated_issues)} compliance issues after deduplication (from {len(all_issues)} original issues)")
         return deduplicated_issues
 
+    async def stream_compliance(self, review_input: ComplianceReviewInput) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Runs analyze_compliance and yields its events as they happen.
+
+        Every verified issue is yielded as soon as its chunk pair finishes, together
+        with phase and progress events. The last event is either "complete", carrying
+        the final deduplicated issues and the review's profile, or "error". Closing the iterator early cancels
+        the analysis.
+
+        Args:
+            review_input: Input containing clinical and compliance document content
+
+        Yields:
+            Event dictionaries with an "event" key (phase, progress, issue, complete, error)
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        trace = ReviewTrace()
+        analysis_task = asyncio.create_task(
+            self.analyze_compliance(review_input, event_callback=queue.put_nowait, trace=trace))
+        # All events are queued before the task finishes, so the sentinel comes last
+        analysis_task.add_done_callback(lambda _: queue.put_nowait(None))
+
+        try:
+            yield {"event": "phase", "phase": "started",
+                   "clinical_doc_id": review_input.clinical_doc_id,
+                   "compliance_doc_id": review_input.compliance_doc_id}
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+
+            try:
+                issues = analysis_task.result()
+            except Exception as e:
+                logger.error(f"Error in streamed compliance analysis: {e}", exc_info=True)
+                yield {"event": "error", "detail": str(e)}
+                return
+
+            yield {"event": "complete",
+                   "clinical_doc_id": review_input.clinical_doc_id,
+                   "compliance_doc_id": review_input.compliance_doc_id,
+                   "issues": [issue.model_dump(mode="json") for issue in issues],
+                   "profile": trace.to_dict()}
+        finally:
+            # The client went away before the analysis finished
+            if not analysis_task.done():
+                analysis_task.cancel()
+
+    async def analyze_incremental(self, review_input: ComplianceReviewInput,
+                                  previous_clinical_content: str,
+                                  existing_issues: List[Dict[str, Any]]) -> IncrementalAnalysisResult:
+        """
+        Re-analyzes only the edited parts of a clinical document.
+
+        The previous and edited clinical texts are diffed. Stored issues whose clinical
+        text lies in unchanged text carry over with remapped offsets; pending issues
+        whose text was edited are removed, while decided issues (a Decision row or a
+        status other than pending) are kept, relocated if their text still exists.
+        Only the edited regions are chunked and paired with the (cached) compliance
+        chunks, so an edit costs a few LLM calls instead of a full review. The
+        whole-document pass is not repeated.
+
+        Args:
+            review_input: Review input holding the edited clinical content and the compliance content
+            previous_clinical_content: Clinical content the stored issues refer to
+            existing_issues: Stored issues as dictionaries (see ComplianceIssue.to_dict in the DB models),
+                with "decided" set for issues that have a Decision
+
+        Returns:
+            IncrementalAnalysisResult with remapped, removed and new issues
+        """
+        new_content = review_input.clinical_doc_content
+        diff = ContentDiff(previous_clinical_content, new_content)
+        result = IncrementalAnalysisResult()
+
+        # Carry over issues whose clinical text was not touched by the edit
+        old_index = NormalizedText(previous_clinical_content)
+        new_index = NormalizedText(new_content)
+        kept_issues = []
+        for record in existing_issues:
+            start = record.get("clinical_text_start_char")
+            end = record.get("clinical_text_end_char")
+            if start is None or end is None:
+                # Rows stored without positions: locate the text in the previous version
+                start, end = find_text_offsets(record["clinical_text"], old_index)
+
+            new_span = diff.map_span(start, end)
+            if new_span is None:
+                decided = record.get("decided") or (record.get("status") or "pending") != "pending"
+                if not decided:
+                    result.removed_issue_ids.append(record["id"])
+                    continue
+                # Keep reviewer decisions; point them at the text if it still exists
+                new_span = new_index.find(record["clinical_text"]) or (None, None)
+
+            result.remapped_issues.append(IssueRemap(
+                issue_id=record["id"],
+                clinical_text_start_char=new_span[0],
+                clinical_text_end_char=new_span[1]))
+            kept_issues.append(self._issue_from_record(record))
+
+        if diff.unchanged:
+            logger.info("Clinical content unchanged, nothing to re-analyze")
+            return result
+
+        # Chunk only the edited regions (widened to whole paragraphs)
+        regions = diff.changed_regions(context_chars=settings.CHUNK_SIZE)
+        result.changed_regions = len(regions)
+        if not regions:
+            return result
+
+        limiter = self._create_rate_limiter(review_input)
+        region_chunks, compliance_chunks_with_offsets = await asyncio.gather(
+            asyncio.gather(*(self._split_text_with_offsets(new_content[start:end])
+                             for start, end in regions)),
+            self._split_text_with_offsets(review_input.compliance_doc_content))
+
+        clinical_chunks, clinical_offsets = [], []
+        for (region_start, _), chunks in zip(regions, region_chunks):
+            for chunk in chunks:
+                clinical_chunks.append(chunk.text)
+                clinical_offsets.append(region_start + chunk.offset)
+        compliance_chunks = [c.text for c in compliance_chunks_with_offsets]
+        compliance_offsets = [c.offset for c in compliance_chunks_with_offsets]
+        result.reanalyzed_chunks = len(clinical_chunks)
+
+        max_pairs = review_input.max_chunk_pairs
+        if max_pairs is None:
+            max_pairs = settings.MAX_CHUNK_PAIRS_PER_REVIEW
+        plan = await self._select_chunk_pairs(
+            clinical_chunks, compliance_chunks, max_pairs=max_pairs)
+        result.analyzed_pairs = len(plan.pairs)
+        logger.info(
+            f"Incremental analysis: {len(regions)} edited regions, {len(clinical_chunks)} chunks, {len(plan.pairs)} chunk pairs")
+
+        score_per_pair = settings.CONFIDENCE_SCORING_SCOPE != "review"
+        issues = await self._analyze_chunk_pairs(
+            plan.pairs,
+            clinical_chunks, clinical_offsets,
+            compliance_chunks, compliance_offsets,
+            limiter,
+            score_confidence=score_per_pair
+        )
+        if not score_per_pair:
+            await self._score_issue_confidence(issues, limiter)
+
+        # Drop issues that are already stored for the unchanged text
+        stored_issues = IssueIndex(kept_issues)
+        for issue in self._deduplicate_issues(issues):
+            if stored_issues.find_similar(issue) is not None:
+                continue
+            issue.metadata = {**(issue.metadata or {}), "analysis": "incremental"}
+            result.new_issues.append(issue)
+
+        logger.info(
+            f"Incremental analysis kept {len(result.remapped_issues)} issues, removed {len(result.removed_issue_ids)}, found {len(result.new_issues)} new")
+        return result
+
+    @staticmethod
+    def _issue_from_record(record: Dict[str, Any]) -> ComplianceIssue:
+        """
+        Build a ComplianceIssue from a stored issue dictionary for duplicate checks.
+
+        Args:
+            record: Stored issue as a dictionary
+
+        Returns:
+            ComplianceIssue with the record's text fields
+        """
+        return ComplianceIssue(
+            id=record["id"],
+            clinical_text=record.get("clinical_text") or "",
+            compliance_text=record.get("compliance_text") or "",
+            explanation=record.get("explanation") or "",
+            suggested_edit=record.get("suggested_edit") or "",
+            confidence=record.get("confidence") or "low",
+            regulation=record.get("regulation") or ""
+        )
+
+    async def _select_chunk_pairs(self, clinical_chunks: List[str], compliance_chunks: List[str],
+                            max_pairs: Optional[int] = None) -> PairPlan:
+        """
+        Selects the (clinical, compliance) chunk pairs to analyze.
+
+        Uses embedding similarity when available and falls back to basic pairing otherwise.
+
+        Args:
+            clinical_chunks: Clinical document chunks
+            compliance_chunks: Compliance document chunks
+            max_pairs: Global pair budget for the review (None or 0 = unlimited)
+
+        Returns:
+            PairPlan with the selected pairs in execution order
+        """
+        if not clinical_chunks or not compliance_chunks:
+            return PairPlan(method="basic",
+                            clinical_chunk_count=len(clinical_chunks),
+                            compliance_chunk_count=len(compliance_chunks))
+
+        # Check if we can use embeddings for intelligent pairing
+        if self.embeddings_available:
+            try:
+                logger.info("Using embeddings for chunk pairing")
+
+                # Get embeddings for all chunks; the embedding client blocks (network
+                # calls on cache misses, memmap reads), so keep it off the event loop
+                with span("embedding", texts=len(clinical_chunks) + len(compliance_chunks)):
+                    clinical_embeddings = await asyncio.to_thread(
+                        self.embeddings.embed_documents, clinical_chunks)
+                    compliance_embeddings = await asyncio.to_thread(
+                        self.embeddings.embed_documents, compliance_chunks)
+
+                return plan_embedding_pairs(
+                    clinical_embeddings, compliance_embeddings,
+                    top_n=TOP_N_MATCHES,
+                    similarity_threshold=SIMILARITY_THRESHOLD,
+                    max_pairs=max_pairs)
+
+            except Exception as e:
+                logger.error(
+                    f"Error in embedding-based pairing: {str(e)}", exc_info=True)
+                # Fall back to basic pairing if embeddings fail
+                return plan_basic_pairs(len(clinical_chunks), len(compliance_chunks))
+
+        # Fall back to basic pairing if embeddings aren't available
+        logger.info(
+            "Using basic chunk pairing (embeddings not available)")
+        return plan_basic_pairs(len(clinical_chunks), len(compliance_chunks))
+
     def _deduplicate_issues(self, issues: List[ComplianceIssue]) -> List[ComplianceIssue]:
         """
         Smart deduplication of compliance issues, prioritizing higher confidence issues
@@ -354,40 +735,7 @@ class ComplianceService:
         if not issues or len(issues) <= 1:
             return issues
 
-        # Group issues by clinical text (after stripping whitespace)
-        text_groups = {}
-        for issue in issues:
-            clean_text = issue.clinical_text.strip()
-            if clean_text not in text_groups:
-                text_groups[clean_text] = []
-            text_groups[clean_text].append(issue)
-
-        # Process groups to select the best issue from each group
-        deduplicated = []
-        for text, group in text_groups.items():
-            if len(group) == 1:
-                # Only one issue for this text, no deduplication needed
-                deduplicated.append(group[0])
-            else:
-                # Multiple issues for the same text - select the best one
-                logger.info(
-                    f"Found {len(group)} issues for the same clinical text: '{text[:30]}...'")
-
-                # Prioritize high confidence issues
-                high_confidence = [i for i in group if i.confidence == 'high']
-                if high_confidence:
-                    # Use the first high confidence issue
-                    selected = high_confidence[0]
-                    logger.info(
-                        f"Selected high confidence issue out of {len(group)} duplicates")
-                else:
-                    # No high confidence issues, use the first one
-                    selected = group[0]
-                    logger.info(
-                        f"Selected first issue (all are low confidence) out of {len(group)} duplicates")
-
-                deduplicated.append(selected)
-
+        deduplicated = deduplicate_issues(issues)
         logger.info(
             f"Deduplication reduced {len(issues)} issues to {len(deduplicated)} unique issues")
         return deduplicated
@@ -397,6 +745,8 @@ class ComplianceService:
         Determines if two compliance issues are similar enough to be considered duplicates.
         Prioritizes exact clinical text matches (non-compliant text).
 
+        To check one issue against many, use an IssueIndex instead.
+
         Args:
             issue1: First compliance issue to compare
             issue2: Second compliance issue to compare
@@ -404,55 +754,7 @@ class ComplianceService:
         Returns:
             True if issues are similar (likely duplicates), False otherwise
         """
-        # Check for exact clinical text match - this is the strongest indicator of a duplicate
-        if issue1.clinical_text.strip() == issue2.clinical_text.strip():
-            logger.debug(
-                f"Found exact clinical text match - marking as duplicate")
-            return True
-
-        # Check if clinical text segments have significant overlap
-        clinical_overlap = self._calculate_text_overlap(
-            issue1.clinical_text,
-            issue2.clinical_text
-        )
-
-        # Check if compliance text segments have significant overlap
-        compliance_overlap = self._calculate_text_overlap(
-            issue1.compliance_text,
-            issue2.compliance_text
-        )
-
-        # Check if regulations cited are the same or similar
-        regulation_match = False
-        if issue1.regulation and issue2.regulation:
-            # Extract section numbers for comparison (e.g., '4.1.2' from 'ICH GCP Section 4.1.2')
-            reg1 = re.sub(r'[^0-9.]', '', issue1.regulation)
-            reg2 = re.sub(r'[^0-9.]', '', issue2.regulation)
-            regulation_match = reg1 == reg2
-
-        # Calculate similarity in suggestions
-        suggestion_overlap = self._calculate_text_overlap(
-            issue1.suggested_edit,
-            issue2.suggested_edit
-        )
-
-        # Define thresholds for similarity
-        TEXT_SIMILARITY_THRESHOLD = 0.8  # Increased from 0.6 to be more strict
-
-        # Strong similarity indicators
-        exact_clinical_overlap = clinical_overlap > 0.95  # Almost exact match
-
-        # Issue is similar if clinical texts have significant overlap
-        # This prioritizes the non-compliant text over other factors
-        if exact_clinical_overlap:
-            logger.debug(
-                f"Found high clinical text overlap ({clinical_overlap:.2f}) - marking as duplicate")
-            return True
-
-        # Otherwise, require significant overlap in multiple criteria
-        return (clinical_overlap > TEXT_SIMILARITY_THRESHOLD and
-                (compliance_overlap > TEXT_SIMILARITY_THRESHOLD or suggestion_overlap > TEXT_SIMILARITY_THRESHOLD)) or \
-               (clinical_overlap > TEXT_SIMILARITY_THRESHOLD and regulation_match)
+        return is_similar(IssueFeatures(issue1), IssueFeatures(issue2))
 
     def _calculate_text_overlap(self, text1: str, text2: str) -> float:
         """
@@ -465,41 +767,75 @@ class ComplianceService:
         Returns:
             Similarity score between 0.0 and 1.0
         """
-        if not text1 or not text2:
-            return 0.0
-
-        # Normalize texts for comparison
-        t1 = text1.lower().strip()
-        t2 = text2.lower().strip()
-
-        # Handle empty strings
-        if not t1 or not t2:
-            return 0.0
-
         # Simple Jaccard similarity based on word sets
-        words1 = set(t1.split())
-        words2 = set(t2.split())
+        return text_overlap(word_set(text1), word_set(text2))
 
-        intersection = len(words1.intersection(words2))
-        union = len(words1.union(words2))
+    def _full_document_mode(self, clinical_doc_content: str, compliance_doc_content: str) -> str:
+        """
+        Choose how the whole-document pass runs (FULL_DOCUMENT_MODE).
+
+        In "auto" mode the documents are analyzed directly when the estimated prompt fits
+        FULL_DOCUMENT_MAX_PROMPT_TOKENS, and through section digests otherwise.
 
-        if union == 0:  # Handle edge case
-            return 0.0
+        Returns:
+            "direct" or "map_reduce"
+        """
+        mode = settings.FULL_DOCUMENT_MODE
+        if mode in ("direct", "map_reduce"):
+            return mode
 
-        return intersection / union
+        prompt_tokens = estimate_tokens(WHOLE_DOCUMENT_ANALYSIS_PROMPT) + estimate_tokens(
+            get_whole_document_analysis_prompt(clinical_doc_content, compliance_doc_content))
+        mode = "direct" if prompt_tokens <= settings.FULL_DOCUMENT_MAX_PROMPT_TOKENS else "map_reduce"
+        logger.info(
+            f"Whole-document prompt estimated at {prompt_tokens} tokens (limit {settings.FULL_DOCUMENT_MAX_PROMPT_TOKENS}); using {mode} mode")
+        return mode
 
-    async def _analyze_full_documents(self, clinical_doc_content: str, compliance_doc_content: str) -> List[ComplianceIssue]:
+    async def _analyze_full_documents(self, clinical_doc_content: str, compliance_doc_content: str,
+                                      limiter: Optional[LLMRateLimiter] = None) -> List[ComplianceIssue]:
         """
-        Analyzes the full documents directly without chunking.
+        Analyzes the full documents without chunking.
         This is specifically designed to catch issues that might be missed by chunking.
 
+        Documents that fit into one prompt are sent directly. Larger documents are
+        condensed into section digests first and the holistic pass runs over the
+        digests (map-reduce), so its cost stays bounded. A direct prompt rejected for
+        exceeding the context window falls back to map-reduce.
+
         Args:
             clinical_doc_content: The full clinical document content
             compliance_doc_content: The full compliance document content
+            limiter: Optional rate limiter of the current review
 
         Returns:
             List of compliance issues with position information
+
+        Raises:
+            Exception: If the LLM calls fail or the reply cannot be parsed
         """
+        mode = self._full_document_mode(clinical_doc_content, compliance_doc_content)
+        trace = current_trace()
+        if trace is not None:
+            trace.attributes["full_document_mode"] = mode
+
+        if mode == "direct":
+            try:
+                return await self._analyze_full_documents_direct(
+                    clinical_doc_content, compliance_doc_content, limiter)
+            except Exception as e:
+                if not _is_context_length_error(e):
+                    raise
+                logger.warning(
+                    f"Whole-document prompt exceeds the context window, falling back to map-reduce: {e}")
+                if trace is not None:
+                    trace.attributes["full_document_mode"] = "map_reduce"
+
+        return await self._analyze_full_documents_map_reduce(
+            clinical_doc_content, compliance_doc_content, limiter)
+
+    async def _analyze_full_documents_direct(self, clinical_doc_content: str, compliance_doc_content: str,
+                                             limiter: Optional[LLMRateLimiter]) -> List[ComplianceIssue]:
+        """Whole-document pass with both documents in a single prompt."""
         # Use comprehensive whole document analysis prompt
         system_prompt = WHOLE_DOCUMENT_ANALYSIS_PROMPT
 
@@ -512,134 +848,286 @@ class ComplianceService:
             HumanMessage(content=human_prompt)
         ]
 
-        # Call OpenAI API
+        response = await self._invoke_llm(messages, limiter)
+        llm_issues = self._parse_document_issues(response.content)
+        return self._locate_document_issues(
+            llm_issues, clinical_doc_content, compliance_doc_content, analysis="direct")
+
+    async def _analyze_full_documents_map_reduce(self, clinical_doc_content: str, compliance_doc_content: str,
+                                                 limiter: Optional[LLMRateLimiter]) -> List[ComplianceIssue]:
+        """
+        Whole-document pass over section digests.
+
+        Both documents are condensed into digests of verbatim statements (cached per
+        document), which are trimmed to the prompt budget and analyzed together. The
+        quotes of the reported issues are located in the full documents.
+        """
+        clinical_digests, compliance_digests = await asyncio.gather(
+            self._document_digests(clinical_doc_content, "clinical trial document", limiter),
+            self._document_digests(compliance_doc_content, "compliance document", limiter))
+
+        # The holistic prompt gets the same budget as a direct prompt, half per document
+        template_tokens = estimate_tokens(WHOLE_DOCUMENT_ANALYSIS_PROMPT) + estimate_tokens(
+            get_digest_analysis_prompt("", ""))
+        digest_chars = max(0, settings.FULL_DOCUMENT_MAX_PROMPT_TOKENS - template_tokens) * CHARS_PER_TOKEN // 2
+
+        def render(digests: List[TextWithOffset], document: str) -> str:
+            # Leave room for the section headings
+            budget = max(0, digest_chars - SECTION_HEADING_CHARS * len(digests))
+            return format_digest(fit_digests(digests, budget), len(document))
+
+        messages = [
+            SystemMessage(content=WHOLE_DOCUMENT_ANALYSIS_PROMPT),
+            HumanMessage(content=get_digest_analysis_prompt(
+                render(clinical_digests, clinical_doc_content),
+                render(compliance_digests, compliance_doc_content)))
+        ]
+        with span("holistic", clinical_sections=len(clinical_digests),
+                  compliance_sections=len(compliance_digests)):
+            response = await self._invoke_llm(messages, limiter)
+
+        llm_issues = self._parse_document_issues(response.content)
+        return self._locate_document_issues(
+            llm_issues, clinical_doc_content, compliance_doc_content, analysis="map_reduce")
+
+    async def _document_digests(self, document: str, document_type: str,
+                                limiter: Optional[LLMRateLimiter]) -> List[TextWithOffset]:
+        """
+        Condense a document into one digest per section, reusing cached digests.
+
+        Args:
+            document: Full document text
+            document_type: Kind of document, for the prompt
+            limiter: Optional rate limiter of the current review
+
+        Returns:
+            Digests with the offsets of their sections
+        """
+        section_chars = max(1, settings.DIGEST_SECTION_TOKENS) * CHARS_PER_TOKEN
+        max_statements = max(1, settings.DIGEST_MAX_STATEMENTS)
+
+        cache = get_digest_cache() if settings.DIGEST_CACHE_ENABLED else None
+        key = None
+        if cache is not None:
+            # The document type is part of the prompt, so it is part of the key
+            key = cache.make_key(document, strategy=f"{DIGEST_PROMPT_VERSION}:{document_type}:{max_statements}",
+                                 chunk_size=section_chars, chunk_overlap=0,
+                                 model=getattr(self.llm_client, "model_name", None))
+            # A forced refresh recomputes the digests as well
+            digests = None if llm_cache_bypassed() else await asyncio.to_thread(cache.get, key)
+            if digests is not None:
+                record_cache("digests", hits=1)
+                logger.info(f"Using cached digests of the {document_type} ({len(digests)} sections)")
+                return digests
+            record_cache("digests", misses=1)
+
+        sections = split_sections(document, section_chars)
+        with span("digest", document_type=document_type, sections=len(sections)):
+            responses = await asyncio.gather(*(
+                self._invoke_llm([
+                    SystemMessage(content=DOCUMENT_DIGEST_SYSTEM_PROMPT),
+                    HumanMessage(content=get_document_digest_prompt(
+                        section.text, document_type, max_statements))
+                ], limiter)
+                for section in sections
+            ))
+        digests = [TextWithOffset(text=parse_digest(response.content, max_statements), offset=section.offset)
+                   for section, response in zip(sections, responses)]
+        logger.info(f"Condensed the {document_type} into {len(digests)} section digests")
+
+        if cache is not None:
+            await asyncio.to_thread(cache.put, key, digests,
+                                    {"strategy": DIGEST_PROMPT_VERSION, "document_type": document_type})
+        return digests
+
+    @staticmethod
+    def _parse_document_issues(response_content: str) -> List[LLMComplianceIssue]:
+        """
+        Parse the issues of a whole-document analysis reply.
+
+        Args:
+            response_content: LLM reply
+
+        Returns:
+            The issues reported by the LLM
+
+        Raises:
+            ValueError: If the reply holds no parseable issue list
+        """
         try:
-            response = await self.llm_client.ainvoke(messages)
-            response_content = response.content
+            # Try to extract JSON
+            if "```json" in response_content:
+                json_str = response_content.split(
+                    "```json")[1].split("```")[0].strip()
+            elif "```" in response_content:
+                json_str = response_content.split("```")[1].strip()
+            else:
+                json_str = response_content.strip()
 
-            # Parse response to extract compliance issues
+            # Parse and validate
             try:
-                # Try to extract JSON
-                if "```json" in response_content:
-                    json_str = response_content.split(
-                        "```json")[1].split("```")[0].strip()
-                elif "```" in response_content:
-                    json_str = response_content.split("```")[1].strip()
-                else:
-                    json_str = response_content.strip()
+                issue_list = ComplianceIssueList.model_validate_json(
+                    json_str)
+                llm_issues = issue_list.issues
+            except Exception as validation_err:
+                # Fall back to manual parsing
+                logger.warning(
+                    f"Pydantic validation failed: {validation_err}. Falling back to manual parsing.")
+                data = json.loads(json_str)
 
-                # Parse and validate
-                try:
-                    issue_list = ComplianceIssueList.model_validate_json(
-                        json_str)
-                    llm_issues = issue_list.issues
-                except Exception as validation_err:
-                    # Fall back to manual parsing
-                    logger.warning(
-                        f"Pydantic validation failed: {validation_err}. Falling back to manual parsing.")
-                    data = json.loads(json_str)
+                # Check if we have a category-based structure (any key other than 'issues' that contains a list)
+                found_categories = [key for key in data.keys(
+                ) if key != 'issues' and isinstance(data[key], list)]
 
-                    # Check if we have a category-based structure (any key other than 'issues' that contains a list)
-                    found_categories = [key for key in data.keys(
-                    ) if key != 'issues' and isinstance(data[key], list)]
+                if found_categories:
+                    logger.info(
+                        f"Found category-based structure with {len(found_categories)} categories")
+                    combined_issues = []
 
-                    if found_categories:
+                    # Collect issues from all categories dynamically
+                    for category in found_categories:
+                        category_issues = data[category]
                         logger.info(
-                            f"Found category-based structure with {len(found_categories)} categories")
-                        combined_issues = []
+                            f"Found '{category}' with {len(category_issues)} issues")
+                        combined_issues.extend(category_issues)
 
-                        # Collect issues from all categories dynamically
-                        for category in found_categories:
-                            category_issues = data[category]
-                            logger.info(
-                                f"Found '{category}' with {len(category_issues)} issues")
-                            combined_issues.extend(category_issues)
+                    llm_issues = [LLMComplianceIssue(
+                        **issue) for issue in combined_issues]
+                    logger.info(
+                        f"Combined {len(llm_issues)} issues from all categories")
+                else:
+                    # Standard structure with 'issues' key
+                    llm_issues = [LLMComplianceIssue(
+                        **issue) for issue in data.get("issues", [])]
+
+            return llm_issues
+        except Exception as parsing_err:
+            logger.error(
+                f"Error parsing whole-document analysis response: {parsing_err}\nResponse: {response_content}")
+            raise ValueError(f"Unparseable whole-document analysis response: {parsing_err}") from parsing_err
+
+    def _locate_document_issues(self, llm_issues: List[LLMComplianceIssue], clinical_doc_content: str,
+                                compliance_doc_content: str, analysis: str) -> List[ComplianceIssue]:
+        """
+        Convert whole-document issues to ComplianceIssues located in the full documents.
 
-                        llm_issues = [LLMComplianceIssue(
-                            **issue) for issue in combined_issues]
-                        logger.info(
-                            f"Combined {len(llm_issues)} issues from all categories")
-                    else:
-                        # Standard structure with 'issues' key
-                        llm_issues = [LLMComplianceIssue(
-                            **issue) for issue in data.get("issues", [])]
+        Args:
+            llm_issues: Issues reported by the LLM
+            clinical_doc_content: The full clinical document content
+            compliance_doc_content: The full compliance document content
+            analysis: Mode of the whole-document pass, stored in the issue metadata
 
-                # Convert to ComplianceIssue objects
-                issues = []
-                for llm_issue in llm_issues:
-                    # Find positions in the document
-                    clinical_start, clinical_end = find_text_offsets(
-                        llm_issue.clinical_text, clinical_doc_content)
-                    compliance_start, compliance_end = find_text_offsets(
-                        llm_issue.compliance_text, compliance_doc_content)
+        Returns:
+            List of compliance issues with position information
+        """
+        # Convert to ComplianceIssue objects, indexing each document once
+        clinical_index = NormalizedText(clinical_doc_content)
+        compliance_index = NormalizedText(compliance_doc_content)
+        issues = []
+        for llm_issue in llm_issues:
+            # Find positions in the document
+            with timed("verification"):
+                clinical_start, clinical_end = find_text_offsets(
+                    llm_issue.clinical_text, clinical_index)
+                compliance_start, compliance_end = find_text_offsets(
+                    llm_issue.compliance_text, compliance_index)
+
+            # Create issue with position information
+            issue = ComplianceIssue(
+                id=self._generate_issue_id(),
+                clinical_text=llm_issue.clinical_text,
+                compliance_text=llm_issue.compliance_text,
+                explanation=llm_issue.explanation,
+                suggested_edit=llm_issue.suggested_edit,
+                confidence=llm_issue.confidence,
+                regulation=llm_issue.regulation,
+                clinical_text_start_char=clinical_start,
+                clinical_text_end_char=clinical_end,
+                compliance_text_start_char=compliance_start,
+                compliance_text_end_char=compliance_end,
+                metadata={"analysis": analysis}
+            )
+            issues.append(issue)
 
-                    # Create issue with position information
-                    issue = ComplianceIssue(
-                        id=self._generate_issue_id(),
-                        clinical_text=llm_issue.clinical_text,
-                        compliance_text=llm_issue.compliance_text,
-                        explanation=llm_issue.explanation,
-                        suggested_edit=llm_issue.suggested_edit,
-                        confidence=llm_issue.confidence,
-                        regulation=llm_issue.regulation,
-                        clinical_text_start_char=clinical_start,
-                        clinical_text_end_char=clinical_end,
-                        compliance_text_start_char=compliance_start,
-                        compliance_text_end_char=compliance_end,
-                        metadata={"analysis": "direct"}
-                    )
-                    issues.append(issue)
+        return issues
 
-                return issues
+    async def _analyze_chunk_pairs(self, pairs: List[ChunkPair],
+                                   clinical_chunks: List[str], clinical_offsets: List[int],
+                                   compliance_chunks: List[str], compliance_offsets: List[int],
+                                   limiter: LLMRateLimiter,
+                                   score_confidence: bool = True,
+                                   on_pair_done: Optional[Callable[[ChunkPair, List[ComplianceIssue]], None]] = None
+                                   ) -> List[ComplianceIssue]:
+        """
+        Analyzes the selected chunk pairs concurrently under the review's rate limiter.
 
-            except Exception as parsing_err:
-                logger.error(
-                    f"Error parsing direct analysis response: {parsing_err}\nResponse: {response_content}")
-                return []
+        Issues are returned in pair order regardless of completion order; on_pair_done
+        is called in completion order as each pair finishes.
 
-        except Exception as e:
-            logger.error(f"Error in direct document analysis: {str(e)}")
-            return []
+        Args:
+            pairs: Chunk pairs in execution order
+            clinical_chunks: Clinical document chunks
+            clinical_offsets: Character offsets of the clinical chunks
+            compliance_chunks: Compliance document chunks
+            compliance_offsets: Character offsets of the compliance chunks
+            limiter: Rate limiter of the current review
+            score_confidence: Whether each pair scores the confidence of its own issues
+            on_pair_done: Optional callback receiving each pair and its issues (empty on failure)
 
-    async def _perform_basic_pairing_analysis(self, clinical_chunks, clinical_offsets,
-                                              compliance_chunks, compliance_offsets,
-                                              all_compliance_issues, processed_pairs):
-        """
-        Helper for basic (limited, sequential) chunk pairing analysis fallback.
-        Used when embedding-based pairing is not available.
+        Returns:
+            List of compliance issues from all pairs
         """
-        # Process a limited combination to optimize API calls
-        # Process max 3 clinical chunks
-        max_clinical_chunks = min(len(clinical_chunks), 3)
-        # Process max 2 compliance chunks per clinical chunk
-        max_compliance_chunks = min(len(compliance_chunks), 2)
+        if not pairs:
+            return []
 
-        for i in range(max_clinical_chunks):
-            logger.info(
-                f"Processing clinical chunk {i+1}/{max_clinical_chunks}")
+        logger.info(
+            f"Analyzing {len(pairs)} chunk pairs with up to {limiter.max_concurrency} concurrent LLM calls")
 
-            # For each clinical chunk, check against limited compliance chunks
-            for j in range(max_compliance_chunks):
-                # Skip if already processed
-                if (i, j) in processed_pairs:
-                    continue
+        # Index each chunk once; a chunk usually takes part in several pairs
+        clinical_indexes = {pair.clinical_index: NormalizedText(clinical_chunks[pair.clinical_index])
+                            for pair in pairs}
+        compliance_indexes = {pair.compliance_index: NormalizedText(compliance_chunks[pair.compliance_index])
+                              for pair in pairs}
 
-                logger.info(
-                    f"  Comparing against compliance chunk {j+1}/{max_compliance_chunks}")
+        async def analyze_pair(pair: ChunkPair) -> List[ComplianceIssue]:
+            pair_issues: List[ComplianceIssue] = []
+            try:
+                with span("chunk_pair", clinical_index=pair.clinical_index,
+                          compliance_index=pair.compliance_index):
+                    pair_issues = await self._analyze_chunk_pair(
+                        clinical_chunks[pair.clinical_index],
+                        compliance_chunks[pair.compliance_index],
+                        clinical_offsets[pair.clinical_index],
+                        compliance_offsets[pair.compliance_index],
+                        limiter=limiter,
+                        score_confidence=score_confidence,
+                        clinical_index=clinical_indexes[pair.clinical_index],
+                        compliance_index=compliance_indexes[pair.compliance_index]
+                    )
+                return pair_issues
+            finally:
+                if on_pair_done is not None:
+                    on_pair_done(pair, pair_issues)
 
-                # Analyze this pair
-                issues = await self._analyze_chunk_pair(
-                    clinical_chunks[i],
-                    compliance_chunks[j],
-                    clinical_offsets[i],
-                    compliance_offsets[j]
-                )
+        results = await asyncio.gather(*(analyze_pair(pair) for pair in pairs),
+                                       return_exceptions=True)
 
-                all_compliance_issues.extend(issues)
-                processed_pairs.add((i, j))
+        issues = []
+        for pair, result in zip(pairs, results):
+            if isinstance(result, BaseException):
+                logger.error(
+                    f"Error analyzing chunk pair (clinical {pair.clinical_index+1}, compliance {pair.compliance_index+1}): {result}")
+                continue
+            issues.extend(result)
+
+        return issues
 
     async def _analyze_chunk_pair(self, clinical_chunk: str, compliance_chunk: str,
-                                  clinical_chunk_offset: int, compliance_chunk_offset: int) -> List[ComplianceIssue]:
+                                  clinical_chunk_offset: int, compliance_chunk_offset: int,
+                                  limiter: Optional[LLMRateLimiter] = None,
+                                  score_confidence: bool = True,
+                                  clinical_index: Optional[NormalizedText] = None,
+                                  compliance_index: Optional[NormalizedText] = None) -> List[ComplianceIssue]:
         """
         Analyzes a specific chunk pair using LLM, verifies, and calculates positions.
 
@@ -648,6 +1136,10 @@ class ComplianceService:
             compliance_chunk: The compliance document chunk
             clinical_chunk_offset: Character offset of clinical chunk in original document
             compliance_chunk_offset: Character offset of compliance chunk in original document
+            limiter: Optional rate limiter of the current review
+            score_confidence: Whether to run the confidence assessment for this pair's issues
+            clinical_index: Prebuilt NormalizedText of the clinical chunk
+            compliance_index: Prebuilt NormalizedText of the compliance chunk
 
         Returns:
             List of compliance issues with position information
@@ -664,7 +1156,7 @@ class ComplianceService:
 
         # Call OpenAI API (Azure or standard)
         try:
-            response = await self.llm_client.ainvoke(messages)
+            response = await self._invoke_llm(messages, limiter)
             response_content = response.content
 
             # Parse response to extract compliance issues
@@ -746,25 +1238,32 @@ class ComplianceService:
                         llm_issues = []
 
                 # Convert to ComplianceIssue objects with position information
+                clinical_source = clinical_index if clinical_index is not None else NormalizedText(clinical_chunk)
+                compliance_source = compliance_index if compliance_index is not None else NormalizedText(compliance_chunk)
                 issues = []
                 for llm_issue in llm_issues:
-                    # Verify clinical text exists in source
-                    if not verify_text_in_source(llm_issue.clinical_text, clinical_chunk):
+                    # Verify clinical text exists in source; the verified span is
+                    # reused for highlighting so the search isn't repeated
+                    with timed("verification"):
+                        clinical_span = locate_verified_text(
+                            llm_issue.clinical_text, clinical_source)
+                    if clinical_span is None:
                         logger.warning(
                             f"Skipping issue - clinical text not verified in source: '{llm_issue.clinical_text[:30]}...'")
                         continue
 
                     # Verify compliance text exists in source
-                    if not verify_text_in_source(llm_issue.compliance_text, compliance_chunk):
+                    with timed("verification"):
+                        compliance_span = locate_verified_text(
+                            llm_issue.compliance_text, compliance_source)
+                    if compliance_span is None:
                         logger.warning(
                             f"Skipping issue - compliance text not verified in source: '{llm_issue.compliance_text[:30]}...'")
                         continue
 
-                    # Find exact character positions for highlighting
-                    clinical_start, clinical_end = find_text_offsets(
-                        llm_issue.clinical_text, clinical_chunk)
-                    compliance_start, compliance_end = find_text_offsets(
-                        llm_issue.compliance_text, compliance_chunk)
+                    # Exact character positions for highlighting
+                    clinical_start, clinical_end = clinical_span
+                    compliance_start, compliance_end = compliance_span
 
                     # Adjust positions relative to original document
                     if clinical_start is not None and clinical_end is not None:
@@ -775,47 +1274,14 @@ class ComplianceService:
                         compliance_start += compliance_chunk_offset
                         compliance_end += compliance_chunk_offset
 
-                    # Use dedicated numerical confidence assessment prompt
-                    confidence_score = llm_issue.confidence  # Default fallback
-                    try:
-                        # Create a call to assess confidence numerically
-                        confidence_prompt = get_confidence_assessment_prompt(
-                            llm_issue.clinical_text,
-                            llm_issue.compliance_text
-                        )
-                        confidence_messages = [
-                            HumanMessage(content=confidence_prompt)]
-                        confidence_response = await self.llm_client.ainvoke(confidence_messages)
-
-                        # Parse the confidence score (expecting just a number)
-                        confidence_text = confidence_response.content.strip()
-                        try:
-                            # Extract just the number if there's extra text
-                            match = re.search(r'\d+\.?\d*', confidence_text)
-                            if match:
-                                confidence_value = float(match.group(0))
-                                # Convert numerical score to high/low string format
-                                confidence_score = 'high' if confidence_value >= 0.5 else 'low'
-                                logger.debug(
-                                    f"Set confidence to {confidence_score} based on numerical value {confidence_value}")
-                            else:
-                                logger.warning(
-                                    f"No numerical confidence value found in response: '{confidence_text}'")
-                        except Exception as cs_err:
-                            logger.warning(
-                                f"Error parsing confidence score: {cs_err}")
-                    except Exception as conf_err:
-                        logger.warning(
-                            f"Error getting confidence assessment: {conf_err}")
-
-                    # Create issue with position information and enhanced confidence
+                    # Create issue with position information; confidence is refined by the batched assessment
                     issue = ComplianceIssue(
                         id=self._generate_issue_id(),
                         clinical_text=llm_issue.clinical_text,
                         compliance_text=llm_issue.compliance_text,
                         explanation=llm_issue.explanation,
                         suggested_edit=llm_issue.suggested_edit,
-                        confidence=confidence_score,
+                        confidence=llm_issue.confidence,
                         regulation=llm_issue.regulation,
                         clinical_text_start_char=clinical_start,
                         clinical_text_end_char=clinical_end,
@@ -826,6 +1292,10 @@ class ComplianceService:
                     )
                     issues.append(issue)
 
+                # Score all verified issues of this pair in one call
+                if score_confidence:
+                    await self._score_issue_confidence(issues, limiter)
+
                 return issues
 
             except Exception as parsing_err:
@@ -837,6 +1307,174 @@ class ComplianceService:
             logger.error(f"LLM invocation error: {str(e)}")
             return []
 
+    @staticmethod
+    def _parse_confidence_value(confidence_text: str) -> Optional[float]:
+        """
+        Extracts a numerical confidence score from a single-issue assessment response.
+
+        Args:
+            confidence_text: Raw LLM response (expected to be just a number)
+
+        Returns:
+            The score, or None if no number was found
+        """
+        # Extract just the number if there's extra text
+        match = re.search(r'\d+\.?\d*', confidence_text)
+        if not match:
+            return None
+        return float(match.group(0))
+
+    async def _assess_confidence_single(self, clinical_text: str, compliance_text: str,
+                                        limiter: Optional[LLMRateLimiter] = None) -> Optional[float]:
+        """
+        Assesses the confidence of one issue with the dedicated numerical prompt.
+
+        Args:
+            clinical_text: Clinical text of the issue
+            compliance_text: Compliance text of the issue
+            limiter: Optional rate limiter of the current review
+
+        Returns:
+            Confidence score between 0.0 and 1.0, or None if it could not be obtained
+        """
+        try:
+            confidence_prompt = get_confidence_assessment_prompt(
+                clinical_text, compliance_text)
+            confidence_response = await self._invoke_llm(
+                [HumanMessage(content=confidence_prompt)], limiter)
+
+            # Parse the confidence score (expecting just a number)
+            confidence_text = confidence_response.content.strip()
+            confidence_value = self._parse_confidence_value(confidence_text)
+            if confidence_value is None:
+                logger.warning(
+                    f"No numerical confidence value found in response: '{confidence_text}'")
+            return confidence_value
+        except Exception as conf_err:
+            logger.warning(
+                f"Error getting confidence assessment: {conf_err}")
+            return None
+
+    async def _assess_confidence_batch(self, snippet_pairs: List[Tuple[str, str]],
+                                       limiter: Optional[LLMRateLimiter] = None) -> Dict[int, float]:
+        """
+        Assesses the confidence of a batch of issues in a single structured call.
+
+        Args:
+            snippet_pairs: (clinical_text, compliance_text) for each issue
+            limiter: Optional rate limiter of the current review
+
+        Returns:
+            Mapping of issue index to confidence score; indices that failed to parse are missing
+        """
+        human_prompt = get_batch_confidence_assessment_prompt(snippet_pairs)
+
+        try:
+            response = await self._invoke_llm(
+                [HumanMessage(content=human_prompt)], limiter)
+            response_content = response.content
+        except Exception as e:
+            logger.warning(f"Error getting batched confidence assessment: {e}")
+            return {}
+
+        # Handle cases where response might contain markdown code blocks
+        if "```json" in response_content:
+            json_str = response_content.split(
+                "```json")[1].split("```")[0].strip()
+        elif "```" in response_content:
+            json_str = response_content.split("```")[1].strip()
+        else:
+            json_str = response_content.strip()
+
+        try:
+            score_list = ConfidenceScoreList.model_validate_json(json_str)
+            raw_scores = [(score.index, score.confidence)
+                          for score in score_list.scores]
+        except Exception as validation_err:
+            # Fall back to lenient parsing, keeping whichever entries are usable
+            logger.warning(
+                f"Batched confidence validation failed: {validation_err}. Falling back to manual parsing.")
+            raw_scores = []
+            try:
+                data = json.loads(json_str)
+                for entry in data.get("scores", []) if isinstance(data, dict) else []:
+                    try:
+                        raw_scores.append(
+                            (int(entry["index"]), float(entry["confidence"])))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+            except Exception as json_err:
+                logger.warning(
+                    f"Unable to parse batched confidence response: {json_err}")
+
+        scores = {}
+        for index, value in raw_scores:
+            if 0 <= index < len(snippet_pairs) and 0.0 <= value <= 1.0:
+                scores[index] = value
+        return scores
+
+    async def _score_issue_confidence(self, issues: List[ComplianceIssue],
+                                      limiter: Optional[LLMRateLimiter] = None) -> None:
+        """
+        Refines the confidence of issues using batched numerical assessment.
+
+        Issues are scored in batches of CONFIDENCE_BATCH_SIZE with one LLM call per batch.
+        Only issues missing from a batched reply fall back to individual calls. Issues
+        that cannot be scored keep the confidence reported by the analysis prompt.
+
+        Args:
+            issues: Issues to score; their confidence is updated in place
+            limiter: Optional rate limiter of the current review
+        """
+        if not issues:
+            return
+
+        with span("confidence_scoring", issues=len(issues)):
+            await self._score_issue_confidence_batches(issues, limiter)
+
+    async def _score_issue_confidence_batches(self, issues: List[ComplianceIssue],
+                                              limiter: Optional[LLMRateLimiter]) -> None:
+        """Scores the confidence of non-empty issues for _score_issue_confidence."""
+        snippet_pairs = [(issue.clinical_text, issue.compliance_text)
+                         for issue in issues]
+        batch_size = max(1, settings.CONFIDENCE_BATCH_SIZE)
+        batch_starts = list(range(0, len(snippet_pairs), batch_size))
+
+        batch_results = await asyncio.gather(*(
+            self._assess_confidence_batch(
+                snippet_pairs[start:start + batch_size], limiter)
+            for start in batch_starts
+        ))
+
+        scores: Dict[int, float] = {}
+        for start, batch_scores in zip(batch_starts, batch_results):
+            for index, value in batch_scores.items():
+                scores[start + index] = value
+
+        # Fall back to per-issue calls only for the items that failed to parse
+        missing = [index for index in range(
+            len(issues)) if index not in scores]
+        if missing:
+            logger.info(
+                f"Falling back to individual confidence assessment for {len(missing)} of {len(issues)} issues")
+            fallback_scores = await asyncio.gather(*(
+                self._assess_confidence_single(
+                    issues[index].clinical_text, issues[index].compliance_text, limiter)
+                for index in missing
+            ))
+            for index, value in zip(missing, fallback_scores):
+                if value is not None:
+                    scores[index] = value
+
+        # Convert numerical scores to high/low string format
+        for index, confidence_value in scores.items():
+            issues[index].confidence = 'high' if confidence_value >= 0.5 else 'low'
+            logger.debug(
+                f"Set confidence to {issues[index].confidence} based on numerical value {confidence_value}")
+
+        logger.info(
+            f"Scored confidence for {len(scores)} of {len(issues)} issues using {len(batch_starts)} batched call(s)")
+
     async def apply_suggestion(self, clinical_text: str, suggested_edit: str, surrounding_context: str, edit_type: str = "modification") -> str:
         """
         Applies a suggested edit using an LLM for intelligent integration.
@@ -867,7 +1505,7 @@ class ComplianceService:
             ]
 
             # Call OpenAI API
-            response = await self.llm_client.ainvoke(messages)
+            response = await self._invoke_llm(messages)
             revised_text = response.content.strip()
 
             # Ensure we're not getting something unrelated like "I'll apply the suggested edit..."
@@ -920,7 +1558,7 @@ class ComplianceService:
             ]
 
             # Call OpenAI API
-            response = await self.llm_client.ainvoke(messages)
+            response = await self._invoke_llm(messages)
             new_content = response.content.strip()
 
             # Clean up any markdown or commentary
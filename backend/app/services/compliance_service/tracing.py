@@ -0,0 +1,379 @@
+"""
+Per-review tracing of the compliance service.
+
+Every review runs inside a ReviewTrace. The phases of the review (chunking,
+embedding, pairing, chunk pairs, confidence scoring, the whole-document pass,
+deduplication) are spans with their durations. LLM calls add the token usage
+reported in the LangChain response metadata to the span they are made in, and
+the chunk, embedding and LLM response caches count their hits and misses.
+Short, frequent steps such as quote verification are accumulated as timers
+instead of spans.
+
+The trace and the current span are held in context variables, so tasks created
+during a review report to it without passing the trace around; outside of a
+review the recording functions do nothing. A finished trace is summarized by
+to_dict (stored with the review) and added to the process-wide Prometheus-style
+counters of review_metrics.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_current_trace: ContextVar[Optional["ReviewTrace"]] = ContextVar("review_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("review_span", default=None)
+
+# Token counters of spans and phases
+TOKEN_FIELDS = ("llm_calls", "cached_calls", "prompt_tokens", "completion_tokens", "total_tokens")
+
+
+class Span:
+    """
+    A timed step of a review, with the LLM usage of the calls made in it.
+    """
+
+    __slots__ = ("name", "parent", "start", "duration", "attributes") + TOKEN_FIELDS
+
+    def __init__(self, name: str, parent: Optional[str], start: float, attributes: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.start = start
+        self.duration: Optional[float] = None
+        self.attributes = attributes
+        for field in TOKEN_FIELDS:
+            setattr(self, field, 0)
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        """Serialize the span with times in milliseconds since origin."""
+        data = {
+            "name": self.name,
+            "parent": self.parent,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((self.duration or 0.0) * 1000, 3)
+        }
+        data.update((field, getattr(self, field)) for field in TOKEN_FIELDS if getattr(self, field))
+        if self.attributes:
+            data["attributes"] = self.attributes
+        return data
+
+
+class ReviewTrace:
+    """
+    Spans, timers, token usage and cache statistics of one review.
+    """
+
+    def __init__(self, max_spans: Optional[int] = None):
+        """
+        Initialize the trace.
+
+        Args:
+            max_spans: Maximum number of spans kept individually (defaults to
+                REVIEW_TRACE_MAX_SPANS); further spans only count towards the phase totals
+        """
+        self.max_spans = settings.REVIEW_TRACE_MAX_SPANS if max_spans is None else max_spans
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        # Totals per span name: count, seconds and LLM usage
+        self.phases: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: dict.fromkeys(("count", "seconds") + TOKEN_FIELDS, 0))
+        # Accumulated (count, seconds) of frequent steps
+        self.timers: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        # (hits, misses) per cache
+        self.caches: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        self.tokens = dict.fromkeys(TOKEN_FIELDS, 0)
+        self.attributes: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """
+        Time a step of the review; LLM calls made inside it are attributed to it.
+
+        Args:
+            name: Phase name (spans of the same name are totalled together)
+            **attributes: JSON-serializable details of the span
+
+        Yields:
+            The open span
+        """
+        parent = _current_span.get()
+        span = Span(name, parent.name if parent is not None else None, time.perf_counter(), attributes)
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped_spans += 1
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+            span.duration = time.perf_counter() - span.start
+            with self._lock:
+                phase = self.phases[name]
+                phase["count"] += 1
+                phase["seconds"] += span.duration
+                for field in TOKEN_FIELDS:
+                    phase[field] += getattr(span, field)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Add one occurrence of a frequent step to its timer."""
+        with self._lock:
+            timer = self.timers[name]
+            timer[0] += 1
+            timer[1] += seconds
+
+    def record_cache(self, cache: str, hits: int = 0, misses: int = 0) -> None:
+        """Count hits and misses of a cache."""
+        with self._lock:
+            counts = self.caches[cache]
+            counts[0] += hits
+            counts[1] += misses
+
+    def record_llm_usage(self, usage: Dict[str, int], cached: bool) -> None:
+        """
+        Add one LLM call to the trace and to the current span.
+
+        Responses served from the cache count as calls but use no tokens.
+        """
+        values = {
+            "llm_calls": 1,
+            "cached_calls": 1 if cached else 0,
+            "prompt_tokens": 0 if cached else int(usage.get("prompt_tokens") or 0),
+            "completion_tokens": 0 if cached else int(usage.get("completion_tokens") or 0),
+            "total_tokens": 0 if cached else int(usage.get("total_tokens") or 0)
+        }
+        span = _current_span.get()
+        with self._lock:
+            for field, value in values.items():
+                self.tokens[field] += value
+                if span is not None:
+                    setattr(span, field, getattr(span, field) + value)
+
+    def finish(self) -> None:
+        """Stop the review clock and add the trace to the process-wide counters."""
+        if self.finished is None:
+            self.finished = time.perf_counter()
+            review_metrics.observe(self)
+
+    @property
+    def duration(self) -> float:
+        """Seconds from the start of the review to its end (or to now)."""
+        return (self.finished or time.perf_counter()) - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Summarize the trace.
+
+        Returns:
+            JSON-serializable profile of the review: totals per phase, timers, token
+            usage, cache hit rates and the individual spans
+        """
+        with self._lock:
+            return {
+                "duration_ms": round(self.duration * 1000, 3),
+                "attributes": dict(self.attributes),
+                "phases": {name: {**{field: phase[field] for field in ("count",) + TOKEN_FIELDS},
+                                  "duration_ms": round(phase["seconds"] * 1000, 3)}
+                           for name, phase in self.phases.items()},
+                "timers": {name: {"count": count, "duration_ms": round(seconds * 1000, 3)}
+                           for name, (count, seconds) in self.timers.items()},
+                "tokens": dict(self.tokens),
+                "caches": {name: {"hits": hits, "misses": misses,
+                                  "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0}
+                           for name, (hits, misses) in self.caches.items()},
+                "spans": [span.to_dict(self.started) for span in self.spans if span.duration is not None],
+                "dropped_spans": self.dropped_spans
+            }
+
+    def summary(self) -> str:
+        """One-line summary of the slowest phases and the token usage, for the logs."""
+        phases = sorted(self.phases.items(), key=lambda item: item[1]["seconds"], reverse=True)
+        timings = ", ".join(f"{name}={phase['seconds'] * 1000:.0f}ms" for name, phase in phases)
+        return (f"{self.duration * 1000:.0f}ms total ({timings}); {self.tokens['llm_calls']} LLM calls "
+                f"({self.tokens['cached_calls']} cached), {self.tokens['total_tokens']} tokens")
+
+
+@contextmanager
+def review_trace(trace: Optional[ReviewTrace] = None) -> Iterator[ReviewTrace]:
+    """
+    Make a trace the current one for the block and finish it at the end.
+
+    Args:
+        trace: Trace to record into (a new one by default)
+
+    Yields:
+        The current trace
+    """
+    trace = trace if trace is not None else ReviewTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.finish()
+
+
+def current_trace() -> Optional[ReviewTrace]:
+    """Return the trace of the review being run, if any."""
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time a step in the current trace (does nothing outside of a review).
+
+    Args:
+        name: Phase name
+        **attributes: JSON-serializable details of the span
+
+    Yields:
+        The open span, or None without a current trace
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    with trace.span(name, **attributes) as opened:
+        yield opened
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Add the duration of the block to a timer of the current trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_time(name, time.perf_counter() - start)
+
+
+def record_time(name: str, seconds: float) -> None:
+    """Add one occurrence of a frequent step, measured by the caller, to the current trace."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_time(name, seconds)
+
+
+def record_cache(cache: str, hits: int = 0, misses: int = 0) -> None:
+    """Count hits and misses of a cache in the current trace."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record_cache(cache, hits, misses)
+
+
+def record_llm_response(response: Any, cached_client: bool = False) -> None:
+    """
+    Add the token usage of an LLM response to the current trace.
+
+    Args:
+        response: LangChain response message (token usage is read from response_metadata)
+        cached_client: Whether the call went through the LLM response cache, whose
+            hits and misses are then counted as well
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    metadata = getattr(response, "response_metadata", None) or {}
+    cached = bool(metadata.get("cache_hit"))
+    trace.record_llm_usage(metadata.get("token_usage") or {}, cached)
+    if cached_client:
+        trace.record_cache("llm_responses", hits=int(cached), misses=int(not cached))
+
+
+class ReviewMetrics:
+    """
+    Process-wide counters over all finished reviews, in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reviews = 0
+        self.review_seconds = 0.0
+        self.phase_counts: Dict[str, float] = defaultdict(float)
+        self.phase_seconds: Dict[str, float] = defaultdict(float)
+        self.phase_llm_calls: Dict[str, float] = defaultdict(float)
+        self.phase_cached_calls: Dict[str, float] = defaultdict(float)
+        self.phase_tokens: Dict[tuple, float] = defaultdict(float)
+        self.timer_counts: Dict[str, float] = defaultdict(float)
+        self.timer_seconds: Dict[str, float] = defaultdict(float)
+        self.cache_lookups: Dict[tuple, float] = defaultdict(float)
+
+    def observe(self, trace: ReviewTrace) -> None:
+        """Add a finished review to the counters."""
+        with self._lock, trace._lock:
+            self.reviews += 1
+            self.review_seconds += trace.duration
+            for name, phase in trace.phases.items():
+                self.phase_counts[name] += phase["count"]
+                self.phase_seconds[name] += phase["seconds"]
+                self.phase_llm_calls[name] += phase["llm_calls"]
+                self.phase_cached_calls[name] += phase["cached_calls"]
+                self.phase_tokens[(name, "prompt")] += phase["prompt_tokens"]
+                self.phase_tokens[(name, "completion")] += phase["completion_tokens"]
+            for name, (count, seconds) in trace.timers.items():
+                self.timer_counts[name] += count
+                self.timer_seconds[name] += seconds
+            for name, (hits, misses) in trace.caches.items():
+                self.cache_lookups[(name, "hit")] += hits
+                self.cache_lookups[(name, "miss")] += misses
+
+    def render(self) -> str:
+        """
+        Render the counters in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text
+        """
+        families = []
+
+        def family(name: str, help_text: str, samples):
+            lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+            families.append("\n".join(lines))
+
+        with self._lock:
+            family("compliance_reviews_total", "Compliance reviews finished.", [((), self.reviews)])
+            family("compliance_review_seconds_total", "Wall time of the finished reviews.",
+                   [((), round(self.review_seconds, 6))])
+            family("compliance_review_phase_total", "Spans of each review phase.",
+                   [((("phase", name),), value) for name, value in sorted(self.phase_counts.items())])
+            family("compliance_review_phase_seconds_total", "Wall time spent in each review phase.",
+                   [((("phase", name),), round(value, 6)) for name, value in sorted(self.phase_seconds.items())])
+            family("compliance_llm_calls_total", "LLM calls made in each review phase.",
+                   [((("phase", name),), value) for name, value in sorted(self.phase_llm_calls.items())])
+            family("compliance_llm_cached_calls_total", "LLM calls served from the response cache in each phase.",
+                   [((("phase", name),), value) for name, value in sorted(self.phase_cached_calls.items())])
+            family("compliance_llm_tokens_total", "LLM tokens used in each review phase.",
+                   [((("phase", name), ("type", kind)), value)
+                    for (name, kind), value in sorted(self.phase_tokens.items())])
+            family("compliance_review_step_total", "Occurrences of frequent review steps.",
+                   [((("step", name),), value) for name, value in sorted(self.timer_counts.items())])
+            family("compliance_review_step_seconds_total", "Time spent in frequent review steps.",
+                   [((("step", name),), round(value, 6)) for name, value in sorted(self.timer_seconds.items())])
+            family("compliance_cache_lookups_total", "Cache lookups made by reviews.",
+                   [((("cache", name), ("result", result)), value)
+                    for (name, result), value in sorted(self.cache_lookups.items())])
+        return "\n".join(families) + "\n"
+
+
+# Counters of all reviews run by this process
+review_metrics = ReviewMetrics()
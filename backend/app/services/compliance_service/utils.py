@@ -7,24 +7,343 @@ and other common operations used by the compliance service.
 
 import re
 import logging
-from typing import Tuple, Optional
+from collections import Counter
+from typing import Dict, List, Tuple, Optional, Union
+
+import numpy as np
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Conditional import for fuzzy matching
+try:
+    from rapidfuzz import fuzz as rapidfuzz_fuzz
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+    logger.warning(
+        "rapidfuzz not installed. Text verification will use exact and normalized matching only.")
+
 # Constants
 SIMILARITY_THRESHOLD = 0.75  # May need adjustment based on embedding model
 TOP_N_MATCHES = 3
 RAPIDFUZZ_MATCH_THRESHOLD = 85  # Percentage for partial ratio verification
+RAPIDFUZZ_LONG_TEXT_THRESHOLD = 75  # Relaxed threshold for texts longer than 50 characters
+
+# Candidate-window search for fuzzy matching
+MAX_ANCHORS = 8  # Rarest query words used to propose candidate regions
+MAX_CANDIDATE_WINDOWS = 4  # Regions scored with partial_ratio_alignment per lookup
+FULL_SCAN_MAX_CHARS = 2000  # Sources up to this size are scored directly without anchors
+
+
+_WHITESPACE_RUN = re.compile(r'\s+')
+_MULTI_WHITESPACE_RUN = re.compile(r'\s{2,}')
+_WORD = re.compile(r'\w+')
+
+
+def normalize_whitespace(text: str) -> str:
+    """
+    Collapse every run of whitespace into a single space.
+
+    Args:
+        text: Text to normalize
+
+    Returns:
+        Text with whitespace runs collapsed
+    """
+    return _WHITESPACE_RUN.sub(' ', text)
+
+
+class NormalizedText:
+    """
+    Whitespace-normalized view of a document with an offset index back to the original.
+
+    Built once per document in linear time. Holds the normalized string and an int32
+    array mapping each normalized offset to the original offset, so lookups done on
+    the normalized text can be translated back without rescanning the document.
+    """
+
+    def __init__(self, text: str):
+        """
+        Build the index.
+
+        Args:
+            text: Original document text
+        """
+        self.original = text or ""
+        self.normalized = normalize_whitespace(self.original)
+
+        # Keep the first character of every whitespace run, drop the rest
+        keep = np.ones(len(self.original), dtype=bool)
+        for match in _MULTI_WHITESPACE_RUN.finditer(self.original):
+            keep[match.start() + 1:match.end()] = False
+
+        # One entry per normalized character plus a sentinel for the end of the text
+        self.offsets = np.empty(len(self.normalized) + 1, dtype=np.int32)
+        self.offsets[:-1] = np.flatnonzero(keep)
+        self.offsets[-1] = len(self.original)
+
+        # Built lazily on the first fuzzy lookup
+        self._word_positions: Optional[Dict[str, List[int]]] = None
+
+    @classmethod
+    def of(cls, source: Union[str, "NormalizedText"]) -> "NormalizedText":
+        """
+        Return source itself if it is already indexed, otherwise index it.
+
+        Args:
+            source: Raw text or an existing NormalizedText
+
+        Returns:
+            NormalizedText for the source
+        """
+        if isinstance(source, NormalizedText):
+            return source
+        return cls(source)
+
+    def __len__(self) -> int:
+        return len(self.original)
+
+    def to_original(self, normalized_pos: int) -> int:
+        """
+        Map a normalized offset to the original offset.
+
+        Args:
+            normalized_pos: Offset in the normalized text
+
+        Returns:
+            Offset in the original text
+        """
+        normalized_pos = min(max(normalized_pos, 0), len(self.normalized))
+        return int(self.offsets[normalized_pos])
+
+    def to_normalized(self, original_pos: int) -> int:
+        """
+        Map an original offset to the first normalized offset at or after it.
+
+        Args:
+            original_pos: Offset in the original text
+
+        Returns:
+            Offset in the normalized text
+        """
+        # Search with a matching dtype so NumPy doesn't copy the whole array
+        return int(np.searchsorted(self.offsets, np.int32(min(original_pos, len(self.original))), side="left"))
+
+    def span_to_original(self, normalized_start: int, normalized_end: int) -> Tuple[int, int]:
+        """
+        Map a normalized [start, end) span to the original text.
+
+        Args:
+            normalized_start: Span start in the normalized text
+            normalized_end: Span end in the normalized text
+
+        Returns:
+            Tuple of (start, end) offsets in the original text
+        """
+        start = self.to_original(normalized_start)
+        if normalized_end <= normalized_start:
+            return start, start
+        # The end maps to just after the last normalized character of the span
+        return start, self.to_original(normalized_end - 1) + 1
+
+    def find(self, text: str, start: int = 0) -> Optional[Tuple[int, int]]:
+        """
+        Find text in the document ignoring differences in whitespace.
+
+        Args:
+            text: Text to find (normalized internally)
+            start: Original offset to start searching from
+
+        Returns:
+            Tuple of original (start, end) offsets, or None if not found
+        """
+        needle = normalize_whitespace(text).strip()
+        if not needle:
+            return None
+        pos = self.normalized.find(needle, self.to_normalized(start))
+        if pos < 0:
+            return None
+        return self.span_to_original(pos, pos + len(needle))
+
+    def word_positions(self) -> Dict[str, List[int]]:
+        """
+        Anchor index of the normalized text: lowercased word -> normalized start offsets.
+
+        Returns:
+            Dictionary mapping each word to the positions where it occurs
+        """
+        if self._word_positions is None:
+            positions: Dict[str, List[int]] = {}
+            for match in _WORD.finditer(self.normalized.lower()):
+                positions.setdefault(match.group(), []).append(match.start())
+            self._word_positions = positions
+        return self._word_positions
+
+    def candidate_windows(self, query: str, start: int = 0) -> List[Tuple[int, int]]:
+        """
+        Propose the few normalized regions most likely to contain an approximate match of query.
+
+        The rarest query words that occur in the text act as anchors. Each anchor
+        occurrence votes for the region where the query would start if the anchor
+        were aligned; the regions with the most distinct anchors win.
+
+        Args:
+            query: Whitespace-normalized text to look for
+            start: Normalized offset before which matches are ignored
+
+        Returns:
+            Up to MAX_CANDIDATE_WINDOWS non-overlapping (start, end) normalized spans
+        """
+        word_positions = self.word_positions()
+        query_words: Dict[str, int] = {}
+        for match in _WORD.finditer(query.lower()):
+            query_words.setdefault(match.group(), match.start())
+
+        # Rarest words first; they propose the fewest regions
+        anchors = sorted(
+            (word for word in query_words if word in word_positions),
+            key=lambda word: len(word_positions[word]))[:MAX_ANCHORS]
+        if not anchors:
+            return []
+
+        bucket = max(16, len(query) // 4)
+        votes: Counter = Counter()
+        for word in anchors:
+            # Count each anchor at most once per region
+            regions = {max(0, position - query_words[word]) // bucket
+                       for position in word_positions[word] if position >= start}
+            votes.update(regions)
+
+        margin = len(query) // 2 + bucket
+        windows: List[Tuple[int, int]] = []
+        for region, _ in votes.most_common(MAX_CANDIDATE_WINDOWS):
+            window_start = max(start, region * bucket - margin)
+            window_end = min(len(self.normalized), region * bucket + len(query) + margin)
+            windows.append((window_start, window_end))
+
+        # Merge overlapping windows so no region is scored twice
+        merged: List[Tuple[int, int]] = []
+        for window_start, window_end in sorted(windows):
+            if merged and window_start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], window_end))
+            else:
+                merged.append((window_start, window_end))
+        return merged
+
+    def search_windows(self, query: str, start: int = 0) -> List[Tuple[int, int]]:
+        """
+        Normalized regions to search for an approximate match of query.
+
+        Small sources are searched whole; larger ones only in the candidate windows.
+
+        Args:
+            query: Whitespace-normalized text to look for
+            start: Normalized offset before which matches are ignored
+
+        Returns:
+            List of (start, end) normalized spans
+        """
+        if len(self.normalized) - start <= max(FULL_SCAN_MAX_CHARS, 2 * len(query)):
+            return [(start, len(self.normalized))]
+        return self.candidate_windows(query, start)
+
+    def __contains__(self, text: str) -> bool:
+        needle = normalize_whitespace(text).strip()
+        return bool(needle) and needle in self.normalized
+
+
+def fuzzy_locate(text_to_find: str, source_text: Union[str, NormalizedText],
+                 min_score: float = RAPIDFUZZ_MATCH_THRESHOLD,
+                 search_start_offset: int = 0) -> Optional[Tuple[int, int, float]]:
+    """
+    Find the best approximate match of text_to_find using candidate windows.
 
+    Instead of running partial_ratio over the whole source, only the few regions
+    proposed by the anchor index are scored with partial_ratio_alignment. Small
+    sources are scored directly.
 
-def find_text_offsets(text_to_find: str, source_text: str, search_start_offset: int = 0) -> Tuple[Optional[int], Optional[int]]:
+    Args:
+        text_to_find: The text to locate
+        source_text: The source text to search within, or its NormalizedText index
+        min_score: Minimum partial ratio (0-100) for a match
+        search_start_offset: Original offset to start searching from
+
+    Returns:
+        Tuple of original (start, end, score) of the best match, or None
+    """
+    if not RAPIDFUZZ_AVAILABLE or not text_to_find or not source_text:
+        return None
+
+    index = NormalizedText.of(source_text)
+    query = normalize_whitespace(text_to_find).strip()
+    if not query:
+        return None
+
+    windows = index.search_windows(query, index.to_normalized(search_start_offset))
+
+    best = None
+    for window_start, window_end in windows:
+        match = rapidfuzz_fuzz.partial_ratio_alignment(
+            query, index.normalized[window_start:window_end], score_cutoff=min_score)
+        if match is not None and (best is None or match.score > best[2]):
+            best = (window_start + match.dest_start,
+                    window_start + match.dest_end, match.score)
+
+    if best is None:
+        return None
+
+    original_start, original_end = index.span_to_original(best[0], best[1])
+    return original_start, original_end, best[2]
+
+
+def _first_part_span(text: str, index: NormalizedText,
+                     search_start_offset: int = 0) -> Optional[Tuple[int, int]]:
+    """
+    Locate the first 30 characters of text and extend the span to the end of the sentence.
+
+    Useful when the model added extra text after an otherwise verbatim quote.
+
+    Args:
+        text: The text to locate (longer than 30 characters)
+        index: NormalizedText of the source
+        search_start_offset: Original offset to start searching from
+
+    Returns:
+        Original (start, end) span, or None if the first part is not found
+    """
+    cleaned_first_part = normalize_whitespace(text[:30].strip())
+    cleaned_source = index.normalized
+
+    pos = cleaned_source.find(
+        cleaned_first_part, index.to_normalized(search_start_offset))
+    if pos < 0:
+        return None
+
+    # Find a reasonable end position - continue until punctuation or ~50 chars
+    max_len = min(len(cleaned_first_part) + 50, len(cleaned_source) - pos)
+
+    # Try to find end at sentence boundary
+    end_pos = pos + max_len
+    for i in range(pos + len(cleaned_first_part), pos + max_len):
+        if i >= len(cleaned_source):
+            break
+        if cleaned_source[i] in '.!?':
+            end_pos = i + 1
+            break
+
+    return index.span_to_original(pos, end_pos)
+
+
+def find_text_offsets(text_to_find: str, source_text: Union[str, NormalizedText],
+                      search_start_offset: int = 0) -> Tuple[Optional[int], Optional[int]]:
     """
     Finds start/end character indices of text_to_find within source_text.
 
     Args:
         text_to_find: The text to locate
-        source_text: The source text to search within
+        source_text: The source text to search within, or its NormalizedText index
+            (pass the index when searching the same source repeatedly)
         search_start_offset: Starting offset for the search
 
     Returns:
@@ -33,6 +352,9 @@ def find_text_offsets(text_to_find: str, source_text: str, search_start_offset:
     if not text_to_find or not source_text:
         return None, None
 
+    index = NormalizedText.of(source_text)
+    source_text = index.original
+
     # Try different normalization approaches in order of precision
 
     # 1. First try direct matching from the offset
@@ -41,165 +363,115 @@ def find_text_offsets(text_to_find: str, source_text: str, search_start_offset:
         return pos, pos + len(text_to_find)
 
     # 2. Normalize whitespace for more reliable matching
-    cleaned_text = re.sub(r'\s+', ' ', text_to_find).strip()
-    cleaned_source = re.sub(r'\s+', ' ', source_text)
+    span = index.find(text_to_find, search_start_offset)
+    if span is not None:
+        return span
 
-    pos = cleaned_source.find(cleaned_text, search_start_offset)
-    if pos >= 0:
-        # Map back to original position by counting characters
-        original_pos = 0
-        normalized_pos = 0
-
-        for i, char in enumerate(source_text):
-            if i >= search_start_offset:
-                if normalized_pos >= pos:
-                    original_pos = i
-                    break
-                if not char.isspace() or (char.isspace() and (i == 0 or not source_text[i-1].isspace())):
-                    normalized_pos += 1
-
-        # Find the end position by adding the normalized length
-        end_pos = original_pos
-        chars_to_match = len(cleaned_text)
-        chars_matched = 0
-
-        for i in range(original_pos, len(source_text)):
-            if not source_text[i].isspace() or (source_text[i].isspace() and (i == 0 or not source_text[i-1].isspace())):
-                chars_matched += 1
-
-            if chars_matched >= chars_to_match:
-                end_pos = i + 1
-                break
-
-        return original_pos, end_pos
-
-    # 3. Try fuzzy matching if available
+    # 3. Try fuzzy matching on the most likely regions only
     try:
-        from rapidfuzz import fuzz as rapidfuzz_fuzz
-
-        # Search for substring with highest similarity
-        search_window = source_text[search_start_offset:search_start_offset + min(
-            10000, len(source_text) - search_start_offset)]
-
-        # Use partial ratio alignment to find best approximate match
-        match = rapidfuzz_fuzz.partial_ratio_alignment(
-            text_to_find, search_window)
-
-        if match.score > 85:  # Only accept high quality matches
-            start_pos = search_start_offset + match.dest_start
-            end_pos = search_start_offset + match.dest_end
-
+        match = fuzzy_locate(text_to_find, index, min_score=RAPIDFUZZ_MATCH_THRESHOLD,
+                             search_start_offset=search_start_offset)
+        if match is not None and match[2] > RAPIDFUZZ_MATCH_THRESHOLD:  # Only accept high quality matches
+            start_pos, end_pos, score = match
             logger.debug(
-                f"Found fuzzy match with score {match.score}: {source_text[start_pos:end_pos]}")
+                f"Found fuzzy match with score {score}: {source_text[start_pos:end_pos]}")
             return start_pos, end_pos
-    except ImportError:
-        logger.debug("rapidfuzz not available for fuzzy matching")
     except Exception as e:
         logger.error(f"Error in fuzzy matching: {e}")
 
     # 4. Try matching just the first part of the string (useful for cases where model adds extra text)
     if len(text_to_find) > 30:
-        first_part = text_to_find[:30].strip()
-        cleaned_first_part = re.sub(r'\s+', ' ', first_part)
-
-        pos = cleaned_source.find(cleaned_first_part, search_start_offset)
-        if pos >= 0:
-            # Find a reasonable end position - continue until punctuation or ~50 chars
-            start_pos = pos
-            max_len = min(len(cleaned_first_part) + 50,
-                          len(cleaned_source) - pos)
-
-            # Try to find end at sentence boundary
-            end_pos = pos + max_len
-            for i in range(pos + len(cleaned_first_part), pos + max_len):
-                if i >= len(cleaned_source):
-                    break
-                if cleaned_source[i] in '.!?':
-                    end_pos = i + 1
-                    break
-
+        span = _first_part_span(text_to_find, index, search_start_offset)
+        if span is not None:
             logger.debug(f"Found partial match using first part of text")
-            return start_pos, end_pos
+            return span
 
     return None, None
 
 
-def verify_text_in_source(text_from_llm: str, source_text: str) -> bool:
+def locate_verified_text(text_from_llm: str,
+                         source_text: Union[str, NormalizedText]) -> Optional[Tuple[int, int]]:
     """
-    Verify if the text identified by LLM exists in the source text.
+    Verify that the text identified by the LLM exists in the source and return where.
     Uses multiple approaches for robust verification.
 
     Args:
         text_from_llm: Text identified by the LLM
-        source_text: Source document to verify against
+        source_text: Source document to verify against, or its NormalizedText index
 
     Returns:
-        Boolean indicating if text was verified to exist in source
+        Original (start, end) span of the verified text, or None if it could not be verified
     """
     if not text_from_llm or not source_text:
-        return False
+        return None
+
+    index = NormalizedText.of(source_text)
 
     # 1. Try exact matching first
-    if text_from_llm in source_text:
-        return True
+    pos = index.original.find(text_from_llm)
+    if pos >= 0:
+        return pos, pos + len(text_from_llm)
 
     # 2. Try with normalized whitespace
-    cleaned_text = re.sub(r'\s+', ' ', text_from_llm).strip()
-    cleaned_source = re.sub(r'\s+', ' ', source_text)
-    if cleaned_text in cleaned_source:
-        return True
+    cleaned_text = normalize_whitespace(text_from_llm).strip()
+    cleaned_source = index.normalized
+    span = index.find(cleaned_text)
+    if span is not None:
+        return span
 
     # 3. Try with flexible word boundaries
-    # This helps with cases where there might be slight differences in punctuation/whitespace
+    # This helps with cases where there might be slight differences in punctuation/whitespace.
+    # Every word must match, so the anchor windows always cover a match if there is one.
     try:
         # Create a more flexible regex pattern
         words = cleaned_text.split()
         if len(words) >= 3:  # Only do this for reasonably long texts
             # Build a regex that allows for flexible word boundaries
-            pattern = r'\b' + r'\s+'.join([re.escape(word)
-                                          for word in words]) + r'\b'
-            if re.search(pattern, cleaned_source, re.IGNORECASE):
-                logger.debug(
-                    f"Verified text using flexible word boundary matching")
-                return True
+            pattern = re.compile(r'\b' + r'\s+'.join([re.escape(word)
+                                                      for word in words]) + r'\b', re.IGNORECASE)
+            for window_start, window_end in index.search_windows(cleaned_text):
+                match = pattern.search(cleaned_source, window_start, window_end)
+                if match:
+                    logger.debug(
+                        f"Verified text using flexible word boundary matching")
+                    return index.span_to_original(match.start(), match.end())
     except Exception as e:
         logger.debug(f"Flexible word matching error: {e}")
 
-    # 4. Try fuzzy matching if available (most lenient)
-    try:
-        from rapidfuzz import fuzz as rapidfuzz_fuzz
-
-        # Check both partial ratio and token sort ratio
-        partial_ratio = rapidfuzz_fuzz.partial_ratio(
-            cleaned_text, cleaned_source)
-        token_ratio = rapidfuzz_fuzz.token_sort_ratio(
-            cleaned_text, cleaned_source)
-
-        logger.debug(
-            f"Fuzzy matching scores: partial={partial_ratio}%, token={token_ratio}%")
-
-        # Accept if either score is high enough
-        if partial_ratio >= RAPIDFUZZ_MATCH_THRESHOLD:
-            logger.debug(f"Verified text using partial ratio fuzzy matching")
-            return True
-
-        # For longer texts, also check if a significant part is matched
-        if len(cleaned_text) > 50 and partial_ratio >= 75:
-            logger.debug(
-                f"Verified long text using partial ratio fuzzy matching with lower threshold")
-            return True
-    except ImportError:
-        logger.warning(
-            "rapidfuzz not available for fuzzy matching. Using basic verification only.")
-    except Exception as e:
-        logger.debug(f"Fuzzy matching error: {e}")
+    # 4. Try fuzzy matching on candidate windows if available (most lenient)
+    if RAPIDFUZZ_AVAILABLE:
+        try:
+            # For longer texts, a significant partial match is enough
+            threshold = RAPIDFUZZ_LONG_TEXT_THRESHOLD if len(
+                cleaned_text) > 50 else RAPIDFUZZ_MATCH_THRESHOLD
+            match = fuzzy_locate(cleaned_text, index, min_score=threshold)
+            if match is not None:
+                logger.debug(
+                    f"Verified text using partial ratio fuzzy matching (score {match[2]:.1f}%)")
+                return match[0], match[1]
+        except Exception as e:
+            logger.debug(f"Fuzzy matching error: {e}")
 
     # 5. For longer texts, check if a significant initial portion exists
     if len(cleaned_text) > 30:
-        first_part = cleaned_text[:30].strip()
-        if first_part in cleaned_source:
+        span = _first_part_span(cleaned_text, index)
+        if span is not None:
             logger.debug(f"Verified text using initial portion matching")
-            return True
+            return span
 
     # All verification methods failed
-    return False
+    return None
+
+
+def verify_text_in_source(text_from_llm: str, source_text: Union[str, NormalizedText]) -> bool:
+    """
+    Verify if the text identified by LLM exists in the source text.
+
+    Args:
+        text_from_llm: Text identified by the LLM
+        source_text: Source document to verify against, or its NormalizedText index
+
+    Returns:
+        Boolean indicating if text was verified to exist in source
+    """
+    return locate_verified_text(text_from_llm, source_text) is not None
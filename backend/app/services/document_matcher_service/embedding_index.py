@@ -0,0 +1,240 @@
+"""
+Document Matcher Service - Persistent embedding index
+
+Holds L2-normalized float32 embeddings of compliance documents in a single
+matrix, next to the document IDs and the SHA-256 of the content each document's
+rows were computed from. Rows are only recomputed for documents that were added
+or changed since the index was last synchronized.
+
+A document is stored either as one pooled vector (ranked with a single
+matrix-vector product in search) or as one row per chunk (ranked by aggregated
+max-similarity over chunk pairs in search_max_sim).
+"""
+
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Returns the embedding (vector) or chunk embeddings (matrix) of a document ID, or None
+DocumentEmbedder = Callable[[str], Optional[np.ndarray]]
+
+# Maximum number of similarity values computed at once by search_max_sim
+MAX_SIM_BLOCK_ELEMENTS = 1 << 20
+
+
+def normalize(vector: np.ndarray) -> np.ndarray:
+    """
+    Scale a vector (or every row of a matrix) to unit length.
+
+    Args:
+        vector: Vector or matrix of row vectors
+
+    Returns:
+        float32 copy with unit-length rows (zero rows stay zero)
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    norms = np.linalg.norm(vector, axis=-1, keepdims=True)
+    return vector / np.where(norms == 0, 1, norms)
+
+
+class EmbeddingIndex:
+    """
+    Matrix of normalized document embeddings, persisted as a single .npz file.
+
+    The rows of document i are matrix[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, path: Optional[str], config: str):
+        """
+        Initialize the index, loading the persisted matrix if it matches config.
+
+        Args:
+            path: File holding the index, or None to keep the index in memory only
+            config: Description of how the embeddings are computed (model, chunking);
+                a persisted index built with a different config is discarded
+        """
+        self.path = path
+        self.config = config
+
+        self._lock = threading.Lock()
+        self.doc_ids: List[str] = []
+        self.signatures: List[str] = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def _load(self) -> None:
+        """Read the persisted index, ignoring missing, unreadable or outdated files."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["config"]) != self.config:
+                    logger.info(f"Discarding embedding index {self.path} built with a different configuration")
+                    return
+                self.matrix = data["matrix"].astype(np.float32, copy=False)
+                self.offsets = data["offsets"].astype(np.int64, copy=False)
+                self.doc_ids = [str(doc_id) for doc_id in data["doc_ids"]]
+                self.signatures = [str(signature) for signature in data["signatures"]]
+            logger.info(f"Loaded embedding index {self.path} with {len(self.doc_ids)} documents")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable embedding index {self.path}: {e}")
+
+    def _save(self) -> None:
+        """Write the index atomically so concurrent readers never see a partial file."""
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        try:
+            np.savez(tmp_path, matrix=self.matrix, offsets=self.offsets,
+                     doc_ids=np.array(self.doc_ids, dtype=str),
+                     signatures=np.array(self.signatures, dtype=str), config=np.array(self.config))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Failed to persist embedding index {self.path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def sync(self, signatures: Dict[str, str], embed: DocumentEmbedder) -> int:
+        """
+        Bring the index in line with the current documents.
+
+        Rows of removed documents are dropped and documents whose signature changed
+        (or that are new) are embedded again; unchanged rows are kept as they are.
+
+        Args:
+            signatures: Content hash of every current document, by document ID
+            embed: Function computing the embedding of a document ID
+
+        Returns:
+            Number of documents that were (re-)embedded
+        """
+        with self._lock:
+            current = {doc_id: signature for doc_id, signature in zip(self.doc_ids, self.signatures)}
+            stale = [doc_id for doc_id, signature in signatures.items() if current.get(doc_id) != signature]
+            removed = [doc_id for doc_id in current if doc_id not in signatures]
+            if not stale and not removed:
+                return 0
+
+            rows = {doc_id: self.matrix[self.offsets[position]:self.offsets[position + 1]]
+                    for position, doc_id in enumerate(self.doc_ids)
+                    if doc_id in signatures and doc_id not in stale}
+            embedded = 0
+            for doc_id in stale:
+                vectors = embed(doc_id)
+                if vectors is None or not np.asarray(vectors).size:
+                    logger.warning(f"Could not embed document {doc_id}; leaving it out of the index")
+                    continue
+                rows[doc_id] = normalize(np.atleast_2d(vectors))
+                embedded += 1
+
+            # Keep the order of the caller's documents so ties resolve the same way
+            self.doc_ids = [doc_id for doc_id in signatures if doc_id in rows]
+            self.signatures = [signatures[doc_id] for doc_id in self.doc_ids]
+            self.offsets = np.concatenate(
+                [[0], np.cumsum([len(rows[doc_id]) for doc_id in self.doc_ids])]).astype(np.int64)
+            self.matrix = (np.vstack([rows[doc_id] for doc_id in self.doc_ids]) if self.doc_ids
+                           else np.zeros((0, 0), dtype=np.float32))
+
+            logger.info(f"Embedding index updated: {embedded} documents embedded, "
+                        f"{len(removed)} removed, {len(self.doc_ids)} indexed")
+            if self.path:
+                self._save()
+            return embedded
+
+    def search(self, query: np.ndarray, top_k: int = 1,
+               doc_ids: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Rank indexed documents by cosine similarity to a query embedding.
+
+        Requires one row per document (pooled document embeddings).
+
+        Args:
+            query: Query embedding (any scale)
+            top_k: Number of documents to return
+            doc_ids: Optional subset of document IDs to rank
+
+        Returns:
+            Up to top_k (document ID, cosine similarity) pairs, best first
+        """
+        with self._lock:
+            matrix, offsets, ids = self.matrix, self.offsets, self.doc_ids
+
+        if not ids or top_k <= 0:
+            return []
+        if len(matrix) != len(ids):
+            raise ValueError("search requires one embedding per document; use search_max_sim")
+
+        return self._top_k(matrix @ normalize(query), ids, top_k, doc_ids)
+
+    def search_max_sim(self, query_chunks: np.ndarray, top_k: int = 1,
+                       doc_ids: Optional[List[str]] = None,
+                       block_elements: int = MAX_SIM_BLOCK_ELEMENTS) -> List[Tuple[str, float]]:
+        """
+        Rank indexed documents by aggregated max-similarity over chunk pairs.
+
+        For every query chunk the most similar chunk of each document is found; a
+        document's score is the mean of these maxima over the query chunks, so a
+        guideline scores well when it covers every part of the query, however
+        long it is. Similarities are computed for blocks of index rows so memory
+        stays bounded by block_elements.
+
+        Args:
+            query_chunks: Embeddings of the query chunks (one per row, any scale)
+            top_k: Number of documents to return
+            doc_ids: Optional subset of document IDs to rank
+            block_elements: Maximum number of similarities held at once
+
+        Returns:
+            Up to top_k (document ID, score) pairs, best first
+        """
+        with self._lock:
+            matrix, offsets, ids = self.matrix, self.offsets, self.doc_ids
+
+        query_chunks = normalize(np.atleast_2d(query_chunks))
+        if not ids or top_k <= 0 or not len(query_chunks):
+            return []
+
+        # Document of every index row
+        row_docs = np.repeat(np.arange(len(ids)), np.diff(offsets))
+        best = np.full((len(query_chunks), len(ids)), -np.inf, dtype=np.float32)
+
+        block_rows = max(1, block_elements // len(query_chunks))
+        for start in range(0, len(matrix), block_rows):
+            end = min(start + block_rows, len(matrix))
+            similarities = query_chunks @ matrix[start:end].T
+            # Reduce each document's run of rows in the block to its maximum
+            block_docs = row_docs[start:end]
+            run_starts = np.flatnonzero(np.r_[True, block_docs[1:] != block_docs[:-1]])
+            docs = block_docs[run_starts]
+            best[:, docs] = np.maximum(best[:, docs], np.maximum.reduceat(similarities, run_starts, axis=1))
+
+        return self._top_k(best.mean(axis=0), ids, top_k, doc_ids)
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, ids: List[str], top_k: int,
+               doc_ids: Optional[List[str]]) -> List[Tuple[str, float]]:
+        """Return the top_k (document ID, score) pairs, optionally restricted to doc_ids."""
+        if doc_ids is not None:
+            allowed = set(doc_ids)
+            scores = np.where([doc_id in allowed for doc_id in ids], scores, -np.inf)
+
+        top_k = min(top_k, len(ids))
+        if top_k < len(ids):
+            candidates = np.sort(np.argpartition(-scores, top_k - 1)[:top_k])
+        else:
+            candidates = np.arange(len(ids))
+        # Stable sort keeps index order among equal scores
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(ids[position], float(scores[position])) for position in ranked
+                if np.isfinite(scores[position])]
@@ -3,31 +3,35 @@ Document Matcher Service - Core Implementation
 
 This service analyzes clinical documents and automatically selects the most relevant
 compliance document based on semantic similarity and regulatory content matching.
+
+Compliance documents are embedded once into a persistent EmbeddingIndex that is
+updated only for added or changed files, so a match costs one embedding of the
+clinical document plus the index lookup. MATCHING_MODE selects how documents
+are compared:
+
+- "mean": one mean-pooled vector per document, ranked by cosine similarity
+- "max_sim": the chunk embeddings of both documents, ranked by aggregated
+  max-similarity over chunk pairs (keeps the topical signal of long documents)
 """
 
+import asyncio
+import json
 import logging
+import os
 from typing import List, Dict, Optional, Tuple
-from uuid import UUID
 import re
 
-# Math/similarity libraries
-try:
-    import numpy as np
-    from sklearn.metrics.pairwise import cosine_similarity
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
-    logging.warning(
-        "scikit-learn not installed. Using basic similarity matching.")
+import numpy as np
 
 # LangChain components
 from langchain_openai import AzureChatOpenAI, ChatOpenAI, AzureOpenAIEmbeddings, OpenAIEmbeddings
 
 # Local application imports
 from app.core.config import settings
-from app.services.compliance_service.chunking import AgenticChunker
+from app.services.compliance_service.chunking import RecursiveChunker
+from app.services.compliance_service.embedding_cache import with_embedding_cache
 from app.services.document_service import document_service
-from app.models.document import Document
+from app.services.document_matcher_service.embedding_index import EmbeddingIndex
 from app.services.document_matcher_service.prompts import (
     DOCUMENT_ANALYSIS_SYSTEM_PROMPT,
     get_document_analysis_prompt
@@ -40,6 +44,12 @@ logger = logging.getLogger(__name__)
 # Threshold for considering documents as semantically similar
 SIMILARITY_THRESHOLD = 0.70
 
+# Bump when the way document embeddings are computed changes so persisted indexes are rebuilt
+INDEX_VERSION = 2
+
+# Supported values of MATCHING_MODE
+MATCHING_MODES = ("mean", "max_sim")
+
 
 class DocumentMatcher:
     """
@@ -49,10 +59,12 @@ class DocumentMatcher:
 
     def __init__(self):
         """Initialize the document matcher with necessary components."""
-        # Use the existing AgenticChunker for semantic document understanding
-        self.chunker = AgenticChunker()
-        # Cache of analyzed compliance documents to improve performance
-        self.compliance_cache = {}
+        # Deterministic chunks keep every document within the embedding model's input
+        # limit without LLM calls; a document embedding is the mean of its chunk embeddings
+        self.chunker = RecursiveChunker(
+            chunk_size=settings.MATCHING_CHUNK_SIZE,
+            chunk_overlap=settings.MATCHING_CHUNK_OVERLAP
+        )
 
         # Initialize the LLM client based on configuration
         if settings.USE_AZURE_OPENAI:
@@ -67,13 +79,14 @@ class DocumentMatcher:
 
             # Initialize embeddings client
             try:
-                self.embeddings = AzureOpenAIEmbeddings(
+                # Embeddings are served through the shared on-disk cache
+                self.embeddings = with_embedding_cache(AzureOpenAIEmbeddings(
                     model=settings.AZURE_OPENAI_EMBEDDING_MODEL_NAME,
                     azure_deployment=settings.AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME,
                     api_version=settings.AZURE_OPENAI_API_MODEL_VERSION,
                     azure_endpoint=settings.AZURE_OPENAI_API_ENDPOINT,
                     api_key=settings.AZURE_OPENAI_API_KEY
-                )
+                ))
                 self.embeddings_available = True
                 logger.info(
                     "Using Azure OpenAI embeddings for document matching")
@@ -89,16 +102,38 @@ class DocumentMatcher:
             )
 
             try:
-                self.embeddings = OpenAIEmbeddings(
+                # Embeddings are served through the shared on-disk cache
+                self.embeddings = with_embedding_cache(OpenAIEmbeddings(
                     model="text-embedding-ada-002",
                     openai_api_key=settings.OPENAI_API_KEY
-                )
+                ))
                 self.embeddings_available = True
                 logger.info("Using OpenAI embeddings for document matching")
             except Exception as e:
                 logger.warning(f"Failed to initialize OpenAI embeddings: {e}")
                 self.embeddings_available = False
 
+        self.mode = settings.MATCHING_MODE if settings.MATCHING_MODE in MATCHING_MODES else "mean"
+        if self.mode != settings.MATCHING_MODE:
+            logger.warning(f"Unknown MATCHING_MODE {settings.MATCHING_MODE}, using mean")
+
+        # Embeddings of all compliance documents, persisted across restarts
+        self.compliance_index = EmbeddingIndex(
+            os.path.join(settings.CACHE_DIR, "matcher", f"compliance_index_{self.mode}.npz"),
+            config=self._index_config()
+        ) if self.embeddings_available else None
+
+    def _index_config(self) -> str:
+        """Describe how document embeddings are computed; the index is rebuilt when it changes."""
+        model = getattr(self.embeddings, "model_name", None) or getattr(self.embeddings, "model", None)
+        return json.dumps({
+            "version": INDEX_VERSION,
+            "mode": self.mode,
+            "model": str(model),
+            "chunk_size": self.chunker.chunk_size,
+            "chunk_overlap": self.chunker.chunk_overlap
+        }, sort_keys=True)
+
     async def find_matching_compliance_document(self, clinical_doc_id: str) -> Optional[str]:
         """
         Find the most relevant compliance document for a given clinical document.
@@ -111,31 +146,13 @@ class DocumentMatcher:
         """
         try:
             # Get the clinical document content
-            clinical_doc_content = document_service.get_document_content(
+            clinical_doc_content = await document_service.aget_document_content(
                 clinical_doc_id)
             if not clinical_doc_content:
                 logger.error(
                     f"Clinical document not found or has no content: {clinical_doc_id}")
                 return None
 
-            # Get clinical document metadata for document object
-            all_docs = document_service.list_documents()
-            clinical_doc_metadata = next(
-                (doc for doc in all_docs if doc["id"] == clinical_doc_id), None)
-
-            if not clinical_doc_metadata:
-                logger.error(
-                    f"Clinical document metadata not found: {clinical_doc_id}")
-                return None
-
-            # Create a Document object for analysis
-            clinical_doc = Document(
-                id=clinical_doc_id,
-                content=clinical_doc_content,
-                title=clinical_doc_metadata.get("title", ""),
-                type="clinical"
-            )
-
             # Get all available compliance documents
             compliance_docs = document_service.list_documents(
                 doc_type="compliance")
@@ -143,29 +160,14 @@ class DocumentMatcher:
                 logger.warning(
                     "No compliance documents available for matching")
                 return None
-
-            # Convert to Document objects with content
-            compliance_doc_objects = []
-            for doc_metadata in compliance_docs:
-                try:
-                    doc_content = document_service.get_document_content(
-                        doc_metadata["id"])
-                    doc_obj = Document(
-                        id=doc_metadata["id"],
-                        content=doc_content,
-                        title=doc_metadata.get("title", ""),
-                        type="compliance"
-                    )
-                    compliance_doc_objects.append(doc_obj)
-                except Exception as e:
-                    logger.warning(
-                        f"Could not load content for document {doc_metadata['id']}: {e}")
+            compliance_doc_ids = [str(doc["id"]) for doc in compliance_docs]
 
             # Analyze the clinical document to extract key concepts and requirements
-            clinical_concepts = await self._analyze_document_content(clinical_doc)
+            clinical_concepts = await self._analyze_document_content(
+                clinical_doc_id, clinical_doc_content)
 
             # Find the best matching compliance document
-            best_match_id, score = await self._find_best_match(clinical_concepts, compliance_doc_objects)
+            best_match_id, score = await self._find_best_match(clinical_concepts, compliance_doc_ids)
 
             logger.info(
                 f"Selected compliance document {best_match_id} with score {score:.2f} for clinical document {clinical_doc_id}")
@@ -186,51 +188,106 @@ class DocumentMatcher:
                     f"Error with fallback compliance document: {fallback_error}")
             return None
 
-    async def _analyze_document_content(self, document: Document) -> Dict:
+    async def _analyze_document_content(self, document_id: str, content: str) -> Dict:
         """
         Analyze document content to extract key concepts, requirements, and regulatory domains.
 
         Args:
-            document: The document to analyze
+            document_id: ID of the document to analyze
+            content: Text content of the document
 
         Returns:
             Dictionary of extracted concepts and features
         """
         try:
             # First, check for explicit document references
-            compliance_doc_reference = self._find_explicit_reference(
-                document.content)
-
-            # Use the AgenticChunker to split the document into semantic chunks
-            chunks = self.chunker.split_text(document.content)
+            compliance_doc_reference = self._find_explicit_reference(content)
 
-            # Generate embeddings if available
-            if self.embeddings_available:
-                # Calculate embeddings for document chunks
-                chunk_embeddings = self.embeddings.embed_documents(chunks)
-
-                # Average the chunk embeddings to get document-level embedding
-                if chunk_embeddings:
-                    doc_embedding = np.mean(chunk_embeddings, axis=0)
-
-                    return {
-                        "document_id": str(document.id),
-                        "chunks": chunks,
-                        "embedding": doc_embedding,
-                        "concepts": [],  # Will be populated in future implementation
-                        "compliance_doc_reference": compliance_doc_reference
-                    }
-
-            # Fallback if embeddings aren't available
-            return {
-                "document_id": str(document.id),
-                "chunks": chunks,
+            analysis = {
+                "document_id": str(document_id),
                 "concepts": [],  # Will be populated in future implementation
                 "compliance_doc_reference": compliance_doc_reference
             }
+
+            # Generate the embeddings if available (the client blocks, so run it in a thread)
+            if self.embeddings_available:
+                chunk_embeddings = await asyncio.to_thread(self._embed_chunks, content)
+                if chunk_embeddings is not None:
+                    analysis["chunk_embeddings"] = chunk_embeddings
+                    analysis["embedding"] = chunk_embeddings.mean(axis=0)
+
+            return analysis
         except Exception as e:
             logger.error(f"Error analyzing document content: {e}")
-            return {"document_id": str(document.id), "concepts": []}
+            return {"document_id": str(document_id), "concepts": []}
+
+    def _embed_chunks(self, text: str) -> Optional[np.ndarray]:
+        """
+        Embed the matching chunks of a text.
+
+        Args:
+            text: Document text
+
+        Returns:
+            Matrix with one chunk embedding per row, or None if the text is empty
+        """
+        chunks = self.chunker.split_text(text)
+        if not chunks:
+            return None
+
+        # One batched call for all chunks, served from the embedding cache when possible
+        return np.asarray(self.embeddings.embed_documents(chunks), dtype=np.float32)
+
+    def _embed_document(self, document_id: str) -> Optional[np.ndarray]:
+        """Compute the index rows of a stored document for the current matching mode."""
+        chunk_embeddings = self._embed_chunks(document_service.get_document_content(document_id))
+        if chunk_embeddings is None or self.mode == "max_sim":
+            return chunk_embeddings
+        return chunk_embeddings.mean(axis=0)
+
+    def _sync_compliance_index(self, compliance_doc_ids: List[str]) -> int:
+        """
+        Update the compliance index for added, changed and removed documents.
+
+        Documents are identified by the hash of their file content, which the
+        extracted-text store keeps in memory, so an unchanged set of documents
+        costs one os.stat per document.
+
+        Args:
+            compliance_doc_ids: IDs of the current compliance documents
+
+        Returns:
+            Number of documents that were embedded
+        """
+        signatures = {}
+        for doc_id in compliance_doc_ids:
+            try:
+                signatures[doc_id] = document_service.get_document_text(doc_id).sha256
+            except Exception as e:
+                logger.warning(f"Could not load content for document {doc_id}: {e}")
+        return self.compliance_index.sync(signatures, self._embed_document)
+
+    async def rank_compliance_documents(self, clinical_concepts: Dict, compliance_doc_ids: List[str],
+                                        top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Rank compliance documents by similarity to an analyzed clinical document.
+
+        Args:
+            clinical_concepts: Result of _analyze_document_content for the clinical document
+            compliance_doc_ids: IDs of the candidate compliance documents
+            top_k: Number of documents to return (defaults to MATCHING_TOP_K)
+
+        Returns:
+            Up to top_k (compliance document ID, similarity) pairs, best first
+        """
+        await asyncio.to_thread(self._sync_compliance_index, compliance_doc_ids)
+        top_k = top_k or max(1, settings.MATCHING_TOP_K)
+
+        if self.mode == "max_sim":
+            return self.compliance_index.search_max_sim(
+                clinical_concepts["chunk_embeddings"], top_k=top_k, doc_ids=compliance_doc_ids)
+        return self.compliance_index.search(
+            clinical_concepts["embedding"], top_k=top_k, doc_ids=compliance_doc_ids)
 
     def _find_explicit_reference(self, content: str) -> Optional[str]:
         """
@@ -264,13 +321,13 @@ class DocumentMatcher:
 
         return None
 
-    async def _find_best_match(self, clinical_concepts: Dict, compliance_docs: List[Document]) -> Tuple[str, float]:
+    async def _find_best_match(self, clinical_concepts: Dict, compliance_doc_ids: List[str]) -> Tuple[str, float]:
         """
         Find the best matching compliance document based on similarity to clinical document.
 
         Args:
             clinical_concepts: Extracted concepts from clinical document
-            compliance_docs: List of available compliance documents (as Document objects)
+            compliance_doc_ids: IDs of the available compliance documents
 
         Returns:
             Tuple of (best_match_id, similarity_score)
@@ -280,72 +337,48 @@ class DocumentMatcher:
             if "compliance_doc_reference" in clinical_concepts and clinical_concepts["compliance_doc_reference"]:
                 # Find the compliance document with this ID
                 reference_id = clinical_concepts["compliance_doc_reference"]
-                for doc in compliance_docs:
+                for doc_id in compliance_doc_ids:
                     # Check for IDs like COMP_001, COMP_002, etc. that match our reference (comp_1, comp_2, etc.)
-                    doc_number = re.search(r'COMP_0+(\d+)', doc.id)
+                    doc_number = re.search(r'COMP_0+(\d+)', doc_id)
                     ref_number = re.search(r'comp_(\d+)', reference_id)
 
                     if doc_number and ref_number and doc_number.group(1) == ref_number.group(1):
                         logger.info(
-                            f"Using explicitly referenced compliance document: {doc.id} (matched {reference_id})")
+                            f"Using explicitly referenced compliance document: {doc_id} (matched {reference_id})")
                         # Perfect confidence score for explicit references
-                        return str(doc.id), 1.0
+                        return doc_id, 1.0
 
                 # If we couldn't find the referenced document, log warning and fall back to similarity
                 logger.warning(
                     f"Referenced compliance document {reference_id} not found, falling back to similarity matching")
 
             # Fall back to embedding similarity matching if no explicit reference or reference not found
-            if not self.embeddings_available or not SKLEARN_AVAILABLE or "embedding" not in clinical_concepts:
+            if not self.embeddings_available or "embedding" not in clinical_concepts:
                 # Fall back to first document if we can't do embedding comparison
-                if compliance_docs:
-                    return str(compliance_docs[0].id), 1.0
+                if compliance_doc_ids:
+                    return compliance_doc_ids[0], 1.0
                 return None, 0.0
 
-            best_match_id = None
-            highest_score = -1.0
-
-            # Compare the clinical document embedding against each compliance document
-            for doc in compliance_docs:
-                # Get or compute compliance doc embedding
-                if str(doc.id) not in self.compliance_cache:
-                    self.compliance_cache[str(doc.id)] = await self._analyze_document_content(doc)
-
-                compliance_data = self.compliance_cache[str(doc.id)]
-
-                # Skip if this compliance doc doesn't have embeddings
-                if "embedding" not in compliance_data:
-                    continue
-
-                # Calculate cosine similarity
-                clinical_embedding = clinical_concepts["embedding"].reshape(
-                    1, -1)
-                compliance_embedding = compliance_data["embedding"].reshape(
-                    1, -1)
-
-                similarity = cosine_similarity(
-                    clinical_embedding, compliance_embedding)[0][0]
-
-                # Update best match if this score is higher
-                if similarity > highest_score:
-                    highest_score = similarity
-                    best_match_id = str(doc.id)
+            # Score against the index of compliance documents
+            ranking = await self.rank_compliance_documents(clinical_concepts, compliance_doc_ids)
+            logger.info("Compliance document ranking: " + ", ".join(
+                f"{doc_id} ({score:.3f})" for doc_id, score in ranking))
 
             # If we found a good match above threshold, return it
-            if best_match_id and highest_score >= SIMILARITY_THRESHOLD:
-                return best_match_id, highest_score
+            if ranking and ranking[0][1] >= SIMILARITY_THRESHOLD:
+                return ranking[0]
 
             # Otherwise default to first document as fallback
-            if compliance_docs:
-                return str(compliance_docs[0].id), highest_score if highest_score > -1 else 0.0
+            if compliance_doc_ids:
+                return compliance_doc_ids[0], ranking[0][1] if ranking else 0.0
 
             return None, 0.0
 
         except Exception as e:
             logger.error(f"Error in finding best match: {e}")
             # Fall back to first compliance document
-            if compliance_docs:
-                return str(compliance_docs[0].id), 0.0
+            if compliance_doc_ids:
+                return compliance_doc_ids[0], 0.0
             return None, 0.0
 
 
@@ -1,10 +1,14 @@
+import asyncio
 import os
 import logging
 from typing import List, Dict, Any, Optional
 from pathlib import Path
-import PyPDF2
 from fastapi import HTTPException
 
+from app.core.config import settings
+from app.services.document_text_store import DocumentTextStore, ExtractedText
+from app.services.pdf_extraction import PdfPageExtractor
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -36,15 +40,30 @@ class DocumentService:
             os.makedirs(self.documents_dir)
             logger.info(f"Created documents directory: {self.documents_dir}")
 
-        # Supported file types for document processing
+        # Supported file types for document processing; each extractor returns the text of every page
         self.supported_extensions = {
-            '.pdf': self._extract_pdf_text,
-            '.txt': self._extract_text_file,
+            '.pdf': self._extract_pdf_pages,
+            '.txt': self._extract_text_file_pages,
             # Add more supported types as needed
         }
 
-        # Document ID mapping dictionary to ensure consistent IDs
+        # Large PDFs are extracted across a process pool
+        self.pdf_extractor = PdfPageExtractor(
+            max_workers=settings.PDF_EXTRACTION_WORKERS or None,
+            pages_per_task=settings.PDF_EXTRACTION_PAGES_PER_TASK,
+            min_parallel_pages=settings.PDF_PARALLEL_MIN_PAGES
+        )
+
+        # Extracted text is reused until the file's mtime or size changes
+        self.text_store = DocumentTextStore(
+            cache_dir=os.path.join(settings.CACHE_DIR, "documents") if settings.DOCUMENT_TEXT_CACHE_ENABLED else None,
+            memory_items=settings.DOCUMENT_TEXT_CACHE_MEMORY_ITEMS,
+            max_bytes=settings.DOCUMENT_TEXT_CACHE_MAX_BYTES
+        )
+
+        # Document ID mapping dictionary to ensure consistent IDs, and its reverse for O(1) lookups
         self._document_id_map = {}
+        self._filename_by_id = {}
         self._initialize_document_ids()
 
     def _initialize_document_ids(self):
@@ -72,10 +91,10 @@ class DocumentService:
 
             # Assign sequential ID based on type
             if doc_type == "clinical":
-                self._document_id_map[filename] = f"CLIN_{clinical_index:03d}"
+                self._register_document_id(filename, f"CLIN_{clinical_index:03d}")
                 clinical_index += 1
             else:
-                self._document_id_map[filename] = f"COMP_{compliance_index:03d}"
+                self._register_document_id(filename, f"COMP_{compliance_index:03d}")
                 compliance_index += 1
         
         # Process clinical folder
@@ -92,7 +111,7 @@ class DocumentService:
                     continue
                     
                 # Files in clinical folder are always clinical type
-                self._document_id_map[os.path.join("clinical", filename)] = f"CLIN_{clinical_index:03d}"
+                self._register_document_id(os.path.join("clinical", filename), f"CLIN_{clinical_index:03d}")
                 clinical_index += 1
         
         # Process compliance folder
@@ -109,11 +128,16 @@ class DocumentService:
                     continue
                     
                 # Files in compliance folder are always compliance type
-                self._document_id_map[os.path.join("compliance", filename)] = f"COMP_{compliance_index:03d}"
+                self._register_document_id(os.path.join("compliance", filename), f"COMP_{compliance_index:03d}")
                 compliance_index += 1
 
         logger.info(f"Initialized document IDs: {self._document_id_map}")
 
+    def _register_document_id(self, filename: str, document_id: str) -> None:
+        """Record the ID of a file (relative to the documents directory) in both lookup maps."""
+        self._document_id_map[filename] = document_id
+        self._filename_by_id[document_id] = filename
+
     def _generate_document_id(self, filename: str) -> str:
         """Get a consistent document ID for the filename."""
         # If we don't have an ID for this file yet, generate one
@@ -129,7 +153,7 @@ class DocumentService:
             prefix = "CLIN" if doc_type == "clinical" else "COMP"
 
             # Store the new ID in the map
-            self._document_id_map[filename] = f"{prefix}_{next_index:03d}"
+            self._register_document_id(filename, f"{prefix}_{next_index:03d}")
 
             logger.info(
                 f"Generated new document ID for {filename}: {self._document_id_map[filename]}")
@@ -249,40 +273,59 @@ class DocumentService:
             logger.error(f"Error listing documents: {str(e)}")
             return []
 
-    def get_document_content(self, document_id: str) -> str:
+    def _resolve_document_path(self, document_id: str) -> Optional[str]:
         """
-        Get the text content of a document by its ID.
+        Find the file of a document ID without listing the documents directory.
+
+        Unknown IDs and IDs whose file has gone trigger one rescan of the
+        directory, which picks up files added since the last listing.
+
+        Args:
+            document_id: The ID of the document
+
+        Returns:
+            Absolute path of the document, or None if no such document exists
+        """
+        filename = self._filename_by_id.get(document_id)
+        if filename is None or not os.path.isfile(os.path.join(self.documents_dir, filename)):
+            self.list_documents()
+            filename = self._filename_by_id.get(document_id)
+            if filename is None:
+                return None
+
+        file_path = os.path.join(self.documents_dir, filename)
+        return file_path if os.path.isfile(file_path) else None
+
+    def get_document_text(self, document_id: str) -> ExtractedText:
+        """
+        Get the extracted text of a document together with its page offsets.
 
         Args:
             document_id: The ID of the document to retrieve
 
         Returns:
-            Document text content as string
+            ExtractedText with the document text and the offset of every page
 
         Raises:
             HTTPException: If document is not found or cannot be processed
         """
         try:
             # Find the document by ID
-            documents = self.list_documents()
-            document = next(
-                (doc for doc in documents if doc["id"] == document_id), None)
+            file_path = self._resolve_document_path(document_id)
 
-            if not document:
+            if not file_path:
                 raise HTTPException(
                     status_code=404, detail=f"Document with ID {document_id} not found")
 
             # Get file extension
-            _, extension = os.path.splitext(document["filename"])
+            _, extension = os.path.splitext(file_path)
             if extension.lower() not in self.supported_extensions:
                 raise HTTPException(status_code=400,
                                     detail=f"Unsupported file type: {extension}")
 
-            # Use the appropriate extraction method
+            # Use the appropriate extraction method, unless the file is unchanged since the last extraction
             extraction_method = self.supported_extensions[extension.lower()]
-            content = extraction_method(document["path"])
-
-            return content
+            return self.text_store.get(file_path, extraction_method)
 
         except HTTPException as e:
             # Re-raise HTTP exceptions
@@ -291,25 +334,60 @@ class DocumentService:
             logger.error(f"Error retrieving document content: {str(e)}")
             raise HTTPException(status_code=500, detail=str(e))
 
-    def _extract_pdf_text(self, file_path: str) -> str:
-        """Extract text from a PDF file."""
+    def get_document_content(self, document_id: str) -> str:
+        """
+        Get the text content of a document by its ID.
+
+        Args:
+            document_id: The ID of the document to retrieve
+
+        Returns:
+            Document text content as string
+
+        Raises:
+            HTTPException: If document is not found or cannot be processed
+        """
+        return self.get_document_text(document_id).text
+
+    async def aget_document_text(self, document_id: str) -> ExtractedText:
+        """
+        Awaitable version of get_document_text that extracts in a worker thread
+        so the event loop never blocks on file I/O or PDF parsing.
+
+        Args:
+            document_id: The ID of the document to retrieve
+
+        Returns:
+            ExtractedText with the document text and the offset of every page
+        """
+        return await asyncio.to_thread(self.get_document_text, document_id)
+
+    async def aget_document_content(self, document_id: str) -> str:
+        """
+        Awaitable version of get_document_content.
+
+        Args:
+            document_id: The ID of the document to retrieve
+
+        Returns:
+            Document text content as string
+        """
+        return (await self.aget_document_text(document_id)).text
+
+    def _extract_pdf_pages(self, file_path: str) -> List[str]:
+        """Extract the text of every page of a PDF file, each followed by a newline."""
         try:
-            with open(file_path, 'rb') as pdf_file:
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+            return self.pdf_extractor.extract_pages(file_path)
         except Exception as e:
             logger.error(
                 f"Error extracting PDF text from {file_path}: {str(e)}")
             raise
 
-    def _extract_text_file(self, file_path: str) -> str:
-        """Extract text from a plain text file."""
+    def _extract_text_file_pages(self, file_path: str) -> List[str]:
+        """Extract text from a plain text file as a single page."""
         try:
             with open(file_path, 'r', encoding='utf-8') as text_file:
-                return text_file.read()
+                return [text_file.read()]
         except Exception as e:
             logger.error(f"Error extracting text from {file_path}: {str(e)}")
             raise
@@ -0,0 +1,306 @@
+"""
+Persistent store of text extracted from source documents.
+
+Extracting text from a PDF is slow and was repeated on every
+get_document_content call. The store keeps the extracted plain text and the
+character offset at which every page starts:
+
+- in memory, keyed by file path and validated with the file's (mtime, size),
+  so a repeat read costs a single os.stat;
+- on disk, keyed by the SHA-256 of the file content, so the text survives
+  restarts and a renamed or touched-but-unchanged file is not re-extracted.
+  Once the files exceed a size limit the least recently used are removed
+  (by modification time, which is refreshed on every disk hit).
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bump when extraction output changes so stale disk entries are ignored
+EXTRACTION_VERSION = 1
+
+# Share of the size limit kept after an eviction, so that evictions are not run on every write
+EVICTION_TARGET = 0.9
+
+# An extractor returns the text of every page of a file; the pages are concatenated as is
+PageExtractor = Callable[[str], List[str]]
+
+
+class ExtractedText:
+    """
+    Plain text of a document together with the offsets of its pages.
+    """
+
+    __slots__ = ("text", "page_offsets", "sha256")
+
+    def __init__(self, text: str, page_offsets: List[int], sha256: str):
+        """
+        Args:
+            text: Full document text
+            page_offsets: Character offset at which each page starts in text
+            sha256: SHA-256 of the source file content
+        """
+        self.text = text
+        self.page_offsets = page_offsets
+        self.sha256 = sha256
+
+    @classmethod
+    def from_pages(cls, pages: List[str], sha256: str) -> "ExtractedText":
+        """
+        Concatenate page texts, recording where every page starts.
+
+        Args:
+            pages: Text of every page in order, including any separator after it
+            sha256: SHA-256 of the source file content
+
+        Returns:
+            ExtractedText instance
+        """
+        page_offsets = []
+        offset = 0
+        for page in pages:
+            page_offsets.append(offset)
+            offset += len(page)
+        return cls("".join(pages), page_offsets, sha256)
+
+    def page_of(self, offset: int) -> int:
+        """
+        Return the zero-based page number containing a character offset.
+
+        Args:
+            offset: Character offset in text
+
+        Returns:
+            Page number (0 if the document has no page information)
+        """
+        return max(0, bisect.bisect_right(self.page_offsets, offset) - 1)
+
+
+def hash_file(file_path: str) -> str:
+    """
+    Compute the SHA-256 of a file's content.
+
+    Args:
+        file_path: Path of the file
+
+    Returns:
+        Hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as source_file:
+        for block in iter(lambda: source_file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentTextStore:
+    """
+    Two-tier (memory LRU + JSON files on disk) store of extracted document text.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, memory_items: int = 64, max_bytes: int = 0):
+        """
+        Initialize the store.
+
+        Args:
+            cache_dir: Directory holding one JSON file per extracted document, or None
+                to keep extracted text in memory only
+            memory_items: Maximum number of documents kept in the in-memory LRU tier
+            max_bytes: Total size of the files on disk before the least recently used are removed (0 = unbounded)
+        """
+        self.cache_dir = cache_dir
+        self.memory_items = max(0, memory_items)
+        self.max_bytes = max(0, max_bytes)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # path -> ((mtime_ns, size), extracted text)
+        self._memory: "OrderedDict[str, Tuple[Tuple[int, int], ExtractedText]]" = OrderedDict()
+
+        # Hit/miss counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Other workers write to the same directory, so this is recounted before evicting
+        self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    def _path(self, sha256: str, extension: str) -> str:
+        key = hashlib.sha256(
+            f"{sha256}\0{extension}\0{EXTRACTION_VERSION}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, file_path: str, signature: Tuple[int, int], extracted: ExtractedText) -> None:
+        """Insert a document into the LRU tier, evicting the least recently used entries."""
+        if not self.memory_items:
+            return
+        self._memory[file_path] = (signature, extracted)
+        self._memory.move_to_end(file_path)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _disk_entries(self) -> List[Tuple[int, int, str]]:
+        """(mtime_ns, size, path) of every file on disk."""
+        if not self.cache_dir:
+            return []
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # Removed by another worker
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self) -> None:
+        """Remove the least recently used files beyond the size limit. Called with the lock held."""
+        entries = sorted(self._disk_entries())
+        self._disk_bytes = sum(size for _, size, _ in entries)
+
+        evicted = 0
+        for _, size, path in entries:
+            if self._disk_bytes <= self.max_bytes * EVICTION_TARGET:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._disk_bytes -= size
+            evicted += 1
+        self.evictions += evicted
+        logger.info(f"Evicted {evicted} extracted text entries from {self.cache_dir}")
+
+    def _load(self, cache_path: str) -> Optional[ExtractedText]:
+        """Read a disk entry, ignoring missing files and removing unreadable ones."""
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, "r", encoding="utf-8") as cache_file:
+                data = json.load(cache_file)
+            extracted = ExtractedText(data["text"], data["page_offsets"], data["sha256"])
+            # The modification time orders entries for eviction
+            os.utime(cache_path)
+            return extracted
+        except FileNotFoundError:
+            # Evicted by another worker in the meantime
+            return None
+        except Exception as e:
+            logger.warning(f"Removing unreadable extracted text entry {cache_path}: {e}")
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+            return None
+
+    def _save(self, cache_path: str, extracted: ExtractedText, source_path: str) -> None:
+        """Write a disk entry atomically so concurrent readers never see a partial file."""
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as cache_file:
+                json.dump({
+                    "source": source_path,
+                    "sha256": extracted.sha256,
+                    "page_offsets": extracted.page_offsets,
+                    "text": extracted.text
+                }, cache_file)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            logger.warning(f"Failed to persist extracted text entry {cache_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._disk_bytes += size
+            if self.max_bytes and self._disk_bytes > self.max_bytes:
+                self._evict()
+
+    def get(self, file_path: str, extractor: PageExtractor) -> ExtractedText:
+        """
+        Return the extracted text of a file, extracting it only if it changed.
+
+        Args:
+            file_path: Path of the source document
+            extractor: Function returning the text of every page of the file
+
+        Returns:
+            ExtractedText of the current file content
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        stat = os.stat(file_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._memory.get(file_path)
+            if cached is not None and cached[0] == signature:
+                self._memory.move_to_end(file_path)
+                self.memory_hits += 1
+                return cached[1]
+
+        # The file is new or changed on disk; identical content is still served from disk
+        sha256 = hash_file(file_path)
+        extension = os.path.splitext(file_path)[1].lower()
+        cache_path = self._path(sha256, extension) if self.cache_dir else None
+
+        extracted = self._load(cache_path) if cache_path else None
+        if extracted is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            logger.info(f"Extracting text from {file_path}")
+            extracted = ExtractedText.from_pages(extractor(file_path), sha256)
+            if cache_path:
+                self._save(cache_path, extracted, file_path)
+            with self._lock:
+                self.misses += 1
+
+        with self._lock:
+            self._remember(file_path, signature, extracted)
+        return extracted
+
+    def invalidate(self, file_path: str) -> None:
+        """
+        Drop a file from the memory tier (e.g. after it was deleted or replaced).
+
+        Args:
+            file_path: Path of the source document
+        """
+        with self._lock:
+            self._memory.pop(file_path, None)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return hit/miss counters and sizes.
+
+        Returns:
+            Dictionary of store statistics
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+                "max_bytes": self.max_bytes
+            }
@@ -0,0 +1,160 @@
+"""
+Parallel PDF text extraction.
+
+PyPDF2 extracts pages one at a time in pure Python, so a large guidance PDF
+keeps one core busy for seconds. PdfPageExtractor splits the page range into
+slices that worker processes extract independently, and yields the pages back
+in document order together with the character offset at which each page starts.
+
+Parsing a PDF (reading the file, its cross-reference table and page tree) is
+done once per process: each worker keeps the reader of the file it is working
+on, so all the slices it receives reuse one parse, and the calling process
+extracts small PDFs with the same reader it used to count their pages.
+
+This module only depends on PyPDF2 so that worker processes start quickly.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import PyPDF2
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+# Reader of the PDF a worker process last extracted from: (path, (mtime_ns, size), reader)
+_worker_reader: Optional[Tuple[str, Tuple[int, int], PyPDF2.PdfReader]] = None
+
+
+def _open_reader(file_path: str) -> PyPDF2.PdfReader:
+    """Parse a PDF (PdfReader reads the whole file into memory, so no handle stays open)."""
+    return PyPDF2.PdfReader(file_path)
+
+
+def _read_pages(pdf_reader: PyPDF2.PdfReader, start: int, end: int) -> List[str]:
+    return [pdf_reader.pages[index].extract_text() + "\n" for index in range(start, end)]
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """
+    Extract the text of pages [start, end) of a PDF, each followed by a newline.
+
+    Runs in worker processes, so it must stay a module-level function. The parsed
+    PDF is kept for the next range of the same (unchanged) file.
+
+    Args:
+        file_path: Path of the PDF file
+        start: Index of the first page
+        end: Index after the last page
+
+    Returns:
+        Text of every page in the range
+    """
+    global _worker_reader
+    stat = os.stat(file_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if _worker_reader is None or _worker_reader[:2] != (file_path, signature):
+        # Only the current file is kept: release the previous one before parsing
+        _worker_reader = None
+        _worker_reader = (file_path, signature, _open_reader(file_path))
+    return _read_pages(_worker_reader[2], start, end)
+
+
+class PdfPageExtractor:
+    """
+    Extracts PDF pages across a process pool and streams them back in order.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, pages_per_task: int = 8,
+                 min_parallel_pages: int = 16):
+        """
+        Initialize the extractor; the process pool is started on first use.
+
+        Args:
+            max_workers: Number of worker processes (defaults to the CPU count; 1 disables the pool)
+            pages_per_task: Number of consecutive pages extracted by one task
+            min_parallel_pages: PDFs with fewer pages are extracted in the calling thread
+        """
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.pages_per_task = max(1, pages_per_task)
+        self.min_parallel_pages = min_parallel_pages
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # Spawned workers don't inherit the server's threads and open connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"))
+                logger.info(f"Started PDF extraction pool with {self.max_workers} workers")
+            return self._executor
+
+    def iter_pages(self, file_path: str) -> Iterator[Tuple[int, int, str]]:
+        """
+        Extract a PDF page by page.
+
+        Pages are yielded in document order as soon as the slice containing them is
+        done, while later slices are still being extracted.
+
+        Args:
+            file_path: Path of the PDF file
+
+        Yields:
+            (page index, character offset of the page in the full text, page text) tuples
+        """
+        pdf_reader = _open_reader(file_path)
+        page_count = len(pdf_reader.pages)
+
+        if self.max_workers == 1 or page_count < self.min_parallel_pages:
+            slices = [_read_pages(pdf_reader, 0, page_count)]
+        else:
+            # Workers parse the file themselves; the pages are not needed here anymore
+            del pdf_reader
+            # Smaller slices keep every worker busy until the end of the document
+            pages_per_task = min(self.pages_per_task, -(-page_count // self.max_workers))
+            executor = self._get_executor()
+            futures = [executor.submit(extract_page_range, file_path, start,
+                                       min(start + pages_per_task, page_count))
+                       for start in range(0, page_count, pages_per_task)]
+            slices = (future.result() for future in futures)
+
+        page_index = 0
+        offset = 0
+        try:
+            for pages in slices:
+                for text in pages:
+                    yield page_index, offset, text
+                    page_index += 1
+                    offset += len(text)
+        finally:
+            # Stop pending slices if the consumer gave up early
+            if not isinstance(slices, list):
+                for future in futures:
+                    future.cancel()
+
+    def extract_pages(self, file_path: str) -> List[str]:
+        """
+        Extract the text of every page of a PDF, each followed by a newline.
+
+        Args:
+            file_path: Path of the PDF file
+
+        Returns:
+            Text of every page in order
+        """
+        return [text for _, _, text in self.iter_pages(file_path)]
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
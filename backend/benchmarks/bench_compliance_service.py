@@ -0,0 +1,306 @@
+"""
+Benchmark: end-to-end ComplianceService reviews, offline, per phase.
+
+Reviews every sample clinical document in backend/documents against the
+compliance document it references ("compliance document comp_N.txt") with
+every ChunkerFactory strategy. The LLM and embedding clients are replaced by
+the replay stand-ins of compliance_service.replay: responses come from a
+cassette recorded with --record (which needs live credentials) or, for
+requests that were never recorded, from the deterministic synthetic responder.
+--latency adds a synthetic round trip to every LLM call.
+
+The phases of analyze_compliance are run one after another so each can be
+measured on its own (chunking, pairing, chunk_analysis, confidence when it is
+scored once per review, full_document, deduplication), followed by an
+end_to_end analyze_compliance run with its usual concurrency. Every phase
+reports wall time, LLM calls, chunk pairs analyzed, the CPU time spent
+verifying quotes against the documents and the peak RSS (the kernel's
+high-water mark is reset before each phase where /proc allows it). The chunk
+and LLM response caches are disabled so that repeated runs measure the same
+work. Agentic chunking calls the OpenAI API itself, so it only runs when
+asked for with --strategies agentic.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_compliance_service --latency 0.2
+    python -m benchmarks.bench_compliance_service --cassette reviews.json --output results.json
+    python -m benchmarks.bench_compliance_service --record reviews.json
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import re
+import resource
+import tempfile
+import time
+
+# Importing the compliance service package instantiates its LLM clients;
+# placeholder settings are enough because no API is called.
+for _name in ("OPENAI_API_KEY", "OPENAI_MODEL_NAME", "AZURE_OPENAI_API_KEY",
+              "AZURE_OPENAI_API_ENDPOINT", "AZURE_OPENAI_API_REGION",
+              "AZURE_OPENAI_API_MODEL_NAME", "AZURE_OPENAI_API_DEPLOYMENT_NAME",
+              "AZURE_OPENAI_API_MODEL_VERSION", "SMTP_USERNAME", "SMTP_PASSWORD", "SENDER_EMAIL"):
+    os.environ.setdefault(_name, "benchmark")
+# Every run has to chunk and call the (stand-in) LLM again
+os.environ["CHUNK_CACHE_ENABLED"] = "false"
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["DIGEST_CACHE_ENABLED"] = "false"
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="compliance-bench-"))
+
+from app.core.config import settings  # noqa: E402
+from app.models.compliance import ComplianceReviewInput  # noqa: E402
+from app.services.compliance_service import compliance_service  # noqa: E402
+from app.services.compliance_service import service as service_module  # noqa: E402
+from app.services.compliance_service.chunking import ChunkerFactory  # noqa: E402
+from app.services.compliance_service.replay import (  # noqa: E402
+    Cassette,
+    RecordingChatModel,
+    RecordingEmbeddings,
+    ReplayChatModel,
+    ReplayEmbeddings,
+)
+from app.services.document_service import document_service  # noqa: E402
+
+REFERENCE_PATTERN = re.compile(r"compliance\s+document\s+comp_(\d+)", re.IGNORECASE)
+
+# Strategies that chunk without calling an API
+OFFLINE_STRATEGIES = tuple(strategy for strategy in ChunkerFactory.STRATEGIES if strategy != "agentic")
+
+
+class VerificationTimer:
+    """Accumulates the thread CPU time of the quote verification functions of the service."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def wrap(self, function):
+        def timed(*args, **kwargs):
+            start = time.thread_time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.seconds += time.thread_time() - start
+        return timed
+
+    def install(self):
+        service_module.locate_verified_text = self.wrap(service_module.locate_verified_text)
+        service_module.find_text_offsets = self.wrap(service_module.find_text_offsets)
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS of this process (Linux); False if it can't be reset."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process in MB since the last reset (or since start)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if maxrss > 1 << 30 else maxrss / 1024
+
+
+def document_pairs():
+    """(clinical id, compliance id) of every clinical document that references a compliance document."""
+    documents = document_service.list_documents()
+    compliance_ids = {doc["title"]: str(doc["id"]) for doc in documents if doc["type"] == "compliance"}
+    pairs = []
+    for doc in sorted(documents, key=lambda doc: doc["title"]):
+        if doc["type"] != "clinical":
+            continue
+        match = REFERENCE_PATTERN.search(document_service.get_document_content(str(doc["id"])))
+        if match and f"comp_{match.group(1)}" in compliance_ids:
+            pairs.append((str(doc["id"]), compliance_ids[f"comp_{match.group(1)}"]))
+    return pairs
+
+
+class PhaseMeter:
+    """Measures the phases of one review."""
+
+    def __init__(self, llm, embeddings, verification: VerificationTimer):
+        self.llm = llm
+        self.embeddings = embeddings
+        self.verification = verification
+        self.rows = []
+
+    async def measure(self, phase: str, work, pairs: int = 0):
+        rss_reset = reset_peak_rss()
+        calls, embedding_calls = self.llm.calls, self.embeddings.calls
+        verification = self.verification.seconds
+        cpu, start = time.process_time(), time.perf_counter()
+
+        result = work()
+        if inspect.isawaitable(result):
+            result = await result
+
+        self.rows.append({
+            "phase": phase,
+            "wall_ms": (time.perf_counter() - start) * 1000,
+            "cpu_ms": (time.process_time() - cpu) * 1000,
+            "llm_calls": self.llm.calls - calls,
+            "embedding_calls": self.embeddings.calls - embedding_calls,
+            "pairs": pairs,
+            "verification_cpu_ms": (self.verification.seconds - verification) * 1000,
+            "peak_rss_mb": peak_rss_mb(),
+            "rss_reset": rss_reset
+        })
+        return result
+
+
+async def run_review(service, review_input: ComplianceReviewInput, meter: PhaseMeter):
+    """Run the phases of analyze_compliance one after another, then the whole review."""
+    clinical, compliance = review_input.clinical_doc_content, review_input.compliance_doc_content
+    limiter = service._create_rate_limiter(review_input)
+    score_per_pair = settings.CONFIDENCE_SCORING_SCOPE != "review"
+
+    clinical_chunks, compliance_chunks = await meter.measure("chunking", lambda: asyncio.gather(
+        service._split_text_with_offsets(clinical), service._split_text_with_offsets(compliance)))
+    clinical_texts = [chunk.text for chunk in clinical_chunks]
+    compliance_texts = [chunk.text for chunk in compliance_chunks]
+
+    plan = await meter.measure("pairing", lambda: service._select_chunk_pairs(
+        clinical_texts, compliance_texts, max_pairs=settings.MAX_CHUNK_PAIRS_PER_REVIEW))
+    chunk_issues = await meter.measure("chunk_analysis", lambda: service._analyze_chunk_pairs(
+        plan.pairs, clinical_texts, [chunk.offset for chunk in clinical_chunks],
+        compliance_texts, [chunk.offset for chunk in compliance_chunks],
+        limiter, score_confidence=score_per_pair), pairs=len(plan.pairs))
+    if not score_per_pair:
+        await meter.measure("confidence", lambda: service._score_issue_confidence(chunk_issues, limiter))
+    direct_issues = await meter.measure("full_document", lambda: service._analyze_full_documents(
+        clinical, compliance, limiter=limiter))
+    await meter.measure("deduplication", lambda: service._deduplicate_issues(chunk_issues + direct_issues))
+
+    issues = await meter.measure("end_to_end", lambda: service.analyze_compliance(review_input),
+                                 pairs=len(plan.pairs))
+    return len(clinical_chunks), len(compliance_chunks), len(issues)
+
+
+def print_rows(strategy: str, pair, chunk_counts, rows):
+    clinical_id, compliance_id = pair
+    print(f"\n{strategy}: {clinical_id} vs {compliance_id} "
+          f"({chunk_counts[0]} clinical / {chunk_counts[1]} compliance chunks, {chunk_counts[2]} issues)")
+    print(f"  {'phase':<15} {'wall':>10} {'cpu':>10} {'llm':>5} {'emb':>5} {'pairs':>6} "
+          f"{'verify cpu':>11} {'peak rss':>10}")
+    for row in rows:
+        print(f"  {row['phase']:<15} {row['wall_ms']:8.1f}ms {row['cpu_ms']:8.1f}ms {row['llm_calls']:>5} "
+              f"{row['embedding_calls']:>5} {row['pairs']:>6} {row['verification_cpu_ms']:9.1f}ms "
+              f"{row['peak_rss_mb']:8.1f}MB")
+
+
+def print_summary(results):
+    print(f"\n{'strategy':<10} {'reviews':>7} {'e2e wall':>11} {'llm calls':>10} {'pairs':>6} "
+          f"{'verify cpu':>11} {'max rss':>9}")
+    for strategy in dict.fromkeys(result["strategy"] for result in results):
+        runs = [result for result in results if result["strategy"] == strategy]
+        end_to_end = [row for run in runs for row in run["phases"] if row["phase"] == "end_to_end"]
+        print(f"{strategy:<10} {len(runs):>7} {sum(row['wall_ms'] for row in end_to_end):9.1f}ms "
+              f"{sum(row['llm_calls'] for row in end_to_end):>10} {sum(row['pairs'] for row in end_to_end):>6} "
+              f"{sum(row['verification_cpu_ms'] for row in end_to_end):9.1f}ms "
+              f"{max(row['peak_rss_mb'] for run in runs for row in run['phases']):7.1f}MB")
+
+
+async def record(strategies, pairs, path: str):
+    """Run every review against the real clients and save their responses and embeddings."""
+    cassette = Cassette.load(path) if os.path.exists(path) else Cassette()
+    compliance_service.llm_client = RecordingChatModel(compliance_service.llm_client, cassette)
+    compliance_service.embeddings = RecordingEmbeddings(compliance_service.embeddings, cassette)
+    for strategy in strategies:
+        compliance_service.chunker = ChunkerFactory.create_chunker(
+            strategy, chunk_size=settings.CHUNK_SIZE, chunk_overlap=settings.CHUNK_OVERLAP)
+        for clinical_id, compliance_id in pairs:
+            print(f"Recording {strategy}: {clinical_id} vs {compliance_id}")
+            await compliance_service.analyze_compliance(ComplianceReviewInput(
+                clinical_doc_id=clinical_id, compliance_doc_id=compliance_id,
+                clinical_doc_content=document_service.get_document_content(clinical_id),
+                compliance_doc_content=document_service.get_document_content(compliance_id)))
+    cassette.save(path)
+    print(f"Recorded {len(cassette.responses)} responses and {len(cassette.embeddings)} embeddings to {path}")
+
+
+async def benchmark(args, strategies, pairs):
+    cassette = Cassette.load(args.cassette) if args.cassette else Cassette()
+    llm = ReplayChatModel(cassette, latency=args.latency, jitter=args.jitter)
+    embeddings = ReplayEmbeddings(cassette, latency=args.embedding_latency)
+    verification = VerificationTimer()
+    verification.install()
+
+    compliance_service.llm_client = llm
+    compliance_service.embeddings = embeddings
+    compliance_service.embeddings_available = True
+
+    results = []
+    for strategy in strategies:
+        try:
+            compliance_service.chunker = ChunkerFactory.create_chunker(
+                strategy, chunk_size=settings.CHUNK_SIZE, chunk_overlap=settings.CHUNK_OVERLAP)
+        except Exception as e:
+            # e.g. NLTK not installed, or tiktoken unable to download its encoding
+            print(f"\nSkipping {strategy} chunking: {type(e).__name__}: {e}")
+            continue
+        for pair in pairs:
+            clinical_id, compliance_id = pair
+            review_input = ComplianceReviewInput(
+                clinical_doc_id=clinical_id, compliance_doc_id=compliance_id,
+                clinical_doc_content=document_service.get_document_content(clinical_id),
+                compliance_doc_content=document_service.get_document_content(compliance_id))
+            meter = PhaseMeter(llm, embeddings, verification)
+            chunk_counts = await run_review(compliance_service, review_input, meter)
+            print_rows(strategy, pair, chunk_counts, meter.rows)
+            results.append({"strategy": strategy, "clinical_doc_id": clinical_id,
+                            "compliance_doc_id": compliance_id, "clinical_chunks": chunk_counts[0],
+                            "compliance_chunks": chunk_counts[1], "issues": chunk_counts[2],
+                            "phases": meter.rows})
+
+    if results:
+        print_summary(results)
+    print(f"\nLLM stand-in: {llm.stats()}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"latency": args.latency, "jitter": args.jitter,
+                       "llm_max_concurrency": settings.LLM_MAX_CONCURRENCY,
+                       "confidence_scoring_scope": settings.CONFIDENCE_SCORING_SCOPE,
+                       "results": results}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--strategies", nargs="+", choices=ChunkerFactory.STRATEGIES,
+                        default=list(OFFLINE_STRATEGIES), help="Chunking strategies to run")
+    parser.add_argument("--cassette", help="Recorded responses to replay (default: synthetic responses only)")
+    parser.add_argument("--record", metavar="PATH",
+                        help="Record the responses of the real LLM and embedding clients to PATH instead")
+    parser.add_argument("--latency", type=float, default=0.1, help="Mean seconds per LLM call")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative spread of the LLM latency")
+    parser.add_argument("--embedding-latency", type=float, default=0.0,
+                        help="Seconds per embedding call (blocks, like the API client)")
+    parser.add_argument("--output", help="Write the measurements to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the service's logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    pairs = document_pairs()
+    if args.record:
+        asyncio.run(record(args.strategies, pairs, args.record))
+    else:
+        asyncio.run(benchmark(args, args.strategies, pairs))
+
+
+if __name__ == "__main__":
+    main()
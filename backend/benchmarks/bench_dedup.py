@@ -0,0 +1,163 @@
+"""
+Benchmark: merging issues through MinHash/LSH candidates vs pairwise comparison.
+
+Synthetic reviews of 100 to 10k issues are built from pseudo-regulatory text,
+about a third of them near duplicates of earlier issues (a word or two changed,
+re-quoted with different whitespace, or cited with another confidence).
+
+The whole-document issues (the last quarter) are added to the chunk issues
+(the rest), skipping duplicates, as analyze_compliance does; the incremental
+check against stored issues has the same shape. The IssueIndex merge is timed
+against the previous approach of comparing every incoming issue with every
+known one through the old per-pair check, which re-tokenized both issues for
+every comparison. Both must keep the same issues; the pairwise baseline is
+skipped above --pairwise-max issues, where it takes minutes.
+
+The final deduplicate_issues pass only groups identical clinical texts in one
+dictionary pass and is not benchmarked here.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_dedup --sizes 100 1000 10000
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+
+# Importing the compliance service package instantiates its LLM clients;
+# placeholder settings are enough because no API is called.
+for _name in ("OPENAI_API_KEY", "OPENAI_MODEL_NAME", "AZURE_OPENAI_API_KEY",
+              "AZURE_OPENAI_API_ENDPOINT", "AZURE_OPENAI_API_REGION",
+              "AZURE_OPENAI_API_MODEL_NAME", "AZURE_OPENAI_API_DEPLOYMENT_NAME",
+              "AZURE_OPENAI_API_MODEL_VERSION", "SMTP_USERNAME", "SMTP_PASSWORD", "SENDER_EMAIL"):
+    os.environ.setdefault(_name, "benchmark")
+
+from app.models.compliance import ComplianceIssue  # noqa: E402
+from app.services.compliance_service.dedup import IssueIndex  # noqa: E402
+
+VOCABULARY = (
+    "the subject shall be enrolled after informed consent is obtained from the participant "
+    "investigator sponsor protocol washout period weeks days dose adverse event serious report "
+    "within hours of awareness monitoring visit source data verification record retention "
+    "concomitant medication prohibited permitted inclusion exclusion criteria age years "
+    "randomization blinding placebo efficacy safety endpoint primary secondary analysis "
+    "population ethics committee approval amendment deviation audit inspection quality"
+).split()
+
+
+def legacy_text_overlap(text1, text2):
+    """Previous ComplianceService._calculate_text_overlap."""
+    if not text1 or not text2:
+        return 0.0
+    t1 = text1.lower().strip()
+    t2 = text2.lower().strip()
+    if not t1 or not t2:
+        return 0.0
+    words1 = set(t1.split())
+    words2 = set(t2.split())
+    union = len(words1.union(words2))
+    return len(words1.intersection(words2)) / union if union else 0.0
+
+
+def legacy_is_similar(issue1, issue2):
+    """Previous ComplianceService._is_similar_issue."""
+    if issue1.clinical_text.strip() == issue2.clinical_text.strip():
+        return True
+    clinical_overlap = legacy_text_overlap(issue1.clinical_text, issue2.clinical_text)
+    compliance_overlap = legacy_text_overlap(issue1.compliance_text, issue2.compliance_text)
+    regulation_match = False
+    if issue1.regulation and issue2.regulation:
+        regulation_match = re.sub(r'[^0-9.]', '', issue1.regulation) == re.sub(r'[^0-9.]', '', issue2.regulation)
+    suggestion_overlap = legacy_text_overlap(issue1.suggested_edit, issue2.suggested_edit)
+    if clinical_overlap > 0.95:
+        return True
+    return (clinical_overlap > 0.8 and (compliance_overlap > 0.8 or suggestion_overlap > 0.8)) or \
+           (clinical_overlap > 0.8 and regulation_match)
+
+
+def pairwise_merge(existing, incoming):
+    merged = list(existing)
+    for issue in incoming:
+        if not any(legacy_is_similar(issue, known) for known in merged):
+            merged.append(issue)
+    return merged
+
+
+def index_merge(existing, incoming):
+    merged = list(existing)
+    index = IssueIndex(merged)
+    for issue in incoming:
+        if index.find_similar(issue) is None:
+            merged.append(issue)
+            index.add(issue)
+    return merged
+
+
+def sentence(generator, vocabulary, weights, length):
+    return " ".join(generator.choices(vocabulary, weights, k=length))
+
+
+def synthetic_issues(count, seed=0):
+    generator = random.Random(seed)
+    vocabulary = list(VOCABULARY)
+    while len(vocabulary) < 3000:
+        vocabulary.append("".join(generator.choice("abcdefghijklmnopqrstuvwxyz")
+                                  for _ in range(generator.randint(3, 11))))
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+
+    issues = []
+    for number in range(count):
+        if issues and generator.random() < 0.35:
+            base = generator.choice(issues)
+            words = base.clinical_text.split()
+            for _ in range(generator.randint(0, 2)):
+                words[generator.randrange(len(words))] = generator.choices(vocabulary, weights)[0]
+            clinical = (" " if generator.random() < 0.5 else "") + " ".join(words)
+            compliance, suggestion, regulation = base.compliance_text, base.suggested_edit, base.regulation
+        else:
+            clinical = sentence(generator, vocabulary, weights, generator.randint(15, 40))
+            compliance = sentence(generator, vocabulary, weights, generator.randint(15, 40))
+            suggestion = sentence(generator, vocabulary, weights, generator.randint(10, 30))
+            regulation = f"ICH GCP Section 4.{generator.randint(1, 12)}.{generator.randint(1, 9)}"
+        issues.append(ComplianceIssue(
+            id=f"R-{number:08x}", clinical_text=clinical, compliance_text=compliance,
+            explanation="Synthetic issue", suggested_edit=suggestion,
+            confidence=generator.choice(["high", "low"]), regulation=regulation))
+    return issues
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Number of issues per synthetic review")
+    parser.add_argument("--pairwise-max", type=int, default=2000,
+                        help="Largest review the pairwise baseline is run on")
+    args = parser.parse_args()
+
+    print(f"{'issues':>7} {'kept':>7}  {'merge pairwise':>15} {'merge LSH':>10}  same")
+    for size in args.sizes:
+        issues = synthetic_issues(size)
+        existing, incoming = issues[:size * 3 // 4], issues[size * 3 // 4:]
+
+        merged, merge_time = timed(index_merge, existing, incoming)
+
+        if size <= args.pairwise_max:
+            expected_merged, pairwise_merge_time = timed(pairwise_merge, existing, incoming)
+            same = [issue.id for issue in merged] == [issue.id for issue in expected_merged]
+            baseline = f"{pairwise_merge_time * 1000:13.1f}ms"
+        else:
+            same, baseline = "-", f"{'skipped':>15}"
+
+        print(f"{size:>7} {len(merged):>7}  {baseline} {merge_time * 1000:8.1f}ms  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Micro-benchmark: repeat reads of a document through the extracted-text store.
+
+Measures a cold extraction (what every get_document_content call used to pay),
+a disk hit (fresh process, unchanged file) and an in-memory hit (mtime/size
+check only).
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_document_store path/to/guideline.pdf --reads 1000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# Importing the document service loads the settings; placeholder values are enough
+for _name in ("OPENAI_API_KEY", "OPENAI_MODEL_NAME", "AZURE_OPENAI_API_KEY",
+              "AZURE_OPENAI_API_ENDPOINT", "AZURE_OPENAI_API_REGION",
+              "AZURE_OPENAI_API_MODEL_NAME", "AZURE_OPENAI_API_DEPLOYMENT_NAME",
+              "AZURE_OPENAI_API_MODEL_VERSION", "SMTP_USERNAME", "SMTP_PASSWORD", "SENDER_EMAIL"):
+    os.environ.setdefault(_name, "benchmark")
+
+from app.services.document_service import document_service  # noqa: E402
+from app.services.document_text_store import DocumentTextStore  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("file", help="PDF or text document to read")
+    parser.add_argument("--reads", type=int, default=1000, help="Number of repeat reads")
+    args = parser.parse_args()
+
+    extension = os.path.splitext(args.file)[1].lower()
+    extractor = document_service.supported_extensions[extension]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        store = DocumentTextStore(cache_dir=cache_dir)
+        start = time.perf_counter()
+        extracted = store.get(args.file, extractor)
+        cold = time.perf_counter() - start
+
+        restarted = DocumentTextStore(cache_dir=cache_dir)
+        start = time.perf_counter()
+        restarted.get(args.file, extractor)
+        disk = time.perf_counter() - start
+
+        timings = []
+        for _ in range(args.reads):
+            start = time.perf_counter()
+            restarted.get(args.file, extractor)
+            timings.append(time.perf_counter() - start)
+
+    print(f"{args.file}: {len(extracted.page_offsets)} pages, {len(extracted.text)} chars")
+    print(f"cold extraction: {cold * 1000:10.2f} ms")
+    print(f"disk hit:        {disk * 1000:10.2f} ms")
+    print(f"memory hit:      {statistics.median(timings) * 1e6:10.2f} us (median of {args.reads})")
+
+
+if __name__ == "__main__":
+    main()
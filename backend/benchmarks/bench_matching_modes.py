@@ -0,0 +1,151 @@
+"""
+Benchmark: compliance-document matching with mean pooling vs chunk-level max-sim.
+
+Every clinical document in backend/documents names its compliance document
+("compliance document comp_N.txt"), which serves as the label; the embedding
+ranking itself never sees that reference. Queries are the full clinical
+documents plus windows of consecutive matching chunks, so that both modes are
+also scored on partial documents. Reports top-1 accuracy, mean reciprocal rank
+and the latency of the index lookup (embedding the query is excluded, it is the
+same batched call in both modes). --pad adds random documents to the index to
+show how the lookup scales.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_matching_modes --embeddings hashing
+    python -m benchmarks.bench_matching_modes --embeddings openai --window 2 --pad 1000
+"""
+
+import argparse
+import os
+import re
+import statistics
+import time
+
+# Importing the services loads the settings; placeholder values are enough
+for _name in ("OPENAI_API_KEY", "OPENAI_MODEL_NAME", "AZURE_OPENAI_API_KEY",
+              "AZURE_OPENAI_API_ENDPOINT", "AZURE_OPENAI_API_REGION",
+              "AZURE_OPENAI_API_MODEL_NAME", "AZURE_OPENAI_API_DEPLOYMENT_NAME",
+              "AZURE_OPENAI_API_MODEL_VERSION", "SMTP_USERNAME", "SMTP_PASSWORD", "SENDER_EMAIL"):
+    os.environ.setdefault(_name, "benchmark")
+
+import numpy as np  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.services.compliance_service.chunking import RecursiveChunker  # noqa: E402
+from app.services.document_service import document_service  # noqa: E402
+from app.services.document_matcher_service.embedding_index import EmbeddingIndex  # noqa: E402
+
+REFERENCE_PATTERN = re.compile(r"compliance\s+document\s+comp_(\d+)", re.IGNORECASE)
+
+
+class HashingEmbeddings:
+    """Offline stand-in for the embedding client: L2-normalized hashed term counts."""
+
+    def __init__(self, n_features: int = 1024):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False,
+                                            stop_words="english", norm="l2")
+
+    def embed_documents(self, texts):
+        return self.vectorizer.transform(texts).toarray().astype(np.float32)
+
+
+def load_embeddings(kind: str):
+    if kind == "hashing":
+        return HashingEmbeddings()
+    from app.services.document_matcher_service import document_matcher
+    return document_matcher.embeddings
+
+
+def label_of(text: str, compliance_ids):
+    match = REFERENCE_PATTERN.search(text)
+    if not match:
+        return None
+    return next((doc_id for doc_id in compliance_ids
+                 if re.fullmatch(rf"COMP_0*{match.group(1)}", doc_id)), None)
+
+
+def build_queries(chunker, embeddings, window: int, compliance_ids):
+    """Return (name, label, chunk embeddings) for every full document and chunk window."""
+    queries = []
+    for doc in document_service.list_documents(doc_type="clinical"):
+        text = document_service.get_document_content(doc["id"])
+        label = label_of(text, compliance_ids)
+        if label is None:
+            continue
+        chunk_embeddings = np.asarray(embeddings.embed_documents(chunker.split_text(text)), dtype=np.float32)
+        queries.append((doc["id"], label, chunk_embeddings))
+        for start in range(0, len(chunk_embeddings) - window + 1):
+            queries.append((f"{doc['id']}[{start}:{start + window}]", label,
+                            chunk_embeddings[start:start + window]))
+    return queries
+
+
+def pad_index(chunk_embeddings, count: int, generator):
+    """Random documents with as many chunks as the real ones, for latency at scale."""
+    dimension = next(iter(chunk_embeddings.values())).shape[1]
+    sizes = [len(matrix) for matrix in chunk_embeddings.values()]
+    return {f"PAD_{number:05d}": generator.normal(size=(sizes[number % len(sizes)], dimension))
+            for number in range(count)}
+
+
+def evaluate(mode: str, chunk_embeddings, queries, top_k: int):
+    index = EmbeddingIndex(None, config=mode)
+    start = time.perf_counter()
+    index.sync({doc_id: "" for doc_id in chunk_embeddings},
+               lambda doc_id: (chunk_embeddings[doc_id] if mode == "max_sim"
+                               else chunk_embeddings[doc_id].mean(axis=0)))
+    build = time.perf_counter() - start
+
+    correct = 0
+    reciprocal_ranks = []
+    timings = []
+    for _, label, query_chunks in queries:
+        start = time.perf_counter()
+        if mode == "max_sim":
+            ranking = index.search_max_sim(query_chunks, top_k=top_k)
+        else:
+            ranking = index.search(query_chunks.mean(axis=0), top_k=top_k)
+        timings.append(time.perf_counter() - start)
+
+        ranked_ids = [doc_id for doc_id, _ in ranking]
+        correct += bool(ranked_ids) and ranked_ids[0] == label
+        reciprocal_ranks.append(1 / (ranked_ids.index(label) + 1) if label in ranked_ids else 0.0)
+
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{mode:<8} top-1 {correct / len(queries):6.1%}   MRR {statistics.mean(reciprocal_ranks):.3f}   "
+          f"lookup p50 {statistics.median(timings) * 1e6:9.1f} us   p99 {p99 * 1e6:9.1f} us   "
+          f"index {index.matrix.nbytes / 1e6:7.2f} MB built in {build * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--embeddings", choices=["hashing", "openai"], default="hashing",
+                        help="Embedding client (hashing runs offline)")
+    parser.add_argument("--window", type=int, default=1, help="Consecutive chunks per partial query")
+    parser.add_argument("--pad", type=int, default=0, help="Random documents added to the index")
+    args = parser.parse_args()
+
+    chunker = RecursiveChunker(chunk_size=settings.MATCHING_CHUNK_SIZE,
+                               chunk_overlap=settings.MATCHING_CHUNK_OVERLAP)
+    embeddings = load_embeddings(args.embeddings)
+
+    compliance_ids = [doc["id"] for doc in document_service.list_documents(doc_type="compliance")]
+    chunk_embeddings = {
+        doc_id: np.asarray(embeddings.embed_documents(
+            chunker.split_text(document_service.get_document_content(doc_id))), dtype=np.float32)
+        for doc_id in compliance_ids}
+    queries = build_queries(chunker, embeddings, args.window, compliance_ids)
+    if args.pad:
+        chunk_embeddings.update(pad_index(chunk_embeddings, args.pad, np.random.default_rng(0)))
+
+    print(f"{len(queries)} queries, {len(chunk_embeddings)} indexed documents "
+          f"({sum(len(matrix) for matrix in chunk_embeddings.values())} chunks), "
+          f"{args.embeddings} embeddings, chunk size {chunker.chunk_size}")
+    for mode in ("mean", "max_sim"):
+        evaluate(mode, chunk_embeddings, queries, top_k=min(10, len(chunk_embeddings)))
+
+
+if __name__ == "__main__":
+    main()
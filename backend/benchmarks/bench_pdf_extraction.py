@@ -0,0 +1,46 @@
+"""
+Micro-benchmark: serial vs process-pool PDF text extraction.
+
+Extracts the same PDF with one worker (the previous behaviour) and with the
+process pool at increasing worker counts, and checks that the text and page
+offsets are identical.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_pdf_extraction path/to/guideline.pdf --workers 1 2 4 8
+"""
+
+import argparse
+import time
+
+from app.services.pdf_extraction import PdfPageExtractor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("file", help="PDF document to extract")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--pages-per-task", type=int, default=8)
+    args = parser.parse_args()
+
+    reference = None
+    for workers in args.workers:
+        extractor = PdfPageExtractor(max_workers=workers, pages_per_task=args.pages_per_task,
+                                     min_parallel_pages=0)
+        if workers > 1:
+            # Start the workers outside the measurement; the server keeps its pool warm
+            extractor._get_executor().submit(int).result()
+
+        start = time.perf_counter()
+        pages = list(extractor.iter_pages(args.file))
+        elapsed = time.perf_counter() - start
+        extractor.shutdown()
+
+        if reference is None:
+            reference = pages
+            baseline = elapsed
+        assert pages == reference, "parallel extraction differs from serial extraction"
+        print(f"{workers:3d} workers: {elapsed * 1000:9.1f} ms  ({baseline / elapsed:4.2f}x)  {len(pages)} pages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Load benchmark: GET /reviews/{review_id} under concurrent clients.
+
+Seeds a local SQLite database with reviews (stored document content and
+issues), serves the compliance router with uvicorn in a child process and runs
+concurrent HTTP clients against it, reporting latency percentiles. The same
+requests are also sent to a copy of the previous handler, which queried a
+synchronous Session from inside the event loop, so the two can be compared.
+Clients run in a separate process so that a blocked server event loop shows up
+as queueing latency.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_review_api_load --clients 100 --requests 20
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='review-load-'), 'reviews.db')}"
+
+# Importing the endpoints loads the settings; placeholder values are enough
+for _name in ("OPENAI_API_KEY", "OPENAI_MODEL_NAME", "AZURE_OPENAI_API_KEY",
+              "AZURE_OPENAI_API_ENDPOINT", "AZURE_OPENAI_API_REGION",
+              "AZURE_OPENAI_API_MODEL_NAME", "AZURE_OPENAI_API_DEPLOYMENT_NAME",
+              "AZURE_OPENAI_API_MODEL_VERSION", "SMTP_USERNAME", "SMTP_PASSWORD", "SENDER_EMAIL"):
+    os.environ.setdefault(_name, "benchmark")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, HTTPException  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.api.endpoints import compliance  # noqa: E402
+from app.db.database import SessionLocal, engine, init_db  # noqa: E402
+from app.db.models.models import ComplianceIssue, Review  # noqa: E402
+from app.db.repositories.compliance_repository import ComplianceRepository  # noqa: E402
+
+
+def seed(reviews: int, issues: int, content_chars: int) -> None:
+    init_db()
+    content = ("Subjects are enrolled after written informed consent. " * (content_chars // 55 + 1))[:content_chars]
+    with SessionLocal() as db:
+        for number in range(1, reviews + 1):
+            review_id = f"R-{number:05d}"
+            db.add(Review(id=review_id, clinical_doc_id="CLIN_001", compliance_doc_id="COMP_001",
+                          clinicalDoc="Protocol", complianceDoc="Guideline", status="completed",
+                          clinical_doc_content=content, compliance_doc_content=content))
+            db.flush()
+            db.execute(insert(ComplianceIssue), [
+                {"id": f"{review_id}-{index}", "review_id": review_id, "clinical_text": content[:200],
+                 "compliance_text": content[:200], "explanation": "Missing consent step",
+                 "suggested_edit": "Add the consent step", "confidence": "high" if index % 2 else "low",
+                 "status": "pending"}
+                for index in range(issues)])
+        db.commit()
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(compliance.router)
+
+    @app.get("/legacy/reviews/{review_id}")
+    async def legacy_get_review(review_id: str):
+        # Previous implementation: blocking queries on the event loop thread. It took
+        # the session from Depends(get_db), whose teardown runs in the threadpool; with
+        # more clients than pooled connections the loop then blocks in the pool checkout
+        # until pool_timeout, so the copy closes its session before returning instead.
+        with SessionLocal() as db:
+            review = ComplianceRepository.get_review_by_id(db, review_id)
+            if not review:
+                raise HTTPException(status_code=404, detail=f"Review {review_id} not found")
+            issues = ComplianceRepository.get_issues_for_review(db, review_id)
+            review_dict = review.to_dict()
+            review_dict["issues"] = [issue.to_dict() for issue in issues]
+        return review_dict
+
+    return app
+
+
+async def run_clients(base_url: str, path: str, clients: int, requests: int, reviews: int):
+    latencies = []
+
+    async def client_loop(client: httpx.AsyncClient, seed_value: int):
+        generator = random.Random(seed_value)
+        for _ in range(requests):
+            review_id = f"R-{generator.randint(1, reviews):05d}"
+            start = time.perf_counter()
+            response = await client.get(path.format(review_id=review_id))
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, index) for index in range(clients)))
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def wait_until_ready(base_url: str, server: subprocess.Popen) -> None:
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Benchmark server exited during startup")
+        try:
+            httpx.get(f"{base_url}/reviews/R-00001", timeout=5).raise_for_status()
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("Benchmark server did not start within 60 s")
+
+
+def report(label: str, latencies, elapsed: float) -> None:
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{label:<28} p50 {quantiles[49] * 1000:8.1f} ms   p95 {quantiles[94] * 1000:8.1f} ms   "
+          f"p99 {quantiles[98] * 1000:8.1f} ms   {len(latencies) / elapsed:8.1f} req/s")
+
+
+async def run(args, base_url: str) -> None:
+    # Warm up both connection pools
+    await run_clients(base_url, "/reviews/{review_id}", 4, 5, args.reviews)
+    await run_clients(base_url, "/legacy/reviews/{review_id}", 4, 5, args.reviews)
+
+    for label, path in (("sync session (previous)", "/legacy/reviews/{review_id}"),
+                        ("async session", "/reviews/{review_id}")):
+        latencies, elapsed = await run_clients(base_url, path, args.clients, args.requests, args.reviews)
+        report(label, latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=100, help="Number of concurrent clients")
+    parser.add_argument("--requests", type=int, default=20, help="Requests sent by each client")
+    parser.add_argument("--reviews", type=int, default=200, help="Number of seeded reviews")
+    parser.add_argument("--issues", type=int, default=20, help="Issues per seeded review")
+    parser.add_argument("--content-chars", type=int, default=20000,
+                        help="Size of each stored document")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the benchmark server")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Per-request INFO logs would dominate the measurement
+    logging.disable(logging.INFO)
+
+    if args.serve:
+        uvicorn.run(build_app(), host="127.0.0.1", port=args.port, log_level="warning",
+                    access_log=False, timeout_keep_alive=300)
+        return
+
+    seed(args.reviews, args.issues, args.content_chars)
+    print(f"{args.clients} clients x {args.requests} requests, {args.reviews} reviews "
+          f"({args.issues} issues, {args.content_chars} chars per document) on {engine.url}")
+
+    # The server process inherits DATABASE_URL and so opens the seeded database
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_review_api_load", "--serve", "--port", str(args.port)])
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(base_url, server)
+        asyncio.run(run(args, base_url))
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
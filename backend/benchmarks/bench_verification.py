@@ -0,0 +1,132 @@
+"""
+Micro-benchmark: per-issue verification latency against document size.
+
+Compares the previous whole-source fuzzy verification (partial_ratio and
+token_sort_ratio over the entire normalized document) with the candidate-window
+verifier in compliance_service.utils. Quotes are perturbed with small typos so
+that verification has to reach the fuzzy stage.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_verification --sizes 5000 20000 100000 500000 --issues 50
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import time
+
+# Importing the compliance service package instantiates its LLM clients;
+# placeholder settings are enough because no API is called.
+for _name in ("OPENAI_API_KEY", "AZURE_OPENAI_API_KEY", "AZURE_OPENAI_API_ENDPOINT",
+              "AZURE_OPENAI_API_REGION", "AZURE_OPENAI_API_MODEL_NAME",
+              "AZURE_OPENAI_API_DEPLOYMENT_NAME", "AZURE_OPENAI_API_MODEL_VERSION",
+              "SMTP_USERNAME", "SMTP_PASSWORD", "SENDER_EMAIL"):
+    os.environ.setdefault(_name, "benchmark")
+os.environ.setdefault("OPENAI_MODEL_NAME", "gpt-4o")
+
+from rapidfuzz import fuzz as rapidfuzz_fuzz  # noqa: E402
+
+from app.services.compliance_service.utils import (  # noqa: E402
+    NormalizedText,
+    locate_verified_text,
+)
+
+VOCABULARY = (
+    "the subject shall be enrolled after informed consent is obtained from the participant "
+    "investigator sponsor protocol washout period weeks days dose adverse event serious report "
+    "within hours of awareness monitoring visit source data verification record retention "
+    "concomitant medication prohibited permitted inclusion exclusion criteria age years "
+    "randomization blinding placebo efficacy safety endpoint primary secondary analysis "
+    "population ethics committee approval amendment deviation audit inspection quality"
+).split()
+
+
+def make_vocabulary(rng: random.Random, size: int = 3000):
+    """Regulatory terms plus pseudo-words, with Zipf-like weights as in natural text."""
+    words = list(VOCABULARY)
+    while len(words) < size:
+        words.append("".join(rng.choice("abcdefghijklmnopqrstuvwxyz")
+                             for _ in range(rng.randint(3, 11))))
+    weights = [1.0 / (rank + 1) for rank in range(len(words))]
+    return words, weights
+
+
+def make_document(size: int, rng: random.Random) -> str:
+    """Generate pseudo-regulatory text of roughly size characters."""
+    vocabulary, weights = make_vocabulary(rng)
+    sentences = []
+    length = 0
+    while length < size:
+        words = rng.choices(vocabulary, weights=weights, k=rng.randint(8, 25))
+        # Sprinkle in numbers and identifiers so documents aren't purely repetitive
+        words.insert(rng.randrange(len(words)), str(rng.randint(1, 9999)))
+        sentence = " ".join(words).capitalize() + "."
+        sentences.append(sentence + ("\n\n" if rng.random() < 0.1 else " "))
+        length += len(sentences[-1])
+    return "".join(sentences)
+
+
+def make_quote(document: str, rng: random.Random, length: int = 120) -> str:
+    """Pick a quote from the document and introduce a few character-level typos."""
+    start = rng.randrange(0, len(document) - length)
+    quote = list(re.sub(r'\s+', ' ', document[start:start + length]).strip())
+    for _ in range(3):
+        position = rng.randrange(len(quote))
+        quote[position] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    return "".join(quote)
+
+
+def verify_whole_source(text: str, source: str) -> bool:
+    """Previous fuzzy stage: score against the entire normalized source."""
+    cleaned_text = re.sub(r'\s+', ' ', text).strip()
+    cleaned_source = re.sub(r'\s+', ' ', source)
+    partial_ratio = rapidfuzz_fuzz.partial_ratio(cleaned_text, cleaned_source)
+    rapidfuzz_fuzz.token_sort_ratio(cleaned_text, cleaned_source)
+    return partial_ratio >= 85 or (len(cleaned_text) > 50 and partial_ratio >= 75)
+
+
+def time_per_issue(function, quotes, source) -> float:
+    """Median latency of function(quote, source) in milliseconds."""
+    timings = []
+    for quote in quotes:
+        started = time.perf_counter()
+        function(quote, source)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[5000, 20000, 100000, 500000])
+    parser.add_argument("--issues", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'doc chars':>10} {'whole-source ms':>16} {'windowed ms':>12} {'speedup':>8} {'agree':>6}")
+    for size in args.sizes:
+        document = make_document(size, rng)
+        quotes = [make_quote(document, rng) for _ in range(args.issues)]
+
+        # The index is built once per document, as in a review
+        started = time.perf_counter()
+        index = NormalizedText(document)
+        index.word_positions()
+        build_ms = (time.perf_counter() - started) * 1000
+
+        whole = time_per_issue(verify_whole_source, quotes, document)
+        windowed = time_per_issue(
+            lambda quote, _: locate_verified_text(quote, index), quotes, document)
+        agree = sum(verify_whole_source(q, document) == (locate_verified_text(q, index) is not None)
+                    for q in quotes)
+
+        print(f"{len(document):>10} {whole:>16.3f} {windowed:>12.3f} "
+              f"{whole / windowed if windowed else float('inf'):>7.1f}x {agree:>3}/{len(quotes)}"
+              f"   (index build {build_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
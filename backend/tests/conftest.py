@@ -0,0 +1,24 @@
+"""
+Shared pytest configuration.
+
+Importing the compliance service instantiates its LLM clients, which requires
+the OpenAI/Azure settings to be present. Unit tests never call the APIs, so
+placeholder values are enough when no .env is configured.
+"""
+
+import os
+
+for name, value in {
+    "OPENAI_API_KEY": "test-key",
+    "OPENAI_MODEL_NAME": "gpt-4o",
+    "AZURE_OPENAI_API_KEY": "test-key",
+    "AZURE_OPENAI_API_ENDPOINT": "https://example.openai.azure.com/",
+    "AZURE_OPENAI_API_REGION": "test-region",
+    "AZURE_OPENAI_API_MODEL_NAME": "gpt-4o",
+    "AZURE_OPENAI_API_DEPLOYMENT_NAME": "test-deployment",
+    "AZURE_OPENAI_API_MODEL_VERSION": "2024-02-01",
+    "SMTP_USERNAME": "test",
+    "SMTP_PASSWORD": "test",
+    "SENDER_EMAIL": "test@example.com",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,123 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.services.compliance_service import chunking
+from app.services.compliance_service.chunking import AgenticChunker, ChunkContent, ChunkGroupsDirect
+
+# Paragraphs over half of the 10000-character pre-split limit, so each is a preliminary chunk of its own
+PARAGRAPHS = [f"Paragraph {number}: subjects will be screened within {number} days. " +
+              "Eligibility is confirmed by the investigator before enrollment. " * 90 for number in range(7)]
+TEXT = "\n\n".join(PARAGRAPHS)
+
+
+def completion(message):
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeAsyncOpenAI:
+    """
+    AsyncOpenAI stand-in: later batches are answered first, batches containing a
+    paragraph listed in `failing` raise, and without structured parsing the
+    reply comes back as JSON text.
+    """
+
+    in_flight = 0
+    max_in_flight = 0
+    requests = []
+
+    def __init__(self, failing=(), structured=True):
+        self.failing = failing
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        if structured:
+            self.beta = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(parse=self._parse)))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def _answer(self, messages):
+        prompt = messages[-1]["content"]
+        numbers = [number for number, paragraph in enumerate(PARAGRAPHS) if paragraph in prompt]
+        FakeAsyncOpenAI.requests.append(numbers)
+        FakeAsyncOpenAI.in_flight += 1
+        FakeAsyncOpenAI.max_in_flight = max(FakeAsyncOpenAI.max_in_flight, FakeAsyncOpenAI.in_flight)
+        try:
+            await asyncio.sleep(0.01 * (len(PARAGRAPHS) - numbers[0]))
+        finally:
+            FakeAsyncOpenAI.in_flight -= 1
+        if any(number in self.failing for number in numbers):
+            raise RuntimeError("rate limited")
+        return [f"Rewritten {number}" for number in numbers]
+
+    async def _parse(self, model, messages, response_format):
+        rewritten = await self._answer(messages)
+        return completion(SimpleNamespace(parsed=ChunkGroupsDirect(
+            chunks=[ChunkContent(rewritten=text) for text in rewritten])))
+
+    async def _create(self, model, messages, response_format):
+        rewritten = await self._answer(messages)
+        return completion(SimpleNamespace(content=json.dumps({"chunks": [{"rewritten": text} for text in rewritten]})))
+
+
+def use_fake_openai(monkeypatch, **kwargs):
+    FakeAsyncOpenAI.in_flight = FakeAsyncOpenAI.max_in_flight = 0
+    FakeAsyncOpenAI.requests = []
+    monkeypatch.setattr(settings, "AGENTIC_CHUNKING_LLM_ENABLED", True)
+    monkeypatch.setattr(settings, "CHUNKING_MAX_CONCURRENCY", 2)
+    monkeypatch.setattr(chunking, "OPENAI_AVAILABLE", True)
+    monkeypatch.setattr(chunking, "openai", SimpleNamespace(AsyncOpenAI=lambda api_key: FakeAsyncOpenAI(**kwargs)))
+
+
+def test_batches_answered_out_of_order_are_merged_in_batch_order(monkeypatch):
+    use_fake_openai(monkeypatch)
+    chunks, complete = asyncio.run(AgenticChunker(batch_size=2)._aprocess_with_llm(TEXT))
+
+    assert chunks == [f"Rewritten {number}" for number in range(7)]
+    assert complete
+    assert sorted(FakeAsyncOpenAI.requests) == [[0, 1], [2, 3], [4, 5], [6]]
+    assert FakeAsyncOpenAI.max_in_flight == 2
+
+
+def test_failed_batches_keep_original_text_and_mark_result_incomplete(monkeypatch):
+    use_fake_openai(monkeypatch, failing=(3,), structured=False)
+    chunks, complete = asyncio.run(AgenticChunker(batch_size=2)._aprocess_with_llm(TEXT))
+
+    assert chunks == ["Rewritten 0", "Rewritten 1", PARAGRAPHS[2], PARAGRAPHS[3],
+                      "Rewritten 4", "Rewritten 5", "Rewritten 6"]
+    assert not complete
+
+
+def test_merge_falls_back_to_recursive_chunks_when_nothing_was_produced():
+    chunker = AgenticChunker(chunk_size=100, chunk_overlap=10)
+    chunks, complete = chunker._merge_batch_results([[]], [ChunkGroupsDirect(chunks=[])], TEXT)
+    assert chunks == chunker.fallback_chunker.split_text(TEXT)
+    assert not complete
+
+
+def test_offsets_of_rewritten_chunks_are_located(monkeypatch):
+    use_fake_openai(monkeypatch)
+    monkeypatch.setattr(FakeAsyncOpenAI, "_answer", answer_verbatim)
+    located, complete = asyncio.run(AgenticChunker(batch_size=3).asplit_with_offsets_and_status(TEXT))
+
+    assert complete
+    assert [chunk.offset for chunk in located] == [TEXT.index(paragraph) for paragraph in PARAGRAPHS]
+
+
+async def answer_verbatim(self, messages):
+    prompt = messages[-1]["content"]
+    return [paragraph for paragraph in PARAGRAPHS if paragraph in prompt]
+
+
+def test_llm_rewrite_is_off_by_default(monkeypatch):
+    use_fake_openai(monkeypatch)
+    monkeypatch.setattr(settings, "AGENTIC_CHUNKING_LLM_ENABLED", False)
+    chunker = AgenticChunker(chunk_size=120, chunk_overlap=10)
+    located, complete = asyncio.run(chunker.asplit_with_offsets_and_status(TEXT))
+
+    assert FakeAsyncOpenAI.requests == []
+    assert complete and located == chunker.fallback_chunker.split_with_offsets(TEXT)
+    assert chunker.cache_params()["model"] is None
@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.endpoints import compliance
+from app.db.database import get_async_db, init_db
+from app.db.repositories.async_compliance_repository import AsyncComplianceRepository
+from app.models.compliance import ComplianceIssue as ComplianceIssueModel
+
+
+def review_data(content="Patients are enrolled after consent."):
+    return {"clinical_doc_id": "CLIN_001", "compliance_doc_id": "COMP_001",
+            "clinicalDoc": "Protocol", "complianceDoc": "Guideline", "status": "completed",
+            "clinical_doc_content": content, "compliance_doc_content": "Consent is required."}
+
+
+def issue(text):
+    return ComplianceIssueModel(id=text, clinical_text=text, compliance_text="Consent is required.",
+                                explanation="Missing consent", suggested_edit="Add consent",
+                                confidence="high", regulation="ICH E6")
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    path = tmp_path / "reviews.db"
+    init_db(create_engine(f"sqlite:///{path}"))
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+def test_async_repository_round_trip(session_factory):
+    async def scenario():
+        async with session_factory() as db:
+            created = await AsyncComplianceRepository.create_review(db, review_data())
+            assert created.id == "R-00001"
+            assert created.to_dict()["issues"] == 0
+
+            updated = await AsyncComplianceRepository.add_issues_to_review(
+                db, created.id, [issue("enrolled"), issue("consent")])
+            assert updated.to_dict()["issues"] == 2
+
+        async with session_factory() as db:
+            review = await AsyncComplianceRepository.get_review_by_id(db, "R-00001")
+            assert review.to_dict()["highConfidenceIssues"] == 2
+            assert len(await AsyncComplianceRepository.get_issues_for_review(db, "R-00001")) == 2
+
+            rows, next_cursor = await AsyncComplianceRepository.get_review_summaries(db, limit=10)
+            assert [row.issue_count for row in rows] == [2]
+            assert next_cursor is None
+
+            review = await AsyncComplianceRepository.update_review(
+                db, "R-00001", {"clinical_doc_content": "Edited"})
+            assert review.clinical_doc_content == "Edited"
+
+            assert await AsyncComplianceRepository.delete_review(db, "R-00001") == {
+                "reviews": 1, "issues": 2, "decisions": 0}
+            assert await AsyncComplianceRepository.get_review_by_id(db, "R-00001") is None
+
+    asyncio.run(scenario())
+
+
+def test_review_endpoint_serves_stored_content(session_factory):
+    app = FastAPI()
+    app.include_router(compliance.router)
+
+    async def override_db():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_db
+
+    async def scenario():
+        async with session_factory() as db:
+            review = await AsyncComplianceRepository.create_review(db, review_data("Applied edit"))
+            await AsyncComplianceRepository.add_issues_to_review(db, review.id, [issue("Applied")])
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/reviews/R-00001")
+            missing = await client.get("/reviews/R-09999")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["clinical_doc_content"] == "Applied edit"
+        assert [item["clinical_text"] for item in body["issues"]] == ["Applied"]
+        assert missing.status_code == 404
+
+    asyncio.run(scenario())
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.database import init_db
+from app.db.repositories.async_compliance_repository import AsyncComplianceRepository
+from app.models.compliance import BatchReviewRequest, ComplianceIssue
+from app.services.batch_review_service import BatchReviewService
+
+CONTENT = {
+    "CLIN_001": "Protocol one", "CLIN_002": "Protocol two", "CLIN_003": "Protocol three",
+    "COMP_001": "Guideline one", "COMP_002": "Guideline two",
+}
+MATCHES = {"CLIN_001": "COMP_001", "CLIN_002": "COMP_002", "CLIN_003": "COMP_001"}
+
+
+class FakeDocuments:
+    def __init__(self):
+        self.listing_threads = []
+
+    def list_documents(self, doc_type=None):
+        self.listing_threads.append(threading.current_thread())
+        return [{"id": doc_id, "title": f"Title {doc_id}"} for doc_id in CONTENT
+                if doc_type is None or doc_id.startswith(doc_type[:4].upper())]
+
+    async def aget_document_content(self, doc_id):
+        return CONTENT[doc_id]
+
+
+class FakeMatcher:
+    async def find_matching_compliance_document(self, clinical_doc_id):
+        return MATCHES.get(clinical_doc_id)
+
+
+class FakeAnalyzer:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.prepared = []
+        self.limiters = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def prepare_compliance_document(self, content):
+        self.prepared.append(content)
+        return 1
+
+    async def analyze_compliance(self, review_input, limiter=None, trace=None):
+        self.limiters.add(id(limiter))
+        async with limiter.limit():
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+        if review_input.clinical_doc_id in self.failing:
+            raise RuntimeError("LLM unavailable")
+        return [ComplianceIssue(id=f"I-{review_input.clinical_doc_id}",
+                                clinical_text=review_input.clinical_doc_content,
+                                compliance_text=review_input.compliance_doc_content,
+                                explanation="Missing step", suggested_edit="Add the step",
+                                confidence="high", regulation="ICH E6")]
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    path = tmp_path / "reviews.db"
+    init_db(create_engine(f"sqlite:///{path}"))
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+def test_batch_job_groups_by_guideline_and_stores_reviews(session_factory):
+    analyzer = FakeAnalyzer(failing={"CLIN_002"})
+    documents = FakeDocuments()
+    service = BatchReviewService(analyzer, FakeMatcher(), documents, session_factory)
+
+    async def scenario():
+        job = service.start_job(BatchReviewRequest(all_clinical=True, max_concurrency=2))
+        assert job.status == "planning"
+        await service._tasks[job.job_id]
+
+        assert job.status == "completed"
+        assert job.groups == {"COMP_001": ["CLIN_001", "CLIN_003"], "COMP_002": ["CLIN_002"]}
+        assert (job.total, job.completed, job.failed) == (3, 2, 1)
+        # Each guideline is prepared once and every document shares the job's limiter
+        assert sorted(analyzer.prepared) == ["Guideline one", "Guideline two"]
+        assert len(analyzer.limiters) == 1
+        assert analyzer.max_in_flight <= 2
+        # Listing stats the document files, which must not block the event loop
+        assert len(documents.listing_threads) == 2
+        assert threading.main_thread() not in documents.listing_threads
+
+        items = {item.clinical_doc_id: item for item in job.items}
+        assert items["CLIN_002"].status == "failed"
+        assert items["CLIN_002"].review_id is None
+
+        async with session_factory() as db:
+            review = await AsyncComplianceRepository.get_review_by_id(db, items["CLIN_003"].review_id)
+            assert review.compliance_doc_id == "COMP_001"
+            assert review.complianceDoc == "Title COMP_001"
+            assert review.clinical_doc_content == "Protocol three"
+            assert review.to_dict()["issues"] == 1
+
+        assert service.get_job(job.job_id) is job
+
+    asyncio.run(scenario())
+
+
+def test_batch_job_requires_documents(session_factory):
+    service = BatchReviewService(FakeAnalyzer(), FakeMatcher(), FakeDocuments(), session_factory)
+    with pytest.raises(ValueError):
+        service.start_job(BatchReviewRequest())
@@ -0,0 +1,87 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models.models import Base, ComplianceIssue, Decision, Review
+from app.db.repositories.compliance_repository import ComplianceRepository
+from app.models.compliance import ComplianceIssue as ComplianceIssueModel
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    for review_id in ("R-00001", "R-00002"):
+        session.add(Review(id=review_id, clinical_doc_id="CLIN_001", compliance_doc_id="COMP_001",
+                           clinicalDoc="Protocol", complianceDoc="Guideline", status="in_progress",
+                           created_at=datetime.datetime(2025, 1, 1)))
+    session.commit()
+    yield session
+    session.close()
+
+
+def _issues(count):
+    return [ComplianceIssueModel(id=f"tmp-{n}", clinical_text=f"clinical {n}", compliance_text="rule",
+                                 explanation="why", suggested_edit="edit", confidence="high", regulation="5.1",
+                                 clinical_text_start_char=n, clinical_text_end_char=n + 5)
+            for n in range(count)]
+
+
+def _count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_issues_decisions_and_delete_are_set_based(engine, db):
+    review = ComplianceRepository.add_issues_to_review(db, "R-00001", _issues(500))
+    ComplianceRepository.add_issues_to_review(db, "R-00002", _issues(3))
+    assert len(review.issues) == 500
+    assert review.issues[0].clinical_text_start_char is not None
+
+    issue_ids = [issue.id for issue in review.issues]
+    foreign_id = ComplianceRepository.get_issues_for_review(db, "R-00002")[0].id
+    decisions = [{"issue_id": issue_id, "action": "accepted"} for issue_id in issue_ids]
+    decisions.append({"issue_id": foreign_id, "action": "rejected"})
+
+    statements = _count_statements(engine)
+    result = ComplianceRepository.save_decisions(db, "R-00001", decisions)
+
+    assert result == {"saved_count": 500, "skipped_count": 1, "review_completed": True}
+    assert sum(statement.startswith("INSERT") for statement in statements) == 1
+    assert len(statements) <= 6
+    assert db.get(Review, "R-00001").status == "completed"
+
+    updated = ComplianceRepository.update_issues_status(
+        db, [{"issue_id": issue_ids[0], "status": "accepted"},
+             {"issue_id": issue_ids[1], "status": "rejected"},
+             {"issue_id": "missing", "status": "accepted"}])
+    assert {issue.id: issue.status for issue in updated} == {
+        issue_ids[0]: "accepted", issue_ids[1]: "rejected"}
+
+    statements.clear()
+    deleted = ComplianceRepository.delete_review(db, "R-00001")
+    assert deleted == {"reviews": 1, "issues": 500, "decisions": 500}
+    assert sum(statement.startswith("DELETE") for statement in statements) == 3
+    assert db.query(ComplianceIssue).count() == 3
+    assert db.query(Decision).count() == 0
+    assert ComplianceRepository.delete_review(db, "R-00001") is None
+
+
+def test_status_update_uses_values_join_on_postgres():
+    from sqlalchemy.dialects import postgresql
+
+    statement = ComplianceRepository._issue_status_update(
+        "postgresql", {"a": "accepted", "b": "rejected"})
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("UPDATE compliance_issues SET status=new_statuses.status FROM (VALUES")
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.endpoints import compliance
+from app.models.compliance import ComplianceIssue
+from app.services import cache_service
+from app.services.cache_service import AnalysisResultCache, MemoryCache
+
+
+def test_lru_eviction_by_items_and_bytes():
+    cache = MemoryCache(max_items=2, max_bytes=0, default_ttl=0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    # "b" was the least recently used entry
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    sized = MemoryCache(max_items=0, max_bytes=15, default_ttl=0)
+    sized.set("x", "a" * 8)
+    sized.set("y", "b" * 8)
+    assert sized.get("x") is None
+    assert sized.stats()["evictions"] == 1
+    assert sized.stats()["bytes"] == 10
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_service.time, "monotonic", lambda: now[0])
+    cache = MemoryCache(default_ttl=60)
+    cache.set("short", "value", ttl=5)
+    cache.set("default", "value")
+
+    now[0] += 10
+    assert cache.get("short") is None
+    assert cache.get("default") == "value"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 1, 1)
+
+
+def test_analysis_results_are_indexed_by_document_pair():
+    results = AnalysisResultCache(MemoryCache())
+    issue = ComplianceIssue(id="i1", clinical_text="a", compliance_text="b", explanation="c",
+                            suggested_edit="d", confidence="high", regulation="5.1",
+                            clinical_text_start_char=3)
+
+    results.put("CLIN_001", "COMP_001", [issue])
+    results.put("CLIN_001", "COMP_002", [])
+
+    popped = results.pop("CLIN_001", "COMP_001")
+    assert [item.model_dump() for item in popped] == [issue.model_dump()]
+    assert results.pop("CLIN_001", "COMP_001") is None
+    assert results.pop("CLIN_001", "COMP_002") == []
+
+
+class ThreadRecordingCache(MemoryCache):
+    """Memory backend recording the threads its methods are called from."""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def set(self, key, value, ttl=None):
+        self.threads.append(threading.current_thread())
+        super().set(key, value, ttl)
+
+    def stats(self):
+        self.threads.append(threading.current_thread())
+        return super().stats()
+
+
+def test_endpoints_use_the_result_cache_off_the_event_loop(monkeypatch):
+    backend = ThreadRecordingCache()
+    monkeypatch.setattr(compliance, "analysis_results_cache", AnalysisResultCache(backend))
+
+    async def no_issues(review_input, trace=None):
+        return []
+
+    monkeypatch.setattr(compliance.enhanced_compliance_service, "analyze_compliance", no_issues)
+    app = FastAPI()
+    app.include_router(compliance.router)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            analyzed = await client.post("/analyze-compliance/", json={
+                "clinical_doc_id": "CLIN_001", "compliance_doc_id": "COMP_001",
+                "clinical_doc_content": "a", "compliance_doc_content": "b"})
+            stats = await client.get("/cache-stats/")
+        return analyzed, stats
+
+    analyzed, stats = asyncio.run(scenario())
+    assert analyzed.status_code == 200 and stats.status_code == 200
+    # Redis backends make a network round-trip per call, which must not block the loop
+    assert len(backend.threads) == 2
+    assert threading.main_thread() not in backend.threads
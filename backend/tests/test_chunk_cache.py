@@ -0,0 +1,76 @@
+import os
+
+from app.core.config import settings
+from app.services.compliance_service import chunk_cache
+from app.services.compliance_service.chunk_cache import ChunkCache, split_with_offsets_cached
+from app.services.compliance_service.chunking import RecursiveChunker
+from app.services.compliance_service.models.pydantic_models import TextWithOffset
+
+TEXT = "Subjects will be enrolled after screening.\n\nAdverse events will be reported within seven days."
+
+
+class CountingChunker(RecursiveChunker):
+    """Recursive chunker counting the documents it actually splits."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    def split_with_offsets_and_status(self, text):
+        self.calls += 1
+        return super().split_with_offsets_and_status(text)
+
+
+def test_keys_depend_on_text_strategy_size_overlap_and_model():
+    key = ChunkCache.make_key(TEXT, "recursive", 500, 50, None)
+    assert key == ChunkCache.make_key(TEXT, "recursive", 500, 50, None)
+    variants = [ChunkCache.make_key(TEXT + " ", "recursive", 500, 50, None),
+                ChunkCache.make_key(TEXT, "agentic", 500, 50, None),
+                ChunkCache.make_key(TEXT, "recursive", 400, 50, None),
+                ChunkCache.make_key(TEXT, "recursive", 500, 0, None),
+                ChunkCache.make_key(TEXT, "recursive", 500, 50, "gpt-4o")]
+    assert len({key, *variants}) == 6
+
+
+def test_results_are_reused_across_instances(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_CACHE_ENABLED", True)
+    monkeypatch.setattr(chunk_cache, "_chunk_cache", ChunkCache(str(tmp_path)))
+    chunker = CountingChunker(chunk_size=60, chunk_overlap=10)
+
+    chunks = split_with_offsets_cached(chunker, TEXT)
+    assert split_with_offsets_cached(chunker, TEXT) == chunks
+    # A new process reads the result from disk
+    monkeypatch.setattr(chunk_cache, "_chunk_cache", ChunkCache(str(tmp_path)))
+    assert split_with_offsets_cached(chunker, TEXT) == chunks
+    assert chunker.calls == 1
+    # A different chunk size is a different result
+    split_with_offsets_cached(CountingChunker(chunk_size=40, chunk_overlap=10), TEXT)
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_corrupt_entries_are_removed_and_recomputed(tmp_path):
+    key = ChunkCache.make_key(TEXT, "recursive", 500, 50, None)
+    (tmp_path / f"{key}.json").write_text('{"chunks": [{"text": "trunc')
+    cache = ChunkCache(str(tmp_path), memory_items=0)
+
+    assert cache.get(key) is None
+    assert not (tmp_path / f"{key}.json").exists()
+    cache.put(key, [TextWithOffset(text=TEXT, offset=0)])
+    assert cache.get(key) == [TextWithOffset(text=TEXT, offset=0)]
+    assert cache.stats()["disk_entries"] == 1
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = ChunkCache(str(tmp_path), memory_items=0, max_entries=4)
+    for number in range(4):
+        cache.put(f"k{number}", [TextWithOffset(text=f"chunk {number}", offset=0)])
+        os.utime(tmp_path / f"k{number}.json", (1000 + number, 1000 + number))
+    # A disk hit refreshes the modification time of k0
+    assert cache.get("k0") is not None
+
+    cache.put("k4", [TextWithOffset(text="chunk 4", offset=0)])
+    # Over the limit: entries are removed down to 90% of it
+    assert sorted(os.listdir(tmp_path)) == ["k0.json", "k3.json", "k4.json"]
+    assert cache.stats()["evictions"] == 2 and cache.stats()["disk_entries"] == 3
+    # A second worker counts the files already on disk
+    assert ChunkCache(str(tmp_path)).stats()["disk_entries"] == 3
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+from app.models.compliance import ComplianceIssue
+from app.services.compliance_service import compliance_service, concurrency
+from app.services.compliance_service.concurrency import LLMRateLimiter
+from app.services.compliance_service.models.pydantic_models import ChunkPair
+from app.services.compliance_service.replay import ReplayEmbeddings
+
+
+def test_limiter_caps_calls_in_flight():
+    limiter = LLMRateLimiter(max_concurrency=3)
+    in_flight = 0
+    max_in_flight = 0
+
+    async def call():
+        nonlocal in_flight, max_in_flight
+        async with limiter.limit():
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    async def scenario():
+        await asyncio.gather(*(call() for _ in range(12)))
+
+    asyncio.run(scenario())
+    assert max_in_flight == 3
+
+
+def test_token_bucket_waits_for_refill(monkeypatch):
+    clock = [1000.0]
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(round(seconds, 3))
+        clock[0] += seconds
+
+    monkeypatch.setattr(concurrency.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(concurrency.asyncio, "sleep", fake_sleep)
+
+    async def scenario():
+        # 60 tokens per minute refill at one token per second
+        limiter = LLMRateLimiter(max_concurrency=2, tokens_per_minute=60)
+        async with limiter.limit(estimated_tokens=60):
+            pass
+        async with limiter.limit(estimated_tokens=30):
+            pass
+        # Prompts larger than the whole budget wait for a full bucket only
+        async with limiter.limit(estimated_tokens=500):
+            pass
+
+    asyncio.run(scenario())
+    assert sleeps == [30.0, 60.0]
+
+
+def make_issue(clinical_index, compliance_index):
+    return ComplianceIssue(id=f"I-{clinical_index}-{compliance_index}", clinical_text=f"clinical {clinical_index}",
+                           compliance_text=f"compliance {compliance_index}", explanation="", suggested_edit="",
+                           confidence="high", regulation="")
+
+
+def test_pair_issues_are_merged_in_pair_order(monkeypatch):
+    pairs = [ChunkPair(clinical_index=i, compliance_index=0) for i in range(4)]
+    chunks = [f"chunk {i}" for i in range(4)]
+
+    async def analyze_pair(clinical_chunk, compliance_chunk, clinical_offset, compliance_offset, **kwargs):
+        index = chunks.index(clinical_chunk)
+        # Later pairs finish first
+        await asyncio.sleep(0.01 * (4 - index))
+        if index == 2:
+            raise RuntimeError("LLM unavailable")
+        return [make_issue(index, 0)]
+
+    monkeypatch.setattr(compliance_service, "_analyze_chunk_pair", analyze_pair)
+    finished = []
+    issues = asyncio.run(compliance_service._analyze_chunk_pairs(
+        pairs, chunks, [0] * 4, ["rule"], [0], LLMRateLimiter(max_concurrency=4),
+        on_pair_done=lambda pair, pair_issues: finished.append((pair.clinical_index, len(pair_issues)))))
+
+    # A failed pair is skipped; the others keep the order of the plan
+    assert [issue.id for issue in issues] == ["I-0-0", "I-1-0", "I-3-0"]
+    assert finished == [(3, 1), (2, 0), (1, 1), (0, 1)]
+
+
+def test_chunk_embeddings_are_computed_off_the_event_loop(monkeypatch):
+    threads = []
+
+    class RecordingEmbeddings(ReplayEmbeddings):
+        def embed_documents(self, texts):
+            threads.append(threading.get_ident())
+            return super().embed_documents(texts)
+
+    monkeypatch.setattr(compliance_service, "embeddings", RecordingEmbeddings(dimensions=16))
+    monkeypatch.setattr(compliance_service, "embeddings_available", True)
+
+    async def scenario():
+        plan = await compliance_service._select_chunk_pairs(["enrolled after consent"], ["consent before enrollment"])
+        return plan, threading.get_ident()
+
+    plan, loop_thread = asyncio.run(scenario())
+    assert plan.method == "embedding"
+    assert len(threads) == 2 and loop_thread not in threads
@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+from langchain.schema import AIMessage
+
+from app.core.config import settings
+from app.models.compliance import ComplianceIssue
+from app.services.compliance_service import compliance_service
+
+SINGLE_PROMPT_MARKER = "Output ONLY a single floating-point number"
+
+
+class ScriptedModel:
+    """Chat model stand-in answering batched prompts in order and single prompts per clinical text."""
+
+    def __init__(self, batch_replies, single_replies=None):
+        self.batch_replies = list(batch_replies)
+        self.single_replies = single_replies or {}
+        self.batch_calls = 0
+        self.single_calls = []
+
+    async def ainvoke(self, messages):
+        prompt = messages[-1].content
+        if SINGLE_PROMPT_MARKER in prompt:
+            clinical_text = prompt.split("Clinical Text Snippet:\n")[1].split("\n")[0]
+            self.single_calls.append(clinical_text)
+            return AIMessage(content=self.single_replies.get(clinical_text, "not sure"))
+        self.batch_calls += 1
+        return AIMessage(content=self.batch_replies.pop(0))
+
+
+def make_issue(text, confidence="high"):
+    return ComplianceIssue(id=text, clinical_text=text, compliance_text=f"rule for {text}",
+                           explanation="", suggested_edit="", confidence=confidence, regulation="")
+
+
+def test_batched_reply_keeps_valid_scores_only(monkeypatch):
+    pairs = [(f"clinical {i}", f"rule {i}") for i in range(4)]
+    replies = [
+        # Fenced, with an out-of-range index and a score outside [0, 1]
+        '```json\n{"scores": [{"index": 0, "confidence": 0.9}, {"index": 7, "confidence": 0.2}, '
+        '{"index": 1, "confidence": 1.5}, {"index": 3, "confidence": 0.1}]}\n```',
+        # Fails validation: entries are parsed one by one and broken ones skipped
+        json.dumps({"scores": [{"index": "2", "confidence": "0.4"}, {"index": 1}, "junk"]}),
+        "I cannot assess these issues.",
+    ]
+    model = ScriptedModel(replies)
+    monkeypatch.setattr(compliance_service, "llm_client", model)
+
+    async def scenario():
+        return [await compliance_service._assess_confidence_batch(pairs) for _ in replies]
+
+    assert asyncio.run(scenario()) == [{0: 0.9, 3: 0.1}, {2: 0.4}, {}]
+
+
+def test_missing_batch_scores_fall_back_to_single_calls(monkeypatch):
+    monkeypatch.setattr(settings, "CONFIDENCE_BATCH_SIZE", 2)
+    issues = [make_issue("a"), make_issue("b", confidence="low"), make_issue("c", confidence="low"),
+              make_issue("d", confidence="low")]
+    model = ScriptedModel(
+        batch_replies=[
+            # First batch (a, b): b is missing
+            '{"scores": [{"index": 0, "confidence": 0.2}]}',
+            # Second batch (c, d): indices are relative to the batch
+            '{"scores": [{"index": 1, "confidence": 0.8}]}',
+        ],
+        single_replies={"b": "0.7"})
+    monkeypatch.setattr(compliance_service, "llm_client", model)
+
+    asyncio.run(compliance_service._score_issue_confidence(issues))
+
+    assert model.batch_calls == 2
+    assert sorted(model.single_calls) == ["b", "c"]
+    # c could not be scored at all and keeps the confidence of the analysis prompt
+    assert [issue.confidence for issue in issues] == ["low", "high", "low", "high"]
@@ -0,0 +1,78 @@
+import random
+
+from app.models.compliance import ComplianceIssue
+from app.services.compliance_service.dedup import IssueFeatures, IssueIndex, deduplicate_issues, is_similar
+
+WORDS = ("subject consent enrolled visit dose week day adverse event report sponsor "
+         "investigator record protocol sample blood placebo washout criteria ethics").split()
+
+
+def issue(clinical, compliance="Consent is required before enrollment.", suggestion="Obtain consent first.",
+          confidence="high", regulation="ICH GCP Section 4.8.8", issue_id=None):
+    return ComplianceIssue(id=issue_id or clinical[:20], clinical_text=clinical, compliance_text=compliance,
+                           explanation="Missing step", suggested_edit=suggestion, confidence=confidence,
+                           regulation=regulation)
+
+
+def synthetic_issues(count, seed):
+    generator = random.Random(seed)
+    issues = []
+    for number in range(count):
+        if issues and generator.random() < 0.4:
+            # Near duplicate of an earlier issue: one word changed
+            base = generator.choice(issues)
+            words = base.clinical_text.split()
+            words[generator.randrange(len(words))] = generator.choice(WORDS)
+            clinical = " ".join(words)
+            compliance, suggestion = base.compliance_text, base.suggested_edit
+        else:
+            clinical = " ".join(generator.choice(WORDS) + str(generator.randrange(50)) for _ in range(12))
+            compliance = " ".join(generator.sample(WORDS, 8))
+            suggestion = " ".join(generator.sample(WORDS, 6))
+        issues.append(issue(clinical, compliance, suggestion, issue_id=f"I-{number}",
+                            confidence=generator.choice(["high", "low"]),
+                            regulation=f"Section 4.{generator.randrange(3)}"))
+    return issues
+
+
+def test_precedence_rules():
+    base = issue("Subjects are enrolled after the screening visit is complete today")
+    # Identical clinical text (after stripping) is always a duplicate
+    assert is_similar(IssueFeatures(base), IssueFeatures(issue("  " + base.clinical_text + " ",
+                                                              compliance="Other", suggestion="Other",
+                                                              regulation="Section 9")))
+    # Strong clinical overlap needs agreement on the regulation section...
+    near = "Subjects are enrolled after the screening visit is complete tomorrow"
+    assert is_similar(IssueFeatures(base), IssueFeatures(issue(near, compliance="Other", suggestion="Other",
+                                                              regulation="GCP 4.8.8")))
+    # ...or on the compliance text or suggestion
+    assert not is_similar(IssueFeatures(base), IssueFeatures(issue(near, compliance="Other", suggestion="Other",
+                                                                  regulation="Section 5.1")))
+    assert is_similar(IssueFeatures(base), IssueFeatures(issue(near, regulation="Section 5.1")))
+
+
+def test_deduplication_prefers_high_confidence_and_keeps_group_order():
+    issues = [issue("Text A", confidence="low", issue_id="a-low"),
+              issue("Unrelated clinical text B", issue_id="b"),
+              issue("Text A ", confidence="high", issue_id="a-high"),
+              issue("Text A", confidence="high", issue_id="a-high-2")]
+    assert [kept.id for kept in deduplicate_issues(issues)] == ["a-high", "b"]
+
+
+def test_deduplication_only_groups_identical_clinical_texts():
+    base = issue("Subjects are enrolled after the screening visit is complete today", issue_id="today")
+    near = issue("Subjects are enrolled after the screening visit is complete tomorrow", issue_id="tomorrow")
+    assert is_similar(IssueFeatures(base), IssueFeatures(near))
+    assert [kept.id for kept in deduplicate_issues([base, near])] == ["today", "tomorrow"]
+
+
+def test_index_finds_the_same_duplicates_as_comparing_every_pair():
+    issues = synthetic_issues(400, seed=1)
+    features = [IssueFeatures(item) for item in issues]
+    index = IssueIndex(issues[:100])
+
+    for position in range(100, len(issues)):
+        expected = next((earlier for earlier in range(position)
+                         if is_similar(features[position], features[earlier])), None)
+        assert index.find_similar(issues[position]) == expected
+        index.add(issues[position])
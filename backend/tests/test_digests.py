@@ -0,0 +1,136 @@
+import asyncio
+
+from app.core.config import settings
+from app.models.compliance import ComplianceReviewInput
+from app.services.compliance_service import compliance_service, digests
+from app.services.compliance_service.concurrency import estimate_tokens
+from app.services.compliance_service.digests import fit_digests, parse_digest, split_sections
+from app.services.compliance_service.models.pydantic_models import TextWithOffset
+from app.services.compliance_service.replay import ReplayChatModel
+
+PARAGRAPH = ("Subjects will be enrolled after the screening visit number {0} has been completed by the site staff. "
+             "Adverse events will be reported to the sponsor within {0} days of awareness by the investigator.\n\n")
+CLINICAL = "".join(PARAGRAPH.format(number) for number in range(120))
+COMPLIANCE = "".join(PARAGRAPH.format(number).replace("will be", "must be") for number in range(90))
+
+
+class PromptLoggingModel(ReplayChatModel):
+    """Replay model keeping the prompts it was sent."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.prompts = []
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        self.prompts.append("".join(message.content for message in messages))
+        return await super().ainvoke(messages, *args, **kwargs)
+
+
+def test_sections_tile_the_document_and_digests_fit_the_budget():
+    text = "Short paragraph.\n\n" + "A long sentence that keeps going. " * 20 + "\n\nTail."
+    sections = split_sections(text, 100)
+    assert "".join(section.text for section in sections) == text
+    assert all(len(section.text) <= 100 for section in sections)
+    assert all(text[section.offset:section.offset + len(section.text)] == section.text for section in sections)
+
+    assert parse_digest('```\n- "First statement."\n2. Second statement.\nNONE\n```', 5) == \
+        "- First statement.\n- Second statement."
+    section_digests = [TextWithOffset(text="- short", offset=0),
+                       TextWithOffset(text="\n".join(f"- statement {i}" for i in range(20)), offset=50)]
+    fitted = fit_digests(section_digests, 100)
+    assert fitted[0].text == "- short" and fitted[1].offset == 50
+    assert sum(len(digest.text) for digest in fitted) <= 100
+
+
+def test_large_documents_are_analyzed_through_cached_digests(tmp_path, monkeypatch):
+    llm = PromptLoggingModel(typo_rate=0.0, issues_per_prompt=4)
+    monkeypatch.setattr(compliance_service, "llm_client", llm)
+    monkeypatch.setattr(settings, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "FULL_DOCUMENT_MODE", "auto")
+    monkeypatch.setattr(settings, "FULL_DOCUMENT_MAX_PROMPT_TOKENS", 4000)
+    monkeypatch.setattr(settings, "DIGEST_SECTION_TOKENS", 1000)
+    monkeypatch.setattr(settings, "DIGEST_CACHE_ENABLED", True)
+    monkeypatch.setattr(digests, "_digest_cache", None)
+
+    assert compliance_service._full_document_mode(CLINICAL, COMPLIANCE) == "map_reduce"
+    issues = asyncio.run(compliance_service._analyze_full_documents(CLINICAL, COMPLIANCE))
+
+    sections = len(split_sections(CLINICAL, 4000)) + len(split_sections(COMPLIANCE, 4000))
+    assert llm.calls == sections + 1
+    # The holistic prompt over the digests stays within the prompt budget
+    assert "DIGEST" in llm.prompts[-1] and estimate_tokens(llm.prompts[-1]) <= 4000
+    assert issues and all(issue.metadata == {"analysis": "map_reduce"} for issue in issues)
+    # Quotes from the digests are located in the full documents
+    for issue in issues:
+        assert CLINICAL[issue.clinical_text_start_char:issue.clinical_text_end_char] == issue.clinical_text
+        assert COMPLIANCE[issue.compliance_text_start_char:issue.compliance_text_end_char] == issue.compliance_text
+
+    # Digests are reused; only the holistic pass runs again
+    asyncio.run(compliance_service._analyze_full_documents(CLINICAL, COMPLIANCE))
+    assert llm.calls == sections + 2
+
+
+def test_digests_are_cached_per_document_type(tmp_path, monkeypatch):
+    llm = PromptLoggingModel(typo_rate=0.0)
+    monkeypatch.setattr(compliance_service, "llm_client", llm)
+    monkeypatch.setattr(settings, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DIGEST_SECTION_TOKENS", 1000)
+    monkeypatch.setattr(settings, "DIGEST_CACHE_ENABLED", True)
+    monkeypatch.setattr(digests, "_digest_cache", None)
+
+    async def scenario():
+        for document_type in ("clinical trial document", "compliance document", "clinical trial document"):
+            await compliance_service._document_digests(COMPLIANCE, document_type, None)
+
+    asyncio.run(scenario())
+    # The same text digested as another kind of document gets its own prompts and cache entry
+    sections = len(split_sections(COMPLIANCE, 4000))
+    assert llm.calls == 2 * sections
+    assert sum("compliance document" in prompt for prompt in llm.prompts) == sections
+
+
+class ContextLimitedModel:
+    """Chat model stand-in rejecting prompts over a length, answering the rest with replay."""
+
+    model_name = "limited"
+
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.replay = ReplayChatModel(typo_rate=0.0)
+        self.rejected = 0
+
+    async def ainvoke(self, messages):
+        if sum(len(message.content) for message in messages) > self.max_chars:
+            self.rejected += 1
+            raise ValueError("This model's maximum context length is 8192 tokens (context_length_exceeded)")
+        return await self.replay.ainvoke(messages)
+
+
+def test_direct_prompt_over_the_context_window_falls_back_to_map_reduce(tmp_path, monkeypatch):
+    llm = ContextLimitedModel(max_chars=16000)
+    monkeypatch.setattr(compliance_service, "llm_client", llm)
+    monkeypatch.setattr(settings, "FULL_DOCUMENT_MODE", "direct")
+    monkeypatch.setattr(settings, "FULL_DOCUMENT_MAX_PROMPT_TOKENS", 3000)
+    monkeypatch.setattr(settings, "DIGEST_CACHE_ENABLED", False)
+
+    issues = asyncio.run(compliance_service._analyze_full_documents(CLINICAL, COMPLIANCE))
+    assert llm.rejected == 1
+    assert issues and all(issue.metadata == {"analysis": "map_reduce"} for issue in issues)
+
+
+def test_failed_whole_document_pass_is_reported(monkeypatch):
+    async def failing(*args, **kwargs):
+        raise RuntimeError("LLM unavailable")
+
+    async def no_chunk_issues(*args, **kwargs):
+        return []
+
+    monkeypatch.setattr(compliance_service, "_analyze_full_documents", failing)
+    monkeypatch.setattr(compliance_service, "_split_text_with_offsets", no_chunk_issues)
+    review_input = ComplianceReviewInput(clinical_doc_id="CLIN_001", compliance_doc_id="COMP_001",
+                                         clinical_doc_content="Clinical text.", compliance_doc_content="Rule.")
+    events = []
+    issues = asyncio.run(compliance_service.analyze_compliance(review_input, event_callback=events.append))
+
+    assert issues == []
+    assert {"event": "phase", "phase": "full_document_failed", "detail": "LLM unavailable"} in events
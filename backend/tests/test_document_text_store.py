@@ -0,0 +1,89 @@
+import json
+import os
+
+from app.services.document_service import DocumentService
+from app.services.document_text_store import DocumentTextStore, ExtractedText
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(text)
+
+
+def test_store_extracts_once_and_follows_file_changes(tmp_path):
+    calls = []
+
+    def extractor(file_path):
+        calls.append(file_path)
+        with open(file_path, encoding="utf-8") as handle:
+            return [f"{page}\n" for page in handle.read().split("|")]
+
+    source = tmp_path / "doc.txt"
+    _write(source, "first|second")
+    store = DocumentTextStore(cache_dir=str(tmp_path / "cache"))
+
+    extracted = store.get(str(source), extractor)
+    assert extracted.text == "first\nsecond\n"
+    assert extracted.page_offsets == [0, 6]
+    assert extracted.page_of(7) == 1
+    assert store.get(str(source), extractor) is extracted
+    assert len(calls) == 1
+
+    _write(source, "first|second|third")
+    assert store.get(str(source), extractor).text == "first\nsecond\nthird\n"
+    assert len(calls) == 2
+
+    # A fresh process finds the extracted text on disk
+    restarted = DocumentTextStore(cache_dir=str(tmp_path / "cache"))
+    assert restarted.get(str(source), extractor).text == "first\nsecond\nthird\n"
+    assert len(calls) == 2
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_from_pages_offsets():
+    extracted = ExtractedText.from_pages(["ab\n", "", "cde\n"], "hash")
+
+    assert extracted.text == "ab\ncde\n"
+    assert extracted.page_offsets == [0, 3, 3]
+
+
+def test_document_service_resolves_ids_and_new_files(tmp_path):
+    os.makedirs(tmp_path / "clinical")
+    os.makedirs(tmp_path / "compliance")
+    _write(tmp_path / "clinical" / "protocol.txt", "Protocol text")
+    service = DocumentService(documents_dir=str(tmp_path))
+
+    assert service.get_document_content("CLIN_001") == "Protocol text"
+
+    # Files added after start-up are found without an explicit listing
+    _write(tmp_path / "compliance" / "guideline.txt", "Guideline text")
+    assert service.get_document_content("COMP_001") == "Guideline text"
+
+
+def test_least_recently_used_documents_are_evicted_from_disk(tmp_path):
+    def extractor(file_path):
+        with open(file_path, encoding="utf-8") as handle:
+            return [handle.read()]
+
+    for name in "abc":
+        _write(tmp_path / f"{name}.txt", name * 1000)
+    cache_dir = tmp_path / "cache"
+    # Room for two documents; memory_items=0 sends every read to disk
+    store = DocumentTextStore(cache_dir=str(cache_dir), memory_items=0, max_bytes=2700)
+    store.get(str(tmp_path / "a.txt"), extractor)
+    store.get(str(tmp_path / "b.txt"), extractor)
+    for age, entry in enumerate(sorted(cache_dir.iterdir(), key=os.path.getmtime)):
+        os.utime(entry, (1000 + age, 1000 + age))
+    # A disk hit marks "a" as recently used
+    store.get(str(tmp_path / "a.txt"), extractor)
+
+    store.get(str(tmp_path / "c.txt"), extractor)
+    stats = store.stats()
+    assert stats["evictions"] == 1 and stats["disk_bytes"] <= 2700
+    assert sorted(json.loads(entry.read_text())["text"][0] for entry in cache_dir.iterdir()) == ["a", "c"]
+
+    # An unreadable entry is removed and extracted again
+    for entry in cache_dir.iterdir():
+        entry.write_text("{")
+    assert store.get(str(tmp_path / "a.txt"), extractor).text == "a" * 1000
+    assert store.stats()["misses"] == 4
@@ -0,0 +1,113 @@
+import json
+import multiprocessing
+
+import numpy as np
+
+from app.services.compliance_service.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+def vector(seed, dimension=4):
+    return np.random.default_rng(seed).random(dimension, dtype=np.float32)
+
+
+class CountingEmbeddings:
+    """Embeddings client stand-in recording the texts it was asked to embed."""
+
+    model = "text-embedding-test"
+
+    def __init__(self):
+        self.requests = []
+
+    def embed_documents(self, texts):
+        self.requests.append(list(texts))
+        return [vector(len(text)) for text in texts]
+
+
+def test_vectors_are_stored_per_dimension_and_reloaded(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), memory_items=0)
+    cache.put_many(["a", "b", "c"], [vector(1), vector(2, dimension=8), vector(3)])
+
+    assert (tmp_path / "vectors_4.f32").stat().st_size == 2 * 4 * 4
+    assert (tmp_path / "vectors_8.f32").stat().st_size == 8 * 4
+    entries = [json.loads(line) for line in (tmp_path / "index.jsonl").read_text().splitlines()]
+    assert entries == [{"k": "a", "d": 4, "r": 0}, {"k": "b", "d": 8, "r": 0}, {"k": "c", "d": 4, "r": 1}]
+
+    # A second process sees the vectors; rows appended after it mapped the file are remapped
+    other = EmbeddingCache(str(tmp_path), memory_items=0)
+    assert np.array_equal(other.get_many(["c"])[0], vector(3))
+    cache.put_many(["d"], [vector(4)])
+    found = other.get_many(["a", "d", "missing"])
+    assert np.array_equal(found[0], vector(1)) and np.array_equal(found[1], vector(4)) and found[2] is None
+    assert other.stats()["disk_hits"] == 3 and other.stats()["misses"] == 1
+
+
+def test_memory_tier_keeps_recently_used_vectors(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), memory_items=2)
+    cache.put_many(["a", "b", "c"], [vector(1), vector(2), vector(3)])
+    # "a" was evicted from memory but is still on disk
+    cache.get_many(["b", "c", "a"])
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["memory_entries"]) == (2, 1, 2)
+    cache.get_many(["a"])
+    assert cache.stats()["memory_hits"] == 3
+
+
+def test_cached_embeddings_only_embed_uncached_texts_once(tmp_path):
+    client = CountingEmbeddings()
+    embeddings = CachedEmbeddings(client, EmbeddingCache(str(tmp_path)))
+
+    first = embeddings.embed_documents(["alpha", "beta", "alpha"])
+    second = embeddings.embed_documents(["beta", "gamma"])
+    assert client.requests == [["alpha", "beta"], ["gamma"]]
+    assert np.array_equal(first[0], first[2]) and np.array_equal(first[1], second[0])
+    # Keys include the model name
+    other_model = CachedEmbeddings(client, EmbeddingCache(str(tmp_path)), model_name="other-model")
+    other_model.embed_query("alpha")
+    assert client.requests[-1] == ["alpha"]
+
+
+def write_vectors(cache_dir, worker):
+    cache = EmbeddingCache(cache_dir, memory_items=0)
+    for start in range(0, 40, 4):
+        keys = [f"{worker}-{i}" for i in range(start, start + 4)]
+        cache.put_many(keys, [vector(worker * 1000 + i) for i in range(start, start + 4)])
+
+
+def test_concurrent_writers_keep_index_and_rows_consistent(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=write_vectors, args=(str(tmp_path), worker)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    assert all(process.exitcode == 0 for process in workers)
+
+    cache = EmbeddingCache(str(tmp_path), memory_items=0)
+    keys = [f"{worker}-{i}" for worker in range(4) for i in range(40)]
+    found = cache.get_many(keys)
+    assert cache.stats()["disk_entries"] == 160
+    assert (tmp_path / "vectors_4.f32").stat().st_size == 160 * 4 * 4
+    for key, stored in zip(keys, found):
+        worker, i = map(int, key.split("-"))
+        assert np.array_equal(stored, vector(worker * 1000 + i))
+
+
+def test_store_is_compacted_to_recently_used_vectors(tmp_path):
+    # Room for 10 vectors of 16 bytes; compaction keeps 9
+    cache = EmbeddingCache(str(tmp_path), memory_items=3, max_bytes=160)
+    reader = EmbeddingCache(str(tmp_path), memory_items=0, max_bytes=160)
+    cache.put_many([f"k{i}" for i in range(10)], [vector(i) for i in range(10)])
+    cache.get_many(["k0", "k1"])
+    assert reader.get_many(["k5"])[0] is not None
+
+    cache.put_many(["k10"], [vector(10)])
+    stats = cache.stats()
+    assert stats["evictions"] == 2 and stats["disk_entries"] == 9 and stats["disk_bytes"] <= 160
+    assert not (tmp_path / "vectors_4.f32").exists()
+
+    # Recently used vectors and the newest rows survive; another process follows the new generation
+    found = reader.get_many(["k0", "k1", "k10", "k9", "k2", "k3"])
+    assert all(np.array_equal(found[i], vector(seed)) for i, seed in enumerate([0, 1, 10, 9]))
+    assert found[4:] == [None, None]
+    reader.put_many(["k11"], [vector(11)])
+    assert np.array_equal(cache.get_many(["k11"])[0], vector(11))
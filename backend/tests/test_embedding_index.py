@@ -0,0 +1,84 @@
+import numpy as np
+
+from app.services.document_matcher_service.embedding_index import EmbeddingIndex
+
+VECTORS = {
+    "COMP_001": np.array([1.0, 0.0, 0.0]),
+    "COMP_002": np.array([0.0, 2.0, 0.0]),
+    "COMP_003": np.array([1.0, 1.0, 0.0]),
+}
+
+
+class CountingEmbedder:
+    def __init__(self, vectors):
+        self.vectors = dict(vectors)
+        self.calls = []
+
+    def __call__(self, doc_id):
+        self.calls.append(doc_id)
+        return self.vectors.get(doc_id)
+
+
+def test_search_ranks_by_cosine_similarity():
+    index = EmbeddingIndex(None, config="test")
+    index.sync({doc_id: "v1" for doc_id in VECTORS}, CountingEmbedder(VECTORS))
+
+    ranking = index.search(np.array([0.0, 5.0, 0.0]), top_k=2)
+    assert [doc_id for doc_id, _ in ranking] == ["COMP_002", "COMP_003"]
+    assert np.isclose(ranking[0][1], 1.0)
+    assert np.isclose(ranking[1][1], np.sqrt(0.5))
+
+    assert index.search(np.array([0.0, 5.0, 0.0]), top_k=3, doc_ids=["COMP_001"]) == [("COMP_001", 0.0)]
+
+
+def test_sync_embeds_only_changed_documents_and_persists(tmp_path):
+    path = str(tmp_path / "matcher" / "index.npz")
+    embedder = CountingEmbedder(VECTORS)
+    index = EmbeddingIndex(path, config="test")
+    assert index.sync({doc_id: "v1" for doc_id in VECTORS}, embedder) == 3
+
+    # A restarted process loads the matrix and embeds nothing while files are unchanged
+    restarted = EmbeddingIndex(path, config="test")
+    embedder.calls.clear()
+    assert restarted.sync({doc_id: "v1" for doc_id in VECTORS}, embedder) == 0
+    assert embedder.calls == []
+
+    # One edited document and one removed document
+    embedder.vectors["COMP_001"] = np.array([0.0, 0.0, 3.0])
+    assert restarted.sync({"COMP_001": "v2", "COMP_002": "v1"}, embedder) == 1
+    assert embedder.calls == ["COMP_001"]
+    assert restarted.doc_ids == ["COMP_001", "COMP_002"]
+    assert restarted.search(np.array([0.0, 0.0, 1.0]))[0][0] == "COMP_001"
+
+    # An index built with another embedding configuration is not reused
+    assert len(EmbeddingIndex(path, config="other-model")) == 0
+
+
+def test_max_sim_scores_every_query_chunk_against_its_best_chunk():
+    # COMP_001 covers both query topics in separate chunks, COMP_002 only their average
+    chunks = {
+        "COMP_001": np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [0.0, 0.0, 1.0]]),
+        "COMP_002": np.array([[1.0, 1.0, 0.0]]),
+    }
+    index = EmbeddingIndex(None, config="test")
+    index.sync({doc_id: "v1" for doc_id in chunks}, CountingEmbedder(chunks))
+    query = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+
+    ranking = index.search_max_sim(query, top_k=2)
+    assert [doc_id for doc_id, _ in ranking] == ["COMP_001", "COMP_002"]
+    assert np.isclose(ranking[0][1], 1.0)
+    assert np.isclose(ranking[1][1], np.sqrt(0.5))
+
+
+def test_max_sim_blocks_give_the_same_scores():
+    generator = np.random.default_rng(0)
+    chunks = {f"COMP_{number:03d}": generator.normal(size=(int(generator.integers(1, 9)), 16))
+              for number in range(1, 30)}
+    index = EmbeddingIndex(None, config="test")
+    index.sync({doc_id: "v1" for doc_id in chunks}, CountingEmbedder(chunks))
+    query = generator.normal(size=(5, 16))
+
+    unblocked = index.search_max_sim(query, top_k=10)
+    blocked = index.search_max_sim(query, top_k=10, block_elements=7)
+    assert [doc_id for doc_id, _ in blocked] == [doc_id for doc_id, _ in unblocked]
+    assert np.allclose([score for _, score in blocked], [score for _, score in unblocked])
@@ -0,0 +1,114 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.endpoints import compliance
+from app.core.config import settings
+from app.db.database import get_async_db, init_db
+from app.db.repositories.async_compliance_repository import AsyncComplianceRepository
+from app.db.repositories.compliance_repository import ComplianceRepository
+from app.models.compliance import ComplianceIssue as ComplianceIssueModel
+from app.services.compliance_service import compliance_service
+from app.services.compliance_service.incremental import ContentDiff
+from app.services.compliance_service.replay import ReplayChatModel, ReplayEmbeddings
+
+
+OLD = (
+    "1. Eligibility\nSubjects must be at least 18 years old.\n\n"
+    "2. Washout\nA washout period of 3 weeks is required.\n\n"
+    "3. Reporting\nSerious adverse events are reported within 24 hours.\n"
+)
+
+
+def test_unchanged_spans_are_shifted_and_edited_spans_dropped():
+    new = OLD.replace("3 weeks", "2 weeks").replace(
+        "1. Eligibility\n", "1. Eligibility\nInformed consent is obtained first.\n")
+    diff = ContentDiff(OLD, new)
+
+    reporting = "Serious adverse events are reported within 24 hours."
+    start = OLD.index(reporting)
+    new_start, new_end = diff.map_span(start, start + len(reporting))
+    assert new[new_start:new_end] == reporting
+
+    washout = "A washout period of 3 weeks is required."
+    start = OLD.index(washout)
+    assert diff.map_span(start, start + len(washout)) is None
+
+
+def test_changed_regions_cover_whole_paragraphs():
+    new = OLD.replace("3 weeks", "2 weeks")
+    regions = ContentDiff(OLD, new).changed_regions(context_chars=500)
+
+    assert len(regions) == 1
+    start, end = regions[0]
+    assert new[start:end] == "2. Washout\nA washout period of 2 weeks is required."
+
+
+def test_identical_content_has_no_changed_regions():
+    diff = ContentDiff(OLD, OLD)
+
+    assert diff.unchanged
+    assert diff.changed_regions(context_chars=500) == []
+    assert diff.map_span(0, len(OLD)) == (0, len(OLD))
+
+
+def test_issues_with_a_decision_are_never_replaced(tmp_path, monkeypatch):
+    path = tmp_path / "reviews.db"
+    init_db(create_engine(f"sqlite:///{path}"))
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(compliance_service, "llm_client", ReplayChatModel(typo_rate=0.0))
+    monkeypatch.setattr(compliance_service, "embeddings", ReplayEmbeddings())
+    monkeypatch.setattr(compliance_service, "embeddings_available", True)
+    monkeypatch.setattr(settings, "CHUNK_CACHE_ENABLED", False)
+
+    app = FastAPI()
+    app.include_router(compliance.router)
+
+    async def override_db():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_db
+    washout = "A washout period of 3 weeks is required."
+    # Stored issue IDs are generated, so the explanation names each issue
+    issues = [ComplianceIssueModel(id=name, clinical_text=text, compliance_text="Washout is 2 weeks.",
+                                   explanation=name, suggested_edit="", confidence="high", regulation="")
+              for name, text in [("pending", washout), ("decided", washout),
+                                 ("reporting", "Serious adverse events are reported within 24 hours.")]]
+
+    async def scenario():
+        async with session_factory() as db:
+            review = await AsyncComplianceRepository.create_review(db, {
+                "clinical_doc_id": "CLIN_001", "compliance_doc_id": "COMP_001", "clinicalDoc": "Protocol",
+                "complianceDoc": "Guideline", "status": "completed", "clinical_doc_content": OLD,
+                "compliance_doc_content": "Washout is 2 weeks.\n\nEvents are reported within 24 hours."})
+            review = await AsyncComplianceRepository.add_issues_to_review(db, review.id, issues)
+            stored_ids = {issue.explanation: issue.id for issue in review.issues}
+            # A decision whose issue status was never updated
+            await db.run_sync(ComplianceRepository.add_decision, {"issue_id": stored_ids["decided"], "action": "rejected"})
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/update-review-content/R-00001", params={"reanalyze": "true"},
+                                         json={"clinical_doc_content": OLD.replace("3 weeks", "2 weeks")})
+
+        async with session_factory() as db:
+            kept = await db.run_sync(ComplianceRepository.delete_issues, [stored_ids["decided"]], keep_decided=True)
+            assert kept == {"issues": 0, "decisions": 0}
+            stored = {issue.id for issue in await AsyncComplianceRepository.get_issues_for_review(db, "R-00001")}
+            decisions = await db.run_sync(ComplianceRepository.get_decisions_for_issue, stored_ids["decided"])
+        return response, stored, decisions, stored_ids
+
+    try:
+        response, stored, decisions, stored_ids = asyncio.run(scenario())
+    finally:
+        asyncio.run(engine.dispose())
+
+    assert response.status_code == 200
+    assert response.json()["incremental"]["removed_issue_ids"] == [stored_ids["pending"]]
+    assert {stored_ids["decided"], stored_ids["reporting"]} <= stored and stored_ids["pending"] not in stored
+    assert [decision.action for decision in decisions] == ["rejected"]
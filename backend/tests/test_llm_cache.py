@@ -0,0 +1,81 @@
+import asyncio
+
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+
+from app.services.compliance_service import llm_cache
+from app.services.compliance_service.llm_cache import CachedChatModel, LLMResponseCache, llm_cache_bypass
+
+
+class CountingModel:
+    """Chat model stand-in answering with a counter."""
+
+    temperature = 0
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return AIMessage(content=f"answer {self.calls}",
+                         response_metadata={"token_usage": {"total_tokens": 10}})
+
+
+def messages(prompt):
+    return [SystemMessage(content="You are a compliance reviewer."), HumanMessage(content=prompt)]
+
+
+def test_keys_depend_on_model_deployment_and_messages():
+    key = LLMResponseCache.make_key("gpt-4o", "prod", messages("a"))
+    assert key == LLMResponseCache.make_key("gpt-4o", "prod", messages("a"))
+    assert key != LLMResponseCache.make_key("gpt-4o-mini", "prod", messages("a"))
+    assert key != LLMResponseCache.make_key("gpt-4o", "staging", messages("a"))
+    assert key != LLMResponseCache.make_key("gpt-4o", "prod", messages("b"))
+
+
+def test_entries_expire_and_lru_entries_are_evicted(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    cache = LLMResponseCache(str(tmp_path / "responses.sqlite3"), ttl_seconds=60, max_bytes=50)
+
+    cache.put("a", "x" * 20)
+    now[0] += 1
+    cache.put("b", "y" * 20)
+    now[0] += 1
+    assert cache.get("a")["content"] == "x" * 20
+    now[0] += 1
+    # Over the limit: "b" was the least recently used response
+    cache.put("c", "z" * 20)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+    now[0] += 61
+    assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1
+
+    # Entries persist across instances sharing the database
+    cache.put("d", "w")
+    assert LLMResponseCache(cache.path).get("d")["content"] == "w"
+
+
+def test_cached_model_serves_repeats_and_bypass_refreshes(tmp_path):
+    model = CountingModel()
+    cached = CachedChatModel(model, LLMResponseCache(str(tmp_path / "responses.sqlite3")),
+                             model_name="gpt-4o", deployment="prod")
+
+    async def scenario():
+        first = await cached.ainvoke(messages("review"))
+        repeat = await cached.ainvoke(messages("review"))
+        with llm_cache_bypass():
+            refreshed = await cached.ainvoke(messages("review"))
+        after_refresh = await cached.ainvoke(messages("review"))
+        return first, repeat, refreshed, after_refresh
+
+    first, repeat, refreshed, after_refresh = asyncio.run(scenario())
+    assert model.calls == 2
+    assert repeat.content == first.content == "answer 1"
+    assert repeat.response_metadata["cache_hit"]
+    assert repeat.response_metadata["token_usage"] == {"total_tokens": 10}
+    assert refreshed.content == after_refresh.content == "answer 2"
+    # Attributes of the wrapped client stay reachable
+    assert cached.temperature == 0
@@ -0,0 +1,59 @@
+import numpy as np
+
+from app.services.compliance_service.models.pydantic_models import PairPlan
+from app.services.compliance_service.pairing import (
+    plan_basic_pairs,
+    plan_embedding_pairs,
+    validate_replay_plan,
+)
+
+
+def reference_pairs(clinical, compliance, top_n, threshold):
+    """Row-by-row argsort selection the planner replaces."""
+    clinical = clinical / np.linalg.norm(clinical, axis=1, keepdims=True)
+    compliance = compliance / np.linalg.norm(compliance, axis=1, keepdims=True)
+    similarity = clinical @ compliance.T
+    pairs = []
+    for i, row in enumerate(similarity):
+        for j in row.argsort()[-top_n:][::-1]:
+            if row[j] >= threshold:
+                pairs.append((i, int(j)))
+    return pairs
+
+
+def test_embedding_plan_matches_per_row_top_n():
+    rng = np.random.default_rng(0)
+    clinical = rng.normal(size=(40, 16))
+    compliance = rng.normal(size=(25, 16))
+
+    plan = plan_embedding_pairs(clinical, compliance, top_n=3, similarity_threshold=0.2)
+
+    selected = [(pair.clinical_index, pair.compliance_index) for pair in plan.pairs]
+    assert selected == reference_pairs(clinical, compliance, 3, 0.2)
+    assert plan.candidate_count == len(plan.pairs)
+
+
+def test_pair_budget_keeps_most_similar_pairs():
+    rng = np.random.default_rng(1)
+    clinical = rng.normal(size=(30, 8))
+    compliance = rng.normal(size=(30, 8))
+
+    unlimited = plan_embedding_pairs(clinical, compliance, top_n=3, similarity_threshold=-1.0)
+    budgeted = plan_embedding_pairs(clinical, compliance, top_n=3, similarity_threshold=-1.0, max_pairs=10)
+
+    assert len(budgeted.pairs) == 10
+    assert budgeted.candidate_count == len(unlimited.pairs)
+    top_scores = sorted((pair.similarity for pair in unlimited.pairs), reverse=True)[:10]
+    assert sorted((pair.similarity for pair in budgeted.pairs), reverse=True) == top_scores
+    # Execution order stays grouped by clinical chunk
+    rows = [pair.clinical_index for pair in budgeted.pairs]
+    assert rows == sorted(rows)
+
+
+def test_plan_round_trips_for_replay():
+    plan = plan_basic_pairs(5, 4)
+    replayed = PairPlan.model_validate_json(plan.model_dump_json())
+
+    assert replayed == plan
+    assert validate_replay_plan(replayed, 5, 4)
+    assert not validate_replay_plan(replayed, 6, 4)
@@ -0,0 +1,67 @@
+import os
+
+from app.services import pdf_extraction
+from app.services.pdf_extraction import PdfPageExtractor, extract_page_range
+
+
+def write_pdf(path, page_texts):
+    """Write a minimal PDF with one line of Helvetica text per page."""
+    page_ids = [4 + 2 * index for index in range(len(page_texts))]
+    objects = {
+        1: "<< /Type /Catalog /Pages 2 0 R >>",
+        2: f"<< /Type /Pages /Kids [{' '.join(f'{page_id} 0 R' for page_id in page_ids)}] /Count {len(page_ids)} >>",
+        3: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for page_id, text in zip(page_ids, page_texts):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects[page_id] = ("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>")
+        objects[page_id + 1] = f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream"
+
+    content = b"%PDF-1.4\n"
+    offsets = []
+    for number in range(1, len(objects) + 1):
+        offsets.append(len(content))
+        content += f"{number} 0 obj\n{objects[number]}\nendobj\n".encode("latin-1")
+    xref = len(content)
+    content += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    content += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    content += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    path.write_bytes(content)
+
+
+def test_parallel_extraction_matches_serial_extraction(tmp_path):
+    path = tmp_path / "guidance.pdf"
+    write_pdf(path, [f"Page {number} requires informed consent" for number in range(11)])
+
+    serial = list(PdfPageExtractor(max_workers=1).iter_pages(str(path)))
+    extractor = PdfPageExtractor(max_workers=2, pages_per_task=3, min_parallel_pages=1)
+    try:
+        parallel = list(extractor.iter_pages(str(path)))
+    finally:
+        extractor.shutdown()
+
+    assert parallel == serial
+    assert [text.strip() for _, _, text in serial] == [f"Page {number} requires informed consent"
+                                                         for number in range(11)]
+    assert [offset for _, offset, _ in serial] == [sum(len(text) for _, _, text in serial[:index])
+                                                    for index in range(11)]
+
+
+def test_worker_parses_each_file_once(tmp_path, monkeypatch):
+    path = tmp_path / "guidance.pdf"
+    write_pdf(path, [f"Page {number}" for number in range(6)])
+    parses = []
+    open_reader = pdf_extraction._open_reader
+    monkeypatch.setattr(pdf_extraction, "_worker_reader", None)
+    monkeypatch.setattr(pdf_extraction, "_open_reader", lambda file_path: parses.append(file_path) or open_reader(file_path))
+
+    pages = extract_page_range(str(path), 0, 2) + extract_page_range(str(path), 2, 6)
+    assert [page.strip() for page in pages] == [f"Page {number}" for number in range(6)]
+    assert len(parses) == 1
+
+    # A changed file is parsed again
+    write_pdf(path, ["Revised page"])
+    os.utime(path, ns=(0, 0))
+    assert extract_page_range(str(path), 0, 1) == ["Revised page\n"]
+    assert len(parses) == 2
@@ -0,0 +1,76 @@
+import asyncio
+
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+
+from app.core.config import settings
+from app.models.compliance import ComplianceReviewInput
+from app.services.compliance_service import compliance_service
+from app.services.compliance_service.chunking import RecursiveChunker
+from app.services.compliance_service.prompts import COMPLIANCE_ANALYSIS_SYSTEM_PROMPT, get_compliance_analysis_human_prompt
+from app.services.compliance_service.replay import (
+    Cassette,
+    RecordingChatModel,
+    RecordingEmbeddings,
+    ReplayChatModel,
+    ReplayEmbeddings,
+)
+
+CLINICAL = ("Subjects will be enrolled after the screening visit has been completed by the site staff. "
+            "Adverse events will be reported to the sponsor within seven days of awareness by the investigator. "
+            "Blood samples are collected at every scheduled study visit for the safety laboratory panel.\n\n") * 12
+COMPLIANCE = ("Subjects must only be enrolled after the screening visit has been completed by qualified site staff. "
+              "Serious adverse events must be reported to the sponsor within twenty-four hours of awareness by the investigator. "
+              "Blood samples must be collected at every scheduled study visit for the safety laboratory panel.\n\n") * 12
+
+
+class EchoModel:
+    async def ainvoke(self, messages):
+        return AIMessage(content=f"echo {len(messages)}", response_metadata={"token_usage": {"total_tokens": 3}})
+
+
+def test_recorded_responses_and_embeddings_are_replayed(tmp_path):
+    messages = [SystemMessage(content="system"), HumanMessage(content="prompt")]
+    cassette = Cassette()
+    recorder = RecordingChatModel(EchoModel(), cassette)
+    asyncio.run(recorder.ainvoke(messages))
+    RecordingEmbeddings(ReplayEmbeddings(dimensions=8), cassette).embed_documents(["some text"])
+
+    path = str(tmp_path / "cassette.json")
+    cassette.save(path)
+    loaded = Cassette.load(path)
+
+    replay = ReplayChatModel(loaded)
+    response = asyncio.run(replay.ainvoke(messages))
+    assert response.content == "echo 2"
+    assert response.response_metadata["token_usage"] == {"total_tokens": 3}
+    assert ReplayEmbeddings(loaded, dimensions=8).embed_documents(["some text"]) == \
+        [cassette.embedding("some text")]
+
+    # Unrecorded requests are answered synthetically, in the format the service parses
+    synthetic = asyncio.run(replay.ainvoke([
+        SystemMessage(content=COMPLIANCE_ANALYSIS_SYSTEM_PROMPT),
+        HumanMessage(content=get_compliance_analysis_human_prompt(CLINICAL[:300], COMPLIANCE[:300]))]))
+    assert synthetic.content.startswith('{"issues": [')
+    assert (replay.replayed, replay.synthesized, replay.calls) == (1, 1, 2)
+
+
+def test_review_runs_offline_with_replay_clients(monkeypatch):
+    llm = ReplayChatModel(latency=0.01, jitter=0.5)
+    embeddings = ReplayEmbeddings()
+    monkeypatch.setattr(compliance_service, "llm_client", llm)
+    monkeypatch.setattr(compliance_service, "embeddings", embeddings)
+    monkeypatch.setattr(compliance_service, "embeddings_available", True)
+    monkeypatch.setattr(compliance_service, "chunker", RecursiveChunker(chunk_size=600, chunk_overlap=0))
+    monkeypatch.setattr(settings, "CHUNK_CACHE_ENABLED", False)
+
+    review_input = ComplianceReviewInput(clinical_doc_id="CLIN_001", compliance_doc_id="COMP_001",
+                                         clinical_doc_content=CLINICAL, compliance_doc_content=COMPLIANCE)
+    first = asyncio.run(compliance_service.analyze_compliance(review_input))
+    calls = llm.calls
+    second = asyncio.run(compliance_service.analyze_compliance(review_input))
+
+    assert calls > 1 and llm.calls == 2 * calls
+    assert embeddings.calls > 0
+    # Synthetic responses only depend on the prompts, so reviews are reproducible
+    assert first and [issue.clinical_text for issue in first] == [issue.clinical_text for issue in second]
+    assert all(issue.clinical_text_start_char is not None for issue in first)
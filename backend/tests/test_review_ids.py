@@ -0,0 +1,65 @@
+import datetime
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db.database import init_db
+from app.db.models.models import Review, review_id_seq
+from app.db.repositories.compliance_repository import ComplianceRepository
+
+
+def _review_data():
+    return {"clinical_doc_id": "CLIN_001", "compliance_doc_id": "COMP_001",
+            "clinicalDoc": "Protocol", "complianceDoc": "Guideline", "status": "in_progress"}
+
+
+def test_ids_continue_after_existing_reviews(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reviews.db'}")
+    init_db(engine)
+    with Session(engine) as db:
+        for review_id in ("R-00002", "R-00010", "legacy-id"):
+            db.add(Review(id=review_id, created_at=datetime.datetime(2025, 1, 1), **_review_data()))
+        db.commit()
+
+    # A restart picks up reviews created before the allocator existed
+    init_db(engine)
+    with Session(engine) as db:
+        assert ComplianceRepository.create_review(db, _review_data()).id == "R-00011"
+        assert ComplianceRepository.create_review(db, _review_data()).id == "R-00012"
+
+    # Restarting again never moves the counter backwards
+    init_db(engine)
+    with Session(engine) as db:
+        assert ComplianceRepository.create_review(db, _review_data()).id == "R-00013"
+
+
+def test_concurrent_allocations_are_unique(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reviews.db'}",
+                           connect_args={"timeout": 30})
+    init_db(engine)
+    make_session = sessionmaker(bind=engine)
+    allocated = []
+    lock = threading.Lock()
+
+    def create_reviews():
+        for _ in range(10):
+            with make_session() as db:
+                review_id = ComplianceRepository.create_review(db, _review_data()).id
+            with lock:
+                allocated.append(review_id)
+
+    threads = [threading.Thread(target=create_reviews) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(allocated) == [f"R-{n:05d}" for n in range(1, 41)]
+
+
+def test_postgres_uses_the_sequence():
+    sql = str(review_id_seq.next_value().compile(dialect=postgresql.dialect()))
+
+    assert sql == "nextval('review_id_seq')"
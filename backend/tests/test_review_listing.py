@@ -0,0 +1,123 @@
+import asyncio
+import datetime
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.endpoints import compliance
+from app.core.config import settings
+from app.db.database import get_async_db, init_db
+from app.db.models.models import Base, ComplianceIssue, Review
+from app.db.repositories.compliance_repository import ComplianceRepository
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    start = datetime.datetime(2025, 1, 1)
+    for number in range(1, 8):
+        review = Review(
+            id=f"R-{number:05d}", clinical_doc_id=f"CLIN_00{number % 2 + 1}",
+            compliance_doc_id="COMP_001", clinicalDoc="Protocol", complianceDoc="Guideline",
+            clinical_doc_content="x" * 1000, compliance_doc_content="y" * 1000,
+            status="completed" if number % 3 else "in_progress",
+            # Two reviews share a timestamp to exercise the id tie-breaker
+            created_at=start + datetime.timedelta(hours=min(number, 6)))
+        review.issues = [
+            ComplianceIssue(clinical_text="a", compliance_text="b", explanation="c",
+                            confidence="high" if index % 2 == 0 else "low")
+            for index in range(number)]
+        session.add(review)
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_summaries_count_issues_without_content(db):
+    rows, next_cursor = ComplianceRepository.get_review_summaries(db)
+
+    assert next_cursor is None
+    assert [row.id for row in rows] == [f"R-{n:05d}" for n in range(7, 0, -1)]
+    summary = Review.summary_dict(rows[0])
+    assert "clinical_doc_content" not in summary
+    full = db.get(Review, "R-00007").to_dict()
+    assert summary == {key: value for key, value in full.items() if not key.endswith("_content")}
+
+
+def test_keyset_pages_cover_every_review_once(db):
+    seen = []
+    cursor = None
+    while True:
+        rows, cursor = ComplianceRepository.get_review_summaries(db, limit=3, cursor=cursor)
+        seen.extend(row.id for row in rows)
+        if cursor is None:
+            break
+
+    assert seen == [f"R-{n:05d}" for n in range(7, 0, -1)]
+
+
+def test_filters(db):
+    rows, _ = ComplianceRepository.get_review_summaries(
+        db, status="in_progress", clinical_doc_id="CLIN_001")
+
+    assert [row.id for row in rows] == ["R-00006"]
+
+
+def test_malformed_cursor(db):
+    with pytest.raises(ValueError):
+        ComplianceRepository.get_review_summaries(db, limit=3, cursor="not-a-cursor")
+
+
+def test_missing_indexes_are_created_on_old_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reviews.db'}")
+    init_db(engine)
+    # A database created before the listing index existed
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_reviews_created_at_id"))
+    init_db(engine)
+
+    indexes = {index["name"]: index["column_names"] for index in inspect(engine).get_indexes("reviews")}
+    assert indexes["ix_reviews_created_at_id"] == ["created_at", "id"]
+
+
+def test_listing_endpoint_pages_by_default(tmp_path, monkeypatch):
+    path = tmp_path / "reviews.db"
+    init_db(create_engine(f"sqlite:///{path}"))
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(engine)
+    monkeypatch.setattr(settings, "REVIEWS_PAGE_SIZE", 2)
+
+    async def override_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(compliance.router)
+    app.dependency_overrides[get_async_db] = override_db
+
+    async def scenario():
+        async with session_factory() as db:
+            for number in range(1, 4):
+                db.add(Review(id=f"R-{number:05d}", clinical_doc_id="CLIN_001", compliance_doc_id="COMP_001",
+                              clinicalDoc="Protocol", complianceDoc="Guideline", status="completed",
+                              created_at=datetime.datetime(2025, 1, number)))
+            await db.commit()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = (await client.get("/reviews/")).json()
+            second = (await client.get("/reviews/", params={"cursor": first["next_cursor"]})).json()
+        return first, second
+
+    try:
+        first, second = asyncio.run(scenario())
+    finally:
+        asyncio.run(engine.dispose())
+    assert [review["id"] for review in first["reviews"]] == ["R-00003", "R-00002"]
+    assert [review["id"] for review in second["reviews"]] == ["R-00001"]
+    assert second["next_cursor"] is None
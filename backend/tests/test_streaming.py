@@ -0,0 +1,158 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.endpoints import compliance
+from app.core.config import settings
+from app.db.database import get_async_db, init_db
+from app.db.repositories.async_compliance_repository import AsyncComplianceRepository
+from app.models.compliance import ComplianceReviewInput
+from app.services.compliance_service import compliance_service
+from app.services.compliance_service.chunking import RecursiveChunker
+from app.services.compliance_service.replay import ReplayChatModel, ReplayEmbeddings
+
+CLINICAL = ("Subjects will be enrolled after the screening visit has been completed by the site staff. "
+            "Adverse events will be reported to the sponsor within seven days of awareness by the investigator.\n\n") * 6
+COMPLIANCE = ("Subjects must only be enrolled after the screening visit has been completed by qualified site staff. "
+              "Serious adverse events must be reported to the sponsor within twenty-four hours of awareness.\n\n") * 6
+REVIEW = {"clinical_doc_id": "CLIN_001", "compliance_doc_id": "COMP_001",
+          "clinical_doc_content": CLINICAL, "compliance_doc_content": COMPLIANCE}
+
+
+@pytest.fixture
+def replay_clients(monkeypatch):
+    monkeypatch.setattr(compliance_service, "llm_client", ReplayChatModel(typo_rate=0.0, issues_per_prompt=3))
+    monkeypatch.setattr(compliance_service, "embeddings", ReplayEmbeddings())
+    monkeypatch.setattr(compliance_service, "embeddings_available", True)
+    monkeypatch.setattr(compliance_service, "chunker", RecursiveChunker(chunk_size=400, chunk_overlap=20))
+    monkeypatch.setattr(settings, "CHUNK_CACHE_ENABLED", False)
+
+
+async def collect(review_input):
+    return [event async for event in compliance_service.stream_compliance(review_input)]
+
+
+def post_stream(path, **kwargs):
+    app = FastAPI()
+    app.include_router(compliance.router)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, **kwargs)
+
+    return asyncio.run(scenario())
+
+
+def test_events_are_streamed_in_order(replay_clients):
+    events = asyncio.run(collect(ComplianceReviewInput(**REVIEW)))
+    kinds = [event["event"] for event in events]
+
+    assert events[0] == {"event": "phase", "phase": "started",
+                         "clinical_doc_id": "CLIN_001", "compliance_doc_id": "COMP_001"}
+    assert kinds[-1] == "complete" and kinds.count("complete") == 1 and "error" not in kinds
+    phases = [event["phase"] for event in events if event["event"] == "phase"]
+    assert phases.index("chunking") < phases.index("chunk_analysis") < phases.index("deduplication")
+
+    # Issues and progress of the chunk pairs arrive between the analysis phase and deduplication
+    analysis = next(i for i, event in enumerate(events) if event.get("phase") == "chunk_analysis")
+    deduplication = next(i for i, event in enumerate(events) if event.get("phase") == "deduplication")
+    assert {"issue", "progress"} <= set(kinds[analysis:deduplication])
+    assert not {"issue", "progress"} & set(kinds[:analysis] + kinds[deduplication:])
+    progress = [event for event in events if event["event"] == "progress"]
+    assert [event["pairs_done"] for event in progress] == list(range(1, len(progress) + 1))
+    assert progress[-1]["pairs_done"] == progress[-1]["pairs_planned"]
+
+    complete = events[-1]
+    assert complete["issues"] and complete["profile"]["attributes"]["issues"] == len(complete["issues"])
+
+
+def test_failed_analysis_ends_with_an_error_event(monkeypatch):
+    async def failing_analysis(review_input, event_callback=None, trace=None):
+        event_callback({"event": "phase", "phase": "chunking"})
+        raise RuntimeError("LLM unavailable")
+
+    monkeypatch.setattr(compliance_service, "analyze_compliance", failing_analysis)
+    events = asyncio.run(collect(ComplianceReviewInput(**REVIEW)))
+
+    assert [event["event"] for event in events] == ["phase", "phase", "error"]
+    assert events[1]["phase"] == "chunking"
+    assert events[-1] == {"event": "error", "detail": "LLM unavailable"}
+
+
+def test_ndjson_stream_has_one_event_per_line(replay_clients):
+    response = post_stream("/analyze-compliance/stream", json=REVIEW)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.endswith("\n")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[0]["phase"] == "started" and events[-1]["event"] == "complete"
+
+
+def test_sse_stream_names_every_event(replay_clients, monkeypatch):
+    async def load_content(document_id):
+        return CLINICAL if document_id == "CLIN_001" else COMPLIANCE
+
+    monkeypatch.setattr(compliance.document_service, "aget_document_content", load_content)
+    response = post_stream("/analyze-by-ids/stream",
+                           params={"clinical_doc_id": "CLIN_001", "compliance_doc_id": "COMP_001", "format": "sse"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.endswith("\n\n")
+    messages = response.text[:-2].split("\n\n")
+    for message in messages:
+        event_line, data_line = message.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        assert json.loads(data_line[len("data: "):])["event"] == event_line[len("event: "):]
+    assert messages[-1].startswith("event: complete\n")
+
+
+def test_review_created_after_a_stream_stores_its_issues(replay_clients, tmp_path, monkeypatch):
+    path = tmp_path / "reviews.db"
+    init_db(create_engine(f"sqlite:///{path}"))
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def load_content(document_id):
+        return CLINICAL if document_id == "CLIN_001" else COMPLIANCE
+
+    async def override_db():
+        async with session_factory() as db:
+            yield db
+
+    monkeypatch.setattr(compliance.document_service, "aget_document_content", load_content)
+    app = FastAPI()
+    app.include_router(compliance.router)
+    app.dependency_overrides[get_async_db] = override_db
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            streamed = await client.post("/analyze-compliance/stream", json=REVIEW)
+            complete = json.loads(streamed.text.splitlines()[-1])
+            created = await client.post("/reviews/", json={
+                "id": "", "clinical_doc_id": "CLIN_001", "compliance_doc_id": "COMP_001",
+                "clinicalDoc": "Protocol", "complianceDoc": "Guideline", "status": "completed",
+                "created": "", "issues": len(complete["issues"])})
+        async with session_factory() as db:
+            stored = await AsyncComplianceRepository.get_issues_for_review(db, created.json()["id"])
+            profile = await AsyncComplianceRepository.get_review_profile(db, created.json()["id"])
+        return complete, created, stored, profile
+
+    try:
+        complete, created, stored, profile = asyncio.run(scenario())
+    finally:
+        asyncio.run(engine.dispose())
+
+    assert complete["event"] == "complete" and complete["issues"]
+    assert created.status_code == 200
+    assert sorted(issue.clinical_text for issue in stored) == sorted(
+        issue["clinical_text"] for issue in complete["issues"])
+    assert profile == (True, complete["profile"])
@@ -0,0 +1,60 @@
+import re
+
+from app.services.compliance_service.utils import (
+    NormalizedText,
+    find_text_offsets,
+    locate_verified_text,
+    verify_text_in_source,
+)
+
+
+SOURCE = "Subjects must be\n\n   at least  17 years\told.\nWashout period:   3 weeks."
+
+
+def test_normalized_text_maps_offsets_back_to_original():
+    index = NormalizedText(SOURCE)
+
+    assert index.normalized == re.sub(r'\s+', ' ', SOURCE)
+    for normalized_pos, char in enumerate(index.normalized):
+        original_char = SOURCE[index.to_original(normalized_pos)]
+        assert original_char == char or (char == ' ' and original_char.isspace())
+    assert index.to_original(len(index.normalized)) == len(SOURCE)
+
+
+def test_find_text_offsets_ignores_whitespace_differences():
+    index = NormalizedText(SOURCE)
+
+    start, end = find_text_offsets("at least 17 years old.", index)
+
+    assert SOURCE[start:end] == "at least  17 years\told."
+    assert find_text_offsets("at least 17 years old.", SOURCE) == (start, end)
+
+
+def test_find_text_offsets_respects_search_start_offset():
+    source = "dose  level one. dose level one."
+    index = NormalizedText(source)
+
+    start, _ = find_text_offsets("dose level one.", index, search_start_offset=5)
+
+    assert start == source.rindex("dose level one.")
+
+
+def test_verify_text_in_source_accepts_index():
+    index = NormalizedText(SOURCE)
+
+    assert verify_text_in_source("Washout period: 3 weeks.", index)
+    assert not verify_text_in_source("Completely unrelated sentence about dosing", index)
+
+
+def test_locate_verified_text_returns_span_of_fuzzy_match_in_long_source():
+    filler = " ".join(f"clause {i} applies to site number {i * 7}." for i in range(2000))
+    target = "Serious adverse events must be reported to the sponsor within 24 hours."
+    source = filler + "\n\n" + target + "\n\n" + filler
+    index = NormalizedText(source)
+
+    # Two typos force the fuzzy stage
+    start, end = locate_verified_text(
+        "Serious adverse evnts must be reported to the sponsr within 24 hours.", index)
+
+    assert source[start:end].strip(" .") in target
+    assert end - start >= len(target) - 5
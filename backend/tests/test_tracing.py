@@ -0,0 +1,103 @@
+import asyncio
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.db.database import init_db
+from app.db.repositories.async_compliance_repository import AsyncComplianceRepository
+from app.models.compliance import ComplianceReviewInput
+from app.services.compliance_service import compliance_service
+from app.services.compliance_service.chunking import RecursiveChunker
+from app.services.compliance_service.replay import ReplayChatModel, ReplayEmbeddings
+from app.services.compliance_service.tracing import ReviewMetrics, ReviewTrace, review_trace, span
+
+CLINICAL = ("Subjects will be enrolled after the screening visit has been completed by the site staff. "
+            "Adverse events will be reported to the sponsor within seven days of awareness by the investigator.\n\n") * 10
+COMPLIANCE = ("Subjects must only be enrolled after the screening visit has been completed by qualified site staff. "
+              "Serious adverse events must be reported to the sponsor within twenty-four hours of awareness.\n\n") * 10
+
+
+def test_review_profile_covers_phases_and_token_usage(monkeypatch):
+    llm = ReplayChatModel()
+    monkeypatch.setattr(compliance_service, "llm_client", llm)
+    monkeypatch.setattr(compliance_service, "embeddings", ReplayEmbeddings())
+    monkeypatch.setattr(compliance_service, "embeddings_available", True)
+    monkeypatch.setattr(compliance_service, "chunker", RecursiveChunker(chunk_size=600, chunk_overlap=0))
+    monkeypatch.setattr(settings, "CHUNK_CACHE_ENABLED", False)
+
+    trace = ReviewTrace()
+    review_input = ComplianceReviewInput(clinical_doc_id="CLIN_001", compliance_doc_id="COMP_001",
+                                         clinical_doc_content=CLINICAL, compliance_doc_content=COMPLIANCE)
+    issues = asyncio.run(compliance_service.analyze_compliance(review_input, trace=trace))
+    profile = trace.to_dict()
+
+    assert {"chunking", "pairing", "chunk_analysis", "chunk_pair", "full_document",
+            "deduplication"} <= set(profile["phases"])
+    assert profile["attributes"] == {"clinical_doc_id": "CLIN_001", "compliance_doc_id": "COMP_001",
+                                     "full_document_mode": "direct", "issues": len(issues)}
+    # Every LLM call is attributed to exactly one phase, and tokens come from the response metadata
+    assert profile["tokens"]["llm_calls"] == llm.calls
+    assert sum(phase["llm_calls"] for phase in profile["phases"].values()) == llm.calls
+    assert profile["tokens"]["total_tokens"] > 0
+    assert profile["timers"]["llm_call"]["count"] == llm.calls
+    pair_spans = [s for s in profile["spans"] if s["name"] == "chunk_pair"]
+    assert pair_spans and all(s["parent"] == "chunk_analysis" for s in pair_spans)
+
+
+def test_spans_are_capped_and_metrics_are_rendered():
+    metrics = ReviewMetrics()
+    trace = ReviewTrace(max_spans=2)
+    with review_trace(trace):
+        for _ in range(3):
+            with span("chunk_pair"):
+                trace.record_llm_usage({"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10}, cached=False)
+                trace.record_llm_usage({"total_tokens": 10}, cached=True)
+        trace.record_cache("embeddings", hits=3, misses=1)
+    metrics.observe(trace)
+
+    profile = trace.to_dict()
+    assert len(profile["spans"]) == 2 and profile["dropped_spans"] == 1
+    assert profile["phases"]["chunk_pair"]["count"] == 3
+    assert profile["tokens"] == {"llm_calls": 6, "cached_calls": 3, "prompt_tokens": 21,
+                                 "completion_tokens": 9, "total_tokens": 30}
+    assert profile["caches"]["embeddings"]["hit_rate"] == 0.75
+
+    rendered = metrics.render()
+    assert "compliance_reviews_total 1" in rendered
+    assert 'compliance_llm_tokens_total{phase="chunk_pair",type="prompt"} 21' in rendered
+    assert 'compliance_cache_lookups_total{cache="embeddings",result="miss"} 1' in rendered
+
+    # Outside of a review spans do nothing
+    with span("orphan") as orphan:
+        assert orphan is None
+
+
+def test_profile_is_stored_with_review_and_column_added_to_old_tables(tmp_path):
+    path = tmp_path / "reviews.db"
+    engine = create_engine(f"sqlite:///{path}")
+    init_db(engine)
+    # A database created before reviews had a profile
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE reviews DROP COLUMN profile"))
+    init_db(engine)
+    assert "profile" in {column["name"] for column in inspect(engine).get_columns("reviews")}
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+    review_data = {"clinical_doc_id": "CLIN_001", "compliance_doc_id": "COMP_001",
+                   "clinicalDoc": "Protocol", "complianceDoc": "Guideline", "status": "completed"}
+
+    async def scenario():
+        async with session_factory() as db:
+            with_profile = await AsyncComplianceRepository.create_review(
+                db, {**review_data, "profile": {"duration_ms": 12.5}})
+            without_profile = await AsyncComplianceRepository.create_review(db, dict(review_data))
+            return (await AsyncComplianceRepository.get_review_profile(db, with_profile.id),
+                    await AsyncComplianceRepository.get_review_profile(db, without_profile.id),
+                    await AsyncComplianceRepository.get_review_profile(db, "R-99999"))
+
+    try:
+        assert asyncio.run(scenario()) == ((True, {"duration_ms": 12.5}), (True, None), (False, None))
+    finally:
+        asyncio.run(async_engine.dispose())
@@ -57,10 +57,17 @@ export const complianceAPI = {
     };
   },
   
-  // Get all compliance reviews
+  // Get all compliance reviews, following the pagination cursor until the last page
   getReviews: async () => {
-    const response = await api.get('/compliance/reviews/');
-    return response.data.reviews;
+    const reviews: any[] = [];
+    let cursor: string | null = null;
+    do {
+      const response: { data: { reviews: any[]; next_cursor: string | null } } =
+        await api.get('/compliance/reviews/', { params: cursor ? { cursor } : {} });
+      reviews.push(...response.data.reviews);
+      cursor = response.data.next_cursor;
+    } while (cursor);
+    return reviews;
   },
   
   // Create a new compliance review record